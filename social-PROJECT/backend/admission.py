@@ -0,0 +1,273 @@
+"""
+Admission control: token buckets per client and per route, and concurrency
+caps on the expensive endpoints, checked before routing.
+
+Every request draws a token from its client's bucket, sized by role. The
+client is the remote address: request headers are chosen by the caller, so a
+client rotating its bearer token must not get a fresh bucket (or push other
+clients out of the bucket table) each time. Behind a load balancer or ingress
+the remote address is the proxy's, so requests from ADMISSION_TRUSTED_PROXIES
+are keyed on the address the proxies recorded in X-Forwarded-For instead. The
+role comes from the X-User-Role header, which the mock auth does not verify,
+so it is honoured only when its limits are no more generous than "anonymous";
+unknown, missing or more generous roles count as "anonymous". Higher limits
+for clinical roles need verified identities and are not configured by default.
+Routes in ADMISSION_ROUTES also draw from a bucket of their own shared by all
+clients, and may cap how many of their requests run at once. A request that
+finds a bucket empty is answered 429, one that finds its route at capacity
+503, both at once and with Retry-After, rather than queueing behind work the
+server cannot finish in time.
+
+Bucket and in-flight state lives in a backend. InMemoryAdmissionBackend
+keeps it per process, so with N workers (serve.py) every limit applies N
+times; a shared store can replace it by implementing the same three
+coroutines.
+"""
+import os
+import re
+import json
+import math
+import time
+import logging
+import ipaddress
+from collections import Counter, OrderedDict
+from typing import Dict, Any, List, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+ADMISSION_ENABLED = os.environ.get("ADMISSION_ENABLED", "true").lower() == "true"
+# Requests per second and burst per client, by role
+ADMISSION_ROLE_RATES = os.environ.get("ADMISSION_ROLE_RATES", "anonymous=20:40,student=10:20")
+# Addresses or CIDR ranges of the proxies in front of the API, whose X-Forwarded-For is believed
+ADMISSION_TRUSTED_PROXIES = os.environ.get("ADMISSION_TRUSTED_PROXIES", "")
+# Client buckets kept in memory; the least recently used are dropped beyond this
+ADMISSION_MAX_CLIENTS = int(os.environ.get("ADMISSION_MAX_CLIENTS", "10000"))
+# Summary generation across all clients: requests per second and how many run at once
+ADMISSION_SUMMARY_RATE = float(os.environ.get("ADMISSION_SUMMARY_RATE", "10"))
+ADMISSION_SUMMARY_CONCURRENCY = int(os.environ.get("ADMISSION_SUMMARY_CONCURRENCY", "8"))
+
+ANONYMOUS = "anonymous"
+
+Network = Union[ipaddress.IPv4Network, ipaddress.IPv6Network]
+
+# Never limited: load balancer health checks and metrics scrapes
+EXEMPT_PATHS = re.compile(r"/api/(health|metrics/.*)")
+
+
+def parse_role_rates(spec: str) -> Dict[str, Tuple[float, float]]:
+    """"role=rate:burst,..." -> {role: (tokens per second, burst)}"""
+    rates = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        role, _, limits = item.partition("=")
+        rate, _, burst = limits.partition(":")
+        rates[role.strip()] = (float(rate), float(burst or rate))
+    return rates
+
+
+def parse_networks(spec: str) -> List[Network]:
+    """"10.0.0.0/8,192.168.1.5,..." -> networks"""
+    return [ipaddress.ip_network(part.strip(), strict=False) for part in spec.split(",") if part.strip()]
+
+
+def _in_networks(address: str, networks: List[Network]) -> bool:
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in network for network in networks)
+
+
+class InMemoryAdmissionBackend:
+    """Token buckets and in-flight counters of this process"""
+
+    def __init__(self, max_buckets: int = ADMISSION_MAX_CLIENTS):
+        self.max_buckets = max_buckets
+        self._buckets: "OrderedDict[str, List[float]]" = OrderedDict()  # key -> [tokens, refilled at]
+        self._in_flight: Counter = Counter()
+
+    async def take(self, key: str, rate: float, burst: float) -> float:
+        """Take one token: 0 when there was one, else the seconds until there will be"""
+        now = time.monotonic()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = [burst, now]
+            if len(self._buckets) > self.max_buckets:
+                self._buckets.popitem(last=False)
+        else:
+            bucket[0] = min(burst, bucket[0] + (now - bucket[1]) * rate)
+            bucket[1] = now
+            self._buckets.move_to_end(key)
+        if bucket[0] >= 1:
+            bucket[0] -= 1
+            return 0.0
+        return (1 - bucket[0]) / rate
+
+    async def acquire(self, key: str, limit: int) -> bool:
+        """Count one more request in flight, unless `limit` are already"""
+        if self._in_flight[key] >= limit:
+            return False
+        self._in_flight[key] += 1
+        return True
+
+    async def release(self, key: str):
+        self._in_flight[key] -= 1
+        if self._in_flight[key] <= 0:
+            del self._in_flight[key]
+
+    def in_flight(self) -> Dict[str, int]:
+        return dict(self._in_flight)
+
+
+class AdmissionRoute:
+    """An expensive endpoint: a bucket shared by every client and/or a cap on concurrent requests"""
+
+    def __init__(self, name: str, method: str, pattern: str, rate: Optional[float] = None,
+                 burst: Optional[float] = None, concurrency: Optional[int] = None, retry_after: float = 1.0):
+        self.name = name
+        self.method = method
+        self.pattern = re.compile(pattern)
+        self.rate = rate
+        self.burst = burst if burst is not None else rate
+        self.concurrency = concurrency
+        # Suggested wait when the route is at capacity
+        self.retry_after = retry_after
+
+    def match(self, method: str, path: str) -> bool:
+        return method == self.method and self.pattern.fullmatch(path) is not None
+
+
+ADMISSION_ROUTES = [
+    # Queues a job that wipes and reloads every collection
+    AdmissionRoute("seed_database", "POST", r"/api/seed-database", rate=1 / 60, burst=1),
+    AdmissionRoute("generate_summary", "POST", r"/api/ai-summaries/generate/[^/]+",
+                   rate=ADMISSION_SUMMARY_RATE, burst=2 * ADMISSION_SUMMARY_RATE,
+                   concurrency=ADMISSION_SUMMARY_CONCURRENCY),
+    AdmissionRoute("stream_summary", "POST", r"/api/ai-summaries/generate/[^/]+/stream",
+                   rate=ADMISSION_SUMMARY_RATE, burst=2 * ADMISSION_SUMMARY_RATE,
+                   concurrency=ADMISSION_SUMMARY_CONCURRENCY),
+    AdmissionRoute("forecast_run", "POST", r"/api/inventory/forecast/run", concurrency=1, retry_after=10),
+    AdmissionRoute("analytics_rebuild", "POST", r"/api/analytics/rebuild", concurrency=1, retry_after=10),
+]
+
+
+class AdmissionController:
+    """Decides, before routing, whether a request runs now or is turned away"""
+
+    def __init__(self, backend=None, role_rates: Optional[Dict[str, Tuple[float, float]]] = None,
+                 routes: List[AdmissionRoute] = ADMISSION_ROUTES, enabled: bool = ADMISSION_ENABLED,
+                 trusted_proxies: Optional[List[Network]] = None):
+        self.backend = backend or InMemoryAdmissionBackend()
+        self.role_rates = role_rates if role_rates is not None else parse_role_rates(ADMISSION_ROLE_RATES)
+        self.trusted_proxies = (trusted_proxies if trusted_proxies is not None
+                                else parse_networks(ADMISSION_TRUSTED_PROXIES))
+        self.routes = routes
+        self.enabled = enabled
+        self.by_role: Dict[str, Counter] = {}
+        self.by_route: Dict[str, Counter] = {}
+
+    def route(self, method: str, path: str) -> Optional[AdmissionRoute]:
+        return next((route for route in self.routes if route.match(method, path)), None)
+
+    def client(self, scope) -> str:
+        """
+        The address a request's bucket is keyed on: the peer, or when the peer
+        is a trusted proxy, the nearest X-Forwarded-For hop that is not one
+        (hops further left were written by the caller and may be forged)
+        """
+        peer = (scope.get("client") or ("unknown",))[0]
+        if not _in_networks(peer, self.trusted_proxies):
+            return peer
+        hops = [hop.strip() for name, value in scope["headers"] if name == b"x-forwarded-for"
+                for hop in value.decode("latin-1").split(",") if hop.strip()]
+        for hop in reversed(hops):
+            if not _in_networks(hop, self.trusted_proxies):
+                return hop
+        return hops[0] if hops else peer
+
+    def role(self, claimed: Optional[str]) -> str:
+        """The role whose limits apply to an unverified X-User-Role claim"""
+        if claimed not in self.role_rates:
+            return ANONYMOUS
+        rate, burst = self.role_rates[claimed]
+        anonymous = self.role_rates.get(ANONYMOUS)
+        if anonymous is not None and (rate > anonymous[0] or burst > anonymous[1]):
+            return ANONYMOUS
+        return claimed
+
+    async def admit(self, role: str, client: str, route: Optional[AdmissionRoute]) -> Optional[Tuple[int, float, str]]:
+        """
+        None when the request may run (holding a concurrency slot of `route`
+        if it has a cap, see release), else (status, Retry-After seconds, reason).
+        """
+        rejected = None
+        if role in self.role_rates:
+            rate, burst = self.role_rates[role]
+            wait = await self.backend.take(f"client:{client}", rate, burst)
+            if wait:
+                rejected = 429, wait, f"Too many requests for role '{role}'"
+        if rejected is None and route is not None and route.rate:
+            wait = await self.backend.take(f"route:{route.name}", route.rate, route.burst)
+            if wait:
+                rejected = 429, wait, f"Too many '{route.name}' requests"
+        if rejected is None and route is not None and route.concurrency:
+            if not await self.backend.acquire(f"route:{route.name}", route.concurrency):
+                rejected = 503, route.retry_after, f"'{route.name}' is at capacity"
+
+        outcome = "admitted" if rejected is None else ("rate_limited" if rejected[0] == 429 else "over_capacity")
+        self.by_role.setdefault(role, Counter())[outcome] += 1
+        if route is not None:
+            self.by_route.setdefault(route.name, Counter())[outcome] += 1
+        return rejected
+
+    async def release(self, route: AdmissionRoute):
+        await self.backend.release(f"route:{route.name}")
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "backend": type(self.backend).__name__,
+            "roles": {role: dict(counts) for role, counts in self.by_role.items()},
+            "routes": {name: dict(counts) for name, counts in self.by_route.items()},
+            "in_flight": self.backend.in_flight() if hasattr(self.backend, "in_flight") else None,
+        }
+
+
+def _header(scope, name: bytes) -> Optional[str]:
+    return next((v.decode("latin-1") for k, v in scope["headers"] if k == name), None)
+
+
+class AdmissionMiddleware:
+    """ASGI middleware answering 429/503 with Retry-After before the request reaches a handler"""
+
+    def __init__(self, app, controller: AdmissionController):
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.controller.enabled or EXEMPT_PATHS.fullmatch(scope["path"]):
+            await self.app(scope, receive, send)
+            return
+
+        role = self.controller.role(_header(scope, b"x-user-role"))
+        client = self.controller.client(scope)
+        route = self.controller.route(scope["method"], scope["path"])
+        rejected = await self.controller.admit(role, client, route)
+        if rejected is not None:
+            status, retry_after, reason = rejected
+            body = json.dumps({"detail": reason}).encode("utf-8")
+            await send({"type": "http.response.start", "status": status, "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode("latin-1")),
+                (b"retry-after", str(max(1, math.ceil(retry_after))).encode("latin-1")),
+            ]})
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            if route is not None and route.concurrency:
+                await self.controller.release(route)
+
+
+admission_controller = AdmissionController()
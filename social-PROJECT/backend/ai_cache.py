@@ -0,0 +1,180 @@
+import os
+import copy
+import json
+import hashlib
+import logging
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Tuple, Optional, Callable, Awaitable
+
+from ai_service import AIService, ai_service
+from ai_executor import AIExecutor, ai_executor
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever extraction output or summary format changes, so stale entries are never served
+AI_SCHEMA_VERSION = 1
+
+# Placeholder stored in cached provenance links instead of the real source id
+_SOURCE_PLACEHOLDER = "$source"
+
+
+def stable_hash(kind: str, payload: Any) -> str:
+    """Content-addressed cache key for an input payload"""
+    canonical = json.dumps({"kind": kind, "version": AI_SCHEMA_VERSION, "payload": payload},
+                           sort_keys=True, separators=(",", ":"), default=str)
+    return f"{kind}:{hashlib.sha256(canonical.encode('utf-8')).hexdigest()}"
+
+
+class LRUCache:
+    """Bounded in-memory LRU map"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.evictions = 0
+        self._data: "OrderedDict[str, Any]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[Any]:
+        value = self._data.get(key)
+        if value is not None:
+            self._data.move_to_end(key)
+        return value
+
+    def put(self, key: str, value: Any):
+        self._data[key] = value
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class AICache:
+    """
+    Memoizes AIService results by content hash: a bounded in-memory LRU in front
+    of an optional persistent Mongo collection.
+    """
+
+    def __init__(self, max_entries: Optional[int] = None):
+        self.memory = LRUCache(max_entries or int(os.environ.get('AI_CACHE_MAX_ENTRIES', '2048')))
+        self.collection = None
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    def attach_collection(self, collection):
+        """Enable the persistent tier (e.g. `db.ai_cache`)"""
+        self.collection = collection
+
+    def _count(self, kind: str, outcome: str):
+        stats = self._stats.setdefault(kind, {"memory_hits": 0, "persistent_hits": 0, "misses": 0})
+        stats[outcome] += 1
+
+    async def get_or_compute(self, kind: str, payload: Any,
+                             compute: Callable[[], Awaitable[Any]]) -> Any:
+        """Return the cached value for `payload`, computing and storing it on a miss"""
+        key = stable_hash(kind, payload)
+
+        value = self.memory.get(key)
+        if value is not None:
+            self._count(kind, "memory_hits")
+            return copy.deepcopy(value)
+
+        if self.collection is not None:
+            try:
+                stored = await self.collection.find_one({"key": key}, {"_id": 0, "value": 1})
+            except Exception as e:
+                logger.warning(f"AI cache lookup failed, recomputing: {e}")
+                stored = None
+            if stored is not None:
+                self._count(kind, "persistent_hits")
+                self.memory.put(key, stored["value"])
+                return copy.deepcopy(stored["value"])
+
+        self._count(kind, "misses")
+        value = await compute()
+        self.memory.put(key, copy.deepcopy(value))
+
+        if self.collection is not None:
+            try:
+                await self.collection.update_one(
+                    {"key": key},
+                    {"$set": {"key": key, "kind": kind, "version": AI_SCHEMA_VERSION, "value": value,
+                              "created_at": datetime.now(timezone.utc).isoformat()}},
+                    upsert=True
+                )
+            except Exception as e:
+                logger.warning(f"AI cache write failed: {e}")
+        return value
+
+    async def prime(self, limit: int) -> int:
+        """Load the most recently written persistent entries into memory; returns how many"""
+        if self.collection is None or limit <= 0:
+            return 0
+        limit = min(limit, self.memory.max_entries)
+        cursor = self.collection.find({"version": AI_SCHEMA_VERSION}, {"_id": 0, "key": 1, "value": 1})
+        entries = await cursor.sort("created_at", -1).limit(limit).to_list(limit)
+        # Oldest first, so the most recent entries end up most recently used
+        for entry in reversed(entries):
+            self.memory.put(entry["key"], entry["value"])
+        return len(entries)
+
+    def stats(self) -> Dict[str, Any]:
+        kinds = {}
+        for kind, counts in self._stats.items():
+            lookups = sum(counts.values())
+            hits = counts["memory_hits"] + counts["persistent_hits"]
+            kinds[kind] = {**counts, "hit_rate": round(hits / lookups, 4) if lookups else 0.0}
+        return {
+            "schema_version": AI_SCHEMA_VERSION,
+            "memory_entries": len(self.memory),
+            "memory_capacity": self.memory.max_entries,
+            "evictions": self.memory.evictions,
+            "persistent": self.collection is not None,
+            "kinds": kinds
+        }
+
+    def clear(self):
+        self.memory.clear()
+        self._stats.clear()
+
+
+class MemoizedAIService:
+    """Cached front for AIService extraction and summary generation"""
+
+    def __init__(self, cache: AICache, service: Optional[AIService] = None,
+                 executor: Optional[AIExecutor] = None):
+        self.cache = cache
+        self.service = service or ai_service
+        self.executor = executor or ai_executor
+
+    async def extract_prescription(self, prescription_text: str) -> Dict[str, Any]:
+        return await self.cache.get_or_compute(
+            "extraction", prescription_text,
+            lambda: self.service.extract_prescription(prescription_text)
+        )
+
+    async def generate_summary_with_provenance(self, extracted_data: Dict[str, Any],
+                                               source_id: str) -> Tuple[str, List[Dict[str, Any]]]:
+        # The summary only depends on the source id through its provenance links, so it is
+        # cached under a placeholder id; reseeded copies of a prescription share one entry
+        async def compute():
+            summary_text, links = await self.executor.generate_summary_with_provenance(
+                extracted_data, _SOURCE_PLACEHOLDER
+            )
+            return {"summary_text": summary_text, "provenance_links": links}
+
+        value = await self.cache.get_or_compute("summary", extracted_data, compute)
+        links = value["provenance_links"]
+        for link in links:
+            if link.get("source_id") == _SOURCE_PLACEHOLDER:
+                link["source_id"] = source_id
+        return value["summary_text"], links
+
+
+# Global cache and memoized service instances
+ai_cache = AICache()
+memoized_ai = MemoizedAIService(ai_cache)
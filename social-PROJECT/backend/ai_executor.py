@@ -0,0 +1,174 @@
+import os
+import asyncio
+import logging
+from concurrent.futures import Executor, ThreadPoolExecutor
+from contextlib import contextmanager
+from itertools import count
+from typing import Dict, Any, List, Tuple, Optional
+
+from ai_service import AIService, ai_service
+
+logger = logging.getLogger(__name__)
+
+
+def _run_in_worker(method_name: str, *args):
+    """Process-pool entry point; each worker process uses its own AIService"""
+    from ai_service import ai_service as worker_service
+    return getattr(worker_service, method_name)(*args)
+
+
+def _extraction_size(extracted_data: Dict[str, Any]) -> int:
+    """Approximate size (in characters) of the summary that will be generated"""
+    size = len(extracted_data.get('advice', '') or '')
+    size += sum(len(s) for s in extracted_data.get('symptoms', []))
+    size += sum(len(t) for t in extracted_data.get('recommended_tests', []))
+    size += 64 * len(extracted_data.get('medicines', []))
+    return size
+
+
+def _summary_size(summary_text: str, provenance_links: List[Dict]) -> int:
+    """Approximate work needed to parse a summary for display"""
+    return len(summary_text) + 32 * len(provenance_links)
+
+
+class AIExecutor:
+    """
+    Runs CPU-heavy AIService calls in a bounded thread or process pool.
+    Inputs below `inline_threshold` stay on the event loop, since handing
+    them to a pool costs more than running them.
+    """
+
+    def __init__(self, service: Optional[AIService] = None, mode: Optional[str] = None,
+                 max_workers: Optional[int] = None, inline_threshold: Optional[int] = None):
+        self.service = service or ai_service
+        self.mode = mode or os.environ.get('AI_EXECUTOR_MODE', 'thread')
+        self.max_workers = max_workers or int(os.environ.get('AI_EXECUTOR_WORKERS', '4'))
+        self.inline_threshold = (inline_threshold if inline_threshold is not None
+                                 else int(os.environ.get('AI_INLINE_THRESHOLD', '8192')))
+        self._executor: Optional[Executor] = None
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.mode == 'process':
+                # Imports multiprocessing, which thread mode never needs
+                from concurrent.futures import ProcessPoolExecutor
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                    thread_name_prefix='ai-executor')
+        return self._executor
+
+    async def run(self, method_name: str, size: int, *args):
+        """Run an AIService method inline or in the pool depending on input size"""
+        if size < self.inline_threshold:
+            return getattr(self.service, method_name)(*args)
+
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        if self.mode == 'process':
+            return await loop.run_in_executor(executor, _run_in_worker, method_name, *args)
+        return await loop.run_in_executor(executor, getattr(self.service, method_name), *args)
+
+    async def generate_summary_with_provenance(self, extracted_data: Dict[str, Any],
+                                               source_id: str) -> Tuple[str, List[Dict[str, Any]]]:
+        return await self.run('generate_summary_with_provenance', _extraction_size(extracted_data),
+                              extracted_data, source_id)
+
+    async def parse_summary_for_display(self, summary_text: str,
+                                        provenance_links: List[Dict]) -> Dict[str, Any]:
+        return await self.run('parse_summary_for_display', _summary_size(summary_text, provenance_links),
+                              summary_text, provenance_links)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+class LoopLagMonitor:
+    """
+    Periodically measures how late the event loop wakes up and logs a warning,
+    together with the requests in flight, when the lag exceeds the budget.
+    """
+
+    def __init__(self, budget_ms: Optional[float] = None, interval_ms: Optional[float] = None):
+        # An explicit 0 is honoured: budget 0 reports any lag, interval 0 samples every loop iteration
+        if budget_ms is None:
+            budget_ms = float(os.environ.get('LOOP_LAG_BUDGET_MS', '100'))
+        if interval_ms is None:
+            interval_ms = float(os.environ.get('LOOP_LAG_INTERVAL_MS', '50'))
+        self.budget_ms = budget_ms
+        self.interval_ms = interval_ms
+        self.max_lag_ms = 0.0
+        self.over_budget_count = 0
+        self._active: Dict[int, str] = {}
+        self._ids = count()
+        self._task: Optional[asyncio.Task] = None
+
+    @contextmanager
+    def track(self, label: str):
+        """Mark a request as in flight so lag warnings can name it"""
+        token = next(self._ids)
+        self._active[token] = label
+        try:
+            yield
+        finally:
+            self._active.pop(token, None)
+
+    def record(self, lag_ms: float):
+        self.max_lag_ms = max(self.max_lag_ms, lag_ms)
+        if lag_ms > self.budget_ms:
+            self.over_budget_count += 1
+            in_flight = ", ".join(sorted(set(self._active.values()))) or "none"
+            logger.warning(
+                f"Event loop blocked for {lag_ms:.1f} ms (budget {self.budget_ms:.0f} ms); "
+                f"in-flight requests: {in_flight}"
+            )
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        interval = self.interval_ms / 1000
+        while True:
+            started = loop.time()
+            await asyncio.sleep(interval)
+            self.record((loop.time() - started - interval) * 1000)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "budget_ms": self.budget_ms,
+            "max_lag_ms": round(self.max_lag_ms, 2),
+            "over_budget_count": self.over_budget_count
+        }
+
+
+class LoopLagMiddleware:
+    """ASGI middleware that registers each HTTP request with the lag monitor"""
+
+    def __init__(self, app, monitor: LoopLagMonitor):
+        self.app = app
+        self.monitor = monitor
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        with self.monitor.track(f"{scope['method']} {scope['path']}"):
+            await self.app(scope, receive, send)
+
+
+# Global executor and loop monitor instances
+ai_executor = AIExecutor()
+loop_monitor = LoopLagMonitor()
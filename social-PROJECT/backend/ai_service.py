@@ -1,13 +1,17 @@
 import os
 import re
 import json
+import hashlib
 import tempfile
-from typing import Dict, Any, List, Tuple, Optional
+from typing import Dict, Any, Callable, List, Tuple, Optional, Iterator, Union
 from pydantic import BaseModel, Field
 from pathlib import Path
 from dotenv import load_dotenv
 import logging
 
+from medication_parser import parse_medications
+from domain import Prescription, ProvenanceLink
+
 # Load environment variables
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
@@ -28,24 +32,80 @@ class ExtractedPrescription(BaseModel):
     prescriber_name: str = Field(default="", description="Name of the prescribing doctor")
     prescriber_reg: str = Field(default="", description="Registration number of the doctor")
     clinic: str = Field(default="", description="Name of the clinic")
+    parse_errors: List[Dict[str, Any]] = Field(
+        default_factory=list, description="Medication lines that could not be parsed, with line and column"
+    )
+
+def prescription_to_extracted_data(prescription: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert a stored prescription document to the extraction format"""
+    return {
+        "patient_name": prescription.get("patient_name", ""),
+        "age": prescription.get("patient_age", 0),
+        "sex": prescription.get("patient_sex", ""),
+        "date": prescription.get("date", ""),
+        "symptoms": prescription.get("symptoms", []),
+        "diagnosis": None,
+        "medicines": prescription.get("medicines", []),
+        "recommended_tests": prescription.get("recommended_tests", []),
+        "advice": prescription.get("notes", ""),
+        "prescriber_name": prescription.get("prescriber_name", ""),
+        "prescriber_reg": prescription.get("prescriber_reg_number", ""),
+        "clinic": prescription.get("clinic", "")
+    }
+
+def _link_dict(field_name: str, value: str, source_type: str, source_id: str, source_field: str) -> Dict[str, str]:
+    return {
+        "field_name": field_name,
+        "value": value,
+        "source_type": source_type,
+        "source_id": source_id,
+        "source_field": source_field
+    }
+
+def source_content_hash(extracted_data: Dict[str, Any], source_id: str) -> str:
+    """Stable hash of the data a summary is generated from (used to skip unchanged regenerations)"""
+    canonical = json.dumps({"source_id": source_id, "data": extracted_data},
+                           sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
 
 class AIService:
     def __init__(self):
         self.api_key = os.environ.get('LLAMA_API_KEY', '')
-        self.llama_client = None
-        self._init_llama()
+        # Created on first use, so importing this module (e.g. in a pre-fork master) stays cheap
+        self._llama_client = None
+        self._llama_initialized = False
+    
+    @property
+    def llama_client(self):
+        """The LlamaCloud extraction client, or None when unavailable (initialized on first access)"""
+        if not self._llama_initialized:
+            self._llama_initialized = True
+            self._init_llama()
+        return self._llama_client
+    
+    @llama_client.setter
+    def llama_client(self, client):
+        self._llama_client = client
+        self._llama_initialized = True
+    
+    async def close(self):
+        """Close the LlamaCloud client if one was created"""
+        if self._llama_client is not None:
+            await self._llama_client.close()
     
     def _init_llama(self):
-        """Initialize LlamaExtract client"""
+        """Initialize the async LlamaCloud extraction client"""
         try:
-            from llama_cloud.client import LlamaCloud
+            from llama_extract import LlamaExtractClient
             if self.api_key:
-                self.llama_client = LlamaCloud(token=self.api_key)
-                logger.info("LlamaCloud client initialized successfully")
+                self.llama_client = LlamaExtractClient(
+                    self.api_key, data_schema=ExtractedPrescription.model_json_schema()
+                )
+                logger.info("LlamaCloud extraction client initialized successfully")
             else:
                 logger.warning("No LLAMA_API_KEY found, using regex extraction fallback")
         except ImportError as e:
-            logger.warning(f"Could not import LlamaCloud: {e}. Using regex fallback.")
+            logger.warning(f"Could not import LlamaCloud extraction client: {e}. Using regex fallback.")
         except Exception as e:
             logger.error(f"Error initializing LlamaCloud: {e}")
     
@@ -63,7 +123,8 @@ class AIService:
             "advice": "",
             "prescriber_name": "",
             "prescriber_reg": "",
-            "clinic": ""
+            "clinic": "",
+            "parse_errors": []
         }
         
         # Extract patient name
@@ -98,24 +159,11 @@ class AIService:
             result["clinic"] = clinic_match.group(1).strip()
         
         # Extract medicines
-        medicines_section = re.search(r"Medications?:(.+?)(?:Recommended Tests|Notes|$)", 
-                                      prescription_text, re.IGNORECASE | re.DOTALL)
-        if medicines_section:
-            med_text = medicines_section.group(1)
-            med_entries = re.findall(
-                r"(\d+)\.\s*([^\n]+?)\s+(\d+\s*mg|\d+\s*ml)\s*\(([^)]+)\)\s*-\s*([^,]+),\s*([^,]+),\s*Route:\s*([^,]+),\s*Qty:\s*(\d+)",
-                med_text, re.IGNORECASE
-            )
-            for entry in med_entries:
-                result["medicines"].append({
-                    "name": entry[1].strip(),
-                    "dosage": entry[2].strip(),
-                    "form": entry[3].strip(),
-                    "frequency": entry[4].strip(),
-                    "duration": entry[5].strip(),
-                    "route": entry[6].strip(),
-                    "quantity": int(entry[7])
-                })
+        medicines, errors = parse_medications(prescription_text)
+        result["medicines"] = medicines
+        result["parse_errors"] = [e.as_dict() for e in errors]
+        for error in errors:
+            logger.warning(f"Could not parse medication {error}")
         
         # Extract recommended tests
         tests_match = re.search(r"Recommended Tests:\s*([^\n]+)", prescription_text, re.IGNORECASE)
@@ -137,120 +185,133 @@ class AIService:
         
         return result
     
+    @staticmethod
+    def normalize_extraction(data: Dict[str, Any]) -> Dict[str, Any]:
+        """Validate a remote extraction result into the same shape as the regex extractor"""
+        return ExtractedPrescription.model_validate(data).model_dump()
+    
     async def extract_prescription(self, prescription_text: str) -> Dict[str, Any]:
         """Extract structured data from prescription text using LlamaCloud or regex fallback"""
-        # For now, use regex extraction as it's reliable and doesn't require async API calls
-        # The LlamaCloud extraction can be added later with proper async handling
-        return self.extract_with_regex(prescription_text)
+        if self.llama_client is None:
+            return self.extract_with_regex(prescription_text)
+        return await self.llama_client.extract(
+            prescription_text, normalize=self.normalize_extraction, fallback=self.extract_with_regex
+        )
     
-    def generate_summary_with_provenance(self, extracted_data: Dict[str, Any], 
-                                         source_id: str) -> Tuple[str, List[Dict[str, Any]]]:
+    def iter_summary_sections(self, extracted_data: Union[Dict[str, Any], Prescription],
+                              source_id: str) -> Iterator[Tuple[str, str, List[Dict[str, Any]]]]:
         """
-        Generate a natural language summary with provenance links.
-        Each fact in the summary is annotated with its source.
+        Yield the summary one section at a time as (section, text, provenance_links).
+        Concatenating the texts gives the full summary produced by
+        generate_summary_with_provenance.
         """
-        provenance_links = []
-        
-        # Build summary with provenance annotations
-        patient_name = extracted_data.get('patient_name', 'Unknown')
-        age = extracted_data.get('age', 'Unknown')
-        sex = extracted_data.get('sex', 'Unknown')
-        symptoms = extracted_data.get('symptoms', [])
-        medicines = extracted_data.get('medicines', [])
-        tests = extracted_data.get('recommended_tests', [])
-        advice = extracted_data.get('advice', '')
-        date = extracted_data.get('date', '')
-        prescriber = extracted_data.get('prescriber_name', '')
-        clinic = extracted_data.get('clinic', '')
-        
-        # Create provenance links for each field
-        def add_provenance(field_name: str, value: Any, source_field: str):
-            provenance_links.append({
-                "field_name": field_name,
-                "value": str(value),
-                "source_type": "prescription",
-                "source_id": source_id,
-                "source_field": source_field
-            })
-        
-        # Build the summary text with inline provenance markers
-        summary_parts = []
+        if not isinstance(extracted_data, Prescription):
+            extracted_data = Prescription.from_extracted(extracted_data)
+        return self._sections(extracted_data, source_id, _link_dict)
+    
+    def _sections(self, prescription: Prescription, source_id: str,
+                  make_link: Callable[..., Any]) -> Iterator[Tuple[str, str, List[Any]]]:
+        """Summary sections with links built by `make_link` (a dict or a ProvenanceLink)"""
+        p = prescription
         
         # Patient info
-        summary_parts.append(f"**Patient**: [{patient_name}]{{patient_name}}, ")
-        add_provenance("patient_name", patient_name, "patient_name")
-        
-        summary_parts.append(f"[{age}]{{age}} years old, ")
-        add_provenance("age", age, "age")
-        
-        summary_parts.append(f"[{sex}]{{sex}}.\n")
-        add_provenance("sex", sex, "sex")
+        yield "patient", (
+            f"**Patient**: [{p.patient_name}]{{patient_name}}, "
+            f"[{p.age}]{{age}} years old, "
+            f"[{p.sex}]{{sex}}.\n"
+        ), [
+            make_link("patient_name", str(p.patient_name), "prescription", source_id, "patient_name"),
+            make_link("age", str(p.age), "prescription", source_id, "age"),
+            make_link("sex", str(p.sex), "prescription", source_id, "sex")
+        ]
         
         # Visit info
-        if clinic:
-            summary_parts.append(f"\n**Visit**: [{clinic}]{{clinic}}")
-            add_provenance("clinic", clinic, "clinic")
-        if date:
-            summary_parts.append(f" on [{date}]{{date}}")
-            add_provenance("date", date, "date")
-        if prescriber:
-            summary_parts.append(f", attended by [{prescriber}]{{prescriber}}.")
-            add_provenance("prescriber", prescriber, "prescriber_name")
+        parts, links = [], []
+        if p.clinic:
+            parts.append(f"\n**Visit**: [{p.clinic}]{{clinic}}")
+            links.append(make_link("clinic", str(p.clinic), "prescription", source_id, "clinic"))
+        if p.date:
+            parts.append(f" on [{p.date}]{{date}}")
+            links.append(make_link("date", str(p.date), "prescription", source_id, "date"))
+        if p.prescriber_name:
+            parts.append(f", attended by [{p.prescriber_name}]{{prescriber}}.")
+            links.append(make_link("prescriber", str(p.prescriber_name), "prescription", source_id, "prescriber_name"))
+        if parts:
+            yield "visit", "".join(parts), links
         
         # Symptoms
-        if symptoms:
-            symptoms_str = ", ".join([f"[{s}]{{symptom}}" for s in symptoms])
-            summary_parts.append(f"\n\n**Presenting Symptoms**: {symptoms_str}.")
-            for s in symptoms:
-                add_provenance("symptom", s, "symptoms")
+        if p.symptoms:
+            symptoms_str = ", ".join([f"[{s}]{{symptom}}" for s in p.symptoms])
+            yield "symptoms", f"\n\n**Presenting Symptoms**: {symptoms_str}.", [
+                make_link("symptom", str(s), "prescription", source_id, "symptoms") for s in p.symptoms
+            ]
         
-        # Medications
-        if medicines:
-            summary_parts.append("\n\n**Prescribed Medications**:\n")
-            for i, med in enumerate(medicines, 1):
-                med_name = med.get('name', 'Unknown')
-                dosage = med.get('dosage', '')
-                frequency = med.get('frequency', '')
-                duration = med.get('duration', '')
-                
-                med_str = f"{i}. [{med_name}]{{medicine}} {dosage}"
-                if frequency:
-                    med_str += f", [{frequency}]{{frequency}}"
-                if duration:
-                    med_str += f" for [{duration}]{{duration}}"
-                summary_parts.append(med_str + "\n")
-                
-                add_provenance("medicine", med_name, f"medicines[{i-1}].name")
-                if frequency:
-                    add_provenance("frequency", frequency, f"medicines[{i-1}].frequency")
-                if duration:
-                    add_provenance("duration", duration, f"medicines[{i-1}].duration")
+        # Medications, one section each (the heading travels with the first one)
+        for i, med in enumerate(p.medicines, 1):
+            med_name = med.name or 'Unknown'
+            
+            med_str = "\n\n**Prescribed Medications**:\n" if i == 1 else ""
+            med_str += f"{i}. [{med_name}]{{medicine}} {med.dosage}"
+            links = [make_link("medicine", str(med_name), "prescription", source_id, f"medicines[{i-1}].name")]
+            if med.frequency:
+                med_str += f", [{med.frequency}]{{frequency}}"
+                links.append(make_link("frequency", str(med.frequency), "prescription", source_id,
+                                       f"medicines[{i-1}].frequency"))
+            if med.duration:
+                med_str += f" for [{med.duration}]{{duration}}"
+                links.append(make_link("duration", str(med.duration), "prescription", source_id,
+                                       f"medicines[{i-1}].duration"))
+            yield "medication", med_str + "\n", links
         
         # Recommended tests
-        if tests:
-            tests_str = ", ".join([f"[{t}]{{test}}" for t in tests])
-            summary_parts.append(f"\n**Recommended Tests**: {tests_str}.")
-            for t in tests:
-                add_provenance("test", t, "recommended_tests")
+        if p.recommended_tests:
+            tests_str = ", ".join([f"[{t}]{{test}}" for t in p.recommended_tests])
+            yield "tests", f"\n**Recommended Tests**: {tests_str}.", [
+                make_link("test", str(t), "prescription", source_id, "recommended_tests") for t in p.recommended_tests
+            ]
         
         # Advice
-        if advice:
-            summary_parts.append(f"\n\n**Clinical Advice**: [{advice}]{{advice}}")
-            add_provenance("advice", advice, "advice")
+        if p.advice:
+            yield "advice", f"\n\n**Clinical Advice**: [{p.advice}]{{advice}}", [
+                make_link("advice", str(p.advice), "prescription", source_id, "advice")
+            ]
+    
+    def generate_summary_with_provenance(self, extracted_data: Union[Dict[str, Any], Prescription],
+                                         source_id: str) -> Tuple[str, List[Dict[str, Any]]]:
+        """
+        Generate a natural language summary with provenance links.
+        Each fact in the summary is annotated with its source.
+        """
+        summary_parts = []
+        provenance_links = []
+        for _, text, links in self.iter_summary_sections(extracted_data, source_id):
+            summary_parts.append(text)
+            provenance_links.extend(links)
         
-        summary_text = "".join(summary_parts)
+        return "".join(summary_parts), provenance_links
+    
+    def summarize(self, prescription: Prescription,
+                  source_id: Optional[str] = None) -> Tuple[str, List[ProvenanceLink]]:
+        """generate_summary_with_provenance for internal callers: slotted in, slotted links out"""
+        summary_parts = []
+        provenance_links = []
+        for _, text, links in self._sections(prescription, source_id or prescription.id, ProvenanceLink):
+            summary_parts.append(text)
+            provenance_links.extend(links)
         
-        return summary_text, provenance_links
+        return "".join(summary_parts), provenance_links
     
     def parse_summary_for_display(self, summary_text: str, provenance_links: List[Dict]) -> Dict[str, Any]:
         """
         Parse summary text and create a structured display format with clickable provenance links.
         """
-        # Create a mapping of values to their provenance
-        provenance_map = {}
-        for link in provenance_links:
-            key = f"{link['field_name']}:{link['value']}"
-            provenance_map[key] = link
+        # Index the first link for each value and each field name, so every marker
+        # resolves in O(1) to the first link matching either one
+        first_by_value = {}
+        first_by_field = {}
+        for i, link in enumerate(provenance_links):
+            first_by_value.setdefault(link['value'], i)
+            first_by_field.setdefault(link['field_name'], i)
         
         # Parse the summary to identify provenance-linked segments
         segments = []
@@ -270,11 +331,9 @@ class AIService:
             field_type = match.group(2)
             
             # Find the corresponding provenance link
-            link = None
-            for pl in provenance_links:
-                if pl['value'] == value or pl['field_name'] == field_type:
-                    link = pl
-                    break
+            index = min(first_by_value.get(value, len(provenance_links)),
+                        first_by_field.get(field_type, len(provenance_links)))
+            link = provenance_links[index] if index < len(provenance_links) else None
             
             segments.append({
                 "type": "provenance_link",
@@ -0,0 +1,227 @@
+"""
+Incremental daily rollups for the clinic and pharmacy dashboards.
+
+Every prescription and dispense transition adds to per-day counters keyed by
+dimension (overall, clinic, prescriber, medicine, status) in the
+`analytics_daily` collection, one document per (day, dimension, key). The
+increments of one event are merged and sent as a single bulk upsert, and
+dashboard queries read at most one document per day and key instead of
+scanning prescriptions.
+"""
+import logging
+from collections import Counter, defaultdict
+from datetime import datetime, timezone, timedelta
+from typing import Dict, Any, AsyncIterable, Iterable, List, Optional, Tuple
+
+from pymongo import UpdateOne
+from pymongo.errors import PyMongoError
+
+logger = logging.getLogger(__name__)
+
+DIMENSIONS = ("all", "clinic", "prescriber", "medicine", "status", "sku")
+
+METRICS = (
+    "prescriptions",          # prescriptions written
+    "prescribed_quantity",    # units prescribed (medicine dimension)
+    "approved",               # dispense requests approved
+    "dispensed",              # dispense requests dispensed
+    "rejected",               # dispense requests rejected
+    "dispensed_quantity",     # units dispensed (medicine dimension)
+    "consumed_quantity",      # units taken from stock on approval (sku dimension, keyed by inventory id)
+    "turnaround_seconds",     # request created -> dispensed, summed
+    "turnaround_count",
+)
+
+# Dispense-request status -> counter incremented on that transition
+STATUS_METRICS = {"approved": "approved", "dispensed": "dispensed", "rejected": "rejected"}
+
+
+def _day(value: Any) -> str:
+    if isinstance(value, datetime):
+        return value.astimezone(timezone.utc).strftime("%Y-%m-%d")
+    if isinstance(value, str) and len(value) >= 10:
+        return value[:10]
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d")
+
+
+def _parse_time(value: Any) -> Optional[datetime]:
+    if isinstance(value, datetime):
+        return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+    if isinstance(value, str):
+        try:
+            parsed = datetime.fromisoformat(value)
+        except ValueError:
+            return None
+        return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+    return None
+
+
+class Increments:
+    """Counter increments grouped by (day, dimension, key)"""
+
+    def __init__(self):
+        self.counters: Dict[Tuple[str, str, str], Counter] = defaultdict(Counter)
+
+    def add(self, day: str, dimension: str, key: Optional[str], metric: str, amount: float = 1):
+        if key:
+            self.counters[(day, dimension, str(key))][metric] += amount
+
+    def add_prescription(self, prescription: Dict[str, Any]):
+        day = _day(prescription.get("date") or prescription.get("created_at"))
+        # Creation is always counted under "pending"; later statuses come from transitions
+        for dimension, key in (("all", "all"), ("clinic", prescription.get("clinic")),
+                               ("prescriber", prescription.get("prescriber_name")), ("status", "pending")):
+            self.add(day, dimension, key, "prescriptions")
+        for medicine in prescription.get("medicines", []):
+            self.add(day, "medicine", medicine.get("name"), "prescriptions")
+            self.add(day, "medicine", medicine.get("name"), "prescribed_quantity", medicine.get("quantity", 1))
+
+    def add_transition(self, request: Dict[str, Any], status: str, at: Any = None,
+                       consumed: Optional[Dict[str, int]] = None):
+        """
+        A dispense request moving to `status` at time `at` (defaults to now).
+        `consumed` maps inventory item ids to the units taken from stock.
+        """
+        metric = STATUS_METRICS.get(status)
+        if metric is None:
+            return
+        at = _parse_time(at) or datetime.now(timezone.utc)
+        day = _day(at)
+        for dimension, key in (("all", "all"), ("clinic", request.get("clinic")),
+                               ("prescriber", request.get("prescriber_name")), ("status", status)):
+            self.add(day, dimension, key, metric)
+        for item_id, quantity in (consumed or {}).items():
+            self.add(day, "sku", item_id, "consumed_quantity", quantity)
+        for medicine in request.get("medicines", []):
+            self.add(day, "medicine", medicine.get("name"), metric)
+            if status == "dispensed":
+                self.add(day, "medicine", medicine.get("name"), "dispensed_quantity", medicine.get("quantity", 1))
+
+        created = _parse_time(request.get("created_at"))
+        if status == "dispensed" and created is not None:
+            seconds = max(0.0, (at - created).total_seconds())
+            for dimension, key in (("all", "all"), ("clinic", request.get("clinic"))):
+                self.add(day, dimension, key, "turnaround_seconds", round(seconds, 3))
+                self.add(day, dimension, key, "turnaround_count")
+
+    def operations(self) -> List[UpdateOne]:
+        return [
+            UpdateOne(
+                {"day": day, "dimension": dimension, "key": key},
+                {"$inc": {f"counts.{metric}": amount for metric, amount in counts.items()}},
+                upsert=True
+            )
+            for (day, dimension, key), counts in self.counters.items()
+        ]
+
+
+class AnalyticsRollups:
+    """Daily counters in one collection of the given database"""
+
+    def __init__(self, collection_name: str = "analytics_daily"):
+        self.collection_name = collection_name
+
+    async def ensure_indexes(self, db):
+        await db[self.collection_name].create_index(
+            [("dimension", 1), ("day", 1), ("key", 1)], unique=True
+        )
+
+    async def apply(self, db, increments: Increments):
+        """Write merged increments in one bulk upsert; failures are logged, never raised"""
+        operations = increments.operations()
+        if not operations:
+            return
+        try:
+            await db[self.collection_name].bulk_write(operations, ordered=False)
+        except PyMongoError as e:
+            logger.error(f"Failed to update analytics rollups: {e}")
+
+    async def record_prescriptions(self, db, prescriptions: Iterable[Dict[str, Any]]):
+        increments = Increments()
+        for prescription in prescriptions:
+            increments.add_prescription(prescription)
+        await self.apply(db, increments)
+
+    async def record_transition(self, db, request: Dict[str, Any], status: str, at: Any = None,
+                                consumed: Optional[Dict[str, int]] = None):
+        increments = Increments()
+        increments.add_transition(request, status, at, consumed)
+        await self.apply(db, increments)
+
+    async def rebuild(self, db, prescriptions: Optional[AsyncIterable[Dict[str, Any]]] = None) -> int:
+        """
+        Recompute every rollup from the prescriptions and dispense_requests
+        collections. `prescriptions` overrides how prescriptions are read
+        (the repository passes decoded documents).
+        """
+        await db[self.collection_name].delete_many({})
+        increments = Increments()
+        if prescriptions is None:
+            prescriptions = db.prescriptions.find({}, {"_id": 0})
+        async for prescription in prescriptions:
+            increments.add_prescription(prescription)
+        async for request in db.dispense_requests.find({"status": {"$in": list(STATUS_METRICS)}}, {"_id": 0}):
+            if request.get("approved_at") or request["status"] == "approved":
+                increments.add_transition(request, "approved", request.get("approved_at") or request.get("created_at"),
+                                          request.get("inventory_consumed"))
+            if request["status"] in ("dispensed", "rejected"):
+                at = request.get(f"{request['status']}_at") or request.get("created_at")
+                increments.add_transition(request, request["status"], at)
+        await self.apply(db, increments)
+        return len(increments.counters)
+
+    async def daily(self, db, dimension: str, date_from: str, date_to: str,
+                    keys: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Rollup documents for a dimension within [date_from, date_to], oldest first"""
+        query: Dict[str, Any] = {"dimension": dimension, "day": {"$gte": date_from, "$lte": date_to}}
+        if keys:
+            query["key"] = {"$in": keys}
+        return await db[self.collection_name].find(query, {"_id": 0}).sort("day", 1).to_list(None)
+
+    async def summary(self, db, date_from: str, date_to: str) -> Dict[str, Any]:
+        """Overall totals and the per-day series for the dashboard header"""
+        rows = await self.daily(db, "all", date_from, date_to)
+        totals = Counter()
+        for row in rows:
+            totals.update(row.get("counts", {}))
+        return {
+            "date_from": date_from,
+            "date_to": date_to,
+            "totals": {metric: totals.get(metric, 0) for metric in METRICS},
+            "avg_turnaround_seconds": (round(totals["turnaround_seconds"] / totals["turnaround_count"], 1)
+                                       if totals["turnaround_count"] else None),
+            "series": [{"day": row["day"], **row.get("counts", {})} for row in rows],
+        }
+
+    async def top(self, db, dimension: str, metric: str, date_from: str, date_to: str,
+                  limit: int = 10) -> List[Dict[str, Any]]:
+        """Keys of a dimension ranked by a metric summed over the range, with their daily series"""
+        totals: Counter = Counter()
+        series: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        for row in await self.daily(db, dimension, date_from, date_to):
+            value = row.get("counts", {}).get(metric, 0)
+            if value:
+                totals[row["key"]] += value
+                series[row["key"]].append({"day": row["day"], "value": value})
+        return [{"key": key, "total": total, "series": series[key]} for key, total in totals.most_common(limit)]
+
+
+def _parse_day(value: str, name: str) -> datetime:
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"{name} must be an ISO date such as 2025-03-10, got {value!r}")
+
+
+def date_range(days: Optional[int], date_from: Optional[str], date_to: Optional[str]) -> Tuple[str, str]:
+    """
+    Resolve a `days` window or explicit bounds to inclusive YYYY-MM-DD strings;
+    raises ValueError for a bound that is not an ISO date or datetime
+    """
+    end = _parse_day(date_to, "date_to") if date_to else datetime.now(timezone.utc)
+    start = _parse_day(date_from, "date_from") if date_from else end - timedelta(days=(days or 30) - 1)
+    return start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d")
+
+
+# Global rollups
+analytics = AnalyticsRollups()
@@ -0,0 +1,152 @@
+"""
+Application factory. `create_app()` builds the API from the route groups in
+routes/ (all of them by default, see server.py) with the middleware stack and
+the startup/shutdown hooks shared by every group:
+
+    from application import create_app
+    app = create_app(["auth", "inventory", "dispense"])
+
+Only the included groups' route modules are imported, so a smaller app also
+starts faster; the shared services the middleware stack and hooks use (database,
+admission, caches, executor, job queue) are imported with this module whatever
+the groups. Importing it opens no connection (see database.py).
+"""
+import os
+import time
+import logging
+from typing import Optional, Sequence
+
+from fastapi import FastAPI
+from pymongo.errors import PyMongoError
+from starlette.middleware.cors import CORSMiddleware
+
+import database
+from admission import admission_controller, AdmissionMiddleware
+from ai_cache import ai_cache
+from ai_executor import ai_executor, loop_monitor, LoopLagMiddleware
+from ai_service import ai_service
+from analytics import analytics
+from audit_log import audit_log
+from compact_storage import dictionary_codec
+from compression import compression_stats, CompressionMiddleware
+from jobs import job_queue
+from response_cache import response_versions, ConditionalGetMiddleware
+from routes import load_groups
+
+# Persist memoized AI results across restarts when enabled
+AI_CACHE_PERSIST = os.environ.get('AI_CACHE_PERSIST', 'false').lower() == 'true'
+
+# Per-worker warm-up before the first request (see serve.py)
+WARMUP = os.environ.get('WARMUP', 'true').lower() == 'true'
+AI_CACHE_PRIME_ENTRIES = int(os.environ.get('AI_CACHE_PRIME_ENTRIES', '512'))
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+async def start_loop_monitor():
+    loop_monitor.start()
+
+async def attach_ai_cache():
+    if AI_CACHE_PERSIST and ai_cache.collection is None:
+        ai_cache.attach_collection(database.db.ai_cache)
+
+async def load_storage_dictionaries():
+    try:
+        await dictionary_codec.load(database.db)
+    except PyMongoError as e:
+        logger.error(f"Could not load storage dictionaries: {e}")
+
+async def start_audit_log():
+    audit_log.start(database.db)
+
+async def start_response_versions():
+    response_versions.start(database.db)
+
+async def start_job_workers():
+    job_queue.start(database.db)
+
+async def ensure_indexes():
+    """Create the indexes the write paths rely on for atomicity"""
+    db = database.db
+    try:
+        await db.ai_summaries.create_index("patient_name", unique=True)
+        await analytics.ensure_indexes(db)
+        await dictionary_codec.ensure_indexes(db)
+        await response_versions.ensure_indexes(db)
+        await job_queue.ensure_indexes(db)
+        if ai_cache.collection is not None:
+            await ai_cache.collection.create_index("key", unique=True)
+    except PyMongoError as e:
+        logger.error(f"Could not create indexes: {e}")
+
+async def warm_up():
+    """
+    Prime this worker's caches and clients after the indexes are checked, so
+    the first requests it accepts do not pay for them.
+    """
+    if not WARMUP:
+        return
+    started = time.perf_counter()
+    primed = 0
+    try:
+        await response_versions.sync(database.db)
+        primed = await ai_cache.prime(AI_CACHE_PRIME_ENTRIES)
+    except PyMongoError as e:
+        logger.error(f"Cache priming failed: {e}")
+    # Imports and builds the LlamaCloud client when configured
+    ai_service.llama_client
+    logger.info(f"Worker {os.getpid()} warmed up in {time.perf_counter() - started:.2f}s "
+                f"({primed} AI cache entries)")
+
+async def shutdown_db_client():
+    # Jobs still running are queued again for another worker
+    await job_queue.stop()
+    await loop_monitor.stop()
+    await audit_log.stop()
+    await response_versions.stop(database.db)
+    ai_executor.shutdown()
+    await ai_service.close()
+    database.close()
+
+
+def create_app(groups: Optional[Sequence[str]] = None) -> FastAPI:
+    """Build the API from the given route groups (all of them by default)"""
+    app = FastAPI(title="Healthcare AI Platform", version="1.0.0")
+
+    for hook in (start_loop_monitor, attach_ai_cache, load_storage_dictionaries, start_audit_log,
+                 start_response_versions):
+        app.add_event_handler("startup", hook)
+    # The routes already carry the /api prefix; adding them as built skips the
+    # per-route rebuild include_router does. Each group brings the startup
+    # hooks its endpoints need (indexes, forecaster).
+    for group in load_groups(groups):
+        app.router.routes.extend(group.router.routes)
+        for hook in getattr(group, "startup_hooks", ()):
+            app.add_event_handler("startup", hook)
+        for hook in getattr(group, "shutdown_hooks", ()):
+            app.add_event_handler("shutdown", hook)
+    app.add_event_handler("startup", ensure_indexes)
+    app.add_event_handler("startup", warm_up)
+    # Last, so the job handlers' groups have run their startup hooks
+    app.add_event_handler("startup", start_job_workers)
+    app.add_event_handler("shutdown", shutdown_db_client)
+
+    # Innermost, so CORS headers are added to 304s as well
+    app.add_middleware(ConditionalGetMiddleware, versions=response_versions)
+    # Inside CORS, so browsers can read 429/503 responses (preflights are never limited)
+    app.add_middleware(AdmissionMiddleware, controller=admission_controller)
+    app.add_middleware(
+        CORSMiddleware,
+        allow_credentials=True,
+        allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+    app.add_middleware(CompressionMiddleware, stats=compression_stats)
+    app.add_middleware(LoopLagMiddleware, monitor=loop_monitor)
+    return app
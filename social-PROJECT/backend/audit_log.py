@@ -0,0 +1,209 @@
+"""
+Status state machines and an append-only audit log of transitions.
+
+Every accepted status change produces one event document. Events are
+buffered in memory and written in batches by a background task, flushing
+when the buffer reaches `max_batch` events or every `flush_interval`
+seconds, so recording an event costs a list append on the request path.
+
+Events go to monthly partitions (`status_events_YYYYMM`) that are only ever
+inserted into; retention is a matter of dropping old partitions. Each event
+carries the entity's `version` after the transition, so a gap in the
+sequence of an entity's events shows that an event was lost (for example,
+buffered events at a crash).
+"""
+import os
+import asyncio
+import logging
+from collections import defaultdict, deque
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional, Set
+
+from pymongo.errors import BulkWriteError, PyMongoError
+
+logger = logging.getLogger(__name__)
+
+AUDIT_FLUSH_INTERVAL = float(os.environ.get("AUDIT_FLUSH_INTERVAL", "1.0"))
+AUDIT_MAX_BATCH = int(os.environ.get("AUDIT_MAX_BATCH", "500"))
+AUDIT_MAX_BUFFER = int(os.environ.get("AUDIT_MAX_BUFFER", "50000"))
+
+PARTITION_PREFIX = "status_events_"
+
+# entity -> current status -> statuses it may move to
+TRANSITIONS: Dict[str, Dict[str, Set[str]]] = {
+    "prescription": {
+        "pending": {"approved", "rejected", "cancelled"},
+        # Back to pending when its approved dispense request is rejected
+        "approved": {"dispensed", "cancelled", "pending"},
+        "dispensed": set(),
+        "rejected": set(),
+        "cancelled": set(),
+    },
+    "dispense_request": {
+        "pending": {"approved", "rejected"},
+        "approved": {"dispensed", "rejected"},
+        "dispensed": set(),
+        "rejected": set(),
+    },
+    "appointment": {
+        "scheduled": {"in-progress", "completed", "cancelled", "no-show"},
+        "in-progress": {"completed", "cancelled"},
+        "completed": set(),
+        "cancelled": set(),
+        "no-show": set(),
+    },
+}
+
+
+class InvalidTransition(Exception):
+    """A status change the entity's state machine does not allow"""
+
+    def __init__(self, entity: str, current: Optional[str], new: str):
+        self.entity = entity
+        self.current = current
+        self.new = new
+        if new not in TRANSITIONS[entity]:
+            message = f"Unknown {entity} status '{new}'; expected one of {', '.join(TRANSITIONS[entity])}"
+        else:
+            message = f"Cannot change {entity} status from '{current}' to '{new}'"
+        super().__init__(message)
+
+
+def allowed_from(entity: str, new: str) -> List[str]:
+    """Statuses from which `new` can be reached"""
+    if new not in TRANSITIONS[entity]:
+        raise InvalidTransition(entity, None, new)
+    return [status for status, targets in TRANSITIONS[entity].items() if new in targets]
+
+
+def validate_transition(entity: str, current: Optional[str], new: str):
+    if new not in TRANSITIONS[entity] or new not in TRANSITIONS[entity].get(current, set()):
+        raise InvalidTransition(entity, current, new)
+
+
+def partition_name(at: datetime) -> str:
+    return f"{PARTITION_PREFIX}{at:%Y%m}"
+
+
+class AuditLog:
+    """Buffered, batched writer for status transition events"""
+
+    def __init__(self, flush_interval: float = AUDIT_FLUSH_INTERVAL, max_batch: int = AUDIT_MAX_BATCH,
+                 max_buffer: int = AUDIT_MAX_BUFFER):
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.db = None
+        self._buffer: deque = deque(maxlen=max_buffer)
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._stopping = False
+        self._indexed: Set[str] = set()
+        self.stats = {"recorded": 0, "written": 0, "dropped": 0, "flushes": 0, "errors": 0}
+
+    def record(self, entity: str, entity_id: str, from_status: Optional[str], to_status: str,
+               version: Optional[int] = None, actor: Optional[str] = None, **details):
+        """Queue one transition event; never blocks and never raises"""
+        if len(self._buffer) == self._buffer.maxlen:
+            self.stats["dropped"] += 1
+            logger.error("Audit buffer full; dropping oldest event")
+        event = {
+            "entity": entity,
+            "entity_id": entity_id,
+            "from_status": from_status,
+            "to_status": to_status,
+            "version": version,
+            "actor": actor,
+            "at": datetime.now(timezone.utc),
+        }
+        if details:
+            event["details"] = details
+        self._buffer.append(event)
+        self.stats["recorded"] += 1
+        if len(self._buffer) >= self.max_batch and self._wakeup is not None:
+            self._wakeup.set()
+
+    async def flush(self, db=None):
+        """Write every buffered event, one insert_many per monthly partition"""
+        db = db or self.db
+        if db is None or not self._buffer:
+            return
+        events = list(self._buffer)
+        self._buffer.clear()
+        by_partition: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        for event in events:
+            by_partition[partition_name(event["at"])].append(event)
+        pending = list(by_partition.items())
+        try:
+            while pending:
+                name, batch = pending[0]
+                try:
+                    if name not in self._indexed:
+                        await db[name].create_index([("entity", 1), ("entity_id", 1), ("version", 1)])
+                        self._indexed.add(name)
+                    await db[name].insert_many(batch, ordered=False)
+                    self.stats["written"] += len(batch)
+                except BulkWriteError as e:
+                    # Retry only the events that failed for a reason other than having been written already
+                    failed = [error["index"] for error in e.details.get("writeErrors", [])
+                              if error.get("code") != 11000]
+                    self.stats["errors"] += 1
+                    self.stats["written"] += e.details.get("nInserted", 0)
+                    logger.error(f"{len(failed)} audit events to {name} failed: {e}")
+                    self._buffer.extendleft(reversed([batch[i] for i in failed]))
+                except PyMongoError as e:
+                    # Put the batch back in front of newer events and retry on the next flush
+                    self.stats["errors"] += 1
+                    logger.error(f"Failed to write {len(batch)} audit events to {name}: {e}")
+                    self._buffer.extendleft(reversed(batch))
+                pending.pop(0)
+        except BaseException:
+            # Cancelled or failed mid-flush: the events not yet written go back to the buffer
+            self._buffer.extendleft(reversed([event for _, batch in pending for event in batch]))
+            raise
+        self.stats["flushes"] += 1
+
+    def start(self, db):
+        self.db = db
+        if self._task is None:
+            self._stopping = False
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    async def stop(self):
+        """Stop the background writer and flush what is left"""
+        if self._task is not None:
+            # Let the writer finish the flush it may be in the middle of, rather than cancelling it
+            self._stopping = True
+            self._wakeup.set()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            self._wakeup = None
+        await self.flush()
+
+    async def history(self, db, entity: str, entity_id: str, partitions: List[str]) -> List[Dict[str, Any]]:
+        """Events for one entity from the given partitions, oldest first (buffered events included)"""
+        events = []
+        for name in sorted(partitions):
+            events.extend(await db[name].find({"entity": entity, "entity_id": entity_id}, {"_id": 0})
+                          .sort("at", 1).to_list(None))
+        events.extend(dict(e) for e in self._buffer if e["entity"] == entity and e["entity_id"] == entity_id)
+        return events
+
+    def metrics(self) -> Dict[str, Any]:
+        return {**self.stats, "buffered": len(self._buffer)}
+
+
+# Global audit log
+audit_log = AuditLog()
@@ -0,0 +1,255 @@
+"""
+Compact storage representation for prescriptions and AI summaries.
+
+Prescriptions repeat a small vocabulary of long strings on every document
+(clinic and prescriber names, and medicine names, dosages and form,
+frequency, duration and route values such as "When required (PRN)"). These fields are stored as
+small integer codes from a per-field dictionary kept in the `dictionaries`
+collection, with an in-memory lookup table in each process. Codes are
+allocated from a per-field counter when a new value is first written; a code
+unknown to this process (allocated by another worker) triggers one reload.
+Documents written before encoding keep their strings and decode unchanged.
+
+So in the `prescriptions` collection `clinic`, `prescriber_name`,
+`prescriber_reg_number` and `medicines.<field>` hold integer codes, and a raw
+MongoDB query comparing them with strings silently matches only documents
+written before encoding. Queries go through the repository, which passes
+them to `PrescriptionCodec.encode_query` to match both forms.
+
+AI summaries no longer copy the prescription into `raw_data`: the stored
+`prescription_id` and `source_hash` reference the source. Their provenance
+links, which all point at the same prescription, are stored once as a
+`provenance` block with one `[field_name, value, source_field]` row per link.
+
+Decoding happens in the repository layer, so handlers see the full documents.
+"""
+import asyncio
+import logging
+from collections import defaultdict
+from typing import Dict, Any, List, Optional
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from domain import ProvenanceLink
+
+logger = logging.getLogger(__name__)
+
+PRESCRIPTION_FIELDS = ("clinic", "prescriber_name", "prescriber_reg_number")
+MEDICINE_FIELDS = ("name", "dosage", "form", "frequency", "duration", "route")
+
+
+class UnknownCode(KeyError):
+    pass
+
+
+class DictionaryCodec:
+    """Field value <-> small-int code tables shared by every worker through MongoDB"""
+
+    def __init__(self, collection_name: str = "dictionaries", counters_name: str = "dictionary_counters"):
+        self.collection_name = collection_name
+        self.counters_name = counters_name
+        self._codes: Dict[str, Dict[str, int]] = defaultdict(dict)
+        self._values: Dict[str, Dict[int, str]] = defaultdict(dict)
+        self._lock = asyncio.Lock()
+        self._db = None
+        self.stats = {"allocated": 0, "reloads": 0}
+
+    def _bind(self, db):
+        """The tables are only valid for the database they were read from"""
+        if db is not self._db:
+            self._db = db
+            self._codes.clear()
+            self._values.clear()
+
+    async def ensure_indexes(self, db):
+        await db[self.collection_name].create_index([("field", 1), ("value", 1)], unique=True)
+        await db[self.collection_name].create_index([("field", 1), ("code", 1)], unique=True)
+
+    def _remember(self, field: str, value: str, code: int):
+        self._codes[field][value] = code
+        self._values[field][code] = value
+
+    async def load(self, db):
+        """Refresh the lookup tables from the `dictionaries` collection"""
+        self._bind(db)
+        self.stats["reloads"] += 1
+        async for entry in db[self.collection_name].find({}, {"_id": 0}):
+            self._remember(entry["field"], entry["value"], entry["code"])
+
+    async def code(self, db, field: str, value: str) -> int:
+        """The code for `value`, allocating one on first use"""
+        self._bind(db)
+        code = self._codes[field].get(value)
+        if code is not None:
+            return code
+        async with self._lock:
+            code = self._codes[field].get(value)
+            if code is not None:
+                return code
+            entry = await db[self.collection_name].find_one({"field": field, "value": value}, {"_id": 0})
+            if entry is None:
+                counter = await db[self.counters_name].find_one_and_update(
+                    {"field": field}, {"$inc": {"seq": 1}}, upsert=True, return_document=ReturnDocument.AFTER
+                )
+                entry = {"field": field, "value": value, "code": counter["seq"]}
+                try:
+                    await db[self.collection_name].insert_one(dict(entry))
+                    self.stats["allocated"] += 1
+                except DuplicateKeyError:
+                    # Another worker allocated this value first
+                    entry = await db[self.collection_name].find_one({"field": field, "value": value}, {"_id": 0})
+            self._remember(field, value, entry["code"])
+            return entry["code"]
+
+    async def lookup(self, db, field: str, value: str) -> Optional[int]:
+        """The code for `value` if one was allocated; never allocates (for queries)"""
+        self._bind(db)
+        code = self._codes[field].get(value)
+        if code is None:
+            entry = await db[self.collection_name].find_one({"field": field, "value": value}, {"_id": 0})
+            if entry is None:
+                return None
+            self._remember(field, value, entry["code"])
+            code = entry["code"]
+        return code
+
+    def value(self, field: str, code: int) -> str:
+        try:
+            return self._values[field][code]
+        except KeyError:
+            raise UnknownCode(f"{field}:{code}")
+
+    def metrics(self) -> Dict[str, Any]:
+        return {**self.stats, "fields": {field: len(codes) for field, codes in self._codes.items()}}
+
+
+class PrescriptionCodec:
+    """Dictionary-encodes the enumerated prescription and medicine fields"""
+
+    def __init__(self, dictionary: DictionaryCodec):
+        self.dictionary = dictionary
+
+    async def encode(self, db, doc: Dict[str, Any]) -> Dict[str, Any]:
+        stored = dict(doc)
+        for field in PRESCRIPTION_FIELDS:
+            if isinstance(stored.get(field), str):
+                stored[field] = await self.dictionary.code(db, field, stored[field])
+        if stored.get("medicines"):
+            medicines = []
+            for medicine in stored["medicines"]:
+                medicine = dict(medicine)
+                for field in MEDICINE_FIELDS:
+                    if isinstance(medicine.get(field), str):
+                        medicine[field] = await self.dictionary.code(db, field, medicine[field])
+                medicines.append(medicine)
+            stored["medicines"] = medicines
+        return stored
+
+    async def _query_values(self, db, field: str, values: List[Any]) -> List[Any]:
+        """`values` plus the codes of the string ones, matching encoded and pre-encoding documents"""
+        matched = list(values)
+        for value in values:
+            if isinstance(value, str):
+                code = await self.dictionary.lookup(db, field, value)
+                if code is not None:
+                    matched.append(code)
+        return matched
+
+    async def encode_query(self, db, query: Dict[str, Any]) -> Dict[str, Any]:
+        """Translate string conditions on encoded fields (equality, $in, $ne, $nin) into their codes"""
+        encoded = {}
+        for key, condition in query.items():
+            if key in ("$and", "$or", "$nor"):
+                encoded[key] = [await self.encode_query(db, part) for part in condition]
+                continue
+            field = key[len("medicines."):] if key.startswith("medicines.") else key
+            if (key in PRESCRIPTION_FIELDS or (key != field and field in MEDICINE_FIELDS)) and condition is not None:
+                if isinstance(condition, str):
+                    condition = {"$in": await self._query_values(db, field, [condition])}
+                elif isinstance(condition, dict):
+                    condition = dict(condition)
+                    if "$ne" in condition:
+                        condition["$nin"] = condition.get("$nin", []) + [condition.pop("$ne")]
+                    for op in ("$in", "$nin"):
+                        if op in condition:
+                            condition[op] = await self._query_values(db, field, condition[op])
+            encoded[key] = condition
+        return encoded
+
+    def _decode(self, doc: Dict[str, Any]) -> Dict[str, Any]:
+        value = self.dictionary.value
+        decoded = dict(doc)
+        for field in PRESCRIPTION_FIELDS:
+            if isinstance(decoded.get(field), int):
+                decoded[field] = value(field, decoded[field])
+        if decoded.get("medicines"):
+            decoded["medicines"] = [
+                {k: value(k, v) if k in MEDICINE_FIELDS and isinstance(v, int) else v for k, v in medicine.items()}
+                for medicine in decoded["medicines"]
+            ]
+        return decoded
+
+    async def decode(self, db, docs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        self.dictionary._bind(db)
+        try:
+            return [self._decode(doc) for doc in docs]
+        except UnknownCode:
+            await self.dictionary.load(db)
+        decoded = []
+        for doc in docs:
+            try:
+                decoded.append(self._decode(doc))
+            except UnknownCode as e:
+                logger.error(f"Prescription {doc.get('id')} references unknown dictionary code {e}")
+                decoded.append(doc)
+        return decoded
+
+
+class SummaryCodec:
+    """Stores AI summaries without `raw_data` and with provenance links as rows"""
+
+    async def encode(self, db, doc: Dict[str, Any]) -> Dict[str, Any]:
+        stored = {k: v for k, v in doc.items() if k != "raw_data"}
+        links = stored.get("provenance_links")
+        if links and isinstance(links[0], ProvenanceLink):
+            # Slotted links from the bulk paths
+            sources = {(link.source_type, link.source_id) for link in links}
+            if len(sources) == 1:
+                rows = [[link.field_name, link.value, link.source_field] for link in links]
+            else:
+                stored["provenance_links"] = [link.as_dict() for link in links]
+        elif links:
+            sources = {(link["source_type"], link["source_id"]) for link in links}
+            if len(sources) == 1:
+                rows = [[link["field_name"], link["value"], link["source_field"]] for link in links]
+        if links and len(sources) == 1:
+            source_type, source_id = sources.pop()
+            del stored["provenance_links"]
+            stored["provenance"] = {"source_type": source_type, "source_id": source_id, "links": rows}
+        return stored
+
+    async def encode_query(self, db, query: Dict[str, Any]) -> Dict[str, Any]:
+        return query
+
+    @staticmethod
+    def _decode(doc: Dict[str, Any]) -> Dict[str, Any]:
+        provenance = doc.get("provenance")
+        if provenance is None:
+            return doc
+        decoded = {k: v for k, v in doc.items() if k != "provenance"}
+        decoded["provenance_links"] = [
+            {"field_name": field_name, "value": value, "source_type": provenance["source_type"],
+             "source_id": provenance["source_id"], "source_field": source_field}
+            for field_name, value, source_field in provenance["links"]
+        ]
+        return decoded
+
+    async def decode(self, db, docs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        return [self._decode(doc) for doc in docs]
+
+
+# Global codecs
+dictionary_codec = DictionaryCodec()
+prescription_codec = PrescriptionCodec(dictionary_codec)
+summary_codec = SummaryCodec()
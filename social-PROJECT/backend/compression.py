@@ -0,0 +1,235 @@
+"""
+Negotiated response compression.
+
+Responses with a compressible content type are encoded with the best codec
+the client accepts (Accept-Encoding q-values, ties broken by the server order
+in COMPRESSION_ENCODINGS). gzip is always available; zstd and brotli are used
+when the optional `zstandard` / `brotli` packages are installed. Bodies sent in
+one message are compressed only above COMPRESSION_MIN_BYTES. Streamed bodies
+(NDJSON / SSE summary generation) are compressed chunk by chunk with a sync
+flush after each one, so every event still reaches the client as soon as it is
+produced.
+
+Bytes before and after compression are recorded per route template and
+reported at /api/metrics/compression.
+"""
+import os
+import zlib
+import asyncio
+import logging
+from abc import ABC, abstractmethod
+from collections import Counter
+from typing import Dict, Any, List, Optional
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+COMPRESSION_MIN_BYTES = int(os.environ.get("COMPRESSION_MIN_BYTES", "1024"))
+COMPRESSION_GZIP_LEVEL = int(os.environ.get("COMPRESSION_GZIP_LEVEL", "6"))
+COMPRESSION_BROTLI_QUALITY = int(os.environ.get("COMPRESSION_BROTLI_QUALITY", "4"))
+COMPRESSION_ZSTD_LEVEL = int(os.environ.get("COMPRESSION_ZSTD_LEVEL", "3"))
+COMPRESSION_ENCODINGS = os.environ.get("COMPRESSION_ENCODINGS", "zstd,br,gzip")
+
+# Single-message bodies above this size are compressed off the event loop
+COMPRESSION_OFFLOAD_BYTES = 256 * 1024
+
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/")
+
+
+class StreamCompressor(ABC):
+    """Incremental encoder: `chunk` returns bytes decodable so far, `finish` ends the stream"""
+
+    @abstractmethod
+    def chunk(self, data: bytes) -> bytes:
+        ...
+
+    @abstractmethod
+    def finish(self, data: bytes = b"") -> bytes:
+        ...
+
+
+class GzipCompressor(StreamCompressor):
+    def __init__(self, level: int = COMPRESSION_GZIP_LEVEL):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def chunk(self, data: bytes) -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, data: bytes = b"") -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush()
+
+
+class BrotliCompressor(StreamCompressor):
+    def __init__(self, quality: int = COMPRESSION_BROTLI_QUALITY):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def chunk(self, data: bytes) -> bytes:
+        return self._compressor.process(data) + self._compressor.flush()
+
+    def finish(self, data: bytes = b"") -> bytes:
+        return self._compressor.process(data) + self._compressor.finish()
+
+
+class ZstdCompressor(StreamCompressor):
+    def __init__(self, level: int = COMPRESSION_ZSTD_LEVEL):
+        self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def chunk(self, data: bytes) -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self, data: bytes = b"") -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush()
+
+
+def available_encodings() -> Dict[str, type]:
+    """Encodings this process can produce, in server preference order"""
+    codecs = {"gzip": GzipCompressor}
+    if brotli is not None:
+        codecs["br"] = BrotliCompressor
+    if zstandard is not None:
+        codecs["zstd"] = ZstdCompressor
+    order = [name.strip() for name in COMPRESSION_ENCODINGS.split(",") if name.strip() in codecs]
+    return {name: codecs[name] for name in order}
+
+
+def negotiate(accept_encoding: str, encodings: List[str]) -> Optional[str]:
+    """Pick the accepted encoding with the highest q-value, or None for identity"""
+    weights: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if name:
+            weights[name.strip().lower()] = quality
+    best, best_quality = None, 0.0
+    for encoding in encodings:
+        quality = weights.get(encoding, weights.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+class CompressionStats:
+    """Bytes before and after compression per route"""
+
+    def __init__(self):
+        self.routes: Dict[str, Counter] = {}
+
+    def record(self, route: str, encoding: Optional[str], bytes_in: int, bytes_out: int):
+        counts = self.routes.setdefault(route, Counter())
+        counts["responses"] += 1
+        counts[f"encoding_{encoding or 'identity'}"] += 1
+        counts["bytes_in"] += bytes_in
+        counts["bytes_out"] += bytes_out
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "encodings": list(available_encodings()),
+            "min_bytes": COMPRESSION_MIN_BYTES,
+            "routes": {
+                route: {**counts, "ratio": round(counts["bytes_in"] / counts["bytes_out"], 2)
+                        if counts["bytes_out"] else 0.0}
+                for route, counts in self.routes.items()
+            },
+        }
+
+
+class CompressionMiddleware:
+    """ASGI middleware compressing responses with the negotiated encoding"""
+
+    def __init__(self, app, stats: CompressionStats, minimum_size: int = COMPRESSION_MIN_BYTES):
+        self.app = app
+        self.stats = stats
+        self.minimum_size = minimum_size
+        self.encodings = available_encodings()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        accept = next((v.decode("latin-1") for k, v in scope["headers"] if k == b"accept-encoding"), "")
+        encoding = negotiate(accept, list(self.encodings)) if accept else None
+        start: Optional[Dict[str, Any]] = None
+        compressor: Optional[StreamCompressor] = None
+        passthrough = False
+        bytes_in = bytes_out = 0
+
+        def route() -> str:
+            matched = scope.get("route")
+            return getattr(matched, "path", None) or "unmatched"
+
+        async def send_compressed(message):
+            nonlocal start, compressor, passthrough, bytes_in, bytes_out
+            if message["type"] == "http.response.start":
+                start = message
+                headers = {k.lower(): v for k, v in message.get("headers", [])}
+                content_type = headers.get(b"content-type", b"").decode("latin-1")
+                passthrough = (b"content-encoding" in headers
+                               or not content_type.startswith(COMPRESSIBLE_TYPES))
+                if not passthrough:
+                    start = {**message, "headers": _with_vary(message.get("headers", []))}
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            bytes_in += len(body)
+            if start is not None:
+                # First body message: decide how this response is sent
+                if not passthrough and encoding is not None and (more_body or len(body) >= self.minimum_size):
+                    compressor = self.encodings[encoding]()
+                    headers = [(k, v) for k, v in start["headers"] if k.lower() != b"content-length"]
+                    headers.append((b"content-encoding", encoding.encode("latin-1")))
+                    if more_body:
+                        body = compressor.chunk(body)
+                    else:
+                        body = await _compress_whole(compressor, body)
+                        headers.append((b"content-length", str(len(body)).encode("latin-1")))
+                    start = {**start, "headers": headers}
+                await send(start)
+                start = None
+            elif compressor is not None:
+                body = compressor.chunk(body) if more_body else compressor.finish(body)
+            bytes_out += len(body)
+            await send({**message, "body": body})
+            if not more_body:
+                self.stats.record(route(), encoding if compressor is not None else None, bytes_in, bytes_out)
+
+        await self.app(scope, receive, send_compressed)
+
+
+def _with_vary(headers: List) -> List:
+    """Add Accept-Encoding to Vary, since the body depends on it"""
+    for i, (key, value) in enumerate(headers):
+        if key.lower() == b"vary":
+            if b"accept-encoding" in value.lower() or value.strip() == b"*":
+                return headers
+            return [*headers[:i], (key, value + b", Accept-Encoding"), *headers[i + 1:]]
+    return [*headers, (b"vary", b"Accept-Encoding")]
+
+
+async def _compress_whole(compressor: StreamCompressor, body: bytes) -> bytes:
+    if len(body) >= COMPRESSION_OFFLOAD_BYTES:
+        return await asyncio.to_thread(compressor.finish, body)
+    return compressor.finish(body)
+
+
+# Global per-route byte counters
+compression_stats = CompressionStats()
@@ -0,0 +1,40 @@
+"""
+MongoDB handle shared by the route modules (routes/).
+
+Motor is imported and the client created the first time `database.db` is
+read, not when the application is imported: the import stays cheap, and a
+process that forks workers (serve.py) creates no client before the fork.
+Route handlers read `database.db` at call time, so tests and tools point the
+whole API at another database by assigning it (`database.db = FakeDatabase()`).
+"""
+import os
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+MONGO_URL = os.environ['MONGO_URL']
+DB_NAME = os.environ.get('DB_NAME', 'healthcare_ai_db')
+
+
+def connect():
+    """Create the Motor client (it connects on first operation)"""
+    from motor.motor_asyncio import AsyncIOMotorClient
+    global client, db
+    client = AsyncIOMotorClient(MONGO_URL)
+    db = client[DB_NAME]
+
+
+def close():
+    """Close the client if one was created"""
+    if 'client' in globals():
+        globals()['client'].close()
+
+
+def __getattr__(name: str):
+    if name in ('client', 'db'):
+        connect()
+        return globals()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,101 @@
+"""
+Slotted internal representations of prescriptions, medicines and
+provenance links.
+
+Pydantic models (models.py) validate request bodies at the API edge. Inside
+the service, summary generation and the bulk paths work on these plain
+slotted dataclasses instead: attribute access instead of `.get` on dicts, no
+validation or `model_dump()` round trips, and far smaller objects than the
+equivalent dicts when many are alive at once.
+
+None of these objects reference each other in cycles, yet each one is tracked
+by the cyclic garbage collector. `gc_paused()` suspends collection around a
+synchronous, CPU-only loop that builds many of them; reference counting still
+frees everything. It switches GC off for the whole process, so it must never
+span an `await` in the server, where other requests keep running.
+"""
+import gc
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Dict, Any, Iterator, List
+
+
+@dataclass(slots=True)
+class Medicine:
+    name: str = ""
+    dosage: str = ""
+    form: str = ""
+    frequency: str = ""
+    duration: str = ""
+    route: str = ""
+    quantity: int = 1
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Medicine":
+        get = data.get
+        return cls(get("name") or "", get("dosage") or "", get("form") or "", get("frequency") or "",
+                   get("duration") or "", get("route") or "", get("quantity", 1))
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {"name": self.name, "dosage": self.dosage, "form": self.form, "frequency": self.frequency,
+                "duration": self.duration, "route": self.route, "quantity": self.quantity}
+
+
+@dataclass(slots=True)
+class Prescription:
+    """The clinical content of a prescription, as summary generation reads it"""
+    id: str = ""
+    patient_name: str = ""
+    age: Any = 0
+    sex: str = ""
+    date: str = ""
+    symptoms: List[str] = field(default_factory=list)
+    medicines: List[Medicine] = field(default_factory=list)
+    recommended_tests: List[str] = field(default_factory=list)
+    advice: str = ""
+    prescriber_name: str = ""
+    prescriber_reg: str = ""
+    clinic: str = ""
+
+    @classmethod
+    def from_document(cls, doc: Dict[str, Any]) -> "Prescription":
+        """From a stored prescription document"""
+        get = doc.get
+        return cls(get("id", ""), get("patient_name", ""), get("patient_age", 0), get("patient_sex", ""),
+                   get("date", ""), get("symptoms", []), [Medicine.from_dict(m) for m in get("medicines", [])],
+                   get("recommended_tests", []), get("notes", ""), get("prescriber_name", ""),
+                   get("prescriber_reg_number", ""), get("clinic", ""))
+
+    @classmethod
+    def from_extracted(cls, data: Dict[str, Any], prescription_id: str = "") -> "Prescription":
+        """From the extraction format (see ai_service.ExtractedPrescription)"""
+        get = data.get
+        return cls(prescription_id, get("patient_name", "Unknown"), get("age", "Unknown"), get("sex", "Unknown"),
+                   get("date", ""), get("symptoms", []), [Medicine.from_dict(m) for m in get("medicines", [])],
+                   get("recommended_tests", []), get("advice", ""), get("prescriber_name", ""),
+                   get("prescriber_reg", ""), get("clinic", ""))
+
+
+@dataclass(slots=True)
+class ProvenanceLink:
+    field_name: str
+    value: str
+    source_type: str
+    source_id: str
+    source_field: str
+
+    def as_dict(self) -> Dict[str, str]:
+        return {"field_name": self.field_name, "value": self.value, "source_type": self.source_type,
+                "source_id": self.source_id, "source_field": self.source_field}
+
+
+@contextmanager
+def gc_paused() -> Iterator[None]:
+    """Suspend cyclic garbage collection around a synchronous loop over domain objects (never across an await)"""
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
@@ -0,0 +1,193 @@
+"""
+Normalized lookup index over the inventory catalog.
+
+Prescriptions name drugs the way clinicians write them ("Amoxil 250mg",
+"amoxicillin", "AMOXICILLIN 0.25 g") while inventory rows are keyed by a
+generic `medicine_name` and a `dosage`. The index folds case and punctuation,
+canonicalizes dose units, maps brand names to generics and tolerates one-
+character typos via a deletion-neighbourhood hash, so every lookup is a
+handful of dict probes regardless of catalog size.
+"""
+import re
+import logging
+from collections import defaultdict
+from typing import Dict, Any, Iterable, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Brand or alternate names -> generic name (all lower case)
+DRUG_ALIASES: Dict[str, str] = {
+    "acetaminophen": "paracetamol",
+    "tylenol": "paracetamol",
+    "crocin": "paracetamol",
+    "calpol": "paracetamol",
+    "dolo": "paracetamol",
+    "advil": "ibuprofen",
+    "motrin": "ibuprofen",
+    "brufen": "ibuprofen",
+    "amoxil": "amoxicillin",
+    "mox": "amoxicillin",
+    "glucophage": "metformin",
+    "glycomet": "metformin",
+    "zantac": "ranitidine",
+    "rantac": "ranitidine",
+    "zyrtec": "cetirizine",
+    "lipitor": "atorvastatin",
+    "atorva": "atorvastatin",
+    "suprax": "cefixime",
+    "taxim o": "cefixime",
+    "wysolone": "prednisolone",
+    "omnacortil": "prednisolone",
+}
+
+# Unit -> (canonical unit, multiplier to the canonical unit)
+UNIT_CANONICAL: Dict[str, Tuple[str, float]] = {
+    "mg": ("mg", 1.0),
+    "milligram": ("mg", 1.0),
+    "milligrams": ("mg", 1.0),
+    "g": ("mg", 1000.0),
+    "gm": ("mg", 1000.0),
+    "gram": ("mg", 1000.0),
+    "grams": ("mg", 1000.0),
+    "mcg": ("mg", 0.001),
+    "ug": ("mg", 0.001),
+    "µg": ("mg", 0.001),
+    "ml": ("ml", 1.0),
+    "l": ("ml", 1000.0),
+    "iu": ("iu", 1.0),
+    "units": ("iu", 1.0),
+    "unit": ("iu", 1.0),
+    "%": ("%", 1.0),
+}
+
+# Dosage-form words that are sometimes written into the drug name
+_FORM_WORDS = {"tablet", "tablets", "tab", "tabs", "capsule", "capsules", "cap", "caps",
+               "syrup", "suspension", "injection", "inj", "cream", "ointment", "drops", "inhaler"}
+
+_DOSE = re.compile(r"(\d+(?:\.\d+)?)\s*(mg|milligrams?|grams?|gm|g|mcg|ug|µg|ml|l|iu|units?|%)(?![a-z])",
+                   re.IGNORECASE)
+_NON_WORD = re.compile(r"[^a-z0-9%µ]+")
+
+
+def canonical_dose(dosage: Optional[str]) -> Optional[str]:
+    """'250mg', '250 MG' and '0.25 g' all become 'mg:250'; None when no dose is present"""
+    if not dosage:
+        return None
+    match = _DOSE.search(dosage)
+    if not match:
+        return None
+    unit, factor = UNIT_CANONICAL[match.group(2).lower()]
+    value = round(float(match.group(1)) * factor, 6)
+    return f"{unit}:{value:g}"
+
+
+def normalize_name(name: str) -> Tuple[str, Optional[str]]:
+    """
+    Fold a prescribed drug name to its generic key and any dose written into it:
+    'Amoxil 250mg tablet' -> ('amoxicillin', 'mg:250').
+    """
+    dose = canonical_dose(name)
+    folded = _DOSE.sub(" ", name.casefold())
+    words = [w for w in _NON_WORD.sub(" ", folded).split() if w not in _FORM_WORDS]
+    key = " ".join(words)
+    return DRUG_ALIASES.get(key, key), dose
+
+
+def _deletions(word: str) -> Set[str]:
+    """All strings one deletion away from `word` (the word itself included)"""
+    return {word} | {word[:i] + word[i + 1:] for i in range(len(word))}
+
+
+class DrugIndex:
+    """Inventory lookup by normalized (generic name, canonical dose)"""
+
+    def __init__(self, min_fuzzy_length: int = 5):
+        self.min_fuzzy_length = min_fuzzy_length
+        self._by_key: Dict[Tuple[str, Optional[str]], str] = {}
+        self._by_name: Dict[str, Set[str]] = defaultdict(set)
+        self._keys_by_id: Dict[str, Tuple[str, Optional[str]]] = {}
+        self._fuzzy: Dict[str, Set[str]] = defaultdict(set)
+        self._name_refs: Dict[str, int] = defaultdict(int)
+
+    def __len__(self) -> int:
+        return len(self._keys_by_id)
+
+    def build(self, items: Iterable[Dict[str, Any]]):
+        """Replace the index contents with `items` (inventory documents)"""
+        self.__init__(self.min_fuzzy_length)
+        for item in items:
+            self.add(item)
+        logger.info(f"Drug index built with {len(self)} SKUs")
+
+    def add(self, item: Dict[str, Any]):
+        """Index (or re-index) one inventory document"""
+        item_id = item["id"]
+        if item_id in self._keys_by_id:
+            self.remove(item_id)
+        name, name_dose = normalize_name(item.get("medicine_name", ""))
+        key = (name, canonical_dose(item.get("dosage")) or name_dose)
+        if key in self._by_key and self._by_key[key] != item_id:
+            logger.warning(f"Inventory items {self._by_key[key]} and {item_id} share {key}; keeping the first")
+            return
+        self._by_key[key] = item_id
+        self._by_name[name].add(item_id)
+        self._keys_by_id[item_id] = key
+        self._name_refs[name] += 1
+        if self._name_refs[name] == 1 and len(name) >= self.min_fuzzy_length:
+            for variant in _deletions(name):
+                self._fuzzy[variant].add(name)
+
+    def remove(self, item_id: str):
+        key = self._keys_by_id.pop(item_id, None)
+        if key is None:
+            return
+        name = key[0]
+        self._by_key.pop(key, None)
+        self._by_name[name].discard(item_id)
+        self._name_refs[name] -= 1
+        if self._name_refs[name] == 0:
+            del self._name_refs[name]
+            del self._by_name[name]
+            for variant in _deletions(name):
+                self._fuzzy[variant].discard(name)
+                if not self._fuzzy[variant]:
+                    del self._fuzzy[variant]
+
+    def _resolve_name(self, name: str) -> Optional[str]:
+        if name in self._by_name:
+            return name
+        if len(name) < self.min_fuzzy_length:
+            return None
+        # One edit (insert, delete or substitute) away: the two strings share a deletion variant
+        candidates: Set[str] = set()
+        for variant in _deletions(name):
+            candidates |= self._fuzzy.get(variant, set())
+        return candidates.pop() if len(candidates) == 1 else None
+
+    def match(self, medicine_name: str, dosage: Optional[str] = None) -> Optional[str]:
+        """Return the inventory item id for a prescribed medicine, or None when unknown or ambiguous"""
+        name, name_dose = normalize_name(medicine_name)
+        resolved = self._resolve_name(name)
+        if resolved is None:
+            return None
+        dose = canonical_dose(dosage) or name_dose
+        if dose is not None:
+            return self._by_key.get((resolved, dose))
+        skus = self._by_name.get(resolved, set())
+        return next(iter(skus)) if len(skus) == 1 else None
+
+    def match_all(self, medicines: List[Dict[str, Any]]) -> Tuple[Dict[str, int], List[Dict[str, Any]]]:
+        """Aggregate prescribed quantities per matched item id; also return the unmatched medicines"""
+        quantities: Dict[str, int] = defaultdict(int)
+        unmatched = []
+        for medicine in medicines:
+            item_id = self.match(medicine.get("name", ""), medicine.get("dosage"))
+            if item_id is None:
+                unmatched.append(medicine)
+            else:
+                quantities[item_id] += medicine.get("quantity", 1)
+        return dict(quantities), unmatched
+
+
+# Global index over the inventory collection
+drug_index = DrugIndex()
@@ -0,0 +1,205 @@
+"""
+Inventory consumption forecasting and dynamic reorder points.
+
+Daily consumption per SKU comes from the `sku` dimension of the analytics
+rollups (units taken from stock when a dispense request is approved). The
+history is loaded into a SKU x day NumPy matrix, and every statistic is
+computed for the whole catalog at once: an exponentially weighted daily rate
+and demand deviation, a safety stock for the configured service level, the
+reorder point over the supplier lead time, days of cover and a suggested
+order quantity. Results are written back onto the inventory documents under
+`forecast` by a periodic batch job.
+"""
+import os
+import math
+import time
+import asyncio
+import logging
+from datetime import datetime, timezone, timedelta, date
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+from pymongo import UpdateOne
+
+from response_cache import response_versions
+
+logger = logging.getLogger(__name__)
+
+FORECAST_HISTORY_DAYS = int(os.environ.get("FORECAST_HISTORY_DAYS", "730"))
+FORECAST_HALF_LIFE_DAYS = float(os.environ.get("FORECAST_HALF_LIFE_DAYS", "14"))
+FORECAST_LEAD_TIME_DAYS = float(os.environ.get("FORECAST_LEAD_TIME_DAYS", "7"))
+FORECAST_REVIEW_DAYS = float(os.environ.get("FORECAST_REVIEW_DAYS", "7"))
+FORECAST_SERVICE_LEVEL_Z = float(os.environ.get("FORECAST_SERVICE_LEVEL_Z", "1.65"))  # ~95% cycle service
+FORECAST_INTERVAL_SECONDS = float(os.environ.get("FORECAST_INTERVAL_SECONDS", "3600"))
+
+# Bulk writes of forecast results are sent in batches of this many updates
+WRITE_BATCH_SIZE = 5000
+
+
+def daily_matrix(sku_index: np.ndarray, day_offset: np.ndarray, quantity: np.ndarray,
+                 skus: int, days: int) -> np.ndarray:
+    """Sum (sku, day, quantity) events into a dense skus x days float matrix"""
+    valid = (day_offset >= 0) & (day_offset < days) & (sku_index >= 0) & (sku_index < skus)
+    flat = sku_index[valid].astype(np.int64) * days + day_offset[valid]
+    return np.bincount(flat, weights=quantity[valid], minlength=skus * days).reshape(skus, days)
+
+
+def forecast_window(half_life_days: float = FORECAST_HALF_LIFE_DAYS) -> int:
+    """Days of history that carry weight: six half-lives (older days weigh under 2%)"""
+    return max(1, int(math.ceil(half_life_days * 6)))
+
+
+def compute_forecast(history: np.ndarray, on_hand: np.ndarray, minimum_stock: np.ndarray,
+                     lead_time_days: np.ndarray, half_life_days: float = FORECAST_HALF_LIFE_DAYS,
+                     review_days: float = FORECAST_REVIEW_DAYS,
+                     service_z: float = FORECAST_SERVICE_LEVEL_Z) -> Dict[str, np.ndarray]:
+    """
+    Vectorized forecast for every SKU. `history` is skus x days with the most
+    recent day last; the other arguments are per-SKU vectors.
+    """
+    skus, days = history.shape
+    window = min(days, forecast_window(half_life_days))
+    # Weight 1 for the most recent day, halving every half_life_days
+    weights = 0.5 ** (np.arange(window - 1, -1, -1) / half_life_days)
+    weights /= weights.sum()
+    recent = history[:, days - window:]
+
+    rate = recent @ weights
+    variance = ((recent - rate[:, None]) ** 2) @ weights
+    deviation = np.sqrt(variance)
+
+    safety_stock = service_z * deviation * np.sqrt(lead_time_days)
+    reorder_point = np.maximum(np.ceil(rate * lead_time_days + safety_stock), minimum_stock)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        days_of_cover = np.where(rate > 0, on_hand / rate, np.inf)
+    order_up_to = np.ceil(rate * (lead_time_days + review_days) + safety_stock)
+    reorder = on_hand <= reorder_point
+    suggested = np.where(reorder, np.maximum(order_up_to, reorder_point) - on_hand, 0)
+
+    # Most urgent first: reorder items by days of cover, then everything else by days of cover
+    rank = np.empty(skus, dtype=np.int64)
+    rank[np.lexsort((days_of_cover, ~reorder))] = np.arange(skus)
+    return {
+        "daily_rate": rate,
+        "demand_std": deviation,
+        "safety_stock": np.ceil(safety_stock),
+        "reorder_point": reorder_point,
+        "days_of_cover": days_of_cover,
+        "reorder": reorder,
+        "suggested_order_quantity": np.maximum(suggested, 0),
+        "rank": rank,
+    }
+
+
+def forecast_documents(items: List[Dict[str, Any]], result: Dict[str, np.ndarray],
+                       computed_at: str) -> List[Dict[str, Any]]:
+    """Per-item `forecast` sub-documents (JSON-safe: infinite cover becomes None)"""
+    columns = {name: result[name].tolist() for name in result}
+    cover = columns["days_of_cover"]
+    documents = []
+    for i in range(len(items)):
+        documents.append({
+            "daily_rate": round(columns["daily_rate"][i], 3),
+            "demand_std": round(columns["demand_std"][i], 3),
+            "safety_stock": int(columns["safety_stock"][i]),
+            "reorder_point": int(columns["reorder_point"][i]),
+            "days_of_cover": round(cover[i], 1) if math.isfinite(cover[i]) else None,
+            "reorder": bool(columns["reorder"][i]),
+            "suggested_order_quantity": int(columns["suggested_order_quantity"][i]),
+            "rank": int(columns["rank"][i]),
+            "computed_at": computed_at,
+        })
+    return documents
+
+
+class InventoryForecaster:
+    """Batch job computing forecasts for the whole inventory"""
+
+    def __init__(self, history_days: int = FORECAST_HISTORY_DAYS, interval: float = FORECAST_INTERVAL_SECONDS):
+        self.history_days = history_days
+        self.interval = interval
+        self.last_run: Optional[Dict[str, Any]] = None
+        self._task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+
+    async def _load_history(self, db, ids: Dict[str, int], start: date) -> Tuple[np.ndarray, ...]:
+        sku_index, day_offset, quantity = [], [], []
+        start_ordinal = start.toordinal()
+        query = {"dimension": "sku", "day": {"$gte": start.isoformat()}}
+        projection = {"_id": 0, "day": 1, "key": 1, "counts.consumed_quantity": 1}
+        async for row in db.analytics_daily.find(query, projection):
+            index = ids.get(row["key"])
+            if index is None:
+                continue
+            sku_index.append(index)
+            day_offset.append(date.fromisoformat(row["day"]).toordinal() - start_ordinal)
+            quantity.append(row.get("counts", {}).get("consumed_quantity", 0))
+        return (np.asarray(sku_index, dtype=np.int64), np.asarray(day_offset, dtype=np.int64),
+                np.asarray(quantity, dtype=np.float64))
+
+    async def run(self, db) -> Dict[str, Any]:
+        """Recompute and store forecasts for every inventory item"""
+        async with self._lock:
+            started = time.perf_counter()
+            # Only the weighted window is read; older rollups would not change the result
+            days = min(self.history_days, forecast_window())
+            start = datetime.now(timezone.utc).date() - timedelta(days=days - 1)
+            items = await db.inventory.find(
+                {}, {"_id": 0, "id": 1, "quantity_available": 1, "minimum_stock": 1, "lead_time_days": 1}
+            ).to_list(None)
+            ids = {item["id"]: i for i, item in enumerate(items)}
+            events = await self._load_history(db, ids, start)
+
+            def vector(field: str, default: float) -> np.ndarray:
+                return np.array([item.get(field, default) for item in items], dtype=np.float64)
+
+            def compute():
+                history = daily_matrix(*events, skus=len(items), days=days)
+                return compute_forecast(history, vector("quantity_available", 0), vector("minimum_stock", 10),
+                                        vector("lead_time_days", FORECAST_LEAD_TIME_DAYS))
+
+            result = await asyncio.to_thread(compute)
+            computed_at = datetime.now(timezone.utc).isoformat()
+            documents = forecast_documents(items, result, computed_at)
+            operations = [UpdateOne({"id": item["id"]}, {"$set": {"forecast": doc}})
+                          for item, doc in zip(items, documents)]
+            for i in range(0, len(operations), WRITE_BATCH_SIZE):
+                await db.inventory.bulk_write(operations[i:i + WRITE_BATCH_SIZE], ordered=False)
+            response_versions.bump("inventory")
+
+            self.last_run = {
+                "computed_at": computed_at,
+                "skus": len(items),
+                "history_days": days,
+                "reorder_count": int(result["reorder"].sum()),
+                "seconds": round(time.perf_counter() - started, 3),
+            }
+            logger.info(f"Inventory forecast computed for {len(items)} SKUs in {self.last_run['seconds']}s")
+            return self.last_run
+
+    def start(self, db):
+        """Recompute forecasts every `interval` seconds in the background"""
+        if self.interval > 0 and self._task is None:
+            self._task = asyncio.create_task(self._periodic(db))
+
+    async def _periodic(self, db):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.run(db)
+            except Exception:
+                # Anything escaping here would end the task and silently stop all future runs
+                logger.exception("Inventory forecast run failed")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+# Global forecaster
+inventory_forecaster = InventoryForecaster()
@@ -0,0 +1,380 @@
+"""
+Background jobs: a `jobs` collection in MongoDB worked by async workers in
+each API process.
+
+Long tasks (reseeding, summary generation) are enqueued as job documents and
+the request returns the job id at once; clients poll GET /api/jobs/{id} for
+status, progress and result. A worker claims a job with one atomic
+find_one_and_update that sets a lease (`lease_until`) and a lease token, and
+renews the lease while the handler runs. A job whose worker died is claimed
+again once its lease expires. Every later write is conditioned on the lease
+token, so a worker that lost its lease cannot overwrite the new owner's
+state.
+
+Deduplication by `key` holds across processes: a job queued with `enqueue`
+carries `active_key` until it finishes and one queued with `debounce` carries
+`queued_key` until a worker claims it, each behind a unique partial index, so
+of two processes racing to queue the same key only one insert succeeds.
+
+A failed job is queued again after an exponential backoff with full jitter
+until it has used `max_attempts`; PermanentJobError fails it at once. Each
+job type caps how many of its jobs one process runs at a time, so with N
+workers (serve.py) up to N times that many run across the deployment.
+"""
+import os
+import time
+import uuid
+import random
+import socket
+import asyncio
+import logging
+from collections import Counter
+from datetime import datetime, timezone, timedelta
+from typing import Dict, Any, Awaitable, Callable, List, Optional
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError, PyMongoError
+
+logger = logging.getLogger(__name__)
+
+# Worker tasks per process (0: this process only enqueues)
+JOBS_WORKERS = int(os.environ.get("JOBS_WORKERS", "4"))
+# How often idle workers look for jobs enqueued by other processes
+JOBS_POLL_SECONDS = float(os.environ.get("JOBS_POLL_SECONDS", "1.0"))
+JOBS_LEASE_SECONDS = float(os.environ.get("JOBS_LEASE_SECONDS", "60"))
+JOBS_MAX_ATTEMPTS = int(os.environ.get("JOBS_MAX_ATTEMPTS", "3"))
+JOBS_RETRY_BASE_SECONDS = float(os.environ.get("JOBS_RETRY_BASE_SECONDS", "5"))
+JOBS_RETRY_MAX_SECONDS = float(os.environ.get("JOBS_RETRY_MAX_SECONDS", "300"))
+# Finished jobs are removed by a TTL index this long after they finish
+JOBS_RETENTION_SECONDS = int(os.environ.get("JOBS_RETENTION_SECONDS", str(7 * 24 * 3600)))
+
+QUEUED, RUNNING, SUCCEEDED, FAILED = "queued", "running", "succeeded", "failed"
+ACTIVE_STATUSES = [QUEUED, RUNNING]
+
+
+class PermanentJobError(Exception):
+    """A failure retrying cannot fix (bad parameters, missing documents)"""
+
+
+def as_utc(value: datetime) -> datetime:
+    """A datetime read back from MongoDB (naive, in UTC) as an aware one"""
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+
+class Job:
+    """The claimed job as its handler sees it"""
+
+    def __init__(self, queue: "JobQueue", db, document: Dict[str, Any]):
+        self.queue = queue
+        self.db = db
+        self.id = document["id"]
+        self.type = document["type"]
+        self.params = document.get("params") or {}
+        self.attempt = document["attempts"]
+        self.lease_token = document["lease_token"]
+        self.created_at = as_utc(document["created_at"])
+
+    async def progress(self, done: int, total: Optional[int] = None, message: Optional[str] = None):
+        """Record how far the job has got, for pollers"""
+        await self.queue._update(self.db, self, {"$set": {
+            "progress": {"done": done, "total": total, "message": message},
+            "updated_at": datetime.now(timezone.utc),
+        }})
+
+
+JobHandler = Callable[[Job], Awaitable[Optional[Dict[str, Any]]]]
+
+
+class JobType:
+    def __init__(self, name: str, handler: JobHandler, concurrency: int, max_attempts: int):
+        self.name = name
+        self.handler = handler
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+
+
+class JobQueue:
+    """Enqueues jobs and runs them with leases, retries and per-type concurrency caps"""
+
+    def __init__(self, workers: int = JOBS_WORKERS, poll_interval: float = JOBS_POLL_SECONDS,
+                 lease_seconds: float = JOBS_LEASE_SECONDS, retry_base: float = JOBS_RETRY_BASE_SECONDS,
+                 retry_max: float = JOBS_RETRY_MAX_SECONDS):
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self.types: Dict[str, JobType] = {}
+        self.db = None
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._claiming: Optional[asyncio.Lock] = None
+        self._running: Counter = Counter()
+        self.stats: Dict[str, Counter] = {}
+
+    def register(self, name: str, handler: JobHandler, concurrency: int = 1,
+                 max_attempts: int = JOBS_MAX_ATTEMPTS):
+        """Make `name` jobs runnable here, at most `concurrency` at a time in this process"""
+        self.types[name] = JobType(name, handler, concurrency, max_attempts)
+
+    def _count(self, job_type: str, outcome: str):
+        self.stats.setdefault(job_type, Counter())[outcome] += 1
+
+    async def ensure_indexes(self, db):
+        await db.jobs.create_index("id", unique=True)
+        await db.jobs.create_index([("status", 1), ("type", 1), ("run_at", 1)])
+        await db.jobs.create_index("key")
+        # At most one active job per enqueue() key, and one queued job per debounce() key
+        await db.jobs.create_index("active_key", unique=True,
+                                   partialFilterExpression={"active_key": {"$exists": True}})
+        await db.jobs.create_index("queued_key", unique=True,
+                                   partialFilterExpression={"queued_key": {"$exists": True}})
+        await db.jobs.create_index("expires_at", expireAfterSeconds=0)
+
+    async def enqueue(self, db, job_type: str, params: Optional[Dict[str, Any]] = None,
+                      key: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Queue a job and return its document. With a `key`, a queued or running
+        job with the same key is returned instead of queueing a second one.
+        """
+        if key is None:
+            return await self._insert(db, job_type, params, key)
+        active = await db.jobs.find_one({"key": key, "status": {"$in": ACTIVE_STATUSES}},
+                                        {"_id": 0, "lease_token": 0})
+        if active:
+            return active
+        try:
+            return await self._insert(db, job_type, params, key, active_key=key)
+        except DuplicateKeyError:
+            # Another process queued it between the lookup and the insert
+            active = await db.jobs.find_one({"active_key": key}, {"_id": 0, "lease_token": 0})
+            if active:
+                return active
+            # ...and it has finished since
+            return await self._insert(db, job_type, params, key, active_key=key)
+
+    async def debounce(self, db, job_type: str, params: Dict[str, Any], key: str, delay: float,
+                       max_delay: float) -> Dict[str, Any]:
+        """
+        Queue a job to run `delay` seconds after the latest call with this
+        `key`, and at most `max_delay` seconds after the first, so a burst of
+        calls runs it once. A call while the job runs queues another: the
+        running one may have read the data before this change.
+        """
+        while True:
+            now = datetime.now(timezone.utc)
+            queued = await db.jobs.find_one({"key": key, "status": QUEUED}, {"_id": 0, "lease_token": 0})
+            if queued:
+                run_at = min(now + timedelta(seconds=delay), as_utc(queued["run_by"]))
+                result = await db.jobs.update_one({"id": queued["id"], "status": QUEUED},
+                                                  {"$set": {"run_at": run_at, "updated_at": now},
+                                                   "$inc": {"coalesced": 1}})
+                # Otherwise a worker claimed it in between
+                if result.matched_count:
+                    self._count(job_type, "coalesced")
+                    return {**queued, "run_at": run_at, "coalesced": queued["coalesced"] + 1}
+            try:
+                return await self._insert(db, job_type, params, key, queued_key=key,
+                                          run_at=now + timedelta(seconds=min(delay, max_delay)),
+                                          run_by=now + timedelta(seconds=max_delay), coalesced=0)
+            except DuplicateKeyError:
+                # Another process queued one between the lookup and the insert: coalesce into it
+                continue
+
+    async def _insert(self, db, job_type: str, params: Optional[Dict[str, Any]], key: Optional[str],
+                      **fields) -> Dict[str, Any]:
+        if job_type not in self.types:
+            raise ValueError(f"Unknown job type '{job_type}'; expected one of {', '.join(self.types)}")
+        now = datetime.now(timezone.utc)
+        job = {
+            "id": str(uuid.uuid4()),
+            "type": job_type,
+            "params": params or {},
+            "key": key,
+            "status": QUEUED,
+            "attempts": 0,
+            "max_attempts": self.types[job_type].max_attempts,
+            "progress": None,
+            "result": None,
+            "error": None,
+            "run_at": now,
+            "created_at": now,
+            "updated_at": now,
+            **fields,
+        }
+        await db.jobs.insert_one(dict(job))
+        self._count(job_type, "enqueued")
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return job
+
+    async def get(self, db, job_id: str) -> Optional[Dict[str, Any]]:
+        return await db.jobs.find_one({"id": job_id}, {"_id": 0, "lease_token": 0})
+
+    async def claim(self, db) -> Optional[Job]:
+        """Lease the oldest runnable job of a type with a free slot, if any, taking the slot"""
+        free = [name for name, job_type in self.types.items() if self._running[name] < job_type.concurrency]
+        if not free:
+            return None
+        now = datetime.now(timezone.utc)
+        document = await db.jobs.find_one_and_update(
+            {"type": {"$in": free}, "$or": [
+                {"status": QUEUED, "run_at": {"$lte": now}},
+                # Its worker stopped renewing the lease: died or hung
+                {"status": RUNNING, "lease_until": {"$lt": now}},
+            ]},
+            {"$set": {"status": RUNNING, "worker": self.worker_id, "lease_token": str(uuid.uuid4()),
+                      "lease_until": now + timedelta(seconds=self.lease_seconds), "updated_at": now},
+             # A debounced key takes new calls again once its job has started
+             "$unset": {"queued_key": ""},
+             "$inc": {"attempts": 1}},
+            projection={"_id": 0}, sort=[("run_at", 1)], return_document=ReturnDocument.AFTER,
+        )
+        if document is None:
+            return None
+        self._running[document["type"]] += 1
+        return Job(self, db, document)
+
+    async def _update(self, db, job: Job, update: Dict[str, Any]) -> bool:
+        """Apply `update` if `job` still holds its lease"""
+        result = await db.jobs.update_one({"id": job.id, "lease_token": job.lease_token}, update)
+        if not result.matched_count:
+            logger.warning(f"Job {job.id} lost its lease; a later attempt owns it")
+        return bool(result.matched_count)
+
+    async def _finish(self, db, job: Job, status: str, **fields):
+        now = datetime.now(timezone.utc)
+        await self._update(db, job, {
+            "$set": {"status": status, "finished_at": now, "updated_at": now,
+                     "expires_at": now + timedelta(seconds=JOBS_RETENTION_SECONDS), **fields},
+            "$unset": {"lease_token": "", "lease_until": "", "active_key": ""},
+        })
+        self._count(job.type, status)
+
+    def backoff(self, attempt: int) -> float:
+        """Full jitter: a random delay up to the exponential backoff for this attempt"""
+        return random.uniform(0, min(self.retry_max, self.retry_base * (2 ** (attempt - 1))))
+
+    async def _renew_lease(self, db, job: Job):
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                await self._update(db, job, {"$set": {
+                    "lease_until": datetime.now(timezone.utc) + timedelta(seconds=self.lease_seconds)}})
+            except PyMongoError as e:
+                logger.error(f"Could not renew the lease of job {job.id}: {e}")
+
+    async def execute(self, db, job: Job):
+        """Run a claimed job's handler, record its outcome and free its slot"""
+        job_type = self.types[job.type]
+        if job.attempt > job_type.max_attempts:
+            self._running[job.type] -= 1
+            await self._finish(db, job, FAILED, error=f"Lease expired on all {job_type.max_attempts} attempts")
+            return
+        renewer = asyncio.create_task(self._renew_lease(db, job))
+        started = time.perf_counter()
+        try:
+            result = await job_type.handler(job)
+        except asyncio.CancelledError:
+            # Shutting down: give the attempt back so the job runs again at once
+            await asyncio.shield(self._update(db, job, {
+                "$set": {"status": QUEUED, "run_at": datetime.now(timezone.utc)},
+                "$unset": {"lease_token": "", "lease_until": ""},
+                "$inc": {"attempts": -1},
+            }))
+            raise
+        except Exception as e:
+            permanent = isinstance(e, PermanentJobError)
+            if permanent or job.attempt >= job_type.max_attempts:
+                logger.error(f"Job {job.id} ({job.type}) failed on attempt {job.attempt}: {e}")
+                await self._finish(db, job, FAILED, error=str(e))
+            else:
+                delay = self.backoff(job.attempt)
+                logger.warning(f"Job {job.id} ({job.type}) failed on attempt {job.attempt}, "
+                               f"retrying in {delay:.1f}s: {e}")
+                await self._update(db, job, {
+                    "$set": {"status": QUEUED, "error": str(e), "updated_at": datetime.now(timezone.utc),
+                             "run_at": datetime.now(timezone.utc) + timedelta(seconds=delay)},
+                    "$unset": {"lease_token": "", "lease_until": ""},
+                })
+                self._count(job.type, "retried")
+        else:
+            await self._finish(db, job, SUCCEEDED, result=result,
+                               duration_seconds=round(time.perf_counter() - started, 3))
+        finally:
+            renewer.cancel()
+            self._running[job.type] -= 1
+
+    async def run_pending(self, db) -> int:
+        """Run runnable jobs in this task until none is left; the number run (for tests and scripts)"""
+        ran = 0
+        while True:
+            job = await self.claim(db)
+            if job is None:
+                return ran
+            await self.execute(db, job)
+            ran += 1
+
+    def start(self, db):
+        """Start this process's worker tasks"""
+        self.db = db
+        if not self._tasks and self.workers > 0:
+            self._wakeup = asyncio.Event()
+            self._claiming = asyncio.Lock()
+            self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+
+    async def _work(self):
+        while True:
+            try:
+                # One claim at a time, so two workers cannot both take a type's last slot
+                async with self._claiming:
+                    job = await self.claim(self.db)
+                if job is not None:
+                    await self.execute(self.db, job)
+            except PyMongoError as e:
+                logger.error(f"Job worker database error: {e}")
+                job = None
+            if job is not None:
+                # A finished job frees a slot another worker may be waiting for
+                self._wakeup.set()
+                continue
+            # asyncio.wait, unlike wait_for, never turns stop()'s cancellation into a timeout
+            wakeup = asyncio.ensure_future(self._wakeup.wait())
+            try:
+                await asyncio.wait([wakeup], timeout=self.poll_interval)
+            finally:
+                wakeup.cancel()
+            self._wakeup.clear()
+
+    async def stop(self):
+        """Stop the workers; jobs they were running are queued again"""
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+        self._wakeup = None
+        self._claiming = None
+
+    async def backlog(self, db) -> Dict[str, Dict[str, int]]:
+        """Queued and running jobs per type"""
+        return {name: {status: await db.jobs.count_documents({"type": name, "status": status})
+                       for status in ACTIVE_STATUSES}
+                for name in self.types}
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "worker": self.worker_id,
+            "workers": len(self._tasks),
+            "running": {name: self._running[name] for name in self.types},
+            "concurrency": {name: job_type.concurrency for name, job_type in self.types.items()},
+            "outcomes": {name: dict(counts) for name, counts in self.stats.items()},
+        }
+
+
+# Global job queue
+job_queue = JobQueue()
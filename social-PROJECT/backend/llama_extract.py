@@ -0,0 +1,229 @@
+import os
+import time
+import random
+import asyncio
+import hashlib
+import logging
+from typing import Dict, Any, Optional, Callable
+
+import httpx
+from pydantic import ValidationError
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BASE_URL = "https://api.cloud.llamaindex.ai"
+
+# Stateless extraction is a job: POST the text and schema, poll the job until it
+# leaves PENDING, then fetch its result. These are the endpoints behind the
+# llama-cloud SDK's llama_extract.extract_stateless / get_job / get_job_result.
+EXTRACT_PATH = "/api/v1/extraction/run"
+JOB_PATH = "/api/v1/extraction/jobs/{job_id}"
+JOB_RESULT_PATH = "/api/v1/extraction/jobs/{job_id}/result"
+EXTRACT_CONFIG = {"extraction_target": "PER_DOC", "extraction_mode": "BALANCED"}
+
+
+class RemoteExtractionError(Exception):
+    """Raised when the remote extraction service fails or returns unusable data"""
+
+
+class RejectedExtractionError(RemoteExtractionError):
+    """The service answered but refused the request; retrying will not help"""
+
+
+class UnauthorizedExtractionError(RemoteExtractionError):
+    """The service refused our credentials (401/403); every call will fail until the key is fixed"""
+
+
+class CircuitBreaker:
+    """
+    Classic closed / open / half-open breaker. Failures and calls slower than
+    `latency_threshold` both count against the service; once `failure_threshold`
+    consecutive bad calls are seen the breaker opens for `reset_timeout` seconds.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0,
+                 latency_threshold: Optional[float] = None, clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.latency_threshold = latency_threshold
+        self.clock = clock
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+
+    def allow_request(self) -> bool:
+        if self.state == "open":
+            if self.clock() - self.opened_at < self.reset_timeout:
+                return False
+            self.state = "half-open"
+            self._probe_in_flight = False
+        if self.state == "half-open":
+            if self._probe_in_flight:
+                return False
+            self._probe_in_flight = True
+        return True
+
+    def record_success(self, latency: float):
+        if self.latency_threshold is not None and latency > self.latency_threshold:
+            self.record_failure()
+            return
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self._probe_in_flight = False
+
+    def record_failure(self):
+        self.consecutive_failures += 1
+        self._probe_in_flight = False
+        if self.state == "half-open" or self.consecutive_failures >= self.failure_threshold:
+            self.state = "open"
+            self.opened_at = self.clock()
+
+
+class LlamaExtractClient:
+    """
+    Async client for LlamaCloud stateless extraction with bounded concurrency,
+    per-job timeouts, jittered retries, a circuit breaker and request coalescing.
+    Any failure falls back to the caller-supplied regex extractor.
+    """
+
+    def __init__(self, api_key: str, base_url: Optional[str] = None, data_schema: Optional[Dict[str, Any]] = None,
+                 max_concurrency: Optional[int] = None, timeout: Optional[float] = None,
+                 max_retries: Optional[int] = None, backoff_base: float = 0.2, poll_interval: Optional[float] = None,
+                 breaker: Optional[CircuitBreaker] = None, transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.api_key = api_key
+        self.base_url = base_url or os.environ.get('LLAMA_CLOUD_BASE_URL', DEFAULT_BASE_URL)
+        self.data_schema = data_schema or {}
+        # Covers the whole job: submitting, polling and fetching the result
+        self.timeout = timeout or float(os.environ.get('LLAMA_EXTRACT_TIMEOUT', '60'))
+        self.poll_interval = poll_interval or float(os.environ.get('LLAMA_EXTRACT_POLL_SECONDS', '1'))
+        self.max_retries = max_retries if max_retries is not None else int(os.environ.get('LLAMA_EXTRACT_RETRIES', '2'))
+        self.backoff_base = backoff_base
+        self.breaker = breaker or CircuitBreaker(
+            failure_threshold=int(os.environ.get('LLAMA_BREAKER_FAILURES', '5')),
+            reset_timeout=float(os.environ.get('LLAMA_BREAKER_RESET_SECONDS', '30')),
+            latency_threshold=float(os.environ.get('LLAMA_BREAKER_LATENCY_SECONDS', '30'))
+        )
+        self._semaphore = asyncio.Semaphore(max_concurrency or int(os.environ.get('LLAMA_EXTRACT_CONCURRENCY', '8')))
+        self._transport = transport
+        self._http: Optional[httpx.AsyncClient] = None
+        self._in_flight: Dict[str, asyncio.Task] = {}
+        self.stats = {"remote_calls": 0, "remote_failures": 0, "retries": 0,
+                      "polls": 0, "coalesced": 0, "fallbacks": 0, "short_circuited": 0}
+
+    def _client(self) -> httpx.AsyncClient:
+        if self._http is None:
+            self._http = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers={"Authorization": f"Bearer {self.api_key}"},
+                transport=self._transport,
+                timeout=self.timeout
+            )
+        return self._http
+
+    async def close(self):
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+    async def _request(self, method: str, path: str, **kwargs) -> Dict[str, Any]:
+        response = await self._client().request(method, path, **kwargs)
+        if response.status_code >= 500 or response.status_code == 429:
+            raise RemoteExtractionError(f"LlamaCloud returned {response.status_code}")
+        if response.status_code in (401, 403):
+            raise UnauthorizedExtractionError(f"LlamaCloud refused the API key: {response.status_code}")
+        if response.status_code != 200:
+            raise RejectedExtractionError(f"LlamaCloud rejected request: {response.status_code}")
+        try:
+            body = response.json()
+        except ValueError:
+            # Proxy error pages and truncated bodies
+            raise RemoteExtractionError("LlamaCloud returned a body that is not JSON")
+        if not isinstance(body, dict):
+            raise RemoteExtractionError("LlamaCloud returned an unexpected response")
+        return body
+
+    async def _run_job(self, prescription_text: str) -> Dict[str, Any]:
+        job = await self._request("POST", EXTRACT_PATH, json={
+            "data_schema": self.data_schema, "config": EXTRACT_CONFIG, "text": prescription_text
+        })
+        job_id = job.get("id")
+        if not job_id:
+            raise RemoteExtractionError("LlamaCloud did not return an extraction job")
+        while job.get("status") == "PENDING":
+            await asyncio.sleep(self.poll_interval)
+            self.stats["polls"] += 1
+            job = await self._request("GET", JOB_PATH.format(job_id=job_id))
+        if job.get("status") != "SUCCESS":
+            # ERROR / CANCELLED / PARTIAL_SUCCESS: the job ran and did not extract this input
+            raise RejectedExtractionError(f"LlamaCloud job {job_id} ended {job.get('status')}: {job.get('error')}")
+        result = await self._request("GET", JOB_RESULT_PATH.format(job_id=job_id))
+        data = result.get("data")
+        if not isinstance(data, dict):
+            raise RemoteExtractionError("LlamaCloud response has no extraction data")
+        return data
+
+    async def _call_once(self, prescription_text: str) -> Dict[str, Any]:
+        async with self._semaphore:
+            self.stats["remote_calls"] += 1
+            return await asyncio.wait_for(self._run_job(prescription_text), timeout=self.timeout)
+
+    async def _call_with_retries(self, prescription_text: str) -> Dict[str, Any]:
+        last_error: Optional[Exception] = None
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                self.stats["retries"] += 1
+                # Full jitter: sleep a random amount up to the exponential backoff
+                await asyncio.sleep(random.uniform(0, self.backoff_base * (2 ** (attempt - 1))))
+            if not self.breaker.allow_request():
+                self.stats["short_circuited"] += 1
+                raise RemoteExtractionError("Circuit breaker is open")
+            started = time.monotonic()
+            try:
+                data = await self._call_once(prescription_text)
+            except UnauthorizedExtractionError:
+                # Not worth retrying, but it counts against the service so the breaker opens
+                self.stats["remote_failures"] += 1
+                self.breaker.record_failure()
+                raise
+            except RejectedExtractionError:
+                # The service is healthy, the input is not
+                self.stats["remote_failures"] += 1
+                self.breaker.record_success(time.monotonic() - started)
+                raise
+            except (RemoteExtractionError, httpx.HTTPError, asyncio.TimeoutError) as e:
+                self.stats["remote_failures"] += 1
+                self.breaker.record_failure()
+                last_error = e
+                continue
+            self.breaker.record_success(time.monotonic() - started)
+            return data
+        raise RemoteExtractionError(str(last_error) or last_error.__class__.__name__)
+
+    async def _extract_or_fallback(self, prescription_text: str,
+                                   normalize: Callable[[Dict[str, Any]], Dict[str, Any]],
+                                   fallback: Callable[[str], Dict[str, Any]]) -> Dict[str, Any]:
+        try:
+            return normalize(await self._call_with_retries(prescription_text))
+        except (RemoteExtractionError, ValidationError) as e:
+            self.stats["fallbacks"] += 1
+            logger.warning(f"Remote extraction unavailable ({e}); using regex fallback")
+            return fallback(prescription_text)
+
+    async def extract(self, prescription_text: str,
+                      normalize: Callable[[Dict[str, Any]], Dict[str, Any]],
+                      fallback: Callable[[str], Dict[str, Any]]) -> Dict[str, Any]:
+        """Extract remotely, coalescing identical in-flight inputs; fall back on any failure"""
+        key = hashlib.sha256(prescription_text.encode("utf-8")).hexdigest()
+        task = self._in_flight.get(key)
+        if task is not None:
+            self.stats["coalesced"] += 1
+        else:
+            task = asyncio.ensure_future(self._extract_or_fallback(prescription_text, normalize, fallback))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        # Shield so one cancelled caller doesn't cancel the shared call for the others
+        return await asyncio.shield(task)
+
+    def metrics(self) -> Dict[str, Any]:
+        return {**self.stats, "breaker_state": self.breaker.state}
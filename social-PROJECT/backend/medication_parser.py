@@ -0,0 +1,199 @@
+"""
+Linear-time parser for prescription medication lines.
+
+Parses lines of the form
+
+    1. Amoxicillin 500 mg (capsule) - Twice daily, 5 days, Route: Oral, Qty: 10
+
+with a hand-written scanner instead of a backtracking regex. Each character
+is visited a bounded number of times, so long or malformed `Medications:`
+sections cannot trigger catastrophic backtracking, and lines that do not
+parse are reported with the line number and column where parsing stopped.
+"""
+from typing import Dict, Any, List, Optional, Tuple
+
+# Dose units accepted after the strength, matched case-insensitively
+DOSE_UNITS = {"mg", "mcg", "µg", "ug", "g", "kg", "ml", "l", "iu", "units", "unit", "%", "meq", "mmol"}
+
+# Most slash-separated parts in one strength ("125 mg/5 ml" has two)
+MAX_COMPOUND_PARTS = 4
+
+# Lines starting with one of these end the medications section
+SECTION_TERMINATORS = ("recommended tests", "notes", "prescribed by")
+
+
+class MedicationParseError(Exception):
+    """A medication line that could not be parsed"""
+
+    def __init__(self, message: str, column: int, text: str, line: int = 0):
+        super().__init__(f"line {line}, column {column}: {message}")
+        self.message = message
+        self.column = column
+        self.text = text
+        self.line = line
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {"line": self.line, "column": self.column, "message": self.message, "text": self.text}
+
+
+def _skip_spaces(text: str, pos: int) -> int:
+    while pos < len(text) and text[pos] in " \t\r":
+        pos += 1
+    return pos
+
+
+def _dose_before(text: str, paren: int, lower_bound: int) -> Optional[int]:
+    """
+    If the text just before `paren` is a dose such as "500 mg", "0.5 mcg",
+    "1 %" or "125 mg/5 ml", return the index where the dose starts;
+    otherwise None. Compound strengths of more than MAX_COMPOUND_PARTS parts
+    are not doses, which bounds how far back one call walks.
+    """
+    end = paren
+    for _ in range(MAX_COMPOUND_PARTS):
+        while end > lower_bound and text[end - 1] in " \t":
+            end -= 1
+        unit_start = end
+        while unit_start > lower_bound and (text[unit_start - 1].isalpha() or text[unit_start - 1] in "%µ"):
+            unit_start -= 1
+        if text[unit_start:end].lower() not in DOSE_UNITS:
+            return None
+        number_end = unit_start
+        while number_end > lower_bound and text[number_end - 1] in " \t":
+            number_end -= 1
+        start = number_end
+        while start > lower_bound and (text[start - 1].isdigit() or text[start - 1] in ".,"):
+            start -= 1
+        if start == number_end or not text[start].isdigit():
+            return None
+        # Compound strengths such as "125 mg/5 ml": the part before the slash is checked next
+        if start > lower_bound and text[start - 1] == "/":
+            end = start - 1
+            continue
+        # The dose must be its own word, separated from the medicine name
+        if start > lower_bound and not text[start - 1].isspace():
+            return None
+        return start
+    return None
+
+
+def parse_medication_line(text: str, line: int = 0) -> Dict[str, Any]:
+    """Parse one medication line, raising MedicationParseError with the failing column"""
+    n = len(text)
+    pos = _skip_spaces(text, 0)
+
+    # "1." list index
+    index_start = pos
+    while pos < n and text[pos].isdigit():
+        pos += 1
+    if pos == index_start or pos >= n or text[pos] != ".":
+        raise MedicationParseError("expected list number such as '1.'", pos, text, line)
+    name_start = _skip_spaces(text, pos + 1)
+
+    # Name and dose: the form is the first parenthesis preceded by a dose
+    dose_start = None
+    paren = name_start
+    while True:
+        paren = text.find("(", paren)
+        if paren == -1:
+            raise MedicationParseError("expected dose followed by '(form)'", n, text, line)
+        dose_start = _dose_before(text, paren, name_start)
+        if dose_start is not None and dose_start > name_start:
+            break
+        paren += 1
+    name = text[name_start:dose_start].strip()
+    dosage = text[dose_start:paren].strip()
+
+    close = text.find(")", paren + 1)
+    if close == -1:
+        raise MedicationParseError("unterminated '(' in form", paren, text, line)
+    form = text[paren + 1:close].strip()
+    if not form:
+        raise MedicationParseError("empty form", paren + 1, text, line)
+
+    pos = _skip_spaces(text, close + 1)
+    if pos >= n or text[pos] not in "-–":
+        raise MedicationParseError("expected '-' after form", pos, text, line)
+    pos += 1
+
+    # Comma separated schedule: frequency, duration, then "Key: value" fields in any order
+    fields: List[Tuple[int, str]] = []
+    offset = pos
+    for part in text[pos:].split(","):
+        fields.append((offset, part))
+        offset += len(part) + 1
+    if len(fields) < 2 or not fields[0][1].strip():
+        raise MedicationParseError("expected frequency", pos, text, line)
+    if not fields[1][1].strip() or ":" in fields[1][1]:
+        raise MedicationParseError("expected duration", fields[1][0], text, line)
+
+    keyed: Dict[str, Tuple[int, str]] = {}
+    for offset, field in fields[2:]:
+        key, sep, value = field.partition(":")
+        if not sep:
+            raise MedicationParseError("expected 'Route:' or 'Qty:' field", offset, text, line)
+        keyed[key.strip().lower()] = (offset + len(key) + 1, value.strip())
+
+    route = keyed.get("route")
+    if route is None or not route[1]:
+        raise MedicationParseError("missing 'Route:'", n, text, line)
+    quantity = keyed.get("qty") or keyed.get("quantity")
+    if quantity is None:
+        raise MedicationParseError("missing 'Qty:'", n, text, line)
+    if not quantity[1].isdigit():
+        raise MedicationParseError("quantity must be a whole number", quantity[0], text, line)
+
+    return {
+        "name": name,
+        "dosage": dosage,
+        "form": form,
+        "frequency": fields[0][1].strip(),
+        "duration": fields[1][1].strip(),
+        "route": route[1],
+        "quantity": int(quantity[1])
+    }
+
+
+def find_medications_section(text: str) -> Optional[Tuple[int, List[str]]]:
+    """
+    Return (first line number, lines) of the `Medications:` section, or None.
+    Text after the colon on the heading line counts as the first line.
+    """
+    lines = text.split("\n")
+    for number, raw in enumerate(lines, 1):
+        stripped = raw.lstrip()
+        lowered = stripped[:12].lower()
+        if lowered.startswith("medications:") or lowered.startswith("medication:"):
+            section = [stripped.split(":", 1)[1]]
+            for follower in lines[number:]:
+                if follower.lstrip()[:17].lower().startswith(SECTION_TERMINATORS):
+                    break
+                section.append(follower)
+            return number, section
+    return None
+
+
+def parse_medications(text: str) -> Tuple[List[Dict[str, Any]], List[MedicationParseError]]:
+    """
+    Parse every numbered line of the `Medications:` section of a prescription.
+    Returns the parsed medicines and one error per numbered line that failed.
+    """
+    section = find_medications_section(text)
+    if section is None:
+        return [], []
+    first_line, lines = section
+
+    medicines, errors = [], []
+    for offset, raw in enumerate(lines):
+        stripped = raw.strip()
+        if not stripped or not stripped[0].isdigit():
+            continue
+        try:
+            medicines.append(parse_medication_line(raw, line=first_line + offset))
+        except MedicationParseError as e:
+            errors.append(e)
+        except Exception as e:
+            # A parser bug must not lose the rest of the section
+            errors.append(MedicationParseError(f"could not parse line: {type(e).__name__}", 0, raw,
+                                               first_line + offset))
+    return medicines, errors
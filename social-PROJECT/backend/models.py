@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Literal
 from datetime import datetime, timezone
 import uuid
 
@@ -102,7 +102,8 @@ class AISummary(BaseModel):
     patient_name: str
     summary_text: str
     provenance_links: List[ProvenanceLink]
-    raw_data: Dict[str, Any]
+    prescription_id: str  # source prescription; its content is not copied into the summary
+    source_hash: str
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
 # Inventory Model
@@ -131,6 +132,26 @@ class DispenseRequest(BaseModel):
     pharmacist_notes: Optional[str] = None
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
+# Bulk Status Update Models
+BULK_MAX_ITEMS = 500
+
+class BulkStatusItem(BaseModel):
+    id: str
+    status: str
+    notes: Optional[str] = None
+
+class BulkStatusUpdate(BaseModel):
+    items: List[BulkStatusItem] = Field(min_length=1, max_length=BULK_MAX_ITEMS)
+
+class DispenseBulkItem(BaseModel):
+    id: str
+    action: Literal["approve", "dispense", "reject"]
+    notes: Optional[str] = None
+
+class DispenseBulkUpdate(BaseModel):
+    pharmacist_id: str
+    items: List[DispenseBulkItem] = Field(min_length=1, max_length=BULK_MAX_ITEMS)
+
 # Doctor Model
 class Doctor(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -0,0 +1,15 @@
+"""
+Nearest-rank percentiles, shared by the latency metrics the API reports and
+the benchmarks in benchmarks/, so both read a p95 the same way.
+"""
+import math
+from typing import Sequence
+
+
+def percentile(sorted_values: Sequence[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list (0.0 when it is empty)"""
+    if not sorted_values:
+        return 0.0
+    # Multiply before dividing: pct / 100 * n can land just above an integer (7 / 100 * 100 > 7)
+    rank = max(1, math.ceil(pct * len(sorted_values) / 100))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
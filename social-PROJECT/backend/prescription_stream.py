@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Streaming extraction of prescriptions from large concatenated text dumps.
+
+Clinic exports are read in fixed-size chunks, split into individual
+prescriptions as boundaries are detected, and extracted one at a time, so
+memory stays bounded by the chunk size and the largest single prescription
+no matter how big the dump is.
+
+    python prescription_stream.py export.txt --jsonl extracted.jsonl
+"""
+import io
+import re
+import sys
+import json
+import time
+import logging
+import argparse
+from pathlib import Path
+from typing import Iterator, Optional, Union, TextIO, Dict
+
+from ai_service import AIService, ExtractedPrescription, ai_service
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 1 << 20  # 1 MiB
+DEFAULT_MAX_RECORD_CHARS = 1 << 20
+
+# Separator lines such as "-----" or "=====" always end a prescription
+_SEPARATOR = re.compile(r"^\s*(?:[-=*_#]\s*){3,}$")
+# Header fields that appear once per prescription; seeing one again starts the next prescription
+_HEADER = re.compile(r"^\s*(Clinic|Date|Patient|Prescription\s*(?:No\.?|#|Number)?)\s*[:#]", re.IGNORECASE)
+# The prescriber signature closes a prescription
+_SIGNATURE = re.compile(r"^\s*Prescribed by\s*:", re.IGNORECASE)
+
+
+class SplitStats:
+    def __init__(self):
+        self.records = 0
+        self.skipped_empty = 0
+        self.skipped_oversized = 0
+        self.chars_read = 0
+
+    def as_dict(self) -> Dict[str, int]:
+        return dict(vars(self))
+
+
+class PrescriptionStreamSplitter:
+    """Incrementally splits a text stream into one string per prescription"""
+
+    def __init__(self, chunk_size: int = DEFAULT_CHUNK_SIZE, max_record_chars: int = DEFAULT_MAX_RECORD_CHARS):
+        self.chunk_size = chunk_size
+        self.max_record_chars = max_record_chars
+        self.stats = SplitStats()
+
+    def _lines(self, stream: TextIO) -> Iterator[Optional[str]]:
+        """
+        Yield complete lines, reading `chunk_size` characters at a time. A line
+        too long to buffer is dropped and reported as a single None.
+        """
+        partial = ""
+        oversized = False
+        while True:
+            chunk = stream.read(self.chunk_size)
+            if not chunk:
+                break
+            self.stats.chars_read += len(chunk)
+            lines = (partial + chunk).split("\n")
+            partial = lines.pop()
+            for line in lines:
+                if oversized:
+                    # Tail of a line that was too long to buffer
+                    oversized = False
+                    continue
+                yield line
+            if len(partial) > self.max_record_chars:
+                if not oversized:
+                    yield None
+                partial = ""
+                oversized = True
+        if partial and not oversized:
+            yield partial
+
+    def iter_records(self, stream: TextIO) -> Iterator[str]:
+        """Yield the raw text of each prescription in the stream"""
+        lines = []
+        size = 0
+        seen_headers = set()
+        oversized = False
+
+        def flush():
+            nonlocal lines, size, seen_headers, oversized
+            record = "\n".join(lines).strip() if not oversized else ""
+            lines, size, seen_headers, oversized = [], 0, set(), False
+            return record
+
+        def mark_oversized():
+            nonlocal lines, oversized
+            if not oversized:
+                logger.warning("Skipping prescription larger than max_record_chars")
+                self.stats.skipped_oversized += 1
+                oversized = True
+                lines = []
+
+        for line in self._lines(stream):
+            if line is None:
+                mark_oversized()
+                continue
+            if _SEPARATOR.match(line):
+                record = flush()
+                if record:
+                    yield record
+                continue
+
+            header = _HEADER.match(line)
+            if header:
+                key = re.sub(r"\W+", "", header.group(1).lower())
+                if key in seen_headers:
+                    record = flush()
+                    if record:
+                        yield record
+                seen_headers.add(key)
+
+            if not lines and not line.strip():
+                continue
+            if not oversized:
+                size += len(line) + 1
+                if size > self.max_record_chars:
+                    mark_oversized()
+                else:
+                    lines.append(line)
+
+            if _SIGNATURE.match(line):
+                record = flush()
+                if record:
+                    yield record
+
+        record = flush()
+        if record:
+            yield record
+
+
+def iter_extracted_prescriptions(source: Union[str, Path, TextIO], service: Optional[AIService] = None,
+                                 splitter: Optional[PrescriptionStreamSplitter] = None,
+                                 encoding: str = "utf-8") -> Iterator[ExtractedPrescription]:
+    """
+    Yield an ExtractedPrescription for every prescription in a dump, reading it
+    incrementally. `source` may be a file path or an open text stream.
+    """
+    service = service or ai_service
+    splitter = splitter or PrescriptionStreamSplitter()
+
+    if isinstance(source, (str, Path)):
+        with open(source, "r", encoding=encoding, errors="replace", newline="") as stream:
+            yield from _extract_records(stream, service, splitter)
+    else:
+        yield from _extract_records(source, service, splitter)
+
+
+def _extract_records(stream: TextIO, service: AIService,
+                     splitter: PrescriptionStreamSplitter) -> Iterator[ExtractedPrescription]:
+    for record in splitter.iter_records(stream):
+        extracted = service.extract_with_regex(record)
+        if not extracted["patient_name"]:
+            # Headers, footers and other non-prescription text between records
+            splitter.stats.skipped_empty += 1
+            continue
+        splitter.stats.records += 1
+        yield ExtractedPrescription(**extracted)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("dump", help="path to the concatenated prescription export ('-' for stdin)")
+    parser.add_argument("--jsonl", help="write one extracted prescription per line to this file")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args(argv)
+
+    splitter = PrescriptionStreamSplitter(chunk_size=args.chunk_size)
+    source = io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8") if args.dump == "-" else args.dump
+    out = open(args.jsonl, "w", encoding="utf-8") if args.jsonl else None
+    started = time.perf_counter()
+    try:
+        for prescription in iter_extracted_prescriptions(source, splitter=splitter):
+            if out:
+                out.write(prescription.model_dump_json() + "\n")
+    finally:
+        if out:
+            out.close()
+    elapsed = time.perf_counter() - started
+
+    stats = splitter.stats.as_dict()
+    stats["seconds"] = round(elapsed, 3)
+    stats["records_per_second"] = round(stats["records"] / elapsed, 1) if elapsed else 0.0
+    try:
+        import resource
+        # ru_maxrss is KiB on Linux
+        stats["peak_rss_mib"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    except ImportError:
+        pass
+    print(json.dumps(stats))
+    return 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    sys.exit(main())
@@ -0,0 +1,235 @@
+"""
+Shared read/write helpers for the collections behind the status and
+inventory endpoints.
+
+Every write returns the stored document from the same round trip
+(`find_one_and_update`) instead of an update followed by a read, and a
+missing document is always a 404 with "<Label> not found". Status
+transitions are guarded by the entity's state machine; an extra read is
+only spent on the failure path, to tell a missing document (404) from a
+disallowed transition (409). Bulk transitions read every document once and
+write them in one `bulk_write`, reporting the same 404/409/400 per item.
+
+Collections with a compact storage format (see compact_storage.py) are
+encoded on insert and decoded on every read here, so handlers only ever see
+full documents.
+"""
+import uuid
+from typing import Dict, Any, AsyncIterator, List, Optional, Tuple, Union
+
+from fastapi import HTTPException
+from pymongo import ReturnDocument, UpdateOne
+
+from audit_log import InvalidTransition, allowed_from, validate_transition
+from compact_storage import prescription_codec, summary_codec
+
+NO_ID = {"_id": 0}
+
+
+class Repository:
+    """Id-keyed access to one collection; methods take the database so tests can swap it"""
+
+    def __init__(self, collection_name: str, label: str, entity: Optional[str] = None, codec=None):
+        self.collection_name = collection_name
+        self.label = label
+        self.entity = entity
+        self.codec = codec
+
+    async def encode(self, db, doc: Dict[str, Any]) -> Dict[str, Any]:
+        return await self.codec.encode(db, doc) if self.codec else doc
+
+    async def decode(self, db, docs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        return await self.codec.decode(db, docs) if self.codec and docs else docs
+
+    async def _query(self, db, query: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """The query as it must be sent for the stored format (encoded field values)"""
+        return await self.codec.encode_query(db, query) if self.codec and query else query or {}
+
+    async def _decode_one(self, db, doc: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        return (await self.decode(db, [doc]))[0] if doc is not None else None
+
+    def not_found(self) -> HTTPException:
+        return HTTPException(status_code=404, detail=f"{self.label} not found")
+
+    async def get(self, db, entity_id: str, projection: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        doc = await db[self.collection_name].find_one({"id": entity_id}, projection or NO_ID)
+        if doc is None:
+            raise self.not_found()
+        return await self._decode_one(db, doc)
+
+    async def find_one(self, db, query: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        doc = await db[self.collection_name].find_one(await self._query(db, query), NO_ID)
+        return await self._decode_one(db, doc)
+
+    async def find(self, db, query: Dict[str, Any], sort: Optional[List[Tuple[str, int]]] = None,
+                   limit: int = 1000) -> List[Dict[str, Any]]:
+        cursor = db[self.collection_name].find(await self._query(db, query), NO_ID)
+        if sort:
+            cursor = cursor.sort(sort)
+        if limit:
+            cursor = cursor.limit(limit)
+        return await self.decode(db, await cursor.to_list(limit or None))
+
+    async def iterate(self, db, query: Optional[Dict[str, Any]] = None,
+                      batch_size: int = 1000) -> AsyncIterator[Dict[str, Any]]:
+        """Every matching document, decoded in batches"""
+        batch = []
+        async for doc in db[self.collection_name].find(await self._query(db, query), NO_ID):
+            batch.append(doc)
+            if len(batch) >= batch_size:
+                for decoded in await self.decode(db, batch):
+                    yield decoded
+                batch = []
+        for decoded in await self.decode(db, batch):
+            yield decoded
+
+    async def insert(self, db, doc: Dict[str, Any]):
+        await db[self.collection_name].insert_one(await self.encode(db, doc))
+
+    async def insert_many(self, db, docs: List[Dict[str, Any]]):
+        await db[self.collection_name].insert_many([await self.encode(db, doc) for doc in docs])
+
+    async def update(self, db, entity_id: str, set_fields: Optional[Dict[str, Any]] = None,
+                     inc: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Apply `$set`/`$inc` and return the updated document in one round trip"""
+        update: Dict[str, Any] = {}
+        if set_fields:
+            update["$set"] = set_fields
+        if inc:
+            update["$inc"] = inc
+        doc = await db[self.collection_name].find_one_and_update(
+            {"id": entity_id}, update, projection=NO_ID, return_document=ReturnDocument.AFTER
+        )
+        if doc is None:
+            raise self.not_found()
+        return await self._decode_one(db, doc)
+
+    async def try_transition(self, db, entity_id: str, status: str, set_fields: Optional[Dict[str, Any]] = None
+                             ) -> Optional[Tuple[Optional[str], Dict[str, Any]]]:
+        """
+        Move the document to `status` if its state machine allows it from the
+        stored status, bumping `version`. The check and the write are one
+        conditional update, so concurrent transitions cannot both succeed.
+        Returns the previous status and the updated document, or None when
+        the document is missing or not in a status that allows the move.
+        """
+        try:
+            allowed = allowed_from(self.entity, status)
+        except InvalidTransition as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        set_fields = {**(set_fields or {}), "status": status}
+        # The pre-image carries the previous status for the audit event; applying
+        # the update to it locally gives the stored document without a second read
+        before = await db[self.collection_name].find_one_and_update(
+            {"id": entity_id, "status": {"$in": allowed}},
+            {"$set": set_fields, "$inc": {"version": 1}},
+            projection=NO_ID,
+            return_document=ReturnDocument.BEFORE
+        )
+        if before is None:
+            return None
+        before = await self._decode_one(db, before)
+        return before.get("status"), {**before, **set_fields, "version": before.get("version", 0) + 1}
+
+    async def transition(self, db, entity_id: str, status: str,
+                         set_fields: Optional[Dict[str, Any]] = None) -> Tuple[Optional[str], Dict[str, Any]]:
+        """`try_transition` that raises 404 for a missing document and 409 for a disallowed move"""
+        result = await self.try_transition(db, entity_id, status, set_fields)
+        if result is None:
+            current = await db[self.collection_name].find_one({"id": entity_id}, {"_id": 0, "status": 1})
+            if current is None:
+                raise self.not_found()
+            raise HTTPException(status_code=409, detail=str(InvalidTransition(self.entity, current.get("status"), status)))
+        return result
+
+    async def get_many(self, db, entity_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Documents by id, in one query; missing ids are left out"""
+        docs = await db[self.collection_name].find({"id": {"$in": list(entity_ids)}}, NO_ID).to_list(None)
+        return {doc["id"]: doc for doc in await self.decode(db, docs)}
+
+    async def bulk_transition(self, db, changes: List[Tuple[str, str, Optional[Dict[str, Any]]]],
+                              current: Optional[Dict[str, Dict[str, Any]]] = None
+                              ) -> List[Union[Tuple[Optional[str], Dict[str, Any]], HTTPException]]:
+        """
+        Apply many (id, status, set_fields) transitions with one read and one
+        `bulk_write`. Each update is conditioned on the status and version
+        that were read, so a document changed in between is a 409 rather than
+        a double transition. Returns, in order, what `transition` would: the
+        previous status and updated document, or the HTTPException it would
+        raise. `current` may hold documents the caller has already read.
+        """
+        if not changes:
+            return []
+        if current is None:
+            current = await self.get_many(db, [entity_id for entity_id, _, _ in changes])
+        results: List[Any] = [None] * len(changes)
+        planned = []
+        seen = set()
+        for i, (entity_id, status, set_fields) in enumerate(changes):
+            before = current.get(entity_id)
+            try:
+                allowed_from(self.entity, status)
+            except InvalidTransition as e:
+                results[i] = HTTPException(status_code=400, detail=str(e))
+                continue
+            if entity_id in seen:
+                results[i] = HTTPException(status_code=400, detail=f"{self.label} {entity_id} is listed more than once")
+                continue
+            seen.add(entity_id)
+            if before is None:
+                results[i] = self.not_found()
+                continue
+            try:
+                validate_transition(self.entity, before.get("status"), status)
+            except InvalidTransition as e:
+                results[i] = HTTPException(status_code=409, detail=str(e))
+                continue
+            planned.append((i, before, {**(set_fields or {}), "status": status}))
+        if not planned:
+            return results
+
+        # Every update of this call carries the same token, so when some of them
+        # lost a race one read tells which documents this call moved
+        token = str(uuid.uuid4())
+        result = await db[self.collection_name].bulk_write([
+            UpdateOne({"id": before["id"], "status": before.get("status"), "version": before.get("version")},
+                      {"$set": {**fields, "transition_id": token}, "$inc": {"version": 1}})
+            for _, before, fields in planned
+        ], ordered=False)
+        moved = None
+        if result.matched_count < len(planned):
+            moved = {doc["id"] for doc in await db[self.collection_name].find(
+                {"id": {"$in": [before["id"] for _, before, _ in planned]}, "transition_id": token},
+                {"_id": 0, "id": 1}
+            ).to_list(None)}
+        for i, before, fields in planned:
+            if moved is None or before["id"] in moved:
+                results[i] = (before.get("status"),
+                              {**before, **fields, "version": (before.get("version") or 0) + 1})
+            else:
+                results[i] = HTTPException(status_code=409, detail=f"{self.label} {before['id']} changed while "
+                                                                   f"it was being updated; retry")
+        return results
+
+
+def bulk_report(changes: List[Tuple[str, str, Optional[Dict[str, Any]]]],
+                results: List[Union[Tuple[Optional[str], Dict[str, Any]], HTTPException]]) -> Dict[str, Any]:
+    """Per-item outcomes of `bulk_transition` in the order they were requested"""
+    items = []
+    for (entity_id, status, _), result in zip(changes, results):
+        if isinstance(result, HTTPException):
+            items.append({"id": entity_id, "ok": False, "status_code": result.status_code, "detail": result.detail})
+        else:
+            previous, updated = result
+            items.append({"id": entity_id, "ok": True, "status_code": 200, "previous_status": previous,
+                          "status": status, "version": updated["version"]})
+    updated = sum(1 for item in items if item["ok"])
+    return {"updated": updated, "failed": len(items) - updated, "results": items}
+
+
+appointments = Repository("appointments", "Appointment", entity="appointment")
+prescriptions = Repository("prescriptions", "Prescription", entity="prescription", codec=prescription_codec)
+dispense_requests = Repository("dispense_requests", "Dispense request", entity="dispense_request")
+inventory = Repository("inventory", "Inventory item")
+medical_records = Repository("medical_records", "Medical record")
+ai_summaries = Repository("ai_summaries", "AI summary", codec=summary_codec)
@@ -0,0 +1,220 @@
+"""
+Conditional GET for the read endpoints dashboards poll.
+
+Each cacheable route names a version scope: a whole collection (`doctors`,
+`inventory`) or one document in it (`students` by id, `ai_summaries` by
+patient name). Write handlers bump the scope after writing, and the ETag of a
+response is built from the versions current when the request arrived. A
+request whose If-None-Match still matches is answered 304 by the middleware
+before routing: no Mongo query, no serialization.
+
+Versions are counters kept in memory and shared through the
+`response_versions` collection. A bump is local and immediate, like an audit
+event it adds no round trip to the write; every RESPONSE_VERSION_SYNC_SECONDS a
+background task sends the pending increments in one bulk write and adopts the
+counters other workers have bumped. That interval bounds how long a worker can
+answer 304 for data another worker has changed.
+"""
+import os
+import re
+import asyncio
+import logging
+from collections import Counter
+from datetime import datetime, timezone, timedelta
+from typing import Dict, Any, List, Optional, Tuple
+
+from pymongo import UpdateOne
+from pymongo.errors import PyMongoError
+
+logger = logging.getLogger(__name__)
+
+RESPONSE_VERSION_SYNC_SECONDS = float(os.environ.get("RESPONSE_VERSION_SYNC_SECONDS", "2"))
+
+
+class ResponseVersions:
+    """Version counters per collection and per document, shared through Mongo"""
+
+    def __init__(self, collection_name: str = "response_versions",
+                 sync_interval: float = RESPONSE_VERSION_SYNC_SECONDS):
+        self.collection_name = collection_name
+        self.sync_interval = sync_interval
+        self.versions: Dict[str, int] = {}
+        self.served: Dict[str, Counter] = {}
+        self._pending: Counter = Counter()
+        self._synced_at: Optional[datetime] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def scope(collection: str, key: Optional[str] = None) -> str:
+        return collection if key is None else f"{collection}/{key}"
+
+    def _adopt(self, scope: str, version: int):
+        if version > self.versions.get(scope, 0):
+            self.versions[scope] = version
+
+    def etag(self, collection: str, key: Optional[str] = None) -> str:
+        """Weak ETag of a collection, or of one document (which also changes with its collection)"""
+        version = f"{self.versions.get(collection, 0)}"
+        if key is not None:
+            version += f".{self.versions.get(self.scope(collection, key), 0)}"
+        return f'W/"{collection}.{version}"'
+
+    def bump(self, collection: str, key: Optional[str] = None):
+        """Invalidate a collection or one document of it after a write"""
+        scope = self.scope(collection, key)
+        self.versions[scope] = self.versions.get(scope, 0) + 1
+        self._pending[scope] += 1
+
+    async def flush(self, db):
+        """Send pending increments in one bulk write; they are kept for the next attempt on failure"""
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, Counter()
+        now = datetime.now(timezone.utc)
+        try:
+            await db[self.collection_name].bulk_write([
+                UpdateOne({"scope": scope}, {"$inc": {"version": count}, "$set": {"updated_at": now}}, upsert=True)
+                for scope, count in pending.items()
+            ], ordered=False)
+        except PyMongoError:
+            self._pending.update(pending)
+            raise
+
+    async def sync(self, db) -> int:
+        """
+        Flush local bumps, then adopt counters bumped since the last sync
+        (all of them the first time); returns how many were read.
+        """
+        await self.flush(db)
+        started = datetime.now(timezone.utc)
+        query: Dict[str, Any] = {}
+        if self._synced_at is not None:
+            # Overlap the previous window so bumps racing the last poll are not missed
+            query["updated_at"] = {"$gte": self._synced_at - timedelta(seconds=self.sync_interval)}
+        count = 0
+        async for doc in db[self.collection_name].find(query, {"_id": 0, "scope": 1, "version": 1}):
+            self._adopt(doc["scope"], doc["version"])
+            count += 1
+        self._synced_at = started
+        return count
+
+    def count(self, route: str, outcome: str):
+        self.served.setdefault(route, Counter())[outcome] += 1
+
+    def metrics(self) -> Dict[str, Any]:
+        routes = {}
+        for name, counts in self.served.items():
+            total = sum(counts.values())
+            routes[name] = {**counts, "not_modified_rate": round(counts["not_modified"] / total, 4) if total else 0.0}
+        return {"routes": routes, "scopes": len(self.versions)}
+
+    async def ensure_indexes(self, db):
+        await db[self.collection_name].create_index("scope", unique=True)
+        await db[self.collection_name].create_index("updated_at")
+
+    def start(self, db):
+        """Sync every `sync_interval` seconds in the background"""
+        if self.sync_interval > 0 and self._task is None:
+            self._task = asyncio.create_task(self._run(db))
+
+    async def _run(self, db):
+        while True:
+            try:
+                await self.sync(db)
+            except PyMongoError as e:
+                logger.error(f"Response version sync failed: {e}")
+            await asyncio.sleep(self.sync_interval)
+
+    async def stop(self, db=None):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if db is not None:
+            try:
+                await self.flush(db)
+            except PyMongoError as e:
+                logger.error(f"Could not flush response versions on shutdown: {e}")
+
+
+class CacheableRoute:
+    """A GET path served with an ETag from a version scope and its own Cache-Control"""
+
+    def __init__(self, name: str, pattern: str, collection: str, cache_control: str):
+        self.name = name
+        self.pattern = re.compile(pattern)
+        self.collection = collection
+        self.cache_control = cache_control
+
+    def match(self, path: str) -> Optional[Tuple[str, Optional[str]]]:
+        matched = self.pattern.fullmatch(path)
+        if matched is None:
+            return None
+        return self.collection, matched.groupdict().get("key")
+
+
+CACHEABLE_ROUTES = [
+    CacheableRoute("student", r"/api/students/(?P<key>[^/]+)", "students", "private, no-cache"),
+    CacheableRoute("patient_summary", r"/api/ai-summaries/patient/(?P<key>[^/]+)", "ai_summaries",
+                   "private, no-cache"),
+    CacheableRoute("doctors", r"/api/doctors", "doctors", "public, max-age=60, must-revalidate"),
+    CacheableRoute("inventory", r"/api/inventory", "inventory", "private, no-cache"),
+]
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against an ETag"""
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == opaque for candidate in if_none_match.split(","))
+
+
+class ConditionalGetMiddleware:
+    """ASGI middleware answering matching If-None-Match with 304 and tagging 200 responses"""
+
+    def __init__(self, app, versions: ResponseVersions, routes: List[CacheableRoute] = CACHEABLE_ROUTES):
+        self.app = app
+        self.versions = versions
+        self.routes = routes
+
+    def _route(self, path: str) -> Optional[Tuple[CacheableRoute, str, Optional[str]]]:
+        for route in self.routes:
+            matched = route.match(path)
+            if matched is not None:
+                return route, *matched
+        return None
+
+    async def __call__(self, scope, receive, send):
+        matched = self._route(scope["path"]) if scope["type"] == "http" and scope["method"] == "GET" else None
+        if matched is None:
+            await self.app(scope, receive, send)
+            return
+
+        route, collection, key = matched
+        # Tagged with the versions seen before the handler reads, so a write racing the read
+        # leaves the response with an older tag and the next poll fetches it again
+        etag = self.versions.etag(collection, key)
+        headers = [(b"etag", etag.encode("latin-1")), (b"cache-control", route.cache_control.encode("latin-1"))]
+        if_none_match = next((v.decode("latin-1") for k, v in scope["headers"] if k == b"if-none-match"), None)
+        if if_none_match is not None and etag_matches(if_none_match, etag):
+            self.versions.count(route.name, "not_modified")
+            await send({"type": "http.response.start", "status": 304, "headers": headers})
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        async def send_tagged(message):
+            if message["type"] == "http.response.start":
+                self.versions.count(route.name, str(message["status"]))
+                if message["status"] == 200:
+                    message = {**message, "headers": [*message.get("headers", []), *headers]}
+            await send(message)
+
+        await self.app(scope, receive, send_tagged)
+
+
+# Global version counters
+response_versions = ResponseVersions()
@@ -0,0 +1,24 @@
+"""
+API route groups. Each module defines an APIRouter (prefix /api) with its
+endpoints and may list the startup/shutdown hooks those endpoints rely on in
+`startup_hooks` / `shutdown_hooks`, which application.create_app registers. A
+module is imported only when its group is included, so an app built from a few
+groups does not pay for the others' route modules.
+"""
+import importlib
+from types import ModuleType
+from typing import List, Optional, Sequence
+
+ROUTE_GROUPS = (
+    "auth", "students", "doctors", "appointments", "prescriptions", "medical_records", "ai_summaries",
+    "inventory", "dispense", "audit", "analytics", "search", "seed", "jobs", "system",
+)
+
+
+def load_groups(groups: Optional[Sequence[str]] = None) -> List[ModuleType]:
+    """Import the given route groups (all of them by default) and return their modules"""
+    groups = ROUTE_GROUPS if groups is None else groups
+    unknown = [group for group in groups if group not in ROUTE_GROUPS]
+    if unknown:
+        raise ValueError(f"Unknown route groups {unknown}; expected some of {', '.join(ROUTE_GROUPS)}")
+    return [importlib.import_module(f"{__name__}.{group}") for group in groups]
@@ -0,0 +1,243 @@
+import os
+import json
+import uuid
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+import database
+import repository
+from ai_cache import memoized_ai
+from ai_executor import ai_executor
+from ai_service import ai_service, prescription_to_extracted_data, source_content_hash
+from jobs import job_queue, Job, PermanentJobError
+from response_cache import response_versions
+from search_index import search_index
+
+logger = logging.getLogger(__name__)
+
+# Background summary generations one process runs at once
+SUMMARY_JOB_CONCURRENCY = int(os.environ.get("SUMMARY_JOB_CONCURRENCY", "4"))
+
+router = APIRouter(prefix="/api")
+
+# ==================== AI SUMMARIES ENDPOINTS ====================
+
+@router.get("/ai-summaries")
+async def get_ai_summaries(patient_name: Optional[str] = None):
+    """Get AI-generated summaries with provenance links"""
+    query = {}
+    if patient_name:
+        query["patient_name"] = patient_name
+
+    summaries = await repository.ai_summaries.find(database.db, query, limit=1000)
+    return summaries
+
+@router.get("/ai-summaries/{summary_id}")
+async def get_ai_summary(summary_id: str):
+    """Get AI summary by ID with full provenance details"""
+    summary = await repository.ai_summaries.get(database.db, summary_id)
+
+    # Parse the summary for display with provenance links
+    display_data = await ai_executor.parse_summary_for_display(
+        summary.get("summary_text", ""),
+        summary.get("provenance_links", [])
+    )
+
+    return {
+        **summary,
+        "display_data": display_data
+    }
+
+@router.get("/ai-summaries/patient/{patient_name}")
+async def get_patient_ai_summary(patient_name: str):
+    """Get AI summary for a specific patient"""
+    summary = await repository.ai_summaries.find_one(database.db, {"patient_name": patient_name})
+    if not summary:
+        raise HTTPException(status_code=404, detail="AI summary not found for this patient")
+
+    # Parse the summary for display
+    display_data = await ai_executor.parse_summary_for_display(
+        summary.get("summary_text", ""),
+        summary.get("provenance_links", [])
+    )
+
+    return {
+        **summary,
+        "display_data": display_data
+    }
+
+async def upsert_ai_summary(ai_summary: dict) -> dict:
+    """Insert or replace a patient's AI summary in a single atomic upsert"""
+    db = database.db
+    encoded = await repository.ai_summaries.encode(db, ai_summary)
+    fields = {k: v for k, v in encoded.items() if k != "id"}
+    # Drop whatever the previous version stored that this one does not: the pre-compaction
+    # copies, or the links in the other of the two provenance layouts
+    legacy = {k: "" for k in ("raw_data", "provenance_links", "provenance") if k not in fields}
+    query = {"patient_name": ai_summary["patient_name"]}
+    update = {"$set": fields, "$setOnInsert": {"id": ai_summary["id"]}}
+    if legacy:
+        update["$unset"] = legacy
+    try:
+        stored = await db.ai_summaries.find_one_and_update(
+            query, update, projection={"_id": 0}, upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+    except DuplicateKeyError:
+        # A concurrent generation inserted the document first; update it instead
+        update.pop("$setOnInsert")
+        stored = await db.ai_summaries.find_one_and_update(
+            query, update, projection={"_id": 0},
+            return_document=ReturnDocument.AFTER
+        )
+    stored = (await repository.ai_summaries.decode(db, [stored]))[0] if stored else stored
+    if stored:
+        search_index.add("ai_summary", stored)
+    response_versions.bump("ai_summaries", ai_summary["patient_name"])
+    return stored
+
+async def generate_summary(prescription_id: str) -> dict:
+    """The stored summary of a prescription, generated first unless it is up to date"""
+    prescription = await repository.prescriptions.get(database.db, prescription_id)
+
+    # Convert prescription to extraction format
+    extracted_data = prescription_to_extracted_data(prescription)
+    source_hash = source_content_hash(extracted_data, prescription_id)
+
+    # Unchanged prescription: return the stored summary without regenerating it
+    ai_summary = await repository.ai_summaries.find_one(
+        database.db, {"patient_name": prescription.get("patient_name", ""), "source_hash": source_hash}
+    )
+    if not ai_summary:
+        # Generate summary with provenance
+        summary_text, provenance_links = await memoized_ai.generate_summary_with_provenance(
+            extracted_data, prescription_id
+        )
+
+        ai_summary = await upsert_ai_summary({
+            "id": str(uuid.uuid4()),
+            "patient_id": prescription.get("patient_id", ""),
+            "patient_name": prescription.get("patient_name", ""),
+            "summary_text": summary_text,
+            "provenance_links": provenance_links,
+            "prescription_id": prescription_id,
+            "source_hash": source_hash,
+            "created_at": datetime.now(timezone.utc).isoformat()
+        })
+    return ai_summary
+
+@router.post("/ai-summaries/generate/{prescription_id}")
+async def generate_ai_summary(prescription_id: str):
+    """Generate AI summary with provenance for a prescription"""
+    ai_summary = await generate_summary(prescription_id)
+
+    # Parse for display
+    display_data = await ai_executor.parse_summary_for_display(
+        ai_summary["summary_text"], ai_summary["provenance_links"]
+    )
+
+    return {
+        **ai_summary,
+        "display_data": display_data
+    }
+
+@router.post("/ai-summaries/generate/{prescription_id}/job", status_code=202)
+async def enqueue_ai_summary(prescription_id: str):
+    """Queue a summary generation; poll GET /api/jobs/{id} for the summary id"""
+    return await job_queue.enqueue(database.db, "generate_summary", {"prescription_id": prescription_id},
+                                   key=f"generate_summary:{prescription_id}")
+
+async def run_summary_job(job: Job) -> dict:
+    try:
+        ai_summary = await generate_summary(job.params["prescription_id"])
+    except HTTPException as e:
+        # Missing prescription: no retry will find it
+        raise PermanentJobError(e.detail)
+    return {"summary_id": ai_summary["id"], "patient_name": ai_summary["patient_name"]}
+
+job_queue.register("generate_summary", run_summary_job, concurrency=SUMMARY_JOB_CONCURRENCY)
+
+def _stream_event(event: str, data: dict, sse: bool) -> bytes:
+    """Encode one streaming event as an SSE message or an NDJSON line"""
+    payload = json.dumps({"event": event, **data}, default=str)
+    if sse:
+        return f"event: {event}\ndata: {payload}\n\n".encode("utf-8")
+    return (payload + "\n").encode("utf-8")
+
+@router.post("/ai-summaries/generate/{prescription_id}/stream")
+async def stream_ai_summary(prescription_id: str, request: Request):
+    """
+    Stream an AI summary section by section (NDJSON, or SSE when the client
+    accepts text/event-stream). The final document is persisted once all
+    sections have been sent and is returned in the closing `complete` event.
+    """
+    prescription = await repository.prescriptions.get(database.db, prescription_id)
+
+    sse = "text/event-stream" in request.headers.get("accept", "")
+    extracted_data = prescription_to_extracted_data(prescription)
+
+    async def events():
+        summary_parts = []
+        provenance_links = []
+        try:
+            sections = ai_service.iter_summary_sections(extracted_data, prescription_id)
+            for index, (section, text, links) in enumerate(sections):
+                summary_parts.append(text)
+                provenance_links.extend(links)
+                yield _stream_event("section", {
+                    "index": index, "section": section, "text": text, "provenance_links": links
+                }, sse)
+                # Let other requests run between sections
+                await asyncio.sleep(0)
+
+            source_hash = source_content_hash(extracted_data, prescription_id)
+            ai_summary = await repository.ai_summaries.find_one(
+                database.db, {"patient_name": prescription.get("patient_name", ""), "source_hash": source_hash}
+            )
+            if not ai_summary:
+                ai_summary = await upsert_ai_summary({
+                    "id": str(uuid.uuid4()),
+                    "patient_id": prescription.get("patient_id", ""),
+                    "patient_name": prescription.get("patient_name", ""),
+                    "summary_text": "".join(summary_parts),
+                    "provenance_links": provenance_links,
+                    "prescription_id": prescription_id,
+                    "source_hash": source_hash,
+                    "created_at": datetime.now(timezone.utc).isoformat()
+                })
+            yield _stream_event("complete", {"summary": ai_summary}, sse)
+        except Exception as e:
+            logger.error(f"Streaming summary for {prescription_id} failed: {e}")
+            yield _stream_event("error", {"detail": "Summary generation failed"}, sse)
+
+    media_type = "text/event-stream" if sse else "application/x-ndjson"
+    return StreamingResponse(events(), media_type=media_type, headers={"Cache-Control": "no-cache"})
+
+@router.get("/provenance/{source_type}/{source_id}")
+async def get_provenance_source(source_type: str, source_id: str):
+    """Get the original source document for a provenance link"""
+    collection_map = {
+        "prescription": "prescriptions",
+        "medical_record": "medical_records",
+        "lab_result": "lab_results"
+    }
+
+    collection_name = collection_map.get(source_type)
+    if not collection_name:
+        raise HTTPException(status_code=400, detail="Invalid source type")
+
+    if source_type == "prescription":
+        doc = await repository.prescriptions.find_one(database.db, {"id": source_id})
+    else:
+        doc = await database.db[collection_name].find_one({"id": source_id}, {"_id": 0})
+    if not doc:
+        raise HTTPException(status_code=404, detail="Source document not found")
+
+    return doc
@@ -0,0 +1,57 @@
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query
+
+import database
+import repository
+from analytics import analytics, date_range, DIMENSIONS, METRICS
+
+router = APIRouter(prefix="/api")
+
+# ==================== ANALYTICS ENDPOINTS ====================
+
+def _date_range(days: int, date_from: Optional[str], date_to: Optional[str]):
+    try:
+        return date_range(days, date_from, date_to)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/analytics/summary")
+async def get_analytics_summary(
+    days: int = Query(30, ge=1, le=3660),
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None
+):
+    """Overall prescription and dispensing totals with a per-day series"""
+    date_from, date_to = _date_range(days, date_from, date_to)
+    return await analytics.summary(database.db, date_from, date_to)
+
+@router.get("/analytics/{dimension}")
+async def get_analytics_by_dimension(
+    dimension: str,
+    metric: str = "prescriptions",
+    days: int = Query(30, ge=1, le=3660),
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    limit: int = Query(10, ge=1, le=100)
+):
+    """Top clinics, prescribers, medicines or statuses by a metric, with daily series"""
+    if dimension not in DIMENSIONS:
+        raise HTTPException(status_code=400, detail=f"Unknown dimension; expected one of {', '.join(DIMENSIONS)}")
+    if metric not in METRICS:
+        raise HTTPException(status_code=400, detail=f"Unknown metric; expected one of {', '.join(METRICS)}")
+    date_from, date_to = _date_range(days, date_from, date_to)
+    return {
+        "dimension": dimension,
+        "metric": metric,
+        "date_from": date_from,
+        "date_to": date_to,
+        "items": await analytics.top(database.db, dimension, metric, date_from, date_to, limit)
+    }
+
+@router.post("/analytics/rebuild")
+async def rebuild_analytics():
+    """Recompute all rollups from the prescriptions and dispense requests collections"""
+    db = database.db
+    rollups = await analytics.rebuild(db, repository.prescriptions.iterate(db))
+    return {"message": "Analytics rebuilt", "rollups": rollups}
@@ -0,0 +1,59 @@
+import uuid
+from datetime import datetime, timezone
+from typing import Optional
+
+from fastapi import APIRouter
+
+import database
+import repository
+from audit_log import audit_log
+from models import AppointmentCreate, BulkStatusUpdate
+
+router = APIRouter(prefix="/api")
+
+# ==================== APPOINTMENTS ENDPOINTS ====================
+
+@router.get("/appointments")
+async def get_appointments(student_id: Optional[str] = None, doctor_id: Optional[str] = None):
+    """Get appointments with optional filters"""
+    query = {}
+    if student_id:
+        query["student_id"] = student_id
+    if doctor_id:
+        query["doctor_id"] = doctor_id
+
+    appointments = await database.db.appointments.find(query, {"_id": 0}).to_list(1000)
+    return appointments
+
+@router.post("/appointments")
+async def create_appointment(appointment: AppointmentCreate):
+    """Create a new appointment"""
+    apt_dict = appointment.model_dump()
+    apt_dict["id"] = str(uuid.uuid4())
+    apt_dict["status"] = "scheduled"
+    apt_dict["created_at"] = datetime.now(timezone.utc).isoformat()
+
+    await database.db.appointments.insert_one(apt_dict)
+    return apt_dict
+
+@router.put("/appointments/{appointment_id}/status")
+async def update_appointment_status(appointment_id: str, status: str, notes: Optional[str] = None):
+    """Update appointment status"""
+    update_data = {}
+    if notes:
+        update_data["notes"] = notes
+
+    previous, updated = await repository.appointments.transition(database.db, appointment_id, status, update_data)
+    audit_log.record("appointment", appointment_id, previous, status, version=updated["version"])
+    return updated
+
+@router.put("/appointments/bulk-status")
+async def bulk_update_appointment_status(update: BulkStatusUpdate):
+    """Update the status of many appointments in one write; outcomes are reported per item"""
+    changes = [(item.id, item.status, {"notes": item.notes} if item.notes else {}) for item in update.items]
+    results = await repository.appointments.bulk_transition(database.db, changes)
+    for (appointment_id, status, _), result in zip(changes, results):
+        if isinstance(result, tuple):
+            previous, updated = result
+            audit_log.record("appointment", appointment_id, previous, status, version=updated["version"])
+    return repository.bulk_report(changes, results)
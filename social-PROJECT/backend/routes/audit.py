@@ -0,0 +1,27 @@
+from datetime import datetime, timezone
+
+from fastapi import APIRouter, HTTPException, Query
+
+import database
+from audit_log import audit_log, partition_name
+
+router = APIRouter(prefix="/api")
+
+# ==================== AUDIT ENDPOINTS ====================
+
+AUDIT_ENTITIES = {"prescription", "dispense_request", "appointment"}
+
+@router.get("/audit/{entity}/{entity_id}")
+async def get_status_history(entity: str, entity_id: str, months: int = Query(12, ge=1, le=120)):
+    """Status transitions of one prescription, dispense request or appointment, oldest first"""
+    if entity not in AUDIT_ENTITIES:
+        raise HTTPException(status_code=400, detail=f"Unknown entity '{entity}'; expected one of {sorted(AUDIT_ENTITIES)}")
+    today = datetime.now(timezone.utc)
+    partitions = []
+    for i in range(months):
+        year, month = divmod(today.year * 12 + today.month - 1 - i, 12)
+        partitions.append(partition_name(datetime(year, month + 1, 1)))
+    events = await audit_log.history(database.db, entity, entity_id, partitions)
+    for event in events:
+        event["at"] = event["at"].isoformat()
+    return {"entity": entity, "entity_id": entity_id, "events": events}
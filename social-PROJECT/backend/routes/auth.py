@@ -0,0 +1,31 @@
+import uuid
+
+from fastapi import APIRouter
+
+from models import UserLogin
+
+router = APIRouter(prefix="/api")
+
+# ==================== AUTH ENDPOINTS (Mock) ====================
+
+@router.post("/auth/login")
+async def mock_login(login_data: UserLogin):
+    """Mock login - just returns user info based on role selection"""
+    user_id = str(uuid.uuid4())
+    return {
+        "id": user_id,
+        "name": login_data.name,
+        "role": login_data.role,
+        "token": f"mock_token_{user_id}"
+    }
+
+@router.get("/auth/roles")
+async def get_available_roles():
+    """Get available user roles"""
+    return {
+        "roles": [
+            {"id": "student", "name": "Student", "description": "Access health records and book appointments"},
+            {"id": "doctor", "name": "Doctor", "description": "Manage patients and prescriptions"},
+            {"id": "pharmacist", "name": "Pharmacist", "description": "Process orders and manage inventory"}
+        ]
+    }
@@ -0,0 +1,252 @@
+import os
+import asyncio
+import logging
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+from fastapi import APIRouter, HTTPException
+from pymongo import UpdateOne
+from pymongo.errors import PyMongoError
+
+import database
+import repository
+from analytics import analytics, Increments
+from audit_log import audit_log, InvalidTransition, validate_transition
+from drug_index import drug_index
+from models import DispenseBulkUpdate
+from response_cache import response_versions
+from search_index import search_index
+
+logger = logging.getLogger(__name__)
+
+# Seconds before a dispense with unmatched medicines may reload the drug index
+DRUG_INDEX_REFRESH_SECONDS = float(os.environ.get('DRUG_INDEX_REFRESH_SECONDS', '30'))
+
+router = APIRouter(prefix="/api")
+
+# Bulk actions and the status each one moves a request to
+DISPENSE_ACTIONS = {"approve": "approved", "dispense": "dispensed", "reject": "rejected"}
+
+# ==================== DISPENSE REQUESTS ENDPOINTS ====================
+
+@router.get("/dispense-requests")
+async def get_dispense_requests(status: Optional[str] = None):
+    """Get dispense requests with optional status filter"""
+    query = {}
+    if status:
+        query["status"] = status
+
+    requests = await database.db.dispense_requests.find(query, {"_id": 0}).to_list(1000)
+    return requests
+
+@router.put("/dispense-requests/{request_id}/approve")
+async def approve_dispense_request(request_id: str, pharmacist_id: str, notes: Optional[str] = None):
+    """Approve a dispense request"""
+    db = database.db
+    request = await repository.dispense_requests.get(db, request_id)
+    try:
+        validate_transition("dispense_request", request.get("status"), "approved")
+    except InvalidTransition as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+    # Match prescribed names to SKUs through the normalized index
+    medicines = request.get("medicines", [])
+    quantities, unmatched = drug_index.match_all(medicines)
+    if unmatched and await refresh_drug_index(stale_only=True):
+        quantities, unmatched = drug_index.match_all(medicines)
+
+    # Update request status; only the request that wins the transition touches inventory
+    approved_at = datetime.now(timezone.utc)
+    previous, updated = await repository.dispense_requests.transition(db, request_id, "approved", {
+        "pharmacist_id": pharmacist_id,
+        "pharmacist_notes": notes,
+        "unmatched_medicines": [m.get("name") for m in unmatched],
+        "inventory_consumed": quantities,
+        "approved_at": approved_at.isoformat()
+    })
+    audit_log.record("dispense_request", request_id, previous, "approved", version=updated["version"],
+                     actor=pharmacist_id)
+
+    # Update inventory
+    await adjust_stock(db, {item_id: -quantity for item_id, quantity in quantities.items()})
+    if unmatched:
+        logger.warning(f"Dispense request {request_id}: no inventory match for "
+                       f"{[m.get('name') for m in unmatched]}")
+    await analytics.record_transition(db, request, "approved", approved_at, consumed=quantities)
+
+    # Update prescription status
+    await follow_prescription_status(request["prescription_id"], "approved", pharmacist_id)
+
+    return updated
+
+@router.put("/dispense-requests/{request_id}/dispense")
+async def dispense_medication(request_id: str, pharmacist_id: str):
+    """Mark medication as dispensed"""
+    dispensed_at = datetime.now(timezone.utc)
+    previous, updated = await repository.dispense_requests.transition(database.db, request_id, "dispensed", {
+        "pharmacist_id": pharmacist_id,
+        "dispensed_at": dispensed_at.isoformat()
+    })
+    audit_log.record("dispense_request", request_id, previous, "dispensed", version=updated["version"],
+                     actor=pharmacist_id)
+    await analytics.record_transition(database.db, updated, "dispensed", dispensed_at)
+
+    # Update prescription status
+    await follow_prescription_status(updated["prescription_id"], "dispensed", pharmacist_id)
+
+    return updated
+
+@router.put("/dispense-requests/{request_id}/reject")
+async def reject_dispense_request(request_id: str, pharmacist_id: str, notes: str):
+    """Reject a dispense request; rejecting an approved one returns its stock and reopens the prescription"""
+    rejected_at = datetime.now(timezone.utc)
+    previous, updated = await repository.dispense_requests.transition(database.db, request_id, "rejected", {
+        "pharmacist_id": pharmacist_id,
+        "pharmacist_notes": notes,
+        "rejected_at": rejected_at.isoformat()
+    })
+    audit_log.record("dispense_request", request_id, previous, "rejected", version=updated["version"],
+                     actor=pharmacist_id)
+    returned = returned_stock(previous, updated)
+    await adjust_stock(database.db, returned)
+    await analytics.record_transition(database.db, updated, "rejected", rejected_at,
+                                      consumed={item_id: -quantity for item_id, quantity in returned.items()})
+    if previous == "approved":
+        await follow_prescription_status(updated["prescription_id"], "pending", pharmacist_id)
+    return updated
+
+@router.put("/dispense-requests/bulk")
+async def bulk_update_dispense_requests(update: DispenseBulkUpdate):
+    """
+    Approve, dispense or reject many dispense requests at once. The requests
+    are read in one query and moved in one bulk write; the inventory the
+    approvals take is summed per SKU into one more, and the analytics into
+    one upsert. Each item's outcome is what its single-item endpoint would answer.
+    """
+    db = database.db
+    pharmacist_id = update.pharmacist_id
+    current = await repository.dispense_requests.get_many(db, [item.id for item in update.items])
+
+    # Match every approval's medicines first, so one index reload covers them all
+    def match_approvals():
+        return {item.id: drug_index.match_all(current[item.id].get("medicines", []))
+                for item in update.items if item.action == "approve" and item.id in current}
+
+    matches = match_approvals()
+    if any(unmatched for _, unmatched in matches.values()) and await refresh_drug_index(stale_only=True):
+        matches = match_approvals()
+
+    now = datetime.now(timezone.utc)
+    changes = []
+    for item in update.items:
+        status = DISPENSE_ACTIONS[item.action]
+        fields = {"pharmacist_id": pharmacist_id, f"{status}_at": now.isoformat()}
+        if item.action == "approve":
+            quantities, unmatched = matches.get(item.id, ({}, []))
+            fields.update({"pharmacist_notes": item.notes, "unmatched_medicines": [m.get("name") for m in unmatched],
+                           "inventory_consumed": quantities})
+        elif item.action == "reject":
+            fields["pharmacist_notes"] = item.notes
+        changes.append((item.id, status, fields))
+
+    # A rejection needs notes, as on the single-item endpoint
+    valid = [i for i, item in enumerate(update.items) if item.action != "reject" or item.notes]
+    results = [HTTPException(status_code=400, detail="Notes are required to reject a dispense request")] * len(changes)
+    applied = await repository.dispense_requests.bulk_transition(db, [changes[i] for i in valid], current)
+    for i, result in zip(valid, applied):
+        results[i] = result
+
+    stock = Counter()
+    increments = Increments()
+    prescriptions = {}
+    for (request_id, status, fields), result in zip(changes, results):
+        if isinstance(result, HTTPException):
+            continue
+        previous, updated = result
+        audit_log.record("dispense_request", request_id, previous, status, version=updated["version"],
+                         actor=pharmacist_id)
+        if status == "rejected":
+            quantities = {item_id: -quantity for item_id, quantity in returned_stock(previous, updated).items()}
+        else:
+            quantities = fields.get("inventory_consumed") or {}
+        stock.subtract(quantities)
+        increments.add_transition(updated, status, now, consumed=quantities)
+        if fields.get("unmatched_medicines"):
+            logger.warning(f"Dispense request {request_id}: no inventory match for {fields['unmatched_medicines']}")
+        if status != "rejected":
+            prescriptions.setdefault(updated["prescription_id"], status)
+        elif previous == "approved":
+            prescriptions.setdefault(updated["prescription_id"], "pending")
+
+    # Only requests that won their transition touch inventory, once per SKU
+    await adjust_stock(db, {item_id: delta for item_id, delta in stock.items() if delta})
+    await analytics.apply(db, increments)
+    await follow_prescription_statuses(list(prescriptions.items()), pharmacist_id)
+
+    return repository.bulk_report(changes, results)
+
+def returned_stock(previous: Optional[str], request: dict) -> Dict[str, int]:
+    """Units a rejection puts back: what the request took from stock, if it had been approved"""
+    return dict(request.get("inventory_consumed") or {}) if previous == "approved" else {}
+
+async def adjust_stock(db, deltas: Dict[str, int]):
+    """Add the signed per-SKU deltas to the available quantities in one bulk write"""
+    if not deltas:
+        return
+    await db.inventory.bulk_write([
+        UpdateOne({"id": item_id}, {"$inc": {"quantity_available": delta}})
+        for item_id, delta in deltas.items()
+    ], ordered=False)
+    response_versions.bump("inventory")
+
+async def follow_prescription_status(prescription_id: str, status: str, actor: str):
+    """Move the prescription behind a dispense request along with it, when its state machine allows"""
+    result = await repository.prescriptions.try_transition(database.db, prescription_id, status)
+    if result is None:
+        logger.warning(f"Prescription {prescription_id} not moved to '{status}' from its current status")
+        return
+    previous, updated = result
+    audit_log.record("prescription", prescription_id, previous, status, version=updated["version"], actor=actor)
+    search_index.set_status("prescription", prescription_id, status)
+
+async def follow_prescription_statuses(moves, actor: str):
+    """follow_prescription_status for many (prescription id, status) pairs, in one read and one write"""
+    changes = [(prescription_id, status, None) for prescription_id, status in moves]
+    results = await repository.prescriptions.bulk_transition(database.db, changes)
+    for (prescription_id, status, _), result in zip(changes, results):
+        if isinstance(result, HTTPException):
+            logger.warning(f"Prescription {prescription_id} not moved to '{status}': {result.detail}")
+            continue
+        previous, updated = result
+        audit_log.record("prescription", prescription_id, previous, status, version=updated["version"], actor=actor)
+        search_index.set_status("prescription", prescription_id, status)
+
+_drug_index_loaded_at = 0.0
+
+async def refresh_drug_index(stale_only: bool = False) -> bool:
+    """
+    Rebuild the drug index from the inventory collection. With stale_only the
+    rebuild is skipped if the index was loaded within DRUG_INDEX_REFRESH_SECONDS
+    (another worker may have re-seeded inventory since startup).
+    """
+    global _drug_index_loaded_at
+    now = asyncio.get_running_loop().time()
+    if stale_only and now - _drug_index_loaded_at < DRUG_INDEX_REFRESH_SECONDS:
+        return False
+    _drug_index_loaded_at = now
+    try:
+        items = await database.db.inventory.find(
+            {}, {"_id": 0, "id": 1, "medicine_name": 1, "dosage": 1}
+        ).to_list(None)
+    except PyMongoError as e:
+        logger.error(f"Could not load inventory for the drug index: {e}")
+        return False
+    drug_index.build(items)
+    return True
+
+async def build_drug_index():
+    await refresh_drug_index()
+
+# Registered by application.create_app when this group is included
+startup_hooks = (build_drug_index,)
@@ -0,0 +1,48 @@
+from fastapi import APIRouter, HTTPException
+
+import database
+
+router = APIRouter(prefix="/api")
+
+# ==================== DOCTORS ENDPOINTS ====================
+
+@router.get("/doctors")
+async def get_doctors():
+    """Get all doctors"""
+    doctors = await database.db.doctors.find({}, {"_id": 0}).to_list(1000)
+    return doctors
+
+@router.get("/doctors/{doctor_id}")
+async def get_doctor(doctor_id: str):
+    """Get doctor by ID"""
+    doctor = await database.db.doctors.find_one({"id": doctor_id}, {"_id": 0})
+    if not doctor:
+        raise HTTPException(status_code=404, detail="Doctor not found")
+    return doctor
+
+@router.get("/doctors/{doctor_id}/queue")
+async def get_doctor_queue(doctor_id: str):
+    """Get appointment queue for a doctor"""
+    appointments = await database.db.appointments.find(
+        {"doctor_id": doctor_id, "status": {"$in": ["scheduled", "in-progress"]}},
+        {"_id": 0}
+    ).sort("date", 1).to_list(100)
+    return appointments
+
+@router.get("/doctors/{doctor_id}/patients")
+async def get_doctor_patients(doctor_id: str):
+    """Get all patients (students) who have had appointments with this doctor"""
+    appointments = await database.db.appointments.find(
+        {"doctor_id": doctor_id},
+        {"_id": 0}
+    ).to_list(1000)
+
+    # Get unique patient IDs
+    patient_ids = list(set([apt["student_id"] for apt in appointments]))
+
+    patients = await database.db.students.find(
+        {"id": {"$in": patient_ids}},
+        {"_id": 0}
+    ).to_list(100)
+
+    return patients
@@ -0,0 +1,68 @@
+from datetime import datetime, timezone
+
+from fastapi import APIRouter, HTTPException, Query
+
+import database
+import repository
+from forecasting import inventory_forecaster
+from models import InventoryUpdate
+from response_cache import response_versions
+
+router = APIRouter(prefix="/api")
+
+# ==================== INVENTORY ENDPOINTS ====================
+
+@router.get("/inventory")
+async def get_inventory():
+    """Get all inventory items"""
+    items = await database.db.inventory.find({}, {"_id": 0}).to_list(1000)
+    return items
+
+@router.get("/inventory/low-stock")
+async def get_low_stock_items():
+    """Get items with stock below minimum"""
+    items = await database.db.inventory.find({}, {"_id": 0}).to_list(1000)
+    low_stock = [item for item in items if item.get("quantity_available", 0) < item.get("minimum_stock", 10)]
+    return low_stock
+
+@router.get("/inventory/forecast")
+async def get_inventory_forecast(reorder_only: bool = False, limit: int = Query(100, ge=1, le=1000)):
+    """Forecast consumption, reorder points and days of cover, most urgent first"""
+    query = {"forecast": {"$exists": True}}
+    if reorder_only:
+        query["forecast.reorder"] = True
+    items = await database.db.inventory.find(query, {"_id": 0}).sort("forecast.rank", 1).limit(limit).to_list(limit)
+    return {"last_run": inventory_forecaster.last_run, "items": items}
+
+@router.post("/inventory/forecast/run")
+async def run_inventory_forecast():
+    """Recompute forecasts for the whole catalog now"""
+    return await inventory_forecaster.run(database.db)
+
+@router.get("/inventory/{item_id}")
+async def get_inventory_item(item_id: str):
+    """Get inventory item by ID"""
+    item = await database.db.inventory.find_one({"id": item_id}, {"_id": 0})
+    if not item:
+        raise HTTPException(status_code=404, detail="Inventory item not found")
+    return item
+
+@router.put("/inventory/{item_id}")
+async def update_inventory(item_id: str, update: InventoryUpdate):
+    """Update inventory quantity"""
+    item = await repository.inventory.update(database.db, item_id, {
+        "quantity_available": update.quantity_available,
+        "last_restocked": datetime.now(timezone.utc).isoformat()
+    })
+    response_versions.bump("inventory")
+    return item
+
+async def start_inventory_forecaster():
+    inventory_forecaster.start(database.db)
+
+async def stop_inventory_forecaster():
+    await inventory_forecaster.stop()
+
+# Registered by application.create_app when this group is included
+startup_hooks = (start_inventory_forecaster,)
+shutdown_hooks = (stop_inventory_forecaster,)
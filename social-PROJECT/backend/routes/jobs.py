@@ -0,0 +1,29 @@
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query
+
+import database
+from jobs import job_queue
+
+router = APIRouter(prefix="/api")
+
+# ==================== JOB ENDPOINTS ====================
+
+@router.get("/jobs")
+async def get_jobs(type: Optional[str] = None, status: Optional[str] = None,
+                   limit: int = Query(50, ge=1, le=500)):
+    """Recent background jobs, newest first"""
+    query = {}
+    if type:
+        query["type"] = type
+    if status:
+        query["status"] = status
+    return await database.db.jobs.find(query, {"_id": 0, "lease_token": 0}).sort("created_at", -1).to_list(limit)
+
+@router.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Status, progress, attempts and result (or last error) of a background job"""
+    job = await job_queue.get(database.db, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
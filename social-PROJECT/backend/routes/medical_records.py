@@ -0,0 +1,40 @@
+from datetime import datetime, timezone
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException
+
+import database
+from models import MedicalRecord
+from search_index import search_index
+
+router = APIRouter(prefix="/api")
+
+# ==================== MEDICAL RECORDS ENDPOINTS ====================
+
+@router.get("/medical-records")
+async def get_medical_records(patient_name: Optional[str] = None):
+    """Get medical records with optional patient filter"""
+    query = {}
+    if patient_name:
+        query["patient_name"] = patient_name
+
+    records = await database.db.medical_records.find(query, {"_id": 0}).to_list(1000)
+    return records
+
+@router.get("/medical-records/{record_id}")
+async def get_medical_record(record_id: str):
+    """Get medical record by ID"""
+    record = await database.db.medical_records.find_one({"id": record_id}, {"_id": 0})
+    if not record:
+        raise HTTPException(status_code=404, detail="Medical record not found")
+    return record
+
+@router.post("/medical-records")
+async def create_medical_record(record: MedicalRecord):
+    """Create a new medical record"""
+    record_dict = record.model_dump()
+    record_dict["created_at"] = datetime.now(timezone.utc).isoformat()
+
+    await database.db.medical_records.insert_one(record_dict)
+    search_index.add("medical_record", record_dict)
+    return record_dict
@@ -0,0 +1,99 @@
+import uuid
+from datetime import datetime, timezone
+from typing import Optional
+
+from fastapi import APIRouter
+
+import database
+import repository
+from analytics import analytics
+from audit_log import audit_log
+from models import PrescriptionCreate, BulkStatusUpdate
+from search_index import search_index
+from summary_refresh import summary_refresher
+
+router = APIRouter(prefix="/api")
+
+# ==================== PRESCRIPTIONS ENDPOINTS ====================
+
+@router.get("/prescriptions")
+async def get_prescriptions(patient_name: Optional[str] = None, status: Optional[str] = None):
+    """Get prescriptions with optional filters"""
+    query = {}
+    if patient_name:
+        query["patient_name"] = patient_name
+    if status:
+        query["status"] = status
+
+    prescriptions = await repository.prescriptions.find(database.db, query, limit=1000)
+    return prescriptions
+
+@router.get("/prescriptions/{prescription_id}")
+async def get_prescription(prescription_id: str):
+    """Get prescription by ID"""
+    return await repository.prescriptions.get(database.db, prescription_id)
+
+@router.post("/prescriptions")
+async def create_prescription(prescription: PrescriptionCreate, doctor_name: str, doctor_reg: str):
+    """Create a new prescription"""
+    db = database.db
+    # Get next prescription number
+    last_prescription = await db.prescriptions.find_one(
+        sort=[("prescription_number", -1)]
+    )
+    next_number = (last_prescription.get("prescription_number", 0) + 1) if last_prescription else 1
+
+    presc_dict = prescription.model_dump()
+    presc_dict["id"] = str(uuid.uuid4())
+    presc_dict["prescription_number"] = next_number
+    presc_dict["prescriber_name"] = doctor_name
+    presc_dict["prescriber_reg_number"] = doctor_reg
+    presc_dict["date"] = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+    presc_dict["status"] = "pending"
+    presc_dict["created_at"] = datetime.now(timezone.utc).isoformat()
+
+    await repository.prescriptions.insert(db, presc_dict)
+    search_index.add("prescription", presc_dict)
+
+    # Create dispense request
+    dispense_request = {
+        "id": str(uuid.uuid4()),
+        "prescription_id": presc_dict["id"],
+        "patient_name": presc_dict["patient_name"],
+        "clinic": presc_dict.get("clinic"),
+        "prescriber_name": doctor_name,
+        "medicines": presc_dict["medicines"],
+        "status": "pending",
+        "created_at": datetime.now(timezone.utc).isoformat()
+    }
+    await db.dispense_requests.insert_one(dispense_request)
+    await analytics.record_prescriptions(db, [presc_dict])
+    await summary_refresher.prescription_changed(db, presc_dict["patient_name"])
+    return presc_dict
+
+@router.put("/prescriptions/{prescription_id}/status")
+async def update_prescription_status(prescription_id: str, status: str):
+    """Update prescription status"""
+    previous, updated = await repository.prescriptions.transition(database.db, prescription_id, status)
+    audit_log.record("prescription", prescription_id, previous, status, version=updated["version"])
+    search_index.set_status("prescription", prescription_id, status)
+    await summary_refresher.prescription_changed(database.db, updated.get("patient_name"))
+    return updated
+
+@router.put("/prescriptions/bulk-status")
+async def bulk_update_prescription_status(update: BulkStatusUpdate):
+    """Update the status of many prescriptions in one write; outcomes are reported per item"""
+    db = database.db
+    changes = [(item.id, item.status, None) for item in update.items]
+    results = await repository.prescriptions.bulk_transition(db, changes)
+    patients = set()
+    for (prescription_id, status, _), result in zip(changes, results):
+        if isinstance(result, tuple):
+            previous, updated = result
+            audit_log.record("prescription", prescription_id, previous, status, version=updated["version"])
+            search_index.set_status("prescription", prescription_id, status)
+            patients.add(updated.get("patient_name"))
+    # One refresh per patient, however many of their prescriptions moved
+    for patient_name in patients:
+        await summary_refresher.prescription_changed(db, patient_name)
+    return repository.bulk_report(changes, results)
@@ -0,0 +1,92 @@
+import time
+import logging
+from datetime import datetime, timezone, timedelta
+from typing import Dict, List, Optional
+
+from fastapi import APIRouter, Query
+from pymongo.errors import PyMongoError
+
+import database
+import repository
+from search_index import search_index, SearchIndexSync
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api")
+
+# ==================== SEARCH ENDPOINTS ====================
+
+SEARCH_COLLECTIONS = {
+    "prescription": repository.prescriptions,
+    "medical_record": repository.medical_records,
+    "ai_summary": repository.ai_summaries,
+}
+
+# Shares this process's index writes with the other workers
+search_sync = SearchIndexSync(search_index, SEARCH_COLLECTIONS)
+
+async def refresh_search_index(share: bool = False):
+    """
+    Rebuild the search index from the prescriptions, medical records and AI
+    summaries collections; with `share` every other worker rebuilds as well
+    """
+    await search_sync.rebuild(database.db, share=share)
+
+@router.get("/search")
+async def search(
+    q: str = "",
+    type: Optional[List[str]] = Query(None),
+    clinic: Optional[List[str]] = Query(None),
+    prescriber: Optional[List[str]] = Query(None),
+    medicine: Optional[List[str]] = Query(None),
+    status: Optional[List[str]] = Query(None),
+    record_type: Optional[List[str]] = Query(None),
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    days: Optional[int] = Query(None, ge=1, description="Only documents from the last N days"),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0)
+):
+    """Full-text search with facet filters and counts across prescriptions, records and summaries"""
+    started = time.perf_counter()
+    filters = {
+        field: values for field, values in
+        {"type": type, "clinic": clinic, "prescriber": prescriber, "medicine": medicine, "status": status,
+         "record_type": record_type}.items()
+        if values
+    }
+    if days:
+        date_from = (datetime.now(timezone.utc) - timedelta(days=days)).strftime("%Y-%m-%d")
+    found = search_index.search(q, filters, date_from, date_to, limit=limit, offset=offset)
+
+    # Load the documents of this page, one query per collection
+    ids_by_type: Dict[str, List[str]] = {}
+    for hit in found["hits"]:
+        ids_by_type.setdefault(hit["type"], []).append(hit["id"])
+    docs = {}
+    for kind, ids in ids_by_type.items():
+        for doc in await SEARCH_COLLECTIONS[kind].find(database.db, {"id": {"$in": ids}}, limit=len(ids)):
+            docs[(kind, doc["id"])] = doc
+
+    return {
+        "total": found["total"],
+        "results": [{"type": hit["type"], **docs[(hit["type"], hit["id"])]}
+                    for hit in found["hits"] if (hit["type"], hit["id"]) in docs],
+        "facets": found["facets"],
+        "took_ms": round((time.perf_counter() - started) * 1000, 2)
+    }
+
+async def build_search_index():
+    try:
+        await search_sync.ensure_indexes(database.db)
+    except PyMongoError as e:
+        logger.error(f"Could not create the search index changes index: {e}")
+    await refresh_search_index()
+    search_sync.start(database.db)
+
+async def stop_search_sync():
+    await search_sync.stop(database.db)
+
+# Registered by application.create_app when this group is included
+startup_hooks = (build_search_index,)
+shutdown_hooks = (stop_search_sync,)
@@ -0,0 +1,171 @@
+import uuid
+from datetime import datetime, timezone
+from typing import Optional
+
+from fastapi import APIRouter
+
+import database
+import repository
+from ai_cache import memoized_ai
+from ai_service import prescription_to_extracted_data, source_content_hash
+from analytics import analytics
+from drug_index import drug_index
+from jobs import job_queue, Job
+from response_cache import response_versions
+from routes.search import refresh_search_index
+
+router = APIRouter(prefix="/api")
+
+SEED_STEPS = 4
+
+# ==================== SEEDING ENDPOINT ====================
+
+@router.post("/seed-database", status_code=202)
+async def seed_database():
+    """Queue a reseed with sample data and AI summaries; poll GET /api/jobs/{id} for its counts"""
+    return await job_queue.enqueue(database.db, "seed_database", key="seed_database")
+
+async def seed_sample_data(job: Optional[Job] = None) -> dict:
+    """Replace the data with the sample records and generate their AI summaries"""
+    # The sample records are only needed here, not when the app is imported
+    from sample_data import SAMPLE_PRESCRIPTIONS, SAMPLE_DOCTORS, SAMPLE_STUDENTS, SAMPLE_INVENTORY
+
+    db = database.db
+    # Clear existing data
+    await db.prescriptions.delete_many({})
+    await db.doctors.delete_many({})
+    await db.students.delete_many({})
+    await db.inventory.delete_many({})
+    await db.ai_summaries.delete_many({})
+    await db.dispense_requests.delete_many({})
+    await db.appointments.delete_many({})
+    await db[analytics.collection_name].delete_many({})
+    if job:
+        await job.progress(1, SEED_STEPS, "Cleared existing data")
+
+    # Seed doctors
+    doctors_with_ids = []
+    for doc in SAMPLE_DOCTORS:
+        doc_with_id = {**doc, "id": str(uuid.uuid4())}
+        doctors_with_ids.append(doc_with_id)
+    await db.doctors.insert_many(doctors_with_ids)
+
+    # Seed students
+    students_with_ids = []
+    for student in SAMPLE_STUDENTS:
+        student_with_id = {**student, "id": str(uuid.uuid4())}
+        students_with_ids.append(student_with_id)
+    await db.students.insert_many(students_with_ids)
+
+    # Seed inventory
+    inventory_with_ids = []
+    for item in SAMPLE_INVENTORY:
+        item_with_id = {
+            **item,
+            "id": str(uuid.uuid4()),
+            "last_restocked": datetime.now(timezone.utc).isoformat()
+        }
+        inventory_with_ids.append(item_with_id)
+    await db.inventory.insert_many(inventory_with_ids)
+    drug_index.build(inventory_with_ids)
+    if job:
+        await job.progress(2, SEED_STEPS, "Seeded doctors, students and inventory")
+
+    # Seed prescriptions and generate AI summaries
+    prescriptions_with_ids = []
+    ai_summaries = []
+    dispense_requests = []
+
+    for presc in SAMPLE_PRESCRIPTIONS:
+        presc_id = str(uuid.uuid4())
+        presc_with_id = {
+            **presc,
+            "id": presc_id,
+            "status": "pending",
+            "created_at": datetime.now(timezone.utc).isoformat()
+        }
+        prescriptions_with_ids.append(presc_with_id)
+
+        # Create dispense request
+        dispense_request = {
+            "id": str(uuid.uuid4()),
+            "prescription_id": presc_id,
+            "patient_name": presc["patient_name"],
+            "clinic": presc.get("clinic"),
+            "prescriber_name": presc.get("prescriber_name"),
+            "medicines": presc["medicines"],
+            "status": "pending",
+            "created_at": datetime.now(timezone.utc).isoformat()
+        }
+        dispense_requests.append(dispense_request)
+
+        # Generate AI summary with provenance
+        extracted_data = prescription_to_extracted_data(presc)
+        summary_text, provenance_links = await memoized_ai.generate_summary_with_provenance(
+            extracted_data, presc_id
+        )
+
+        # Find student ID
+        student = next((s for s in students_with_ids if s["name"] == presc["patient_name"]), None)
+        patient_id = student["id"] if student else ""
+
+        ai_summary = {
+            "id": str(uuid.uuid4()),
+            "patient_id": patient_id,
+            "patient_name": presc.get("patient_name", ""),
+            "summary_text": summary_text,
+            "provenance_links": provenance_links,
+            "prescription_id": presc_id,
+            "source_hash": source_content_hash(extracted_data, presc_id),
+            "created_at": datetime.now(timezone.utc).isoformat()
+        }
+        ai_summaries.append(ai_summary)
+
+    await repository.prescriptions.insert_many(db, prescriptions_with_ids)
+    await analytics.record_prescriptions(db, prescriptions_with_ids)
+    await repository.ai_summaries.insert_many(db, ai_summaries)
+    await db.dispense_requests.insert_many(dispense_requests)
+    if job:
+        await job.progress(3, SEED_STEPS, "Seeded prescriptions and AI summaries")
+
+    # Create some sample appointments
+    sample_appointments = []
+    for i, student in enumerate(students_with_ids[:5]):
+        doctor = doctors_with_ids[i % len(doctors_with_ids)]
+        appointment = {
+            "id": str(uuid.uuid4()),
+            "student_id": student["id"],
+            "student_name": student["name"],
+            "doctor_id": doctor["id"],
+            "doctor_name": doctor["name"],
+            "date": "2025-08-15",
+            "time": doctor["available_slots"][0],
+            "reason": "General checkup",
+            "status": "scheduled",
+            "created_at": datetime.now(timezone.utc).isoformat()
+        }
+        sample_appointments.append(appointment)
+
+    await db.appointments.insert_many(sample_appointments)
+    # Every worker's index is rebuilt, not only this one's
+    await refresh_search_index(share=True)
+    for collection in ("students", "doctors", "inventory", "ai_summaries"):
+        response_versions.bump(collection)
+    if job:
+        await job.progress(SEED_STEPS, SEED_STEPS, "Seeded appointments and refreshed the search index")
+
+    return {
+        "message": "Database seeded successfully",
+        "counts": {
+            "doctors": len(doctors_with_ids),
+            "students": len(students_with_ids),
+            "prescriptions": len(prescriptions_with_ids),
+            "inventory_items": len(inventory_with_ids),
+            "ai_summaries": len(ai_summaries),
+            "dispense_requests": len(dispense_requests),
+            "appointments": len(sample_appointments)
+        }
+    }
+
+# Reseeding wipes every collection: one at a time
+job_queue.register("seed_database", seed_sample_data, concurrency=1)
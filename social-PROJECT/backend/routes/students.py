@@ -0,0 +1,59 @@
+from fastapi import APIRouter, HTTPException
+
+import database
+import repository
+
+router = APIRouter(prefix="/api")
+
+# ==================== STUDENTS ENDPOINTS ====================
+
+@router.get("/students")
+async def get_students():
+    """Get all students"""
+    students = await database.db.students.find({}, {"_id": 0}).to_list(1000)
+    return students
+
+@router.get("/students/{student_id}")
+async def get_student(student_id: str):
+    """Get student by ID"""
+    student = await database.db.students.find_one({"id": student_id}, {"_id": 0})
+    if not student:
+        raise HTTPException(status_code=404, detail="Student not found")
+    return student
+
+@router.get("/students/by-name/{name}")
+async def get_student_by_name(name: str):
+    """Get student by name"""
+    student = await database.db.students.find_one({"name": name}, {"_id": 0})
+    if not student:
+        raise HTTPException(status_code=404, detail="Student not found")
+    return student
+
+@router.get("/students/{student_id}/health-stats")
+async def get_student_health_stats(student_id: str):
+    """Get health statistics for a student"""
+    db = database.db
+    student = await db.students.find_one({"id": student_id}, {"_id": 0})
+    if not student:
+        raise HTTPException(status_code=404, detail="Student not found")
+
+    # Get prescription count
+    prescription_count = await db.prescriptions.count_documents({"patient_name": student["name"]})
+
+    # Get appointment count
+    appointment_count = await db.appointments.count_documents({"student_id": student_id})
+
+    # Get recent prescriptions
+    recent_prescriptions = await repository.prescriptions.find(
+        db, {"patient_name": student["name"]}, sort=[("date", -1)], limit=3
+    )
+
+    return {
+        "student": student,
+        "prescription_count": prescription_count,
+        "appointment_count": appointment_count,
+        "recent_prescriptions": recent_prescriptions,
+        "blood_group": student.get("blood_group", "Unknown"),
+        "allergies": student.get("allergies", []),
+        "chronic_conditions": student.get("chronic_conditions", [])
+    }
@@ -0,0 +1,86 @@
+from fastapi import APIRouter
+
+import database
+from admission import admission_controller
+from ai_cache import ai_cache
+from ai_executor import loop_monitor
+from ai_service import ai_service
+from audit_log import audit_log
+from compression import compression_stats
+from jobs import job_queue
+from response_cache import response_versions
+from summary_refresh import summary_refresher
+
+router = APIRouter(prefix="/api")
+
+# ==================== ROOT ENDPOINT ====================
+
+@router.get("/")
+async def root():
+    return {
+        "message": "Healthcare AI Platform API",
+        "version": "1.0.0",
+        "endpoints": [
+            "/api/auth/login",
+            "/api/auth/roles",
+            "/api/students",
+            "/api/doctors",
+            "/api/appointments",
+            "/api/prescriptions",
+            "/api/medical-records",
+            "/api/ai-summaries",
+            "/api/inventory",
+            "/api/dispense-requests",
+            "/api/search",
+            "/api/analytics/summary",
+            "/api/audit/{entity}/{entity_id}",
+            "/api/seed-database",
+            "/api/jobs/{job_id}"
+        ]
+    }
+
+@router.get("/metrics/ai-cache")
+async def get_ai_cache_stats():
+    """Hit-rate metrics for memoized extraction and summary generation"""
+    return ai_cache.stats()
+
+@router.get("/metrics/audit")
+async def get_audit_metrics():
+    """Buffered audit writer counters"""
+    return audit_log.metrics()
+
+@router.get("/metrics/response-cache")
+async def get_response_cache_stats():
+    """Conditional GET outcomes per cacheable route"""
+    return response_versions.metrics()
+
+@router.get("/metrics/compression")
+async def get_compression_stats():
+    """Response bytes before and after compression per route"""
+    return compression_stats.metrics()
+
+@router.get("/metrics/admission")
+async def get_admission_stats():
+    """Admitted, rate-limited (429) and over-capacity (503) requests by role and route"""
+    return admission_controller.metrics()
+
+@router.get("/metrics/jobs")
+async def get_job_stats():
+    """Background job outcomes per type, this worker's running jobs and the queued/running backlog"""
+    return {**job_queue.metrics(), "backlog": await job_queue.backlog(database.db)}
+
+@router.get("/metrics/summary-refresh")
+async def get_summary_refresh_stats():
+    """Write-triggered summary regeneration: coalesced writes, backlog and freshness lag"""
+    return await summary_refresher.metrics(database.db)
+
+@router.get("/metrics/extraction")
+async def get_extraction_stats():
+    """Remote extraction call, retry, fallback and circuit-breaker metrics"""
+    if ai_service.llama_client is None:
+        return {"remote_enabled": False}
+    return {"remote_enabled": True, **ai_service.llama_client.metrics()}
+
+@router.get("/health")
+async def health_check():
+    return {"status": "healthy", "event_loop": loop_monitor.stats()}
@@ -0,0 +1,520 @@
+"""
+In-process inverted index for full-text and faceted search.
+
+Prescriptions, medical records and AI summaries are numbered densely and
+stored column-wise: token and medicine postings are compact int32 arrays,
+while single-valued facets (type, clinic, prescriber, status, record_type)
+and the date are dictionary-encoded NumPy columns. A query is a handful of
+vectorized mask operations and bincounts, so it stays in the low milliseconds
+over a million documents; only the ids of the requested page are returned and
+the documents themselves are read from MongoDB.
+
+The index lives in each server process and is the only way /api/search
+finds documents, so every process must see every write. It is built from
+MongoDB at startup and updated in place by the write endpoints of the same
+process. SearchIndexSync shares those writes: it queues the changed ids and
+writes them to the `search_index_changes` collection every
+SEARCH_INDEX_SYNC_SECONDS. Other processes then re-read those documents and
+re-index them. A rebuild (after reseeding) is shared the same way. That
+interval bounds how long another worker's search can miss a write.
+"""
+import os
+import re
+import sys
+import uuid
+import asyncio
+import logging
+from array import array
+from collections import Counter
+from datetime import date, datetime, timezone, timedelta
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+
+import numpy as np
+from pymongo.errors import PyMongoError
+
+from drug_index import DRUG_ALIASES, normalize_name
+
+logger = logging.getLogger(__name__)
+
+SEARCH_INDEX_SYNC_SECONDS = float(os.environ.get("SEARCH_INDEX_SYNC_SECONDS", "2"))
+# Shared changes older than this are dropped by a TTL index
+SEARCH_INDEX_CHANGES_TTL_SECONDS = int(os.environ.get("SEARCH_INDEX_CHANGES_TTL_SECONDS", "3600"))
+
+FACET_FIELDS = ("type", "clinic", "prescriber", "medicine", "status", "record_type")
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+_STOPWORDS = {"a", "an", "and", "the", "of", "for", "in", "on", "with", "to", "after", "by", "is", "as", "at", "or"}
+
+
+def tokenize(text: str, query: bool = False) -> List[str]:
+    """
+    Lower-case word tokens with stopwords removed. Indexed brand names also
+    yield their generic; in queries a brand name is replaced by its generic.
+    """
+    tokens = []
+    for token in _TOKEN.findall(text.lower()):
+        if token in _STOPWORDS:
+            continue
+        generic = DRUG_ALIASES.get(token)
+        if not query or not generic:
+            tokens.append(sys.intern(token))
+        if generic:
+            tokens.append(sys.intern(generic))
+    return tokens
+
+
+def _day(value) -> Optional[int]:
+    """Ordinal day of an ISO date/datetime string or a date/datetime object"""
+    if isinstance(value, datetime):
+        return value.date().toordinal()
+    if isinstance(value, date):
+        return value.toordinal()
+    if isinstance(value, str) and len(value) >= 10:
+        try:
+            return date.fromisoformat(value[:10]).toordinal()
+        except ValueError:
+            return None
+    return None
+
+
+def _medicine_names(medicines: List[Dict[str, Any]]) -> List[str]:
+    return [normalize_name(m.get("name", ""))[0] for m in medicines if m.get("name")]
+
+
+def prescription_document(prescription: Dict[str, Any]) -> Dict[str, Any]:
+    """Text, facets and date of a prescription"""
+    medicines = prescription.get("medicines", [])
+    text = " ".join([
+        " ".join(prescription.get("symptoms", [])),
+        " ".join(m.get("name", "") for m in medicines),
+        " ".join(prescription.get("recommended_tests", [])),
+        prescription.get("notes", ""),
+        prescription.get("patient_name", ""),
+    ])
+    return {
+        "text": text,
+        "day": _day(prescription.get("date") or prescription.get("created_at")),
+        "facets": {
+            "clinic": [prescription.get("clinic")],
+            "prescriber": [prescription.get("prescriber_name")],
+            "medicine": _medicine_names(medicines),
+            "status": [prescription.get("status")],
+        },
+    }
+
+
+def medical_record_document(record: Dict[str, Any]) -> Dict[str, Any]:
+    """Text, facets and date of a medical record"""
+    details = record.get("details") or {}
+    text = " ".join([record.get("description", ""), record.get("record_type", ""), record.get("patient_name", "")]
+                    + [str(v) for v in details.values() if isinstance(v, (str, int, float))])
+    return {
+        "text": text,
+        "day": _day(record.get("created_at")),
+        "facets": {"record_type": [record.get("record_type")]},
+    }
+
+
+def ai_summary_document(summary: Dict[str, Any]) -> Dict[str, Any]:
+    """Text, facets and date of an AI summary (facets come from its provenance links)"""
+    linked: Dict[str, List[str]] = {}
+    for link in summary.get("provenance_links", []):
+        linked.setdefault(link.get("field_name"), []).append(link.get("value"))
+    raw = summary.get("raw_data") or {}  # summaries stored before raw_data was dropped
+
+    def first(field: str, raw_field: str):
+        return (linked.get(field) or [raw.get(raw_field)])[0]
+
+    medicines = [{"name": name} for name in linked.get("medicine", [])] or raw.get("medicines", [])
+    return {
+        "text": summary.get("summary_text", ""),
+        "day": _day(first("date", "date") or summary.get("created_at")),
+        "facets": {
+            "clinic": [first("clinic", "clinic")],
+            "prescriber": [first("prescriber", "prescriber_name")],
+            "medicine": _medicine_names(medicines),
+        },
+    }
+
+
+DOCUMENT_BUILDERS = {
+    "prescription": prescription_document,
+    "medical_record": medical_record_document,
+    "ai_summary": ai_summary_document,
+}
+
+
+# Facets with one value per document are stored as code columns; the rest as postings
+COLUMN_FACETS = ("type", "clinic", "prescriber", "status", "record_type")
+POSTING_FACETS = ("medicine",)
+
+_NO_DAY = -1
+
+
+def _ids(posting: array) -> np.ndarray:
+    """Document numbers of a posting as an int32 view (valid until the posting grows)"""
+    return np.frombuffer(posting, dtype=np.int32)
+
+
+class SearchIndex:
+    """Columnar inverted index with dictionary-encoded facet columns"""
+
+    def __init__(self, facet_limit: int = 10, initial_capacity: int = 1024):
+        self.facet_limit = facet_limit
+        self._size = 0
+        self._capacity = initial_capacity
+        self._alive = np.zeros(initial_capacity, dtype=bool)
+        self._day = np.full(initial_capacity, _NO_DAY, dtype=np.int32)
+        self._columns = {f: np.full(initial_capacity, -1, dtype=np.int32) for f in COLUMN_FACETS}
+        self._codes: Dict[str, Dict[str, int]] = {f: {} for f in COLUMN_FACETS}
+        self._values: Dict[str, List[str]] = {f: [] for f in COLUMN_FACETS}
+        self._tokens: Dict[str, array] = {}
+        self._postings: Dict[str, Dict[str, array]] = {f: {} for f in POSTING_FACETS}
+        self._doc_ids: List[Optional[str]] = []
+        self._numbers: Dict[Tuple[str, str], int] = {}
+        self._removed = 0
+        # Documents written here that other processes have not been told about (see SearchIndexSync)
+        self.shared = False
+        self.pending: Dict[Tuple[str, str], None] = {}
+
+    def __len__(self) -> int:
+        return len(self._numbers)
+
+    def clear(self):
+        shared, pending = self.shared, self.pending
+        self.__init__(self.facet_limit)
+        self.shared, self.pending = shared, pending
+
+    def _changed(self, kind: str, doc_id: str):
+        if self.shared:
+            self.pending[(kind, doc_id)] = None
+
+    def _grow(self):
+        self._capacity *= 2
+        for name in ("_alive", "_day"):
+            old = getattr(self, name)
+            new = np.full(self._capacity, False if name == "_alive" else _NO_DAY, dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+        for field, old in self._columns.items():
+            new = np.full(self._capacity, -1, dtype=np.int32)
+            new[:len(old)] = old
+            self._columns[field] = new
+
+    def _code(self, field: str, value: str) -> int:
+        code = self._codes[field].get(value)
+        if code is None:
+            code = self._codes[field][value] = len(self._values[field])
+            self._values[field].append(value)
+        return code
+
+    def add(self, kind: str, doc: Dict[str, Any]):
+        """Index (or re-index) one prescription, medical record or AI summary"""
+        self._index(kind, doc)
+        self._changed(kind, doc["id"])
+
+    def _index(self, kind: str, doc: Dict[str, Any]):
+        key = (kind, doc["id"])
+        if key in self._numbers:
+            self._drop(kind, doc["id"])
+        built = DOCUMENT_BUILDERS[kind](doc)
+        if self._size == self._capacity:
+            self._grow()
+        number = self._size
+        self._size += 1
+
+        for token in set(tokenize(built["text"])):
+            posting = self._tokens.get(token)
+            if posting is None:
+                posting = self._tokens[token] = array("i")
+            posting.append(number)
+        facets = {"type": [kind], **built["facets"]}
+        for field in COLUMN_FACETS:
+            value = (facets.get(field) or [None])[0]
+            if value:
+                self._columns[field][number] = self._code(field, sys.intern(str(value)))
+        for field in POSTING_FACETS:
+            for value in set(facets.get(field) or []):
+                if value:
+                    self._postings[field].setdefault(sys.intern(str(value)), array("i")).append(number)
+        if built["day"] is not None:
+            self._day[number] = built["day"]
+        self._alive[number] = True
+        self._doc_ids.append(doc["id"])
+        self._numbers[key] = number
+
+    def remove(self, kind: str, doc_id: str):
+        """Tombstone a document; its postings are dropped at the next compaction"""
+        self._drop(kind, doc_id)
+        self._changed(kind, doc_id)
+
+    def _drop(self, kind: str, doc_id: str):
+        number = self._numbers.pop((kind, doc_id), None)
+        if number is None:
+            return
+        self._alive[number] = False
+        self._doc_ids[number] = None
+        self._removed += 1
+        if self._removed > max(len(self._numbers), 10_000):
+            self.compact()
+
+    def compact(self):
+        """Renumber live documents densely and drop tombstoned entries from every posting"""
+        alive = self._alive[:self._size]
+        remap = np.cumsum(alive, dtype=np.int32) - 1
+        live = int(alive.sum())
+
+        def rewrite(postings: Dict[str, array]):
+            for key in list(postings):
+                ids = _ids(postings[key])
+                kept = remap[ids[alive[ids]]]
+                if len(kept):
+                    postings[key] = array("i", kept.astype(np.int32).tobytes())
+                else:
+                    del postings[key]
+
+        rewrite(self._tokens)
+        for field in POSTING_FACETS:
+            rewrite(self._postings[field])
+        self._day[:live] = self._day[:self._size][alive]
+        self._day[live:] = _NO_DAY
+        for field, column in self._columns.items():
+            column[:live] = column[:self._size][alive]
+            column[live:] = -1
+        self._doc_ids = [d for d in self._doc_ids if d is not None]
+        self._numbers = {key: int(remap[n]) for key, n in self._numbers.items()}
+        self._alive[:live] = True
+        self._alive[live:] = False
+        self._size = live
+        self._removed = 0
+
+    def set_status(self, kind: str, doc_id: str, status: str):
+        """Move a document to a new status without re-tokenizing it"""
+        number = self._numbers.get((kind, doc_id))
+        if number is not None:
+            self._columns["status"][number] = self._code("status", sys.intern(status))
+        self._changed(kind, doc_id)
+
+    def build(self, documents: Iterable[Tuple[str, Dict[str, Any]]]):
+        """Replace the index contents with (kind, document) pairs"""
+        self.clear()
+        for kind, doc in documents:
+            self._index(kind, doc)
+        logger.info(f"Search index built with {len(self)} documents and {len(self._tokens)} terms")
+
+    def _posting_mask(self, postings: List[array]) -> np.ndarray:
+        mask = np.zeros(self._size, dtype=bool)
+        for posting in postings:
+            mask[_ids(posting)] = True
+        return mask
+
+    def _facet_counts(self, mask: np.ndarray, matches: np.ndarray) -> Dict[str, List[Dict[str, Any]]]:
+        facets = {}
+        for field in FACET_FIELDS:
+            if field in self._columns:
+                # Shift by one so documents without a value (-1) land in bin 0
+                counts = np.bincount(self._columns[field][matches] + 1, minlength=len(self._values[field]) + 1)[1:]
+                pairs = [(self._values[field][code], int(count)) for code, count in enumerate(counts) if count]
+            else:
+                pairs = [(value, int(np.count_nonzero(mask[_ids(posting)])))
+                         for value, posting in self._postings[field].items()]
+            pairs.sort(key=lambda p: (-p[1], p[0]))
+            facets[field] = [{"value": v, "count": c} for v, c in pairs[:self.facet_limit] if c]
+        return facets
+
+    def _empty(self) -> Dict[str, Any]:
+        return {"total": 0, "hits": [], "facets": {f: [] for f in FACET_FIELDS}}
+
+    def search(self, q: str = "", filters: Optional[Dict[str, List[str]]] = None,
+               date_from: Optional[str] = None, date_to: Optional[str] = None,
+               limit: int = 20, offset: int = 0) -> Dict[str, Any]:
+        """
+        (type, id) of documents containing every query term and matching every
+        facet filter (values within one facet are OR-ed), newest first, with
+        facet counts over all matches.
+        """
+        mask = self._alive[:self._size].copy()
+        for token in set(tokenize(q, query=True)):
+            posting = self._tokens.get(token)
+            if posting is None:
+                return self._empty()
+            mask &= self._posting_mask([posting])
+        for field, values in (filters or {}).items():
+            if field in self._columns:
+                codes = [self._codes[field][v] for v in values if v in self._codes[field]]
+                if not codes:
+                    return self._empty()
+                # Lookup table indexed by code + 1 (missing values are -1)
+                wanted = np.zeros(len(self._values[field]) + 1, dtype=bool)
+                wanted[np.asarray(codes) + 1] = True
+                mask &= wanted[self._columns[field][:self._size] + 1]
+            else:
+                if field == "medicine":
+                    values = [normalize_name(v)[0] for v in values]
+                postings = [self._postings[field][v] for v in values if v in self._postings[field]]
+                if not postings:
+                    return self._empty()
+                mask &= self._posting_mask(postings)
+
+        day_from, day_to = _day(date_from), _day(date_to)
+        if day_from is not None or day_to is not None:
+            days = self._day[:self._size]
+            in_range = days != _NO_DAY
+            if day_from is not None:
+                in_range &= days >= day_from
+            if day_to is not None:
+                in_range &= days <= day_to
+            mask &= in_range
+
+        matches = np.flatnonzero(mask)
+        # Newest first, ties broken by most recently indexed
+        keys = (self._day[matches].astype(np.int64) << 32) | matches
+        wanted = offset + limit
+        top, top_keys = matches, keys
+        if len(matches) > wanted:
+            part = np.argpartition(-keys, wanted - 1)[:wanted]
+            top, top_keys = matches[part], keys[part]
+        page = top[np.argsort(-top_keys, kind="stable")][offset:wanted]
+
+        type_values = self._values["type"]
+        type_column = self._columns["type"]
+        return {
+            "total": len(matches),
+            "hits": [{"type": type_values[type_column[n]], "id": self._doc_ids[n]} for n in page.tolist()],
+            "facets": self._facet_counts(mask, matches),
+        }
+
+
+def _utc(value: datetime) -> datetime:
+    """Motor returns naive UTC datetimes"""
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+class SearchIndexSync:
+    """Keeps one process's index in step with the writes of every other process"""
+
+    def __init__(self, index: SearchIndex, sources: Dict[str, Any], collection_name: str = "search_index_changes",
+                 sync_interval: float = SEARCH_INDEX_SYNC_SECONDS):
+        # `sources` maps each document kind to the repository it is read from
+        self.index = index
+        self.sources = sources
+        self.collection_name = collection_name
+        self.sync_interval = sync_interval
+        self.origin = str(uuid.uuid4())
+        self.stats = Counter()
+        self._share_rebuild = False
+        self._synced_at: Optional[datetime] = None
+        self._rebuilt_at: Optional[datetime] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def ensure_indexes(self, db):
+        await db[self.collection_name].create_index("at", expireAfterSeconds=SEARCH_INDEX_CHANGES_TTL_SECONDS)
+
+    async def rebuild(self, db, share: bool = False) -> bool:
+        """Rebuild the index from MongoDB; with `share`, every other process rebuilds as well"""
+        started = datetime.now(timezone.utc)
+        documents = []
+        try:
+            for kind, repo in self.sources.items():
+                async for doc in repo.iterate(db):
+                    if doc.get("id"):
+                        documents.append((kind, doc))
+        except PyMongoError as e:
+            logger.error(f"Could not load documents for the search index: {e}")
+            return False
+        self.index.build(documents)
+        # The rebuild has every write made before it started
+        self._synced_at = started
+        self._share_rebuild = self._share_rebuild or share
+        self.stats["rebuilds"] += 1
+        return True
+
+    async def flush(self, db):
+        """Share pending local writes in one insert; they are kept for the next attempt on failure"""
+        pending, self.index.pending = self.index.pending, {}
+        share_rebuild, self._share_rebuild = self._share_rebuild, False
+        now = datetime.now(timezone.utc)
+        changes = [{"origin": self.origin, "kind": kind, "doc_id": doc_id, "at": now} for kind, doc_id in pending]
+        if share_rebuild:
+            changes.append({"origin": self.origin, "rebuild": True, "at": now})
+        if not changes:
+            return
+        try:
+            await db[self.collection_name].insert_many(changes, ordered=False)
+        except PyMongoError:
+            self.index.pending = {**pending, **self.index.pending}
+            self._share_rebuild = self._share_rebuild or share_rebuild
+            raise
+        self.stats["shared"] += len(pending)
+
+    async def sync(self, db) -> int:
+        """
+        Share local writes, then re-index the documents other processes have
+        written since the last sync (or rebuild if one of them rebuilt);
+        returns how many documents were re-read.
+        """
+        await self.flush(db)
+        started = datetime.now(timezone.utc)
+        query: Dict[str, Any] = {"origin": {"$ne": self.origin}}
+        if self._synced_at is not None:
+            # Overlap the previous window so changes racing the last poll are not missed;
+            # re-indexing a document twice is harmless
+            query["at"] = {"$gte": self._synced_at - timedelta(seconds=self.sync_interval)}
+        changes = await db[self.collection_name].find(query, {"_id": 0}).to_list(None)
+
+        rebuilds = [_utc(c["at"]) for c in changes if c.get("rebuild")]
+        rebuilds = [at for at in rebuilds if self._rebuilt_at is None or at > self._rebuilt_at]
+        if rebuilds:
+            self._rebuilt_at = max(rebuilds)
+            await self.rebuild(db)
+            return len(self.index)
+
+        ids_by_kind: Dict[str, set] = {}
+        for change in changes:
+            if change.get("kind") in self.sources:
+                ids_by_kind.setdefault(change["kind"], set()).add(change["doc_id"])
+        count = 0
+        for kind, ids in ids_by_kind.items():
+            docs = await self.sources[kind].find(db, {"id": {"$in": list(ids)}}, limit=len(ids))
+            for doc in docs:
+                self.index._index(kind, doc)
+            for missing in ids - {doc["id"] for doc in docs}:
+                self.index._drop(kind, missing)
+            count += len(ids)
+        self._synced_at = started
+        self.stats["applied"] += count
+        return count
+
+    def start(self, db):
+        """Record local writes and sync every `sync_interval` seconds in the background"""
+        if self.sync_interval > 0 and self._task is None:
+            self.index.shared = True
+            self._task = asyncio.create_task(self._run(db))
+
+    async def _run(self, db):
+        while True:
+            await asyncio.sleep(self.sync_interval)
+            try:
+                await self.sync(db)
+            except Exception:
+                # The loop must outlive any one failed sync
+                logger.exception("Search index sync failed")
+
+    async def stop(self, db=None):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if db is not None:
+            try:
+                await self.flush(db)
+            except PyMongoError as e:
+                logger.error(f"Could not share search index changes on shutdown: {e}")
+        self.index.shared = False
+
+
+# Global search index
+search_index = SearchIndex()
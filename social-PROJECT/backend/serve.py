@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Multi-process serving entry point (Linux / macOS).
+
+    cd backend
+    python -m serve --workers 4 --port 8000
+    python -m serve --workers 4 --no-preload     # each worker imports the app itself
+
+The master binds the listening socket and, with preloading (the default),
+imports the application once before forking. Modules, Pydantic models, sample
+data and compiled parser tables are then shared copy-on-write by every worker,
+and gc.freeze() keeps the collector from writing to those shared pages.
+Nothing in that import opens a connection: the Motor client connects on first
+use and the LlamaCloud client is created on first access, so every worker
+opens its own after the fork. Caches (AI results, the drug index, storage
+dictionaries) are per worker and share nothing. The search index and response
+versions are also per worker, but every worker sends its writes to MongoDB
+and polls for the others' (see search_index.py and response_cache.py). The
+search index is the only way /api/search finds documents, so it must not miss
+another worker's write.
+
+Each worker runs the application's startup hooks (index check, index and
+dictionary loads, then the warm-up hook priming caches, see WARMUP in
+application.py) before it accepts connections; until then connections wait in the
+shared backlog or go to workers that are ready. The master logs each worker's
+startup time, restarts workers that exit unexpectedly, and on SIGTERM/SIGINT
+lets workers finish in-flight requests for --graceful-timeout seconds.
+"""
+import gc
+import os
+import sys
+import time
+import select
+import signal
+import socket
+import logging
+import argparse
+from typing import Dict, List, Optional
+
+logger = logging.getLogger("serve")
+
+# A worker that exits this soon after starting is not restarted (it would crash-loop)
+MIN_WORKER_LIFETIME_SECONDS = 5.0
+
+
+def bind_socket(host: str, port: int, backlog: int = 2048) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def preload():
+    """Import the application in the master so workers share it copy-on-write"""
+    started = time.perf_counter()
+    import server
+    gc.collect()
+    gc.freeze()
+    logger.info(f"Preloaded application in {time.perf_counter() - started:.2f}s")
+    return server.app
+
+
+def run_worker(app, sock: socket.socket, ready_fd: int, args: argparse.Namespace):
+    """Serve on the shared socket until told to stop; reports readiness on `ready_fd`"""
+    import uvicorn
+
+    class WorkerServer(uvicorn.Server):
+        async def startup(self, sockets=None):
+            await super().startup(sockets=sockets)
+            if not self.should_exit:
+                os.write(ready_fd, b"1")
+            os.close(ready_fd)
+
+    config = uvicorn.Config(app if app is not None else "server:app", log_level=args.log_level,
+                            access_log=args.access_log, timeout_graceful_shutdown=args.graceful_timeout,
+                            timeout_keep_alive=args.keep_alive, lifespan="on")
+    WorkerServer(config).run(sockets=[sock])
+
+
+class Master:
+    """Forks workers on one listening socket and supervises them"""
+
+    def __init__(self, app, sock: socket.socket, args: argparse.Namespace):
+        self.app = app
+        self.sock = sock
+        self.args = args
+        self.workers: Dict[int, float] = {}   # pid -> start time
+        self.pending: Dict[int, int] = {}     # ready pipe fd -> pid
+        self.stopping = False
+
+    def spawn(self) -> int:
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_fd)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            code = 0
+            try:
+                run_worker(self.app, self.sock, write_fd, self.args)
+            except BaseException:
+                logger.exception("Worker failed")
+                code = 1
+            finally:
+                os._exit(code)
+        os.close(write_fd)
+        self.workers[pid] = time.monotonic()
+        self.pending[read_fd] = pid
+        return pid
+
+    def _stop(self, signum, frame):
+        self.stopping = True
+
+    def _collect_ready(self, timeout: float):
+        if not self.pending:
+            time.sleep(timeout)
+            return
+        readable, _, _ = select.select(list(self.pending), [], [], timeout)
+        for fd in readable:
+            pid = self.pending.pop(fd)
+            ready = os.read(fd, 1) == b"1"
+            os.close(fd)
+            if ready:
+                logger.info(f"Worker {pid} ready in {time.monotonic() - self.workers[pid]:.2f}s")
+                if not self.pending:
+                    logger.info(f"All {len(self.workers)} workers ready")
+
+    def _reap(self) -> bool:
+        """Handle exited workers; False when the master should give up"""
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return False
+            if pid == 0:
+                return True
+            started = self.workers.pop(pid, None)
+            for fd, pending_pid in list(self.pending.items()):
+                if pending_pid == pid:
+                    del self.pending[fd]
+                    os.close(fd)
+            if started is None or self.stopping:
+                continue
+            code = os.waitstatus_to_exitcode(status)
+            if time.monotonic() - started < MIN_WORKER_LIFETIME_SECONDS:
+                logger.error(f"Worker {pid} exited with {code} during startup; stopping")
+                return False
+            logger.warning(f"Worker {pid} exited with {code}; restarting it")
+            self.spawn()
+
+    def run(self) -> int:
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+        started = time.monotonic()
+        for _ in range(self.args.workers):
+            self.spawn()
+        host, port = self.sock.getsockname()[:2]
+        logger.info(f"Forked {self.args.workers} workers in {time.monotonic() - started:.3f}s on {host}:{port}")
+        healthy = True
+        while not self.stopping and healthy:
+            self._collect_ready(0.2)
+            healthy = self._reap()
+        self.shutdown()
+        return 0 if healthy else 1
+
+    def shutdown(self):
+        """SIGTERM every worker, then SIGKILL the ones still running after the grace period"""
+        self.stopping = True
+        for pid in self.workers:
+            _signal(pid, signal.SIGTERM)
+        deadline = time.monotonic() + self.args.graceful_timeout + 5
+        while self.workers and time.monotonic() < deadline:
+            try:
+                pid, _ = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if pid:
+                self.workers.pop(pid, None)
+            else:
+                time.sleep(0.1)
+        for pid in self.workers:
+            logger.warning(f"Worker {pid} did not stop in time; killing it")
+            _signal(pid, signal.SIGKILL)
+        self.sock.close()
+
+
+def _signal(pid: int, signum: int):
+    try:
+        os.kill(pid, signum)
+    except ProcessLookupError:
+        pass
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=os.environ.get("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.environ.get("PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=int(os.environ.get("WEB_CONCURRENCY", os.cpu_count() or 1)))
+    parser.add_argument("--no-preload", dest="preload", action="store_false",
+                        help="import the application in each worker instead of once in the master")
+    parser.add_argument("--no-warmup", dest="warmup", action="store_false",
+                        help="skip the per-worker cache priming (WARMUP=false)")
+    parser.add_argument("--graceful-timeout", type=int, default=30,
+                        help="seconds workers get to finish in-flight requests on shutdown")
+    parser.add_argument("--keep-alive", type=int, default=5)
+    parser.add_argument("--log-level", default="info")
+    parser.add_argument("--no-access-log", dest="access_log", action="store_false")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    logging.basicConfig(level=args.log_level.upper(), format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    if not args.warmup:
+        os.environ["WARMUP"] = "false"
+    sock = bind_socket(args.host, args.port)
+    app = preload() if args.preload else None
+    return Master(app, sock, args).run()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
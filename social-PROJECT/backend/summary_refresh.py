@@ -0,0 +1,112 @@
+"""
+Regenerating patient summaries when their prescriptions change.
+
+create_prescription and update_prescription_status report each write here.
+A write becomes a `refresh_summary` job keyed by patient (jobs.py). Later
+writes for the same patient while that job is queued push it back by
+SUMMARY_REFRESH_DEBOUNCE_SECONDS, up to SUMMARY_REFRESH_MAX_DELAY_SECONDS
+after the first, so a burst of writes costs one regeneration. The job
+regenerates the summary from the patient's latest prescription that is not
+cancelled or rejected. It changes nothing when that prescription's summary
+is already current.
+
+Freshness lag is the time from the first write of a burst to the stored
+summary. It is kept for the most recent regenerations of this process.
+The backlog (queued and running refreshes, and the oldest unanswered write)
+is read from the jobs collection, so it covers every worker.
+"""
+import os
+import logging
+from collections import Counter, deque
+from datetime import datetime, timezone
+from typing import Dict, Any, Optional
+
+import repository
+from jobs import job_queue, as_utc, ACTIVE_STATUSES, Job, JobQueue
+from percentiles import percentile
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_REFRESH_ENABLED = os.environ.get("SUMMARY_REFRESH_ENABLED", "true").lower() == "true"
+SUMMARY_REFRESH_DEBOUNCE_SECONDS = float(os.environ.get("SUMMARY_REFRESH_DEBOUNCE_SECONDS", "5"))
+SUMMARY_REFRESH_MAX_DELAY_SECONDS = float(os.environ.get("SUMMARY_REFRESH_MAX_DELAY_SECONDS", "60"))
+# Regenerations one process runs at once
+SUMMARY_REFRESH_CONCURRENCY = int(os.environ.get("SUMMARY_REFRESH_CONCURRENCY", "2"))
+
+JOB_TYPE = "refresh_summary"
+
+# A summary is never generated from these
+INACTIVE_STATUSES = ["cancelled", "rejected"]
+
+
+class SummaryRefresher:
+    """Debounced, write-triggered summary regeneration"""
+
+    def __init__(self, queue: JobQueue, debounce_seconds: float = SUMMARY_REFRESH_DEBOUNCE_SECONDS,
+                 max_delay_seconds: float = SUMMARY_REFRESH_MAX_DELAY_SECONDS,
+                 enabled: bool = SUMMARY_REFRESH_ENABLED, history: int = 1000):
+        self.queue = queue
+        self.debounce_seconds = debounce_seconds
+        self.max_delay_seconds = max_delay_seconds
+        self.enabled = enabled
+        self.lags: deque = deque(maxlen=history)
+        self.stats = Counter()
+        queue.register(JOB_TYPE, self.refresh, concurrency=SUMMARY_REFRESH_CONCURRENCY)
+
+    async def prescription_changed(self, db, patient_name: Optional[str]):
+        """Schedule a regeneration of the patient's summary after a prescription write"""
+        if not self.enabled or not patient_name:
+            return
+        job = await self.queue.debounce(db, JOB_TYPE, {"patient_name": patient_name},
+                                        key=f"{JOB_TYPE}:{patient_name}", delay=self.debounce_seconds,
+                                        max_delay=self.max_delay_seconds)
+        self.stats["writes"] += 1
+        if job["coalesced"]:
+            self.stats["coalesced"] += 1
+
+    async def refresh(self, job: Job) -> Dict[str, Any]:
+        """Job handler: regenerate one patient's summary from their latest active prescription"""
+        # The route module is imported by the first refresh, not with the prescription routes
+        from routes.ai_summaries import generate_summary
+
+        patient_name = job.params["patient_name"]
+        latest = await repository.prescriptions.find(
+            job.db, {"patient_name": patient_name, "status": {"$nin": INACTIVE_STATUSES}},
+            sort=[("created_at", -1)], limit=1
+        )
+        if not latest:
+            self.stats["skipped"] += 1
+            return {"skipped": "No active prescription"}
+        summary = await generate_summary(latest[0]["id"])
+        lag = (datetime.now(timezone.utc) - job.created_at).total_seconds()
+        self.lags.append(lag)
+        self.stats["refreshed"] += 1
+        return {"summary_id": summary["id"], "prescription_id": latest[0]["id"],
+                "freshness_lag_seconds": round(lag, 3)}
+
+    async def metrics(self, db) -> Dict[str, Any]:
+        backlog = {status: await db.jobs.count_documents({"type": JOB_TYPE, "status": status})
+                   for status in ACTIVE_STATUSES}
+        oldest = await db.jobs.find_one({"type": JOB_TYPE, "status": {"$in": ACTIVE_STATUSES}},
+                                        {"_id": 0, "created_at": 1}, sort=[("created_at", 1)])
+        lags = sorted(self.lags)
+        return {
+            "enabled": self.enabled,
+            "debounce_seconds": self.debounce_seconds,
+            "max_delay_seconds": self.max_delay_seconds,
+            **{name: self.stats[name] for name in ("writes", "coalesced", "refreshed", "skipped")},
+            "backlog": backlog,
+            # How long the stalest pending summary has waited
+            "oldest_pending_seconds": round(
+                (datetime.now(timezone.utc) - as_utc(oldest["created_at"])).total_seconds(), 3) if oldest else 0.0,
+            "freshness_lag_seconds": {
+                "p50": round(percentile(lags, 50), 3),
+                "p95": round(percentile(lags, 95), 3),
+                "max": round(lags[-1], 3) if lags else 0.0,
+                "samples": len(lags),
+            },
+        }
+
+
+# Global summary refresher
+summary_refresher = SummaryRefresher(job_queue)
@@ -255,7 +255,13 @@ class HealthcareAPITester:
         """Test database seeding endpoint"""
         print("\n🌱 Testing Database Seeding...")
         
-        success, result = self.test_api_endpoint('POST', 'seed-database')
+        success, result = self.test_api_endpoint('POST', 'seed-database', expected_status=202)
+        # Seeding runs as a background job; poll it until it finishes
+        while success and result.get('status') in ('queued', 'running'):
+            time.sleep(0.5)
+            success, result = self.test_api_endpoint('GET', f"jobs/{result['id']}")
+        if success and result.get('status') == 'succeeded':
+            result = result['result']
         if success and 'message' in result and 'counts' in result:
             counts = result['counts']
             expected_counts = ['doctors', 'students', 'prescriptions', 'ai_summaries', 'inventory_items']
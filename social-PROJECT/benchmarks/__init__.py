@@ -0,0 +1,7 @@
+import sys
+from pathlib import Path
+
+# Backend modules import each other as top-level modules (e.g. `from models import ...`)
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
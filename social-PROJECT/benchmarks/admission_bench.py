@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Tail latency of summary generation under overload, with and without
+admission control (backend/admission.py).
+
+The generation backend is modelled as --slots concurrent generations of
+--service-ms each (an LLM endpoint or a CPU pool), so its capacity is
+slots / service time. Requests from --clients clients arrive open loop (at a
+fixed rate, whether or not earlier ones finished) at --overload times that
+capacity, against the in-memory Mongo stand-in over an ASGI transport.
+Without admission control every request is accepted and queues for a slot,
+so latency grows for as long as the overload lasts. With it, the
+generate_summary route rule (its rate and concurrency cap, --slots wide)
+turns the excess away at once with 429/503 and the requests it admits keep
+their latency. Fails when the admitted p99 exceeds --max-p99-factor times
+the service time, or rejections are not faster than one service time.
+
+    python -m benchmarks.admission_bench
+    python -m benchmarks.admission_bench --slots 4 --service-ms 100 --overload 5 --duration 10
+"""
+import sys
+import time
+import asyncio
+import argparse
+from collections import Counter
+from typing import Dict, Any, List, Optional, Tuple
+
+import httpx
+
+import benchmarks  # noqa: F401  (puts backend/ on sys.path)
+from benchmarks.load_test import REPO_DIR, percentile  # also defaults MONGO_URL for database.py
+
+import database
+import repository
+from admission import admission_controller, AdmissionRoute, InMemoryAdmissionBackend, ADMISSION_ROUTES
+from ai_cache import memoized_ai
+from application import create_app
+from benchmarks.search_bench import generate_prescriptions
+
+
+def generate_route(slots: int) -> AdmissionRoute:
+    """The configured generate_summary rule, capped at the modelled backend's slots"""
+    configured = next(route for route in ADMISSION_ROUTES if route.name == "generate_summary")
+    return AdmissionRoute(configured.name, configured.method, configured.pattern.pattern, rate=configured.rate,
+                          burst=configured.burst, concurrency=slots, retry_after=configured.retry_after)
+
+
+async def _offer_load(app, rate: float, duration: float, clients: int) -> Tuple[List[Tuple[int, float]], float]:
+    """(status, latency ms) of each request, sent open loop at `rate` per second, and the seconds until the last answer"""
+    results: List[Tuple[int, float]] = []
+    # Client buckets are per address, so each simulated client gets one
+    sessions = [httpx.AsyncClient(transport=httpx.ASGITransport(app=app, client=(f"10.0.{n // 256}.{n % 256}", 4000)),
+                                  base_url="http://bench", timeout=None) for n in range(clients)]
+    try:
+        async def one(i: int):
+            started = time.perf_counter()
+            response = await sessions[i % clients].post(f"/api/ai-summaries/generate/presc-{i}",
+                                                        headers={"X-User-Role": "doctor"})
+            results.append((response.status_code, (time.perf_counter() - started) * 1000))
+
+        tasks = []
+        started = time.perf_counter()
+        for i in range(int(rate * duration)):
+            delay = started + i / rate - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(one(i)))
+        await asyncio.gather(*tasks)
+    finally:
+        for session in sessions:
+            await session.aclose()
+    return results, time.perf_counter() - started
+
+
+def run(admission: bool, slots: int, service_ms: float, overload: float, duration: float,
+        clients: int, route: Optional[AdmissionRoute] = None) -> Dict[str, Any]:
+    capacity = slots / (service_ms / 1000)
+    rate = overload * capacity
+    saved = (admission_controller.enabled, admission_controller.routes, admission_controller.backend,
+             memoized_ai.generate_summary_with_provenance)
+    original = memoized_ai.generate_summary_with_provenance
+    in_use = peak = 0
+    backend_slots: Optional[asyncio.Semaphore] = None
+
+    async def modelled_generation(extracted_data, prescription_id):
+        nonlocal in_use, peak
+        async with backend_slots:
+            in_use += 1
+            peak = max(peak, in_use)
+            await asyncio.sleep(service_ms / 1000)
+            in_use -= 1
+        return await original(extracted_data, prescription_id)
+
+    async def scenario():
+        nonlocal backend_slots
+        backend_slots = asyncio.Semaphore(slots)
+        await repository.prescriptions.insert_many(database.db, list(generate_prescriptions(int(rate * duration))))
+        return await _offer_load(app, rate, duration, clients)
+
+    app = create_app(["ai_summaries"])
+    sys.path.insert(0, str(REPO_DIR))
+    from tests.fake_mongo import FakeDatabase
+    database.db = FakeDatabase()
+    admission_controller.enabled = admission
+    admission_controller.routes = [route or generate_route(slots)]
+    admission_controller.backend = InMemoryAdmissionBackend()
+    memoized_ai.generate_summary_with_provenance = modelled_generation
+    try:
+        results, elapsed = asyncio.run(scenario())
+    finally:
+        (admission_controller.enabled, admission_controller.routes, admission_controller.backend,
+         memoized_ai.generate_summary_with_provenance) = saved
+
+    statuses = Counter(status for status, _ in results)
+    admitted = sorted(ms for status, ms in results if status == 200)
+    rejected = sorted(ms for status, ms in results if status in (429, 503))
+    return {
+        "admission": admission,
+        "offered_rps": round(rate, 1),
+        "capacity_rps": round(capacity, 1),
+        "requests": len(results),
+        "statuses": dict(statuses),
+        "goodput_rps": round(len(admitted) / elapsed, 1),
+        "peak_backend_in_use": peak,
+        "admitted_p50_ms": round(percentile(admitted, 50), 1),
+        "admitted_p99_ms": round(percentile(admitted, 99), 1),
+        "rejected_p99_ms": round(percentile(rejected, 99), 1),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--slots", type=int, default=generate_route(8).concurrency,
+                        help="concurrent generations the backend runs (the route's concurrency cap)")
+    parser.add_argument("--service-ms", type=float, default=200.0, help="time one generation takes")
+    parser.add_argument("--overload", type=float, default=3.0, help="offered load as a multiple of capacity")
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds of offered load")
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--max-p99-factor", type=float, default=3.0,
+                        help="fail when the admitted p99 exceeds this many service times")
+    args = parser.parse_args(argv)
+
+    capacity = args.slots / (args.service_ms / 1000)
+    print(f"🚦 Admission control under {args.overload:g}x overload: {args.slots} slots x {args.service_ms:g} ms "
+          f"= {capacity:.0f} req/s capacity, {args.duration:g}s from {args.clients} clients")
+    print("=" * 96)
+    reports = {}
+    for admission in (False, True):
+        report = reports[admission] = run(admission, args.slots, args.service_ms, args.overload, args.duration,
+                                          args.clients)
+        label = "admission on " if admission else "admission off"
+        print(f"{label}  {report['requests']:5} req  {report['statuses']}  goodput {report['goodput_rps']:6.1f}/s  "
+              f"admitted p50 {report['admitted_p50_ms']:8.1f} p99 {report['admitted_p99_ms']:8.1f} ms  "
+              f"rejected p99 {report['rejected_p99_ms']:6.1f} ms")
+    print("=" * 96)
+    on, off = reports[True], reports[False]
+    limit = args.max_p99_factor * args.service_ms
+    if on["admitted_p99_ms"] > limit or (on["rejected_p99_ms"] and on["rejected_p99_ms"] >= args.service_ms):
+        print(f"❌ With admission control the admitted p99 is {on['admitted_p99_ms']} ms (limit {limit:g} ms) "
+              f"and rejections take {on['rejected_p99_ms']} ms (limit {args.service_ms:g} ms)")
+        return 1
+    print(f"🎉 Admitted p99 {on['admitted_p99_ms']:.0f} ms with admission control vs {off['admitted_p99_ms']:.0f} ms "
+          f"without; excess requests rejected in {on['rejected_p99_ms']:.1f} ms (p99)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmarks for the AIService hot functions with scaling curves.
+
+Inputs of increasing size are generated from the sample_data.py patterns
+(1 to 500 medicines, 1 to 200 symptoms, long notes). Each function is timed
+and memory-profiled at every size, and the log-log slope of time versus size
+is fitted so super-linear behavior is caught automatically. Results are
+compared against the checked-in baseline (benchmarks/ai_service_baseline.json).
+
+    python -m benchmarks.ai_service_bench
+    python -m benchmarks.ai_service_bench --update-baseline
+    python -m benchmarks.ai_service_bench --plot test_reports/ai_service_scaling.png
+"""
+import sys
+import json
+import math
+import time
+import argparse
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Any, List, Callable, Optional, Tuple
+
+import benchmarks  # noqa: F401  (puts backend/ on sys.path)
+
+from ai_service import AIService, prescription_to_extracted_data
+from sample_data import SAMPLE_PRESCRIPTIONS
+
+BASELINE_PATH = Path(__file__).resolve().parent / "ai_service_baseline.json"
+REPORTS_DIR = Path(__file__).resolve().parent.parent / "test_reports"
+
+MEDICINE_SIZES = [1, 10, 50, 100, 250, 500]
+SYMPTOM_SIZES = [1, 10, 50, 100, 200]
+NOTES_SIZES = [100, 1_000, 10_000, 50_000]
+
+# Sizes below this are dominated by fixed overhead and are left out of the slope fit
+FIT_MIN_SIZE = 50
+
+_MEDICINES = [m for p in SAMPLE_PRESCRIPTIONS for m in p["medicines"]]
+_SYMPTOMS = sorted({s for p in SAMPLE_PRESCRIPTIONS for s in p["symptoms"]})
+_NOTES = " ".join(p["notes"] for p in SAMPLE_PRESCRIPTIONS)
+
+
+# ==================== INPUT GENERATORS ====================
+
+def build_prescription(medicines: int = 3, symptoms: int = 3, notes_chars: int = 60) -> Dict[str, Any]:
+    """A prescription document in the sample_data.py shape, scaled up"""
+    base = dict(SAMPLE_PRESCRIPTIONS[1])
+    base["medicines"] = [
+        {**_MEDICINES[i % len(_MEDICINES)], "name": f"{_MEDICINES[i % len(_MEDICINES)]['name']}-{i}"}
+        for i in range(medicines)
+    ]
+    base["symptoms"] = [f"{_SYMPTOMS[i % len(_SYMPTOMS)]} {i}" for i in range(symptoms)]
+    base["notes"] = (_NOTES * (notes_chars // len(_NOTES) + 1))[:notes_chars]
+    return base
+
+
+def render_prescription_text(prescription: Dict[str, Any]) -> str:
+    """Render a prescription as the free text extract_with_regex expects"""
+    lines = [
+        f"Clinic: {prescription['clinic']}",
+        f"Date: {prescription['date']}",
+        f"Patient: {prescription['patient_name']}, Age: {prescription['patient_age']}, "
+        f"Sex: {prescription['patient_sex']}",
+        f"Symptoms: {', '.join(prescription['symptoms'])}",
+        "Medications:",
+    ]
+    for i, med in enumerate(prescription["medicines"], 1):
+        lines.append(f"{i}. {med['name']} {med['dosage']} ({med['form']}) - {med['frequency']}, "
+                     f"{med['duration']}, Route: {med['route']}, Qty: {med['quantity']}")
+    lines += [
+        f"Recommended Tests: {', '.join(prescription['recommended_tests'])}",
+        f"Notes: {prescription['notes']}",
+        f"Prescribed by: {prescription['prescriber_name']} (Reg. #{prescription['prescriber_reg_number']})",
+    ]
+    return "\n".join(lines)
+
+
+# ==================== MEASUREMENT ====================
+
+def measure(fn: Callable[[], Any], repeats: int) -> Tuple[float, int]:
+    """Median wall time in seconds and peak traced memory in bytes for one call"""
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    timings.sort()
+
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return timings[len(timings) // 2], peak
+
+
+def scaling_exponent(points: List[Tuple[int, float]]) -> float:
+    """Least-squares slope of log(time) against log(size); ~1 is linear, ~2 is quadratic"""
+    points = [(n, t) for n, t in points if n >= FIT_MIN_SIZE and t > 0] or [p for p in points if p[1] > 0]
+    if len(points) < 2:
+        return 0.0
+    xs = [math.log(n) for n, _ in points]
+    ys = [math.log(t) for _, t in points]
+    mean_x, mean_y = sum(xs) / len(xs), sum(ys) / len(ys)
+    denom = sum((x - mean_x) ** 2 for x in xs)
+    return sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / denom if denom else 0.0
+
+
+def build_cases(service: AIService) -> Dict[str, Dict[str, Any]]:
+    """Benchmark name -> sizes and a factory returning the call to time at each size"""
+
+    def extract(n):
+        text = render_prescription_text(build_prescription(medicines=n))
+        return lambda: service.extract_with_regex(text)
+
+    def summary_medicines(n):
+        data = prescription_to_extracted_data(build_prescription(medicines=n))
+        return lambda: service.generate_summary_with_provenance(data, "bench")
+
+    def summary_symptoms(n):
+        data = prescription_to_extracted_data(build_prescription(symptoms=n))
+        return lambda: service.generate_summary_with_provenance(data, "bench")
+
+    def summary_notes(n):
+        data = prescription_to_extracted_data(build_prescription(notes_chars=n))
+        return lambda: service.generate_summary_with_provenance(data, "bench")
+
+    def parse_medicines(n):
+        text, links = service.generate_summary_with_provenance(
+            prescription_to_extracted_data(build_prescription(medicines=n)), "bench")
+        return lambda: service.parse_summary_for_display(text, links)
+
+    def parse_symptoms(n):
+        text, links = service.generate_summary_with_provenance(
+            prescription_to_extracted_data(build_prescription(symptoms=n)), "bench")
+        return lambda: service.parse_summary_for_display(text, links)
+
+    return {
+        "extract_with_regex[medicines]": {"sizes": MEDICINE_SIZES, "factory": extract},
+        "generate_summary_with_provenance[medicines]": {"sizes": MEDICINE_SIZES, "factory": summary_medicines},
+        "generate_summary_with_provenance[symptoms]": {"sizes": SYMPTOM_SIZES, "factory": summary_symptoms},
+        "generate_summary_with_provenance[notes]": {"sizes": NOTES_SIZES, "factory": summary_notes},
+        "parse_summary_for_display[medicines]": {"sizes": MEDICINE_SIZES, "factory": parse_medicines},
+        "parse_summary_for_display[symptoms]": {"sizes": SYMPTOM_SIZES, "factory": parse_symptoms},
+    }
+
+
+def run_benchmarks(repeats: int = 5, scale: float = 1.0,
+                   only: Optional[List[str]] = None) -> Dict[str, Any]:
+    service = AIService()
+    results = {}
+    for name, case in build_cases(service).items():
+        if only and not any(o in name for o in only):
+            continue
+        sizes = sorted({max(1, int(n * scale)) for n in case["sizes"]})
+        curve = []
+        for n in sizes:
+            seconds, peak = measure(case["factory"](n), repeats)
+            curve.append({"size": n, "time_us": round(seconds * 1e6, 2), "peak_kib": round(peak / 1024, 2)})
+        results[name] = {
+            "curve": curve,
+            "exponent": round(scaling_exponent([(p["size"], p["time_us"]) for p in curve]), 3),
+            "memory_exponent": round(scaling_exponent([(p["size"], p["peak_kib"]) for p in curve]), 3),
+        }
+    return results
+
+
+def check(results: Dict[str, Any], baseline: Dict[str, Any], max_exponent: float,
+          time_tolerance: float) -> List[str]:
+    """Return human-readable failures: super-linear curves and regressions against the baseline"""
+    failures = []
+    for name, result in results.items():
+        if result["exponent"] > max_exponent:
+            failures.append(f"{name}: time grows as n^{result['exponent']:.2f} (limit n^{max_exponent})")
+        before = baseline.get("benchmarks", {}).get(name)
+        if not before:
+            continue
+        if result["exponent"] > before["exponent"] + 0.3:
+            failures.append(f"{name}: scaling exponent {before['exponent']:.2f} → {result['exponent']:.2f}")
+        baseline_points = {p["size"]: p["time_us"] for p in before["curve"]}
+        largest = result["curve"][-1]
+        reference = baseline_points.get(largest["size"])
+        if reference and largest["time_us"] > reference * time_tolerance:
+            failures.append(f"{name}: {largest['time_us']:.0f} µs at n={largest['size']} "
+                            f"vs baseline {reference:.0f} µs (>{time_tolerance:.1f}x)")
+    return failures
+
+
+def plot(results: Dict[str, Any], path: str):
+    try:
+        import matplotlib
+        matplotlib.use("Agg")
+        import matplotlib.pyplot as plt
+    except ImportError:
+        print("⚠️  matplotlib is not installed; skipping plot")
+        return
+    fig, ax = plt.subplots(figsize=(8, 5))
+    for name, result in results.items():
+        ax.loglog([p["size"] for p in result["curve"]], [p["time_us"] for p in result["curve"]],
+                  marker="o", label=f"{name} (n^{result['exponent']:.2f})")
+    ax.set_xlabel("input size")
+    ax.set_ylabel("time (µs)")
+    ax.legend(fontsize=7)
+    fig.savefig(path, dpi=120, bbox_inches="tight")
+    print(f"📈 Scaling plot written to {path}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--only", nargs="*", help="run benchmarks whose name contains any of these")
+    parser.add_argument("--max-exponent", type=float, default=1.4, help="fail above this scaling exponent")
+    parser.add_argument("--time-tolerance", type=float, default=3.0,
+                        help="fail when the largest input is this many times slower than the baseline")
+    parser.add_argument("--baseline", default=str(BASELINE_PATH))
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--output", help="also write the results as JSON")
+    parser.add_argument("--plot", help="write a log-log scaling plot (requires matplotlib)")
+    args = parser.parse_args(argv)
+
+    print("🧪 AIService micro-benchmarks")
+    print("=" * 50)
+    results = run_benchmarks(repeats=args.repeats, only=args.only)
+    for name, result in results.items():
+        curve = "  ".join(f"n={p['size']}: {p['time_us']:.0f}µs/{p['peak_kib']:.0f}KiB" for p in result["curve"])
+        print(f"{name}\n    exponent {result['exponent']:.2f}  |  {curve}")
+
+    report = {"generated_at": datetime.now(timezone.utc).isoformat(), "benchmarks": results}
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+    if args.plot:
+        plot(results, args.plot)
+
+    if args.update_baseline:
+        Path(args.baseline).write_text(json.dumps(report, indent=2) + "\n")
+        print(f"📝 Baseline updated: {args.baseline}")
+        return 0
+
+    baseline_path = Path(args.baseline)
+    baseline = json.loads(baseline_path.read_text()) if baseline_path.exists() else {}
+    failures = check(results, baseline, args.max_exponent, args.time_tolerance)
+    print("=" * 50)
+    if failures:
+        print("❌ Scaling regressions detected:")
+        for failure in failures:
+            print(f"  - {failure}")
+        return 1
+    print("🎉 All functions scale within budget")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Pharmacist approval throughput: the single-item loop vs the bulk endpoint.
+
+A batch of pending dispense requests (each with its prescription) is approved
+once by calling PUT /api/dispense-requests/{id}/approve for every request, and
+once by one PUT /api/dispense-requests/bulk. Both run against the in-memory
+Mongo stand-in from tests/, which counts server round trips. Each round trip
+is also charged --rtt-ms, which models the network time to a real mongod.
+The in-process time alone only measures handler overhead. Fails when the bulk
+path's modelled throughput is less than --min-speedup times the loop's.
+
+    python -m benchmarks.bulk_status_bench
+    python -m benchmarks.bulk_status_bench --requests 500 --rtt-ms 1.0
+"""
+import sys
+import time
+import asyncio
+import argparse
+from typing import Dict, Any, List, Optional
+
+import benchmarks.load_test  # noqa: F401  (puts backend/ on sys.path, sets MONGO_URL)
+
+import database
+from audit_log import AuditLog
+from models import DispenseBulkItem, DispenseBulkUpdate
+from routes import dispense
+from sample_data import SAMPLE_INVENTORY
+from tests.fake_mongo import FakeDatabase
+
+
+async def seed(db, count: int):
+    await db.inventory.insert_many([{**item, "id": f"sku-{i}", "quantity_available": 10 ** 9}
+                                    for i, item in enumerate(SAMPLE_INVENTORY)])
+    await db.prescriptions.insert_many([{"id": f"presc-{i}", "status": "pending", "patient_name": f"Patient {i}"}
+                                        for i in range(count)])
+    await db.dispense_requests.insert_many([
+        {"id": f"req-{i}", "prescription_id": f"presc-{i}", "status": "pending", "clinic": "Main",
+         "created_at": "2026-01-01T00:00:00+00:00",
+         "medicines": [{"name": item["medicine_name"], "dosage": item["dosage"], "quantity": 1 + i % 3}]}
+        for i, item in ((i, SAMPLE_INVENTORY[i % len(SAMPLE_INVENTORY)]) for i in range(count))
+    ])
+    await dispense.refresh_drug_index()
+
+
+async def approve(count: int, bulk: bool, chunk: int) -> Dict[str, Any]:
+    """Approve `count` seeded requests one by one or in bulk chunks; returns seconds, round trips and stock used"""
+    db = FakeDatabase()
+    saved_db, saved_log = database.db, dispense.audit_log
+    database.db, dispense.audit_log = db, AuditLog(flush_interval=60)
+    try:
+        await seed(db, count)
+        ids = [f"req-{i}" for i in range(count)]
+        db.round_trips = 0
+        started = time.perf_counter()
+        if bulk:
+            for start in range(0, count, chunk):
+                report = await dispense.bulk_update_dispense_requests(DispenseBulkUpdate(
+                    pharmacist_id="pharm-1",
+                    items=[DispenseBulkItem(id=request_id, action="approve") for request_id in ids[start:start + chunk]]
+                ))
+                assert report["failed"] == 0, report
+        else:
+            for request_id in ids:
+                await dispense.approve_dispense_request(request_id, "pharm-1")
+        seconds = time.perf_counter() - started
+        round_trips = db.round_trips
+    finally:
+        database.db, dispense.audit_log = saved_db, saved_log
+    return {
+        "seconds": seconds,
+        "round_trips": round_trips,
+        "approved": sum(1 for doc in db.dispense_requests.docs if doc["status"] == "approved"),
+        "prescriptions_approved": sum(1 for doc in db.prescriptions.docs if doc["status"] == "approved"),
+        "stock_used": sum(10 ** 9 - doc["quantity_available"] for doc in db.inventory.docs),
+    }
+
+
+def run(count: int, chunk: int, rtt_ms: float) -> Dict[str, Dict[str, Any]]:
+    report = {}
+    for name, bulk in (("single", False), ("bulk", True)):
+        result = asyncio.run(approve(count, bulk, chunk))
+        modelled = result["seconds"] + result["round_trips"] * rtt_ms / 1000
+        report[name] = {
+            **result,
+            "round_trips_per_item": round(result["round_trips"] / count, 3),
+            "items_per_second": round(count / result["seconds"], 1),
+            "modelled_items_per_second": round(count / modelled, 1),
+        }
+    return report
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=1000, help="dispense requests to approve")
+    parser.add_argument("--chunk", type=int, default=500, help="items per bulk request")
+    parser.add_argument("--rtt-ms", type=float, default=0.5, help="modelled network time per database round trip")
+    parser.add_argument("--min-speedup", type=float, default=5.0,
+                        help="fail when bulk throughput is less than this multiple of the loop's")
+    args = parser.parse_args(argv)
+
+    print(f"📦 Approving {args.requests:,} dispense requests: single-item loop vs bulk ({args.chunk} per request)")
+    print("=" * 50)
+    report = run(args.requests, args.chunk, args.rtt_ms)
+    for name, result in report.items():
+        print(f"{name:7} {result['items_per_second']:>10,.0f} items/s in process, "
+              f"{result['modelled_items_per_second']:>9,.0f} items/s at {args.rtt_ms} ms RTT, "
+              f"{result['round_trips_per_item']} round trips/item")
+    single, bulk = report["single"], report["bulk"]
+    for key in ("approved", "prescriptions_approved", "stock_used"):
+        if single[key] != bulk[key]:
+            print(f"❌ The two paths disagree on {key}: {single[key]} vs {bulk[key]}")
+            return 1
+    speedup = bulk["modelled_items_per_second"] / single["modelled_items_per_second"]
+    print("=" * 50)
+    if speedup < args.min_speedup:
+        print(f"❌ Bulk approvals are only {speedup:.1f}x the single-item loop (target {args.min_speedup}x)")
+        return 1
+    print(f"🎉 Bulk approvals are {speedup:.1f}x the single-item loop")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+CPU versus bandwidth for each response encoding and level.
+
+Builds the JSON bodies of the large list endpoints from the sample_data.py
+vocabularies (see search_bench.py): a full /api/prescriptions page and a full
+/api/ai-summaries page with summary text and provenance links, serialized the
+way FastAPI does, plus a streamed summary compressed section by section with
+a sync flush as the middleware does. For every available encoding and level
+it reports the compression ratio, the CPU time per response, and the
+time to deliver the response (compress + transfer) on a slow and a fast link.
+Fails when the default gzip level compresses either list by less than the
+target ratio.
+
+    python -m benchmarks.compression_bench
+    python -m benchmarks.compression_bench --docs 200 --repeats 10
+"""
+import sys
+import json
+import time
+import argparse
+from typing import Dict, Any, List, Optional, Tuple
+
+import benchmarks  # noqa: F401  (puts backend/ on sys.path)
+
+from ai_service import AIService, prescription_to_extracted_data
+from compression import (
+    GzipCompressor, BrotliCompressor, ZstdCompressor, brotli, zstandard, COMPRESSION_GZIP_LEVEL
+)
+from benchmarks.search_bench import generate_prescriptions
+
+LEVELS = {
+    "gzip": (GzipCompressor, sorted({1, 3, 6, 9, COMPRESSION_GZIP_LEVEL})),
+    "br": (BrotliCompressor, [1, 4, 6, 9, 11]),
+    "zstd": (ZstdCompressor, [1, 3, 6, 12, 19]),
+}
+
+# Link speeds in bits per second
+LINKS = {"10 Mbit/s": 10e6, "100 Mbit/s": 100e6}
+
+
+def _render(content: Any) -> bytes:
+    """The bytes fastapi.responses.JSONResponse sends"""
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None,
+                      separators=(",", ":")).encode("utf-8")
+
+
+def build_payloads(docs: int) -> Dict[str, List[bytes]]:
+    """Response bodies, each a list of chunks as the handler sends them"""
+    service = AIService()
+    prescriptions, summaries = [], []
+    for i, prescription in enumerate(generate_prescriptions(docs)):
+        prescription.update({"prescription_number": i + 1, "patient_age": 20 + i % 60, "patient_sex": "Female",
+                             "prescriber_reg_number": f"REG-{i % 40:04d}", "created_at": prescription["date"]})
+        prescriptions.append(prescription)
+        text, links = service.generate_summary_with_provenance(prescription_to_extracted_data(prescription),
+                                                               prescription["id"])
+        summaries.append({"id": f"summary-{i}", "patient_id": "", "patient_name": prescription["patient_name"],
+                          "summary_text": text, "provenance_links": links, "prescription_id": prescription["id"],
+                          "source_hash": f"{i:064x}", "created_at": prescription["date"]})
+
+    stream = [_render({"event": "section", "section": section, "text": text, "provenance_links": links}) + b"\n"
+              for section, text, links in service.iter_summary_sections(
+                  prescription_to_extracted_data(prescriptions[0]), prescriptions[0]["id"])]
+    return {
+        "prescriptions": [_render(prescriptions)],
+        "ai_summaries": [_render(summaries)],
+        "summary_stream": stream,
+    }
+
+
+def _compress(codec, level: int, chunks: List[bytes]) -> bytes:
+    compressor = codec(level)
+    body = [compressor.chunk(chunk) for chunk in chunks[:-1]]
+    body.append(compressor.finish(chunks[-1]))
+    return b"".join(body)
+
+
+def measure(chunks: List[bytes], codec, level: int, repeats: int) -> Dict[str, float]:
+    size = sum(len(chunk) for chunk in chunks)
+    best = float("inf")
+    for _ in range(repeats):
+        started = time.process_time()
+        compressed = _compress(codec, level, chunks)
+        best = min(best, time.process_time() - started)
+    result = {"ratio": round(size / len(compressed), 2), "bytes": len(compressed), "cpu_ms": round(best * 1e3, 3)}
+    for link, bits_per_second in LINKS.items():
+        result[link] = round((best + len(compressed) * 8 / bits_per_second) * 1e3, 2)
+    return result
+
+
+def run(docs: int, repeats: int) -> Dict[str, Any]:
+    encodings = {"gzip": True, "br": brotli is not None, "zstd": zstandard is not None}
+    report = {"docs": docs, "payloads": {}, "skipped": [name for name, ok in encodings.items() if not ok]}
+    for name, chunks in build_payloads(docs).items():
+        size = sum(len(chunk) for chunk in chunks)
+        rows: Dict[str, Any] = {"identity": {"ratio": 1.0, "bytes": size, "cpu_ms": 0.0,
+                                             **{link: round(size * 8 / bps * 1e3, 2) for link, bps in LINKS.items()}}}
+        for encoding, (codec, levels) in LEVELS.items():
+            if encodings[encoding]:
+                for level in levels:
+                    rows[f"{encoding}-{level}"] = measure(chunks, codec, level, repeats)
+        report["payloads"][name] = {"bytes": size, "chunks": len(chunks), "levels": rows}
+    return report
+
+
+def _fastest(rows: Dict[str, Any], link: str) -> Tuple[str, float]:
+    name = min(rows, key=lambda n: rows[n][link])
+    return name, rows[name][link]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=1000, help="documents per list response (the API page size)")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--min-ratio", type=float, default=4.0,
+                        help="fail when the default gzip level compresses a list by less than this")
+    args = parser.parse_args(argv)
+
+    print(f"🗜️  Response compression over {args.docs:,}-document list responses")
+    report = run(args.docs, args.repeats)
+    if report["skipped"]:
+        print(f"   (not installed, skipped: {', '.join(report['skipped'])})")
+    print("=" * 72)
+    failures = []
+    for name, payload in report["payloads"].items():
+        rows = payload["levels"]
+        print(f"{name}: {payload['bytes'] / 1024:,.1f} KiB in {payload['chunks']} chunk(s)")
+        print(f"  {'encoding':<10} {'ratio':>6} {'KiB':>9} {'CPU ms':>8}" + "".join(f"{link:>12}" for link in LINKS))
+        for level, row in rows.items():
+            print(f"  {level:<10} {row['ratio']:6.2f} {row['bytes'] / 1024:9.1f} {row['cpu_ms']:8.2f}"
+                  + "".join(f"{row[link]:10.2f}ms" for link in LINKS))
+        for link in LINKS:
+            fastest, ms = _fastest(rows, link)
+            print(f"  fastest delivery on {link}: {fastest} ({ms} ms)")
+        default = rows[f"gzip-{COMPRESSION_GZIP_LEVEL}"]
+        if payload["chunks"] == 1 and default["ratio"] < args.min_ratio:
+            failures.append(f"{name} gzip-{COMPRESSION_GZIP_LEVEL} ratio {default['ratio']}")
+    print("=" * 72)
+    if failures:
+        print(f"❌ Below the {args.min_ratio}x target: {'; '.join(failures)}")
+        return 1
+    print(f"🎉 gzip-{COMPRESSION_GZIP_LEVEL} (the default) compresses every list response at least {args.min_ratio}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Compare summary generation over plain dicts with the slotted domain objects.
+
+Generates synthetic prescription documents (see search_bench.py) and
+summarizes all of them twice, keeping every result alive as a bulk job does
+before writing: once through the dict API (`prescription_to_extracted_data`
++ `generate_summary_with_provenance`, dict links) and once through the
+internal path (`Prescription.from_document` + `summarize`, slotted links)
+inside `gc_paused()` (a synchronous, CPU-only block). Reports
+per-document CPU time and the memory held by the results, and fails when the
+slotted path is not lighter.
+
+    python -m benchmarks.domain_bench
+    python -m benchmarks.domain_bench --docs 20000
+"""
+import gc
+import sys
+import time
+import argparse
+import tracemalloc
+from typing import Dict, Any, Callable, List, Optional
+
+import benchmarks  # noqa: F401  (puts backend/ on sys.path)
+
+from ai_service import AIService, prescription_to_extracted_data
+from domain import Prescription, gc_paused
+from benchmarks.search_bench import generate_prescriptions
+
+
+def _summarize_all(docs: List[Dict[str, Any]], summarize: Callable, bulk: bool) -> List[Any]:
+    if not bulk:
+        return [summarize(doc) for doc in docs]
+    with gc_paused():
+        return [summarize(doc) for doc in docs]
+
+
+def _cpu_us_per_doc(docs: List[Dict[str, Any]], summarize: Callable, bulk: bool, repeats: int) -> float:
+    best = float("inf")
+    for _ in range(repeats):
+        gc.collect()
+        started = time.process_time()
+        results = _summarize_all(docs, summarize, bulk)
+        best = min(best, time.process_time() - started)
+        del results
+    return best / len(docs) * 1e6
+
+
+def _retained_bytes(docs: List[Dict[str, Any]], summarize: Callable, bulk: bool) -> Dict[str, float]:
+    gc.collect()
+    tracemalloc.start()
+    results = _summarize_all(docs, summarize, bulk)
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del results
+    return {"retained_bytes_per_doc": retained / len(docs), "peak_mib": peak / 2 ** 20}
+
+
+def run(count: int, repeats: int) -> Dict[str, Any]:
+    service = AIService()
+    docs = list(generate_prescriptions(count))
+    paths = {
+        "dicts": lambda doc: service.generate_summary_with_provenance(prescription_to_extracted_data(doc), doc["id"]),
+        "slots": lambda doc: service.summarize(Prescription.from_document(doc)),
+    }
+    # Both paths must produce the same summaries
+    for doc in docs[:100]:
+        text, links = paths["dicts"](doc)
+        slotted_text, slotted_links = paths["slots"](doc)
+        assert text == slotted_text and links == [link.as_dict() for link in slotted_links]
+
+    report = {"docs": count, "paths": {}}
+    for name, summarize in paths.items():
+        bulk = name == "slots"
+        report["paths"][name] = {"cpu_us_per_doc": round(_cpu_us_per_doc(docs, summarize, bulk, repeats), 2),
+                                 **{k: round(v, 1) for k, v in _retained_bytes(docs, summarize, bulk).items()}}
+    return report
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=100_000)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    print(f"🧬 Summarizing {args.docs:,} prescriptions: dicts vs slotted domain objects")
+    print("=" * 50)
+    report = run(args.docs, args.repeats)
+    for name, result in report["paths"].items():
+        print(f"  {name:<6} {result['cpu_us_per_doc']:7.2f} us/doc CPU   "
+              f"{result['retained_bytes_per_doc']:8.1f} B/doc held   peak {result['peak_mib']:7.1f} MiB")
+    dicts, slots = report["paths"]["dicts"], report["paths"]["slots"]
+    print("=" * 50)
+    if slots["retained_bytes_per_doc"] >= dicts["retained_bytes_per_doc"] or \
+            slots["cpu_us_per_doc"] > dicts["cpu_us_per_doc"]:
+        print("❌ The slotted path is not lighter than the dict path")
+        return 1
+    print(f"🎉 Slotted path: {1 - slots['retained_bytes_per_doc'] / dicts['retained_bytes_per_doc']:.0%} less memory, "
+          f"{1 - slots['cpu_us_per_doc'] / dicts['cpu_us_per_doc']:.0%} less CPU per document")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
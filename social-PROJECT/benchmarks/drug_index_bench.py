@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Benchmark inventory matching against a large synthetic catalog.
+
+Builds catalogs of up to 50k SKUs (sample_data.py medicines plus generated
+generics at several strengths) and times exact, brand-alias, unit-variant
+and misspelled lookups. Per-lookup cost must stay flat as the catalog grows.
+
+    python -m benchmarks.drug_index_bench
+    python -m benchmarks.drug_index_bench --sizes 1000 10000 50000 200000
+"""
+import sys
+import time
+import random
+import argparse
+from typing import Dict, Any, List, Optional, Tuple
+
+import benchmarks  # noqa: F401  (puts backend/ on sys.path)
+
+from drug_index import DrugIndex, DRUG_ALIASES
+from sample_data import SAMPLE_INVENTORY
+from benchmarks.ai_service_bench import scaling_exponent
+
+STRENGTHS = ["5 mg", "10 mg", "20 mg", "50 mg", "100 mg", "250 mg", "500 mg"]
+_SYLLABLES = ["ab", "ce", "di", "lo", "mex", "pra", "zol", "tin", "vir", "cor", "fen", "dar", "ol", "am", "ix"]
+
+
+def build_catalog(size: int, seed: int = 7) -> List[Dict[str, Any]]:
+    """`size` inventory documents in the SAMPLE_INVENTORY shape"""
+    rng = random.Random(seed)
+    catalog = [{**item, "id": f"sample-{i}"} for i, item in enumerate(SAMPLE_INVENTORY)]
+    names = set()
+    while len(catalog) < size:
+        name = "".join(rng.choice(_SYLLABLES) for _ in range(rng.randint(3, 5))).capitalize()
+        if name in names:
+            continue
+        names.add(name)
+        for strength in rng.sample(STRENGTHS, 3):
+            catalog.append({"id": f"sku-{len(catalog)}", "medicine_name": name, "dosage": strength,
+                            "form": "tablet", "quantity_available": 100})
+    return catalog[:size]
+
+
+def build_queries(catalog: List[Dict[str, Any]], count: int, seed: int = 11) -> Dict[str, List[Tuple[str, str]]]:
+    rng = random.Random(seed)
+    picks = [rng.choice(catalog) for _ in range(count)]
+    generics_to_brand = {generic: brand for brand, generic in DRUG_ALIASES.items()}
+    sample = [item for item in catalog if item["medicine_name"].lower() in generics_to_brand]
+
+    def typo(name: str) -> str:
+        i = rng.randrange(1, len(name) - 1)
+        return name[:i] + name[i + 1:]
+
+    return {
+        "exact": [(p["medicine_name"], p["dosage"]) for p in picks],
+        "unit_variant": [(p["medicine_name"].upper(), p["dosage"].replace(" ", "").upper()) for p in picks],
+        "brand_alias": [(generics_to_brand[s["medicine_name"].lower()].title(), s["dosage"])
+                        for s in (rng.choice(sample) for _ in range(count))],
+        "typo": [(typo(p["medicine_name"]), p["dosage"]) for p in picks],
+    }
+
+
+def run(sizes: List[int], lookups: int) -> Dict[int, Dict[str, Any]]:
+    results = {}
+    for size in sizes:
+        catalog = build_catalog(size)
+        index = DrugIndex()
+        started = time.perf_counter()
+        index.build(catalog)
+        build_seconds = time.perf_counter() - started
+
+        result = {"build_ms": round(build_seconds * 1000, 1), "lookups": {}}
+        for kind, queries in build_queries(catalog, lookups).items():
+            started = time.perf_counter()
+            hits = sum(index.match(name, dosage) is not None for name, dosage in queries)
+            elapsed = time.perf_counter() - started
+            result["lookups"][kind] = {"us_per_lookup": round(elapsed / len(queries) * 1e6, 2),
+                                       "hit_rate": round(hits / len(queries), 3)}
+        results[size] = result
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="*", default=[1_000, 10_000, 50_000])
+    parser.add_argument("--lookups", type=int, default=20_000)
+    parser.add_argument("--max-exponent", type=float, default=0.3,
+                        help="fail when per-lookup time grows faster than n^this with catalog size")
+    args = parser.parse_args(argv)
+
+    print("💊 Drug index matching benchmark")
+    print("=" * 50)
+    results = run(args.sizes, args.lookups)
+    failed = False
+    for size, result in results.items():
+        lookups = "  ".join(f"{kind}: {r['us_per_lookup']:.1f}µs ({r['hit_rate']:.0%})"
+                            for kind, r in result["lookups"].items())
+        print(f"{size:>7} SKUs  build {result['build_ms']:.0f} ms  |  {lookups}")
+    for kind in results[args.sizes[0]]["lookups"]:
+        exponent = scaling_exponent([(size, r["lookups"][kind]["us_per_lookup"]) for size, r in results.items()])
+        if exponent > args.max_exponent:
+            failed = True
+            print(f"❌ {kind} lookups grow as n^{exponent:.2f} with catalog size")
+    print("=" * 50)
+    print("❌ Lookup cost depends on catalog size" if failed else "🎉 Lookup cost is flat across catalog sizes")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Benchmark the inventory forecasting batch computation.
+
+Generates sparse daily consumption for a large catalog (by default 50k SKUs
+over two years) in the shape the forecaster reads from the analytics
+rollups, then times bucketing into the SKU x day matrix and the vectorized
+forecast. Fails when the whole computation exceeds the time budget.
+
+    python -m benchmarks.forecast_bench
+    python -m benchmarks.forecast_bench --skus 100000 --days 730 --density 0.5
+"""
+import sys
+import time
+import argparse
+from typing import Dict, Any, List, Optional
+
+import numpy as np
+
+import benchmarks  # noqa: F401  (puts backend/ on sys.path)
+
+from forecasting import compute_forecast, daily_matrix
+
+
+def generate_events(skus: int, days: int, density: float, seed: int = 5):
+    """(sku, day, quantity) rows for roughly `density` of all SKU-days"""
+    rng = np.random.default_rng(seed)
+    count = int(skus * days * density)
+    sku_index = rng.integers(0, skus, count)
+    day_offset = rng.integers(0, days, count)
+    # Per-SKU base demand with Poisson noise
+    base = rng.gamma(2.0, 5.0, skus)
+    quantity = rng.poisson(base[sku_index]).astype(np.float64)
+    return sku_index, day_offset, quantity
+
+
+def run(skus: int, days: int, density: float, repeats: int) -> Dict[str, Any]:
+    events = generate_events(skus, days, density)
+    rng = np.random.default_rng(1)
+    on_hand = rng.integers(0, 2000, skus).astype(np.float64)
+    minimum_stock = np.full(skus, 10.0)
+    lead_time = rng.choice([3.0, 7.0, 14.0], skus)
+
+    best_bucket = best_forecast = float("inf")
+    for _ in range(repeats):
+        started = time.perf_counter()
+        history = daily_matrix(*events, skus=skus, days=days)
+        bucketed = time.perf_counter()
+        result = compute_forecast(history, on_hand, minimum_stock, lead_time)
+        finished = time.perf_counter()
+        best_bucket = min(best_bucket, bucketed - started)
+        best_forecast = min(best_forecast, finished - bucketed)
+        del history
+    return {
+        "skus": skus,
+        "days": days,
+        "events": len(events[0]),
+        "bucket_seconds": round(best_bucket, 3),
+        "forecast_seconds": round(best_forecast, 3),
+        "total_seconds": round(best_bucket + best_forecast, 3),
+        "reorder_count": int(result["reorder"].sum()),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--skus", type=int, default=50_000)
+    parser.add_argument("--days", type=int, default=730)
+    parser.add_argument("--density", type=float, default=0.3, help="fraction of SKU-days with consumption")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--budget-seconds", type=float, default=5.0)
+    args = parser.parse_args(argv)
+
+    print(f"📦 Forecasting {args.skus:,} SKUs x {args.days} days")
+    print("=" * 50)
+    report = run(args.skus, args.days, args.density, args.repeats)
+    print(f"{report['events']:,} consumption rows")
+    print(f"  bucketing  {report['bucket_seconds']:.3f} s")
+    print(f"  forecast   {report['forecast_seconds']:.3f} s")
+    print(f"  reorder    {report['reorder_count']:,} SKUs")
+    print("=" * 50)
+    if report["total_seconds"] > args.budget_seconds:
+        print(f"❌ {report['total_seconds']:.2f} s exceeds the {args.budget_seconds:.0f} s budget")
+        return 1
+    print(f"🎉 Whole catalog in {report['total_seconds']:.2f} s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""
+In-process load test for the Healthcare AI Platform API.
+
+Replays weighted user scenarios concurrently against the FastAPI app over an
+ASGI transport (no network, no uvicorn) and reports throughput and latency
+percentiles per route as a JSON report in test_reports/.
+
+    python -m benchmarks.load_test --requests 2000 --concurrency 32
+    python -m benchmarks.load_test --mongo-url mongodb://localhost:27017 --baseline test_reports/load_baseline.json
+
+Without --mongo-url the in-memory Mongo stand-in from tests/ is used, so the
+numbers measure application overhead rather than database latency.
+"""
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+from collections import defaultdict
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+import httpx
+
+import benchmarks  # noqa: F401  (puts backend/ on sys.path)
+from percentiles import percentile  # also used by the other benchmarks
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+REPORTS_DIR = REPO_DIR / "test_reports"
+
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+
+
+class LoadContext:
+    """Ids discovered after seeding, shared by all scenarios"""
+
+    def __init__(self, doctors, students, prescriptions):
+        self.doctors = doctors
+        self.students = students
+        self.prescriptions = prescriptions
+
+
+class HealthcareLoadTester:
+    def __init__(self, app, concurrency: int = 16, total_requests: int = 1000,
+                 duration: Optional[float] = None, seed: int = 42):
+        self.app = app
+        self.concurrency = concurrency
+        self.total_requests = total_requests
+        self.duration = duration
+        self.random = random.Random(seed)
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.scenario_counts: Dict[str, int] = defaultdict(int)
+        self.requests_sent = 0
+        self.scenarios: List[tuple] = [
+            ("doctor_queue_polling", 40, self.doctor_queue_polling),
+            ("patient_dashboard_load", 30, self.patient_dashboard_load),
+            ("pharmacist_approval_burst", 20, self.pharmacist_approval_burst),
+            ("summary_generation", 10, self.summary_generation),
+        ]
+
+    async def request(self, client: httpx.AsyncClient, method: str, route: str, url: str,
+                      expected: tuple = (), **kwargs):
+        """Issue one request and record its latency under the route template (`expected` codes are not errors)"""
+        self.requests_sent += 1
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+            ok = response.status_code < 400 or response.status_code in expected
+        except Exception:
+            response, ok = None, False
+        self.latencies[f"{method} {route}"].append((time.perf_counter() - started) * 1000)
+        if not ok:
+            self.errors[f"{method} {route}"] += 1
+        return response.json() if ok and response.status_code < 400 and response.content else None
+
+    # ==================== SCENARIOS ====================
+
+    async def doctor_queue_polling(self, client, ctx: LoadContext):
+        doctor = self.random.choice(ctx.doctors)
+        await self.request(client, "GET", "/api/doctors/{doctor_id}/queue", f"/api/doctors/{doctor['id']}/queue")
+
+    async def patient_dashboard_load(self, client, ctx: LoadContext):
+        student = self.random.choice(ctx.students)
+        await asyncio.gather(
+            self.request(client, "GET", "/api/students/{student_id}/health-stats",
+                         f"/api/students/{student['id']}/health-stats"),
+            self.request(client, "GET", "/api/prescriptions", "/api/prescriptions",
+                         params={"patient_name": student["name"]}),
+            self.request(client, "GET", "/api/ai-summaries/patient/{patient_name}",
+                         f"/api/ai-summaries/patient/{student['name']}"),
+            self.request(client, "GET", "/api/appointments", "/api/appointments",
+                         params={"student_id": student["id"]}),
+        )
+
+    async def pharmacist_approval_burst(self, client, ctx: LoadContext):
+        pending = await self.request(client, "GET", "/api/dispense-requests", "/api/dispense-requests",
+                                     params={"status": "pending"}) or []
+        burst = self.random.sample(pending, min(5, len(pending)))
+        # Concurrent pharmacists race for the same requests; the losers get 409 Conflict
+        await asyncio.gather(*[
+            self.request(client, "PUT", "/api/dispense-requests/{request_id}/approve",
+                         f"/api/dispense-requests/{item['id']}/approve", expected=(409,),
+                         params={"pharmacist_id": "load-test"})
+            for item in burst
+        ])
+        await self.request(client, "GET", "/api/inventory", "/api/inventory")
+
+    async def summary_generation(self, client, ctx: LoadContext):
+        prescription = self.random.choice(ctx.prescriptions)
+        await self.request(client, "POST", "/api/ai-summaries/generate/{prescription_id}",
+                           f"/api/ai-summaries/generate/{prescription['id']}")
+
+    # ==================== RUNNER ====================
+
+    async def setup(self, client: httpx.AsyncClient) -> LoadContext:
+        response = await client.post("/api/seed-database")
+        response.raise_for_status()
+        # Seeding runs as a background job; wait for it like any client would
+        job = response.json()
+        while job["status"] in ("queued", "running"):
+            await asyncio.sleep(0.05)
+            job = (await client.get(f"/api/jobs/{job['id']}")).json()
+        if job["status"] != "succeeded":
+            raise RuntimeError(f"Seeding failed: {job['error']}")
+        doctors = (await client.get("/api/doctors")).json()
+        students = (await client.get("/api/students")).json()
+        prescriptions = (await client.get("/api/prescriptions")).json()
+        return LoadContext(doctors, students, prescriptions)
+
+    async def worker(self, client: httpx.AsyncClient, ctx: LoadContext, deadline: Optional[float]):
+        names = [s[0] for s in self.scenarios]
+        weights = [s[1] for s in self.scenarios]
+        handlers = {s[0]: s[2] for s in self.scenarios}
+        while True:
+            if deadline is not None and time.perf_counter() >= deadline:
+                return
+            if deadline is None and self.requests_sent >= self.total_requests:
+                return
+            name = self.random.choices(names, weights)[0]
+            self.scenario_counts[name] += 1
+            await handlers[name](client, ctx)
+
+    async def run(self) -> Dict[str, Any]:
+        # The ASGI transport does not send lifespan events, so run startup/shutdown here
+        for handler in self.app.router.on_startup:
+            await handler()
+        transport = httpx.ASGITransport(app=self.app)
+        try:
+            async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=60) as client:
+                ctx = await self.setup(client)
+                self.latencies.clear()
+                self.requests_sent = 0
+
+                started = time.perf_counter()
+                deadline = started + self.duration if self.duration else None
+                await asyncio.gather(*[self.worker(client, ctx, deadline) for _ in range(self.concurrency)])
+                elapsed = time.perf_counter() - started
+        finally:
+            for handler in self.app.router.on_shutdown:
+                await handler()
+        return self.report(elapsed)
+
+    def report(self, elapsed: float) -> Dict[str, Any]:
+        routes = {}
+        for route, values in sorted(self.latencies.items()):
+            values = sorted(values)
+            routes[route] = {
+                "requests": len(values),
+                "errors": self.errors.get(route, 0),
+                "throughput_rps": round(len(values) / elapsed, 2) if elapsed else 0.0,
+                "mean_ms": round(sum(values) / len(values), 3),
+                "p50_ms": round(percentile(values, 50), 3),
+                "p95_ms": round(percentile(values, 95), 3),
+                "p99_ms": round(percentile(values, 99), 3),
+                "max_ms": round(values[-1], 3),
+            }
+        total = sum(r["requests"] for r in routes.values())
+        total_errors = sum(r["errors"] for r in routes.values())
+        return {
+            "summary": (f"In-process load test: {total} requests across {len(routes)} routes in "
+                        f"{elapsed:.2f}s ({total / elapsed if elapsed else 0:.1f} req/s) with "
+                        f"concurrency {self.concurrency}; {total_errors} errors."),
+            "backend_issues": {
+                "critical_bugs": [],
+                "flaky_endpoints": [route for route, r in routes.items() if r["errors"]]
+            },
+            "config": {
+                "concurrency": self.concurrency,
+                "total_requests": self.total_requests,
+                "duration_seconds": self.duration,
+                "scenario_weights": {name: weight for name, weight, _ in self.scenarios},
+            },
+            "scenarios": dict(self.scenario_counts),
+            "routes": routes,
+            "totals": {
+                "requests": total,
+                "errors": total_errors,
+                "elapsed_seconds": round(elapsed, 3),
+                "throughput_rps": round(total / elapsed, 2) if elapsed else 0.0,
+            },
+            "generated_at": datetime.now(timezone.utc).isoformat(),
+        }
+
+
+def compare_reports(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float = 0.25) -> List[str]:
+    """Return the routes whose p95 regressed by more than `tolerance` versus the baseline"""
+    regressions = []
+    for route, stats in current["routes"].items():
+        before = baseline.get("routes", {}).get(route)
+        if not before or not before["p95_ms"]:
+            continue
+        change = (stats["p95_ms"] - before["p95_ms"]) / before["p95_ms"]
+        marker = "⚠️ " if change > tolerance else "  "
+        print(f"{marker}{route}: p95 {before['p95_ms']:.2f} → {stats['p95_ms']:.2f} ms ({change:+.0%})")
+        if change > tolerance:
+            regressions.append(route)
+    return regressions
+
+
+def build_app(mongo_url: Optional[str] = None, db=None):
+    """
+    Import the API and point it at `db`, a real mongod or the in-memory stand-in.
+
+    This rebinds process-wide singletons (database.db, the admission
+    controller) for the rest of the process; callers that go on running other
+    code restore them (tests/test_load_test.py does so with monkeypatch).
+    """
+    import database
+    import server
+    from admission import admission_controller
+    # One client at full speed measures handler capacity; admission_bench.py covers overload
+    admission_controller.enabled = False
+    if db is not None:
+        database.db = db
+    elif mongo_url:
+        from motor.motor_asyncio import AsyncIOMotorClient
+        database.db = AsyncIOMotorClient(mongo_url)[os.environ.get("DB_NAME", "healthcare_ai_loadtest")]
+    else:
+        sys.path.insert(0, str(REPO_DIR))
+        from tests.fake_mongo import FakeDatabase
+        database.db = FakeDatabase()
+    return server.app
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=1000, help="total requests to send")
+    parser.add_argument("--duration", type=float, help="run for N seconds instead of a request count")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--mongo-url", help="use a real mongod instead of the in-memory stand-in")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="report path (default: test_reports/load_<timestamp>.json)")
+    parser.add_argument("--baseline", help="previous report to diff p95 latencies against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed p95 regression (fraction)")
+    args = parser.parse_args(argv)
+
+    print("🏥 Healthcare AI Platform - Load Test")
+    print("=" * 50)
+    tester = HealthcareLoadTester(build_app(args.mongo_url), concurrency=args.concurrency,
+                                  total_requests=args.requests, duration=args.duration, seed=args.seed)
+    report = asyncio.run(tester.run())
+
+    for route, stats in report["routes"].items():
+        print(f"{route:<55} {stats['requests']:>6} req  p50 {stats['p50_ms']:>8.2f}  "
+              f"p95 {stats['p95_ms']:>8.2f}  p99 {stats['p99_ms']:>8.2f} ms")
+    print("=" * 50)
+    print(f"📊 {report['summary']}")
+
+    output = Path(args.output) if args.output else (
+        REPORTS_DIR / f"load_{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S')}.json")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print(f"📝 Report written to {output}")
+
+    if args.baseline:
+        regressions = compare_reports(report, json.loads(Path(args.baseline).read_text()), args.tolerance)
+        if regressions:
+            print(f"⚠️  {len(regressions)} route(s) regressed beyond {args.tolerance:.0%}")
+            return 1
+    return 1 if report["totals"]["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Benchmark the medication-line parser against the regex it replaced.
+
+Adversarial `Medications:` sections (long lines full of list numbers and
+doses with no form, huge sections without a terminator, many commas) make
+the old lazy-group regex backtrack quadratically. The parser must stay
+linear on all of them.
+
+    python -m benchmarks.medication_parser_bench
+    python -m benchmarks.medication_parser_bench --sizes 500 1000 2000 4000
+"""
+import re
+import sys
+import time
+import argparse
+from typing import Callable, Dict, List, Optional
+
+import benchmarks  # noqa: F401  (puts backend/ on sys.path)
+
+from medication_parser import parse_medications
+from benchmarks.ai_service_bench import build_prescription, render_prescription_text, scaling_exponent
+
+# The pattern extract_with_regex used before the dedicated parser
+LEGACY_SECTION = re.compile(r"Medications?:(.+?)(?:Recommended Tests|Notes|$)", re.IGNORECASE | re.DOTALL)
+LEGACY_MEDICINE = re.compile(
+    r"(\d+)\.\s*([^\n]+?)\s+(\d+\s*mg|\d+\s*ml)\s*\(([^)]+)\)\s*-\s*([^,]+),\s*([^,]+),\s*Route:\s*([^,]+),\s*Qty:\s*(\d+)",
+    re.IGNORECASE
+)
+
+
+def legacy_parse(text: str) -> List[tuple]:
+    section = LEGACY_SECTION.search(text)
+    return LEGACY_MEDICINE.findall(section.group(1)) if section else []
+
+
+ADVERSARIAL_INPUTS: Dict[str, Callable[[int], str]] = {
+    # Every "1." restarts the lazy name group, which then scans to the end of the line
+    "list_numbers_without_form": lambda n: "Medications:\n1. " + "1.1 mg " * n + "\n",
+    # Dose and form present but the schedule never completes
+    "unterminated_schedule": lambda n: "Medications:\n" + "1. A 5 mg (tab) - x " * n + "\n",
+    # A well-formed but very long section
+    "long_valid_section": lambda n: render_prescription_text(build_prescription(medicines=n)),
+}
+
+
+def time_call(fn: Callable[[], object], repeats: int) -> float:
+    best = float("inf")
+    for _ in range(repeats):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def run(sizes: List[int], repeats: int, legacy_limit: float) -> Dict[str, Dict[str, object]]:
+    results = {}
+    for name, build in ADVERSARIAL_INPUTS.items():
+        parser_curve, legacy_curve = [], []
+        legacy_gave_up = False
+        for n in sizes:
+            text = build(n)
+            parser_curve.append((n, time_call(lambda: parse_medications(text), repeats)))
+            if not legacy_gave_up:
+                seconds = time_call(lambda: legacy_parse(text), 1)
+                legacy_curve.append((n, seconds))
+                # Stop timing the regex once a single input takes too long
+                legacy_gave_up = seconds > legacy_limit
+        results[name] = {
+            "parser": parser_curve,
+            "legacy": legacy_curve,
+            "parser_exponent": scaling_exponent(parser_curve),
+            "legacy_exponent": scaling_exponent(legacy_curve),
+        }
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="*", default=[250, 500, 1000, 2000])
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--legacy-limit", type=float, default=2.0,
+                        help="stop timing the legacy regex once one input exceeds this many seconds")
+    parser.add_argument("--max-exponent", type=float, default=1.4)
+    args = parser.parse_args(argv)
+
+    print("💊 Medication parser vs legacy regex")
+    print("=" * 50)
+    results = run(args.sizes, args.repeats, args.legacy_limit)
+    failed = False
+    for name, result in results.items():
+        legacy_exponent = (f"n^{result['legacy_exponent']:.2f}" if len(result["legacy"]) > 1
+                           else "too slow to fit")
+        print(f"{name}: parser n^{result['parser_exponent']:.2f}, legacy regex {legacy_exponent}")
+        legacy = dict(result["legacy"])
+        for n, seconds in result["parser"]:
+            before = f"{legacy[n] * 1000:10.2f} ms" if n in legacy else "   (skipped)"
+            print(f"    n={n:<6} parser {seconds * 1000:8.3f} ms   legacy {before}")
+        if result["parser_exponent"] > args.max_exponent:
+            failed = True
+            print(f"❌ {name}: parser grows super-linearly")
+    print("=" * 50)
+    print("❌ Parser scaling regression" if failed else "🎉 Parser is linear on all adversarial inputs")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Benchmark /api/search queries over a large synthetic prescription corpus.
+
+Prescriptions are generated from the sample_data.py vocabularies (clinics,
+prescribers, medicines, symptoms, tests) with dates spread over two years,
+indexed, and a fixed mix of clinician queries is timed. Fails when the p95
+query latency exceeds the budget.
+
+    python -m benchmarks.search_bench
+    python -m benchmarks.search_bench --docs 1000000 --budget-ms 50
+"""
+import sys
+import time
+import random
+import argparse
+import resource
+from datetime import date, timedelta
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+
+import benchmarks  # noqa: F401  (puts backend/ on sys.path)
+
+from search_index import SearchIndex
+from sample_data import SAMPLE_PRESCRIPTIONS
+from benchmarks.load_test import percentile
+
+_CLINICS = sorted({p["clinic"] for p in SAMPLE_PRESCRIPTIONS})
+_PRESCRIBERS = sorted({p["prescriber_name"] for p in SAMPLE_PRESCRIPTIONS})
+_SYMPTOMS = sorted({s for p in SAMPLE_PRESCRIPTIONS for s in p["symptoms"]})
+_TESTS = sorted({t for p in SAMPLE_PRESCRIPTIONS for t in p["recommended_tests"]})
+_MEDICINES = list({m["name"]: m for p in SAMPLE_PRESCRIPTIONS for m in p["medicines"]}.values())
+_NOTES = sorted({p["notes"] for p in SAMPLE_PRESCRIPTIONS})
+_STATUSES = ["pending", "approved", "dispensed", "rejected"]
+
+END_DATE = date(2025, 12, 31)
+
+# (label, query kwargs); relative dates are resolved against END_DATE
+QUERIES: List[Tuple[str, Dict[str, Any]]] = [
+    ("metformin + fatigue, last 90 days", {"q": "fatigue", "filters": {"medicine": ["Metformin"]}, "days": 90}),
+    ("single term", {"q": "cough"}),
+    ("two terms", {"q": "fever headache"}),
+    ("clinic + status facets", {"filters": {"clinic": [_CLINICS[0]], "status": ["pending"]}}),
+    ("prescriber, last 30 days", {"filters": {"prescriber": [_PRESCRIBERS[0]]}, "days": 30}),
+    ("date range only", {"days": 7}),
+    ("no match", {"q": "unobtainium"}),
+]
+
+
+def generate_prescriptions(count: int, seed: int = 3) -> Iterator[Dict[str, Any]]:
+    rng = random.Random(seed)
+    for i in range(count):
+        yield {
+            "id": f"presc-{i}",
+            "clinic": rng.choice(_CLINICS),
+            "prescriber_name": rng.choice(_PRESCRIBERS),
+            "patient_name": f"Patient {i % 50_000}",
+            "date": (END_DATE - timedelta(days=rng.randrange(730))).isoformat(),
+            "symptoms": rng.sample(_SYMPTOMS, rng.randint(1, 4)),
+            "medicines": rng.sample(_MEDICINES, rng.randint(1, 3)),
+            "recommended_tests": rng.sample(_TESTS, rng.randint(0, 2)),
+            "notes": rng.choice(_NOTES),
+            "status": rng.choice(_STATUSES),
+        }
+
+
+def run(docs: int, repeats: int) -> Dict[str, Any]:
+    index = SearchIndex()
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    started = time.perf_counter()
+    index.build(("prescription", p) for p in generate_prescriptions(docs))
+    build_seconds = time.perf_counter() - started
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    queries = {}
+    for label, spec in QUERIES:
+        spec = dict(spec)
+        days = spec.pop("days", None)
+        if days:
+            spec["date_from"] = (END_DATE - timedelta(days=days)).isoformat()
+        timings = []
+        for _ in range(repeats):
+            started = time.perf_counter()
+            result = index.search(**spec)
+            timings.append((time.perf_counter() - started) * 1000)
+        timings.sort()
+        queries[label] = {"total": result["total"], "p50_ms": round(percentile(timings, 50), 2),
+                          "p95_ms": round(percentile(timings, 95), 2)}
+    return {
+        "docs": docs,
+        "build_seconds": round(build_seconds, 1),
+        # ru_maxrss is KiB on Linux
+        "index_rss_mib": round((rss_after - rss_before) / 1024, 1),
+        "queries": queries,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=200_000)
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--budget-ms", type=float, default=50.0, help="fail when any query's p95 exceeds this")
+    args = parser.parse_args(argv)
+
+    print(f"🔎 Search benchmark over {args.docs:,} prescriptions")
+    print("=" * 50)
+    report = run(args.docs, args.repeats)
+    print(f"Indexed in {report['build_seconds']} s, ~{report['index_rss_mib']} MiB")
+    failed = []
+    for label, result in report["queries"].items():
+        print(f"  {label:<36} {result['total']:>8} hits   p50 {result['p50_ms']:7.2f} ms   "
+              f"p95 {result['p95_ms']:7.2f} ms")
+        if result["p95_ms"] > args.budget_ms:
+            failed.append(label)
+    print("=" * 50)
+    if failed:
+        print(f"❌ Over the {args.budget_ms:.0f} ms budget: {', '.join(failed)}")
+        return 1
+    print(f"🎉 All queries within {args.budget_ms:.0f} ms at p95")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
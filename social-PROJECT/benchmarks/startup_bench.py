@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Cold start and per-worker memory of the multi-process server (backend/serve.py).
+
+Measures the import time of the application in a fresh interpreter, then
+starts `python -m serve` with and without preloading and reports the time
+until every worker has finished its startup hooks and answered a request,
+and each worker's RSS, PSS (RSS with shared pages divided among the processes
+sharing them) and USS (pages only that worker holds), from
+/proc/<pid>/smaps_rollup (Linux). Fails when preloading does not lower the
+memory each worker holds on its own.
+
+Without a reachable MongoDB (MONGO_URL, or --mongo-url) the startup hooks
+fail fast instead of loading data; import and fork costs are unaffected.
+
+    python -m benchmarks.startup_bench
+    python -m benchmarks.startup_bench --workers 8 --mongo-url mongodb://localhost:27017
+"""
+import os
+import sys
+import time
+import socket
+import signal
+import statistics
+import subprocess
+import argparse
+import urllib.request
+from typing import Dict, Any, List, Optional
+
+from benchmarks import BACKEND_DIR
+
+UNREACHABLE_MONGO = "mongodb://127.0.0.1:1/?serverSelectionTimeoutMS=10"
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _memory_kib(pid: int) -> Dict[str, int]:
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                fields[parts[0].rstrip(":")] = int(parts[1])
+    return {"rss": fields["Rss"], "pss": fields["Pss"],
+            "uss": fields["Private_Clean"] + fields["Private_Dirty"]}
+
+
+def import_seconds(env: Dict[str, str], repeats: int) -> float:
+    """Median time to import the application in a fresh interpreter"""
+    code = "import time; t = time.perf_counter(); import server; print(time.perf_counter() - t)"
+    samples = [float(subprocess.run([sys.executable, "-c", code], cwd=BACKEND_DIR, env=env, check=True,
+                                    capture_output=True, text=True).stdout.strip().splitlines()[-1])
+               for _ in range(repeats)]
+    return statistics.median(samples)
+
+
+def start_server(env: Dict[str, str], workers: int, preload: bool, timeout: float) -> Dict[str, Any]:
+    port = _free_port()
+    command = [sys.executable, "-m", "serve", "--host", "127.0.0.1", "--port", str(port),
+               "--workers", str(workers), "--no-access-log", "--log-level", "warning"]
+    if not preload:
+        command.append("--no-preload")
+    started = time.perf_counter()
+    process = subprocess.Popen(command, cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL,
+                               stderr=subprocess.DEVNULL)
+    try:
+        children: List[int] = []
+        deadline = started + timeout
+        # Ready once every worker has been forked and the server answers requests
+        while time.perf_counter() < deadline:
+            children = [int(p) for p in open(f"/proc/{process.pid}/task/{process.pid}/children").read().split()]
+            if len(children) == workers:
+                try:
+                    urllib.request.urlopen(f"http://127.0.0.1:{port}/api/auth/roles", timeout=1).read()
+                    break
+                except OSError:
+                    pass
+            time.sleep(0.02)
+        else:
+            raise RuntimeError(f"server not ready within {timeout}s")
+        first_response = time.perf_counter() - started
+        # Let every worker finish its startup hooks before sampling memory
+        for _ in range(workers * 4):
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/api/auth/roles", timeout=5).read()
+        time.sleep(1.0)
+        memory = [_memory_kib(pid) for pid in children]
+        return {
+            "first_response_s": round(first_response, 3),
+            "master": _memory_kib(process.pid),
+            "workers": {key: round(statistics.mean(m[key] for m in memory) / 1024, 1) for key in ("rss", "pss", "uss")},
+        }
+    finally:
+        process.send_signal(signal.SIGTERM)
+        try:
+            process.wait(30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--repeats", type=int, default=5, help="fresh interpreters for the import timing")
+    parser.add_argument("--mongo-url", default=os.environ.get("MONGO_URL", UNREACHABLE_MONGO))
+    parser.add_argument("--timeout", type=float, default=60.0)
+    args = parser.parse_args(argv)
+    env = {**os.environ, "MONGO_URL": args.mongo_url}
+
+    print(f"🚀 Startup benchmark: {args.workers} workers")
+    print("=" * 60)
+    print(f"import server (fresh interpreter, median of {args.repeats}): "
+          f"{import_seconds(env, args.repeats) * 1e3:.0f} ms")
+    results = {}
+    for preload in (True, False):
+        label = "preload" if preload else "no-preload"
+        result = results[label] = start_server(env, args.workers, preload, args.timeout)
+        workers = result["workers"]
+        print(f"{label:<11} first response {result['first_response_s'] * 1e3:7.0f} ms   per worker: "
+              f"RSS {workers['rss']:6.1f} MiB  PSS {workers['pss']:6.1f} MiB  USS {workers['uss']:6.1f} MiB"
+              f"   master RSS {result['master']['rss'] / 1024:6.1f} MiB")
+    print("=" * 60)
+    shared, separate = results["preload"]["workers"], results["no-preload"]["workers"]
+    if shared["uss"] >= separate["uss"]:
+        print(f"❌ Preloading did not lower per-worker private memory ({shared['uss']} vs {separate['uss']} MiB)")
+        return 1
+    print(f"🎉 Preloading: {separate['uss'] - shared['uss']:.1f} MiB less private memory per worker "
+          f"({args.workers} workers: {(separate['pss'] - shared['pss']) * args.workers:.0f} MiB less in total PSS)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Measure the compact storage format on a large synthetic dataset.
+
+Prescriptions are generated from the sample_data.py vocabularies (see
+search_bench.py), each with its AI summary, and every document is BSON-encoded
+in the original layout and in the compact one (dictionary-encoded prescription
+fields; summaries without `raw_data` and with provenance rows). BSON bytes are
+what MongoDB keeps per document in its cache, so their total is the working
+set of the two collections; zlib over 32 KiB pages approximates the on-disk
+size after block compression. Fails when the working set shrinks by less than
+the target.
+
+    python -m benchmarks.storage_bench
+    python -m benchmarks.storage_bench --docs 1000000 --min-reduction 0.4
+"""
+import sys
+import time
+import zlib
+import asyncio
+import argparse
+from typing import Dict, Any, List, Optional
+
+import bson
+
+import benchmarks  # noqa: F401  (puts backend/ on sys.path)
+
+from ai_service import AIService, prescription_to_extracted_data, source_content_hash
+from compact_storage import DictionaryCodec, PrescriptionCodec, SummaryCodec
+from benchmarks.search_bench import generate_prescriptions
+from tests.fake_mongo import FakeDatabase
+
+PAGE_BYTES = 32 * 1024
+
+
+class SizeCounter:
+    """Sums BSON document sizes and zlib-compressed 32 KiB pages"""
+
+    def __init__(self):
+        self.bson_bytes = 0
+        self.compressed_bytes = 0
+        self._page = bytearray()
+
+    def add(self, doc: Dict[str, Any]):
+        encoded = bson.encode(doc)
+        self.bson_bytes += len(encoded)
+        self._page += encoded
+        if len(self._page) >= PAGE_BYTES:
+            self._flush()
+
+    def _flush(self):
+        if self._page:
+            self.compressed_bytes += len(zlib.compress(bytes(self._page), 6))
+            self._page = bytearray()
+
+    def totals(self) -> Dict[str, int]:
+        self._flush()
+        return {"bson_bytes": self.bson_bytes, "compressed_bytes": self.compressed_bytes}
+
+
+def summary_for(service: AIService, prescription: Dict[str, Any]) -> Dict[str, Any]:
+    extracted = prescription_to_extracted_data(prescription)
+    text, links = service.generate_summary_with_provenance(extracted, prescription["id"])
+    return {
+        "id": f"summary-{prescription['id']}",
+        "patient_id": "",
+        "patient_name": prescription["patient_name"],
+        "summary_text": text,
+        "provenance_links": links,
+        "raw_data": extracted,
+        "prescription_id": prescription["id"],
+        "source_hash": source_content_hash(extracted, prescription["id"]),
+        "created_at": "2025-12-31T00:00:00+00:00",
+    }
+
+
+async def measure(docs: int) -> Dict[str, Any]:
+    db = FakeDatabase()
+    prescriptions = PrescriptionCodec(DictionaryCodec())
+    summaries = SummaryCodec()
+    service = AIService()
+    sizes = {name: SizeCounter() for name in
+             ("prescriptions", "prescriptions_compact", "summaries", "summaries_compact")}
+    encode_seconds = decode_seconds = 0.0
+
+    for i, prescription in enumerate(generate_prescriptions(docs)):
+        prescription.update({"prescription_number": i + 1, "patient_age": 20 + i % 60, "patient_sex": "Female",
+                             "prescriber_reg_number": f"{zlib.crc32(prescription['prescriber_name'].encode()):08x}",
+                             "created_at": "2025-12-31T00:00:00+00:00"})
+        summary = summary_for(service, prescription)
+
+        started = time.perf_counter()
+        compact_prescription = await prescriptions.encode(db, prescription)
+        compact_summary = await summaries.encode(db, summary)
+        decoded = time.perf_counter()
+        restored = await prescriptions.decode(db, [compact_prescription])
+        await summaries.decode(db, [compact_summary])
+        finished = time.perf_counter()
+        encode_seconds += decoded - started
+        decode_seconds += finished - decoded
+        if i < 1000:
+            assert restored[0] == prescription
+
+        sizes["prescriptions"].add(prescription)
+        sizes["prescriptions_compact"].add(compact_prescription)
+        sizes["summaries"].add(summary)
+        sizes["summaries_compact"].add(compact_summary)
+
+    totals = {name: counter.totals() for name, counter in sizes.items()}
+    dictionary_bytes = sum(len(bson.encode(entry)) for entry in db.dictionaries.docs)
+    return {
+        "docs": docs,
+        "sizes": totals,
+        "dictionary_entries": len(db.dictionaries.docs),
+        "dictionary_bytes": dictionary_bytes,
+        "encode_us": round(encode_seconds / docs * 1e6, 2),
+        "decode_us": round(decode_seconds / docs * 1e6, 2),
+    }
+
+
+def _mib(n: int) -> str:
+    return f"{n / 2 ** 20:9.1f} MiB"
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=200_000)
+    parser.add_argument("--min-reduction", type=float, default=0.4,
+                        help="fail when the working set shrinks by less than this fraction")
+    args = parser.parse_args(argv)
+
+    print(f"🗜️  Storage benchmark over {args.docs:,} prescriptions + summaries")
+    print("=" * 50)
+    report = asyncio.run(measure(args.docs))
+    sizes = report["sizes"]
+    for collection in ("prescriptions", "summaries"):
+        before, after = sizes[collection], sizes[f"{collection}_compact"]
+        print(f"{collection}")
+        print(f"  BSON     {_mib(before['bson_bytes'])} -> {_mib(after['bson_bytes'])}"
+              f"  ({1 - after['bson_bytes'] / before['bson_bytes']:.0%} smaller)")
+        print(f"  on disk  {_mib(before['compressed_bytes'])} -> {_mib(after['compressed_bytes'])}"
+              f"  ({1 - after['compressed_bytes'] / before['compressed_bytes']:.0%} smaller)")
+    before = sizes["prescriptions"]["bson_bytes"] + sizes["summaries"]["bson_bytes"]
+    after = (sizes["prescriptions_compact"]["bson_bytes"] + sizes["summaries_compact"]["bson_bytes"]
+             + report["dictionary_bytes"])
+    reduction = 1 - after / before
+    print(f"dictionary: {report['dictionary_entries']} entries, {report['dictionary_bytes']:,} bytes")
+    print(f"encode {report['encode_us']} us/doc, decode {report['decode_us']} us/doc")
+    print("=" * 50)
+    if reduction < args.min_reduction:
+        print(f"❌ Working set {_mib(before).strip()} -> {_mib(after).strip()} is only {reduction:.0%} smaller")
+        return 1
+    print(f"🎉 Working set {_mib(before).strip()} -> {_mib(after).strip()} ({reduction:.0%} smaller)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,43 @@
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+# Backend modules import each other as top-level modules (e.g. `from models import ...`)
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+sys.path.insert(0, str(BACKEND_DIR))
+
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "healthcare_ai_test_db")
+
+# Needs backend/ on sys.path and the environment above
+import database
+from admission import admission_controller
+from jobs import job_queue
+from models import PrescriptionCreate
+from routes import prescriptions
+from tests.fake_mongo import FakeDatabase
+
+
+@pytest.fixture
+def db(monkeypatch):
+    """Point the whole API at an empty in-memory database, unthrottled and with fresh job stats.
+
+    Test modules that need seed data or more isolation override `db` and request this one.
+    """
+    fake = FakeDatabase()
+    monkeypatch.setattr(database, "db", fake)
+    monkeypatch.setattr(admission_controller, "enabled", False)
+    monkeypatch.setattr(job_queue, "stats", {})
+    return fake
+
+
+@pytest.fixture
+def create_prescription(db):
+    """Create a prescription through the API from a sample document, with any fields overridden"""
+    def create(prescription, **overrides):
+        fields = {k: v for k, v in {**prescription, **overrides}.items() if k in PrescriptionCreate.model_fields}
+        return prescriptions.create_prescription(PrescriptionCreate(**fields),
+                                                 doctor_name=prescription["prescriber_name"], doctor_reg="reg")
+    return create
@@ -0,0 +1,75 @@
+"""
+Local fake of LlamaCloud stateless extraction, served over httpx's ASGI transport.
+
+Mirrors the real job flow: POST /api/v1/extraction/run answers with a PENDING
+job, GET /api/v1/extraction/jobs/{id} reports its status until it finishes and
+GET /api/v1/extraction/jobs/{id}/result returns the extracted `data`.
+"""
+import time
+import uuid
+
+import httpx
+from fastapi import FastAPI, Request
+from fastapi.responses import HTMLResponse, JSONResponse
+
+from ai_service import ai_service
+
+
+class FakeLlamaCloud:
+    def __init__(self, delay: float = 0.0, fail_first: int = 0, status_code: int = 500, job_status: str = "SUCCESS"):
+        self.delay = delay
+        self.fail_first = fail_first
+        self.status_code = status_code
+        self.job_status = job_status
+        self.requests = 0
+        self.polls = 0
+        self.payloads = []
+        self.jobs = {}
+        self.active = 0
+        self.max_active = 0
+        self.app = FastAPI()
+        self.app.post("/api/v1/extraction/run")(self.run)
+        self.app.get("/api/v1/extraction/jobs/{job_id}")(self.get_job)
+        self.app.get("/api/v1/extraction/jobs/{job_id}/result")(self.get_job_result)
+
+    async def run(self, request: Request):
+        self.requests += 1
+        if not request.headers.get("authorization", "").startswith("Bearer "):
+            return JSONResponse({"detail": "Invalid authentication credentials"}, status_code=401)
+        if self.requests <= self.fail_first:
+            if self.status_code == 200:
+                # A proxy answering for the service
+                return HTMLResponse("<html><body>Service temporarily unavailable</body></html>")
+            return JSONResponse({"detail": "unavailable"}, status_code=self.status_code)
+        payload = await request.json()
+        self.payloads.append(payload)
+        if not isinstance(payload.get("data_schema"), dict) or not isinstance(payload.get("config"), dict) \
+                or not payload.get("text"):
+            return JSONResponse({"detail": [{"msg": "field required"}]}, status_code=422)
+        job_id = str(uuid.uuid4())
+        self.jobs[job_id] = {"text": payload["text"], "ready_at": time.monotonic() + self.delay, "status": "PENDING"}
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        return {"id": job_id, "status": "PENDING", "error": None}
+
+    async def get_job(self, job_id: str):
+        self.polls += 1
+        job = self.jobs.get(job_id)
+        if job is None:
+            return JSONResponse({"detail": "Job not found"}, status_code=404)
+        if job["status"] == "PENDING" and time.monotonic() >= job["ready_at"]:
+            job["status"] = self.job_status
+            self.active -= 1
+        error = "Extraction failed" if job["status"] == "ERROR" else None
+        return {"id": job_id, "status": job["status"], "error": error}
+
+    async def get_job_result(self, job_id: str):
+        job = self.jobs.get(job_id)
+        if job is None or job["status"] != "SUCCESS":
+            return JSONResponse({"detail": "Job has no result"}, status_code=404)
+        data = ai_service.extract_with_regex(job["text"])
+        data["diagnosis"] = "remote"
+        return {"run_id": str(uuid.uuid4()), "extraction_agent_id": None, "data": data, "extraction_metadata": {}}
+
+    def transport(self) -> httpx.ASGITransport:
+        return httpx.ASGITransport(app=self.app)
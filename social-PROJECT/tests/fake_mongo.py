@@ -0,0 +1,389 @@
+"""In-memory stand-in for the subset of Motor's collection API the backend uses"""
+import copy
+import re
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+
+def _get(doc: Dict[str, Any], path: str):
+    value = doc
+    for part in path.split("."):
+        if isinstance(value, list) and part.isdigit():
+            value = value[int(part)] if int(part) < len(value) else None
+        elif isinstance(value, list):
+            return [_get(v, part) for v in value if isinstance(v, dict)]
+        elif isinstance(value, dict):
+            value = value.get(part)
+        else:
+            return None
+    return value
+
+
+def _matches_value(actual, condition) -> bool:
+    if isinstance(condition, dict) and condition and all(k.startswith("$") for k in condition):
+        for op, expected in condition.items():
+            if op == "$in":
+                if isinstance(actual, list):
+                    if not any(a in expected for a in actual):
+                        return False
+                elif actual not in expected:
+                    return False
+            elif op == "$nin" and actual in expected:
+                return False
+            elif op == "$ne" and actual == expected:
+                return False
+            elif op == "$gt" and not (actual is not None and actual > expected):
+                return False
+            elif op == "$gte" and not (actual is not None and actual >= expected):
+                return False
+            elif op == "$lt" and not (actual is not None and actual < expected):
+                return False
+            elif op == "$lte" and not (actual is not None and actual <= expected):
+                return False
+            elif op == "$exists" and (actual is not None) != bool(expected):
+                return False
+            elif op == "$regex" and not (isinstance(actual, str) and re.search(expected, actual)):
+                return False
+        return True
+    if isinstance(actual, list) and not isinstance(condition, list):
+        return condition in actual
+    return actual == condition
+
+
+def matches(doc: Dict[str, Any], query: Dict[str, Any]) -> bool:
+    for key, condition in query.items():
+        if key == "$or":
+            if not any(matches(doc, q) for q in condition):
+                return False
+        elif key == "$and":
+            if not all(matches(doc, q) for q in condition):
+                return False
+        elif not _matches_value(_get(doc, key), condition):
+            return False
+    return True
+
+
+def _project(doc: Dict[str, Any], projection: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    doc = copy.deepcopy(doc)
+    if not projection:
+        return doc
+    included = [k for k, v in projection.items() if v and k != "_id"]
+    if included:
+        result = {}
+        for key in included:
+            value = _get(doc, key)
+            if value is not None:
+                _set_path(result, key, value)
+        if projection.get("_id", 1) and "_id" in doc:
+            result["_id"] = doc["_id"]
+        return result
+    for key, value in projection.items():
+        if not value:
+            doc.pop(key, None)
+    return doc
+
+
+def _set_path(doc: Dict[str, Any], path: str, value):
+    parts = path.split(".")
+    for part in parts[:-1]:
+        doc = doc.setdefault(part, {})
+    doc[parts[-1]] = value
+
+
+def _apply_update(doc: Dict[str, Any], update: Dict[str, Any], inserting: bool):
+    for op, fields in update.items():
+        for key, value in fields.items():
+            if op == "$set":
+                _set_path(doc, key, copy.deepcopy(value))
+            elif op == "$setOnInsert" and inserting:
+                _set_path(doc, key, copy.deepcopy(value))
+            elif op == "$inc":
+                _set_path(doc, key, (_get(doc, key) or 0) + value)
+            elif op == "$push":
+                current = _get(doc, key) or []
+                _set_path(doc, key, current + [copy.deepcopy(value)])
+            elif op == "$unset":
+                doc.pop(key, None)
+
+
+class UpdateResult:
+    def __init__(self, matched_count: int, modified_count: int, upserted_id=None):
+        self.matched_count = matched_count
+        self.modified_count = modified_count
+        self.upserted_id = upserted_id
+
+
+class InsertOneResult:
+    def __init__(self, inserted_id):
+        self.inserted_id = inserted_id
+
+
+class DeleteResult:
+    def __init__(self, deleted_count: int):
+        self.deleted_count = deleted_count
+
+
+class BulkWriteResult:
+    def __init__(self, matched_count: int, modified_count: int, upserted_count: int, inserted_count: int):
+        self.matched_count = matched_count
+        self.modified_count = modified_count
+        self.upserted_count = upserted_count
+        self.inserted_count = inserted_count
+
+
+class FakeCursor:
+    def __init__(self, collection: "FakeCollection", docs: List[Dict[str, Any]], projection):
+        self._collection = collection
+        self._docs = docs
+        self._projection = projection
+        self._limit = 0
+
+    def sort(self, key, direction=None):
+        keys = [(key, direction or 1)] if isinstance(key, str) else list(key)
+        for field, order in reversed(keys):
+            self._docs.sort(key=lambda d: (_get(d, field) is None, _get(d, field)), reverse=order < 0)
+        return self
+
+    def limit(self, n: int):
+        self._limit = n
+        return self
+
+    def skip(self, n: int):
+        self._docs = self._docs[n:]
+        return self
+
+    async def to_list(self, length: Optional[int] = None):
+        self._collection.database.round_trips += 1
+        docs = self._docs
+        if self._limit:
+            docs = docs[:self._limit]
+        if length:
+            docs = docs[:length]
+        return [_project(d, self._projection) for d in docs]
+
+    def __aiter__(self):
+        self._iter = iter(self._docs[:self._limit] if self._limit else self._docs)
+        self._collection.database.round_trips += 1
+        return self
+
+    async def __anext__(self):
+        try:
+            return _project(next(self._iter), self._projection)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+class FakeCollection:
+    def __init__(self, database: "FakeDatabase", name: str):
+        self.database = database
+        self.name = name
+        self.docs: List[Dict[str, Any]] = []
+        # (field, partialFilterExpression or None)
+        self.unique_keys: List[Tuple[str, Optional[Dict[str, Any]]]] = []
+        self.indexes: List[Any] = []
+        self._next_id = 0
+
+    def _count(self):
+        self.database.round_trips += 1
+        self.database.calls[self.name] += 1
+
+    def _check_unique(self, doc: Dict[str, Any], ignore: Optional[Dict[str, Any]] = None):
+        for key, partial in self.unique_keys:
+            if partial is not None and not matches(doc, partial):
+                continue
+            value = _get(doc, key)
+            for other in self.docs:
+                if other is ignore or other is doc or (partial is not None and not matches(other, partial)):
+                    continue
+                if _get(other, key) == value:
+                    raise DuplicateKeyError(f"E11000 duplicate key error collection: {self.name} key: {key}")
+
+    def _insert(self, doc: Dict[str, Any]):
+        if "_id" not in doc:
+            self._next_id += 1
+            doc["_id"] = f"{self.name}-{self._next_id}"
+        stored = copy.deepcopy(doc)
+        self._check_unique(stored)
+        self.docs.append(stored)
+        return doc["_id"]
+
+    def _find_matching(self, query, sort=None) -> List[Dict[str, Any]]:
+        docs = self.docs
+        entity_id = (query or {}).get("id")
+        if isinstance(entity_id, str):
+            # Stands in for the unique index on `id`, so lookups by id stay cheap in large collections
+            docs = [d for d in docs if d.get("id") == entity_id]
+        docs = [d for d in docs if matches(d, query or {})]
+        if sort:
+            for field, order in reversed(list(sort)):
+                docs.sort(key=lambda d: (_get(d, field) is None, _get(d, field)), reverse=order < 0)
+        return docs
+
+    async def create_index(self, keys, unique: bool = False, **kwargs):
+        self._count()
+        self.indexes.append((keys, unique, kwargs))
+        if unique and isinstance(keys, str):
+            self.unique_keys.append((keys, kwargs.get("partialFilterExpression")))
+        return keys if isinstance(keys, str) else "_".join(k for k, _ in keys)
+
+    def find(self, query=None, projection=None, sort=None, limit: int = 0):
+        cursor = FakeCursor(self, self._find_matching(query), projection)
+        if sort:
+            cursor.sort(sort)
+        if limit:
+            cursor.limit(limit)
+        return cursor
+
+    async def find_one(self, query=None, projection=None, sort=None):
+        self._count()
+        docs = self._find_matching(query, sort)
+        return _project(docs[0], projection) if docs else None
+
+    async def count_documents(self, query):
+        self._count()
+        return len(self._find_matching(query))
+
+    async def insert_one(self, doc):
+        self._count()
+        return InsertOneResult(self._insert(doc))
+
+    async def insert_many(self, docs, ordered: bool = True):
+        self._count()
+        for doc in docs:
+            self._insert(doc)
+
+    def _update(self, query, update, upsert: bool, many: bool = False) -> UpdateResult:
+        targets = self._find_matching(query)
+        if not many:
+            targets = targets[:1]
+        if not targets:
+            if not upsert:
+                return UpdateResult(0, 0)
+            doc = {k: v for k, v in query.items() if not k.startswith("$") and not isinstance(v, dict)}
+            _apply_update(doc, update, inserting=True)
+            return UpdateResult(0, 0, upserted_id=self._insert(doc))
+        modified = 0
+        for target in targets:
+            before = copy.deepcopy(target)
+            _apply_update(target, update, inserting=False)
+            try:
+                self._check_unique(target, ignore=target)
+            except DuplicateKeyError:
+                target.clear()
+                target.update(before)
+                raise
+            if target != before:
+                modified += 1
+        return UpdateResult(len(targets), modified)
+
+    async def update_one(self, query, update, upsert: bool = False):
+        self._count()
+        return self._update(query, update, upsert)
+
+    async def update_many(self, query, update, upsert: bool = False):
+        self._count()
+        return self._update(query, update, upsert, many=True)
+
+    async def replace_one(self, query, replacement, upsert: bool = False):
+        self._count()
+        targets = self._find_matching(query)[:1]
+        if not targets:
+            if upsert:
+                return UpdateResult(0, 0, upserted_id=self._insert(dict(replacement)))
+            return UpdateResult(0, 0)
+        target = targets[0]
+        _id = target.get("_id")
+        target.clear()
+        target.update(copy.deepcopy(replacement))
+        target["_id"] = _id
+        return UpdateResult(1, 1)
+
+    async def find_one_and_update(self, query, update, projection=None, upsert: bool = False,
+                                  return_document=ReturnDocument.BEFORE, sort=None):
+        self._count()
+        targets = self._find_matching(query, sort)[:1]
+        if not targets:
+            if not upsert:
+                return None
+            doc = {k: v for k, v in query.items() if not k.startswith("$") and not isinstance(v, dict)}
+            _apply_update(doc, update, inserting=True)
+            self._insert(doc)
+            return _project(self.docs[-1], projection) if return_document == ReturnDocument.AFTER else None
+        target = targets[0]
+        before = copy.deepcopy(target)
+        _apply_update(target, update, inserting=False)
+        try:
+            self._check_unique(target, ignore=target)
+        except DuplicateKeyError:
+            target.clear()
+            target.update(before)
+            raise
+        return _project(target if return_document == ReturnDocument.AFTER else before, projection)
+
+    async def delete_one(self, query):
+        self._count()
+        docs = self._find_matching(query)[:1]
+        for doc in docs:
+            self.docs.remove(doc)
+        return DeleteResult(len(docs))
+
+    async def delete_many(self, query):
+        self._count()
+        docs = self._find_matching(query)
+        for doc in docs:
+            self.docs.remove(doc)
+        return DeleteResult(len(docs))
+
+    async def bulk_write(self, requests, ordered: bool = True):
+        self._count()
+        matched = modified = upserted = inserted = 0
+        for request in requests:
+            kind = type(request).__name__
+            doc = request._doc if hasattr(request, "_doc") else None
+            if kind == "InsertOne":
+                self._insert(doc)
+                inserted += 1
+                continue
+            query = request._filter
+            if kind in ("UpdateOne", "UpdateMany"):
+                result = self._update(query, request._doc, bool(request._upsert), many=kind == "UpdateMany")
+            elif kind == "DeleteOne" or kind == "DeleteMany":
+                targets = self._find_matching(query)
+                for target in (targets if kind == "DeleteMany" else targets[:1]):
+                    self.docs.remove(target)
+                continue
+            else:
+                raise NotImplementedError(kind)
+            matched += result.matched_count
+            modified += result.modified_count
+            upserted += 1 if result.upserted_id is not None else 0
+        return BulkWriteResult(matched, modified, upserted, inserted)
+
+    def aggregate(self, pipeline):
+        raise NotImplementedError("aggregate is not supported by the in-memory database")
+
+
+class FakeDatabase:
+    """Dict-of-collections database; `round_trips` counts every simulated server call"""
+
+    def __init__(self):
+        self._collections: Dict[str, FakeCollection] = {}
+        self.round_trips = 0
+        self.calls: Dict[str, int] = defaultdict(int)
+
+    def __getitem__(self, name: str) -> FakeCollection:
+        if name not in self._collections:
+            self._collections[name] = FakeCollection(self, name)
+        return self._collections[name]
+
+    def __getattr__(self, name: str) -> FakeCollection:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+
+    async def list_collection_names(self):
+        self.round_trips += 1
+        return list(self._collections)
@@ -0,0 +1,149 @@
+import asyncio
+
+import httpx
+import pytest
+
+import database
+import server
+from admission import (
+    AdmissionController, AdmissionMiddleware, AdmissionRoute, InMemoryAdmissionBackend, admission_controller,
+    parse_networks, parse_role_rates,
+)
+from benchmarks import admission_bench
+from tests.fake_mongo import FakeDatabase
+
+
+@pytest.fixture
+def controller(monkeypatch):
+    """The app's controller with fresh buckets (the load test disables it)"""
+    monkeypatch.setattr(admission_controller, "enabled", True)
+    monkeypatch.setattr(admission_controller, "backend", InMemoryAdmissionBackend())
+    monkeypatch.setattr(admission_controller, "by_role", {})
+    monkeypatch.setattr(admission_controller, "by_route", {})
+    monkeypatch.setattr(database, "db", FakeDatabase())
+    return admission_controller
+
+
+def _send(app, *requests, address: str = "127.0.0.1"):
+    async def scenario():
+        transport = httpx.ASGITransport(app=app, client=(address, 4000))
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return [await client.request(method, path, headers=headers) for method, path, headers in requests]
+
+    return asyncio.run(scenario())
+
+
+def test_parse_role_rates():
+    assert parse_role_rates("student=10:20, doctor=5,") == {"student": (10.0, 20.0), "doctor": (5.0, 5.0)}
+
+
+def test_client_bucket_refuses_with_429_and_retry_after(controller, monkeypatch):
+    monkeypatch.setattr(controller, "role_rates", {"anonymous": (1, 2), "student": (1, 1), "doctor": (1, 3)})
+    # A new token on every request is still the same client
+    rotating = [("GET", "/api/auth/roles", {"X-User-Role": "doctor", "Authorization": f"Bearer {i}"})
+                for i in range(3)]
+    student = {"X-User-Role": "student"}
+
+    first = _send(server.app, *rotating, address="10.0.0.1")
+    second = _send(server.app, *[("GET", "/api/auth/roles", student)] * 2, address="10.0.0.2")
+
+    # The unverified doctor claim is more generous than anonymous, so it gets the anonymous burst of 2
+    assert [r.status_code for r in first] == [200, 200, 429]
+    assert [r.status_code for r in second] == [200, 429]
+    assert first[2].headers["retry-after"] == "1"
+    assert first[2].json() == {"detail": "Too many requests for role 'anonymous'"}
+    assert controller.metrics()["roles"] == {"anonymous": {"admitted": 2, "rate_limited": 1},
+                                              "student": {"admitted": 1, "rate_limited": 1}}
+
+
+def test_clients_behind_trusted_proxies_get_their_own_buckets(controller, monkeypatch):
+    monkeypatch.setattr(controller, "role_rates", {"anonymous": (1, 1)})
+    monkeypatch.setattr(controller, "trusted_proxies", parse_networks("10.1.0.0/16"))
+
+    def via_proxy(forwarded_for):
+        return ("GET", "/api/auth/roles", {"X-Forwarded-For": forwarded_for})
+
+    first = _send(server.app, via_proxy("203.0.113.7"), via_proxy("203.0.113.8"), address="10.1.0.5")
+    # A forged left-most hop does not move the caller to a fresh bucket
+    forged = _send(server.app, via_proxy("198.51.100.1, 203.0.113.7"), address="10.1.0.6")
+    # Only trusted proxies are believed
+    direct = _send(server.app, via_proxy("203.0.113.9"), via_proxy("203.0.113.10"), address="192.0.2.1")
+
+    assert [r.status_code for r in first] == [200, 200]
+    assert [r.status_code for r in forged] == [429]
+    assert [r.status_code for r in direct] == [200, 429]
+
+
+def test_health_and_metrics_are_never_limited(controller, monkeypatch):
+    monkeypatch.setattr(controller, "role_rates", {"anonymous": (1, 1)})
+
+    responses = _send(server.app, *[("GET", "/api/health", {})] * 3, ("GET", "/api/metrics/admission", {}),
+                      ("GET", "/api/", {}), ("GET", "/api/", {}))
+
+    assert [r.status_code for r in responses] == [200, 200, 200, 200, 200, 429]
+    assert responses[3].json()["enabled"] is True
+
+
+def test_seeding_is_limited_across_clients(controller, monkeypatch):
+    monkeypatch.setattr(controller, "role_rates", {})
+
+    first = _send(server.app, ("POST", "/api/seed-database", {}), address="10.0.0.1")
+    second = _send(server.app, ("POST", "/api/seed-database", {}), address="10.0.0.2")
+    responses = first + second
+
+    assert responses[0].status_code == 202
+    assert responses[1].status_code == 429
+    assert int(responses[1].headers["retry-after"]) >= 59
+    assert controller.metrics()["routes"]["seed_database"]["rate_limited"] == 1
+
+
+def test_concurrency_cap_answers_503_and_frees_the_slot():
+    route = AdmissionRoute("slow", "GET", r"/slow", concurrency=1, retry_after=3)
+    controller = AdmissionController(role_rates={}, routes=[route], enabled=True)
+    release = asyncio.Event()
+    started = asyncio.Event()
+
+    async def slow_app(scope, receive, send):
+        started.set()
+        await release.wait()
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"done"})
+
+    app = AdmissionMiddleware(slow_app, controller=controller)
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            first = asyncio.create_task(client.get("/slow"))
+            await started.wait()
+            assert controller.metrics()["in_flight"] == {"route:slow": 1}
+            busy = await client.get("/slow")
+            release.set()
+            return busy, await first, await client.get("/slow")
+
+    busy, first, again = asyncio.run(scenario())
+
+    assert (busy.status_code, busy.headers["retry-after"]) == (503, "3")
+    assert first.status_code == 200 and again.status_code == 200
+    assert controller.metrics()["in_flight"] == {}
+    assert controller.metrics()["routes"]["slow"] == {"admitted": 2, "over_capacity": 1}
+
+
+def test_admission_keeps_admitted_latency_bounded_under_overload():
+    """A short admission_bench run: 4x overload of a 2-slot, 40 ms backend"""
+    route = AdmissionRoute("generate_summary", "POST", r"/api/ai-summaries/generate/[^/]+", rate=50, burst=4,
+                           concurrency=2)
+    args = dict(slots=2, service_ms=40, overload=4, duration=1.0, clients=50, route=route)
+
+    off = admission_bench.run(False, **args)
+    on = admission_bench.run(True, **args)
+
+    assert off["statuses"] == {200: off["requests"]}
+    assert on["statuses"].get(200) and on["statuses"].get(429, 0) + on["statuses"].get(503, 0)
+    assert on["peak_backend_in_use"] <= 2
+    # Without admission the backlog grows for the whole second of overload
+    assert off["admitted_p99_ms"] > 500
+    assert on["admitted_p99_ms"] < 3 * 40 < off["admitted_p99_ms"] / 4
+    assert on["rejected_p99_ms"] < 40
+    # The benchmark leaves the app's controller as it found it
+    assert admission_controller.routes is not route
@@ -0,0 +1,94 @@
+import asyncio
+
+from ai_cache import AICache, MemoizedAIService
+from ai_executor import AIExecutor
+from ai_service import AIService, prescription_to_extracted_data
+from sample_data import SAMPLE_PRESCRIPTIONS
+from tests.fake_mongo import FakeDatabase
+
+
+class CountingService(AIService):
+    def __init__(self):
+        super().__init__()
+        self.summary_calls = 0
+        self.extract_calls = 0
+
+    def generate_summary_with_provenance(self, extracted_data, source_id):
+        self.summary_calls += 1
+        return super().generate_summary_with_provenance(extracted_data, source_id)
+
+    async def extract_prescription(self, prescription_text):
+        self.extract_calls += 1
+        return await super().extract_prescription(prescription_text)
+
+
+def _memoized(cache):
+    service = CountingService()
+    return service, MemoizedAIService(cache, service=service, executor=AIExecutor(service=service))
+
+
+def test_repeat_generation_is_a_lookup_with_the_callers_source_id():
+    service, memoized = _memoized(AICache(max_entries=16))
+    data = prescription_to_extracted_data(SAMPLE_PRESCRIPTIONS[1])
+
+    first = asyncio.run(memoized.generate_summary_with_provenance(data, "presc-a"))
+    second = asyncio.run(memoized.generate_summary_with_provenance(data, "presc-b"))
+
+    assert service.summary_calls == 1
+    assert first[0] == second[0]
+    assert {link["source_id"] for link in first[1]} == {"presc-a"}
+    assert {link["source_id"] for link in second[1]} == {"presc-b"}
+    assert first == AIService().generate_summary_with_provenance(data, "presc-a")
+    assert memoized.cache.stats()["kinds"]["summary"]["hit_rate"] == 0.5
+
+
+def test_extraction_is_memoized_and_lru_is_bounded():
+    service, memoized = _memoized(AICache(max_entries=2))
+    texts = [f"Patient: Test {i}, Age: {20 + i}, Sex: Female" for i in range(3)]
+
+    async def scenario():
+        for text in texts + texts[-1:]:
+            await memoized.extract_prescription(text)
+
+    asyncio.run(scenario())
+    stats = memoized.cache.stats()
+    assert service.extract_calls == 3
+    assert stats["memory_entries"] == 2
+    assert stats["evictions"] == 1
+    assert stats["kinds"]["extraction"]["memory_hits"] == 1
+
+
+def test_persistent_tier_survives_a_cold_memory_cache():
+    db = FakeDatabase()
+    data = prescription_to_extracted_data(SAMPLE_PRESCRIPTIONS[2])
+
+    warm_cache = AICache(max_entries=16)
+    warm_cache.attach_collection(db.ai_cache)
+    _, warm = _memoized(warm_cache)
+    expected = asyncio.run(warm.generate_summary_with_provenance(data, "presc-1"))
+
+    cold_cache = AICache(max_entries=16)
+    cold_cache.attach_collection(db.ai_cache)
+    service, cold = _memoized(cold_cache)
+    result = asyncio.run(cold.generate_summary_with_provenance(data, "presc-1"))
+
+    assert service.summary_calls == 0
+    assert result == expected
+    assert cold_cache.stats()["kinds"]["summary"]["persistent_hits"] == 1
+
+
+def test_priming_loads_the_most_recent_persistent_entries():
+    db = FakeDatabase()
+    writer = AICache(max_entries=16)
+    writer.attach_collection(db.ai_cache)
+    service, memoized = _memoized(writer)
+    for i, presc in enumerate(SAMPLE_PRESCRIPTIONS[:3]):
+        asyncio.run(memoized.generate_summary_with_provenance(prescription_to_extracted_data(presc), f"p{i}"))
+
+    worker = AICache(max_entries=2)
+    worker.attach_collection(db.ai_cache)
+    assert asyncio.run(worker.prime(10)) == 2
+
+    service, memoized = _memoized(worker)
+    asyncio.run(memoized.generate_summary_with_provenance(prescription_to_extracted_data(SAMPLE_PRESCRIPTIONS[2]), "x"))
+    assert service.summary_calls == 0 and worker.stats()["kinds"]["summary"]["memory_hits"] == 1
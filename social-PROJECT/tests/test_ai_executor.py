@@ -0,0 +1,66 @@
+import asyncio
+import threading
+
+from ai_executor import AIExecutor, LoopLagMonitor
+from ai_service import AIService, prescription_to_extracted_data
+from sample_data import SAMPLE_PRESCRIPTIONS
+
+
+class RecordingService(AIService):
+    def __init__(self):
+        super().__init__()
+        self.threads = []
+
+    def generate_summary_with_provenance(self, extracted_data, source_id):
+        self.threads.append(threading.current_thread().name)
+        return super().generate_summary_with_provenance(extracted_data, source_id)
+
+
+def test_small_inputs_run_inline_and_large_inputs_use_pool():
+    service = RecordingService()
+    executor = AIExecutor(service=service, inline_threshold=10_000)
+    small = prescription_to_extracted_data(SAMPLE_PRESCRIPTIONS[0])
+    large = {**small, "medicines": small["medicines"] * 500}
+
+    async def scenario():
+        inline_result = await executor.generate_summary_with_provenance(small, "p1")
+        pooled_result = await executor.generate_summary_with_provenance(large, "p2")
+        return inline_result, pooled_result
+
+    inline_result, pooled_result = asyncio.run(scenario())
+    executor.shutdown()
+
+    assert inline_result == AIService().generate_summary_with_provenance(small, "p1")
+    assert len(pooled_result[1]) > len(inline_result[1])
+    assert service.threads[0] == "MainThread"
+    assert service.threads[1].startswith("ai-executor")
+
+
+def test_loop_lag_monitor_reports_blocking_requests(caplog):
+    monitor = LoopLagMonitor(budget_ms=20, interval_ms=5)
+
+    async def scenario():
+        monitor.start()
+        await asyncio.sleep(0.01)
+        with monitor.track("POST /api/seed-database"):
+            threading.Event().wait(0.1)  # block the loop
+            await asyncio.sleep(0.01)
+        await monitor.stop()
+
+    asyncio.run(scenario())
+
+    assert monitor.over_budget_count >= 1
+    assert monitor.max_lag_ms >= 50
+    assert "POST /api/seed-database" in caplog.text
+
+
+def test_loop_lag_monitor_honours_an_explicit_zero(monkeypatch):
+    monkeypatch.setenv("LOOP_LAG_BUDGET_MS", "100")
+    monkeypatch.setenv("LOOP_LAG_INTERVAL_MS", "50")
+    monitor = LoopLagMonitor(budget_ms=0, interval_ms=0)
+
+    monitor.record(0.5)
+
+    assert (monitor.budget_ms, monitor.interval_ms) == (0, 0)
+    assert monitor.over_budget_count == 1
+    assert (LoopLagMonitor().budget_ms, LoopLagMonitor().interval_ms) == (100, 50)
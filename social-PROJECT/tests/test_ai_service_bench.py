@@ -0,0 +1,46 @@
+from ai_service import AIService, prescription_to_extracted_data
+from benchmarks.ai_service_bench import (
+    build_prescription, check, render_prescription_text, scaling_exponent
+)
+
+
+def _first_matching_link(links, value, field_type):
+    for link in links:
+        if link["value"] == value or link["field_name"] == field_type:
+            return link
+    return None
+
+
+def test_indexed_provenance_lookup_matches_linear_scan():
+    service = AIService()
+    text, links = service.generate_summary_with_provenance(
+        prescription_to_extracted_data(build_prescription(medicines=40, symptoms=20)), "p1")
+    # Drop the leading links so many markers resolve deep in the list (or not at all)
+    links = links[5:]
+
+    display = service.parse_summary_for_display(text, links)
+
+    for segment in display["segments"]:
+        if segment["type"] == "provenance_link":
+            expected = _first_matching_link(links, segment["content"], segment["field_type"])
+            assert segment["provenance"] is expected
+
+
+def test_generated_text_round_trips_through_regex_extraction():
+    prescription = build_prescription(medicines=25, symptoms=12)
+    extracted = AIService().extract_with_regex(render_prescription_text(prescription))
+
+    assert len(extracted["medicines"]) == 25
+    assert extracted["symptoms"] == prescription["symptoms"]
+
+
+def test_scaling_check_flags_quadratic_curves():
+    linear = [(n, n * 2.0) for n in (50, 100, 250, 500)]
+    quadratic = [(n, n * n * 0.01) for n in (50, 100, 250, 500)]
+    assert abs(scaling_exponent(linear) - 1.0) < 1e-6
+    assert abs(scaling_exponent(quadratic) - 2.0) < 1e-6
+
+    results = {"f": {"exponent": 2.0, "curve": [{"size": 500, "time_us": 2500.0}]}}
+    baseline = {"benchmarks": {"f": {"exponent": 1.0, "curve": [{"size": 500, "time_us": 500.0}]}}}
+    failures = check(results, baseline, max_exponent=1.4, time_tolerance=3.0)
+    assert len(failures) == 3
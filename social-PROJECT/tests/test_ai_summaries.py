@@ -0,0 +1,123 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+import application
+import repository
+import server
+from ai_executor import ai_executor
+from routes import ai_summaries
+from sample_data import SAMPLE_PRESCRIPTIONS
+
+
+@pytest.fixture
+def db(db):
+    asyncio.run(application.ensure_indexes())
+    return db
+
+
+def _seed_prescriptions(db, *prescriptions):
+    for i, presc in enumerate(prescriptions):
+        asyncio.run(db.prescriptions.insert_one({**presc, "id": f"presc-{i}", "status": "pending"}))
+
+
+def test_regenerating_unchanged_prescription_short_circuits(db, monkeypatch):
+    _seed_prescriptions(db, SAMPLE_PRESCRIPTIONS[0])
+    first = asyncio.run(ai_summaries.generate_ai_summary("presc-0"))
+
+    calls = []
+    monkeypatch.setattr(ai_executor, "generate_summary_with_provenance",
+                        lambda *args: calls.append(args))
+    second = asyncio.run(ai_summaries.generate_ai_summary("presc-0"))
+
+    assert calls == []
+    assert second["id"] == first["id"]
+    assert second["source_hash"] == first["source_hash"]
+    assert len(db.ai_summaries.docs) == 1
+
+
+def test_changed_prescription_updates_summary_in_place(db):
+    _seed_prescriptions(db, SAMPLE_PRESCRIPTIONS[0])
+    first = asyncio.run(ai_summaries.generate_ai_summary("presc-0"))
+
+    asyncio.run(db.prescriptions.update_one({"id": "presc-0"}, {"$set": {"notes": "Review in 2 weeks."}}))
+    second = asyncio.run(ai_summaries.generate_ai_summary("presc-0"))
+
+    assert second["id"] == first["id"]
+    assert second["source_hash"] != first["source_hash"]
+    assert "Review in 2 weeks." in second["summary_text"]
+    assert len(db.ai_summaries.docs) == 1
+
+
+def test_concurrent_generation_for_same_patient_creates_one_summary(db):
+    same_patient = {**SAMPLE_PRESCRIPTIONS[1], "patient_name": SAMPLE_PRESCRIPTIONS[0]["patient_name"]}
+    _seed_prescriptions(db, SAMPLE_PRESCRIPTIONS[0], same_patient)
+
+    async def scenario():
+        return await asyncio.gather(
+            ai_summaries.generate_ai_summary("presc-0"),
+            ai_summaries.generate_ai_summary("presc-1"),
+        )
+
+    asyncio.run(scenario())
+    assert len(db.ai_summaries.docs) == 1
+
+
+def _stream(accept: str):
+    async def scenario():
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            async with client.stream("POST", "/api/ai-summaries/generate/presc-0/stream",
+                                     headers={"Accept": accept}) as response:
+                return response.headers["content-type"], [chunk async for chunk in response.aiter_lines()]
+
+    return asyncio.run(scenario())
+
+
+def test_streamed_sections_reassemble_into_the_persisted_summary(db):
+    _seed_prescriptions(db, SAMPLE_PRESCRIPTIONS[1])
+    content_type, lines = _stream("application/x-ndjson")
+    events = [json.loads(line) for line in lines if line]
+
+    sections = [e for e in events if e["event"] == "section"]
+    assert content_type.startswith("application/x-ndjson")
+    assert [e["section"] for e in sections] == [
+        "patient", "visit", "symptoms", "medication", "medication", "medication", "tests", "advice"
+    ]
+    assert events[-1]["event"] == "complete"
+
+    stored = db.ai_summaries.docs[0]
+    assert "".join(e["text"] for e in sections) == stored["summary_text"]
+    assert [link for e in sections for link in e["provenance_links"]] == events[-1]["summary"]["provenance_links"]
+    # Stored compactly: no prescription copy, one provenance row per link
+    assert "raw_data" not in stored and "provenance_links" not in stored
+    assert len(stored["provenance"]["links"]) == len(events[-1]["summary"]["provenance_links"])
+    assert events[-1]["summary"]["id"] == stored["id"]
+
+
+def test_stream_uses_server_sent_events_when_requested(db):
+    _seed_prescriptions(db, SAMPLE_PRESCRIPTIONS[0])
+    content_type, lines = _stream("text/event-stream")
+
+    assert content_type.startswith("text/event-stream")
+    assert lines[0] == "event: section"
+    assert lines[1].startswith("data: ")
+    assert "event: complete" in lines
+
+
+def test_slotted_summaries_match_the_dict_path(db):
+    from ai_service import ai_service, prescription_to_extracted_data
+    from domain import Prescription, gc_paused
+
+    for i, presc in enumerate(SAMPLE_PRESCRIPTIONS):
+        doc = {**presc, "id": f"presc-{i}"}
+        with gc_paused():
+            text, links = ai_service.summarize(Prescription.from_document(doc))
+        expected_text, expected_links = ai_service.generate_summary_with_provenance(
+            prescription_to_extracted_data(doc), doc["id"])
+        assert text == expected_text
+        assert [link.as_dict() for link in links] == expected_links
+        stored = asyncio.run(repository.ai_summaries.encode(db, {"id": "s", "provenance_links": links}))
+        assert stored["provenance"]["links"][0] == [links[0].field_name, links[0].value, links[0].source_field]
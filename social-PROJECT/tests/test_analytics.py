@@ -0,0 +1,101 @@
+import asyncio
+from datetime import datetime, timezone
+
+import pytest
+from fastapi import HTTPException
+
+from routes import analytics, dispense
+from sample_data import SAMPLE_PRESCRIPTIONS
+
+TODAY = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+
+
+def _by_key(items):
+    return {item["key"]: item["total"] for item in items}
+
+
+def test_writes_update_daily_rollups(db, create_prescription):
+    async def scenario():
+        for presc in SAMPLE_PRESCRIPTIONS[:3]:
+            await create_prescription(presc)
+        requests = await db.dispense_requests.find({}, {"_id": 0}).to_list(None)
+        await dispense.approve_dispense_request(requests[0]["id"], "pharm-1")
+        await dispense.dispense_medication(requests[0]["id"], "pharm-1")
+        await dispense.reject_dispense_request(requests[1]["id"], "pharm-1", "Out of stock")
+        summary = await analytics.get_analytics_summary(days=1, date_from=None, date_to=None)
+        medicines = await analytics.get_analytics_by_dimension(
+            "medicine", metric="prescribed_quantity", days=1, date_from=None, date_to=None, limit=100)
+        clinics = await analytics.get_analytics_by_dimension(
+            "clinic", metric="prescriptions", days=1, date_from=None, date_to=None, limit=100)
+        return summary, medicines, clinics
+
+    summary, medicines, clinics = asyncio.run(scenario())
+
+    totals = summary["totals"]
+    assert (totals["prescriptions"], totals["approved"], totals["dispensed"], totals["rejected"]) == (3, 1, 1, 1)
+    assert totals["turnaround_count"] == 1 and summary["avg_turnaround_seconds"] >= 0
+    assert [row["day"] for row in summary["series"]] == [TODAY]
+
+    expected_quantities = {}
+    for presc in SAMPLE_PRESCRIPTIONS[:3]:
+        for med in presc["medicines"]:
+            expected_quantities[med["name"]] = expected_quantities.get(med["name"], 0) + med["quantity"]
+    assert _by_key(medicines["items"]) == expected_quantities
+    assert sum(_by_key(clinics["items"]).values()) == 3
+
+
+def test_dashboard_query_reads_rollups_not_prescriptions(db):
+    asyncio.run(db.prescriptions.insert_many(
+        [{**SAMPLE_PRESCRIPTIONS[i % len(SAMPLE_PRESCRIPTIONS)], "id": f"p{i}", "date": "2025-03-01"}
+         for i in range(500)]))
+    asyncio.run(analytics.rebuild_analytics())
+    db.round_trips = 0
+
+    summary = asyncio.run(analytics.get_analytics_summary(days=30, date_from=None, date_to="2025-03-10"))
+
+    assert summary["totals"]["prescriptions"] == 500
+    assert len(summary["series"]) == 1
+    assert db.round_trips == 1
+
+
+def test_rebuild_matches_incremental_rollups(db, create_prescription):
+    async def scenario():
+        for presc in SAMPLE_PRESCRIPTIONS[:4]:
+            await create_prescription(presc)
+        request = (await db.dispense_requests.find({}, {"_id": 0}).to_list(None))[0]
+        await dispense.approve_dispense_request(request["id"], "pharm-1")
+        await dispense.dispense_medication(request["id"], "pharm-1")
+        incremental = sorted((d["day"], d["dimension"], d["key"], sorted(d["counts"].items()))
+                             for d in db.analytics_daily.docs)
+        await analytics.rebuild_analytics()
+        rebuilt = sorted((d["day"], d["dimension"], d["key"], sorted(d["counts"].items()))
+                         for d in db.analytics_daily.docs)
+        return incremental, rebuilt
+
+    incremental, rebuilt = asyncio.run(scenario())
+
+    # Turnaround is recomputed from stored timestamps, so compare everything else exactly
+    strip = lambda rows: [(d, dim, k, [(m, v) for m, v in c if not m.startswith("turnaround_seconds")])
+                          for d, dim, k, c in rows]
+    assert strip(rebuilt) == strip(incremental)
+
+
+def test_unknown_dimension_is_rejected(db):
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(analytics.get_analytics_by_dimension(
+            "pharmacy", metric="prescriptions", days=30, date_from=None, date_to=None, limit=10))
+    assert exc.value.status_code == 400
+
+
+@pytest.mark.parametrize("date_from, date_to", [(None, "garbage"), ("xx", None), ("2025-03-01", "2025-13-01")])
+def test_malformed_date_bounds_are_rejected(db, date_from, date_to):
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(analytics.get_analytics_summary(days=30, date_from=date_from, date_to=date_to))
+    assert exc.value.status_code == 400 and "ISO date" in exc.value.detail
+
+
+def test_date_bounds_are_normalized(db):
+    summary = asyncio.run(analytics.get_analytics_by_dimension(
+        "clinic", metric="prescriptions", days=30, date_from="2025-03-01T08:00:00", date_to="2025-03-10",
+        limit=10))
+    assert (summary["date_from"], summary["date_to"]) == ("2025-03-01", "2025-03-10")
@@ -0,0 +1,155 @@
+import asyncio
+from datetime import datetime, timezone
+
+import pytest
+from fastapi import HTTPException
+
+from audit_log import AuditLog, validate_transition, InvalidTransition, partition_name
+from routes import appointments, audit, dispense, prescriptions
+from sample_data import SAMPLE_PRESCRIPTIONS
+from tests.fake_mongo import FakeDatabase
+
+
+@pytest.fixture
+def db(db, monkeypatch):
+    log = AuditLog(flush_interval=60, max_batch=500)
+    for module in (appointments, audit, dispense, prescriptions):
+        monkeypatch.setattr(module, "audit_log", log)
+    return db
+
+
+def test_state_machine_rejects_skipped_and_unknown_statuses():
+    validate_transition("dispense_request", "pending", "approved")
+    with pytest.raises(InvalidTransition):
+        validate_transition("dispense_request", "pending", "dispensed")
+    with pytest.raises(InvalidTransition):
+        validate_transition("prescription", "dispensed", "pending")
+    with pytest.raises(InvalidTransition):
+        validate_transition("appointment", "scheduled", "done")
+
+
+def test_dispense_flow_is_recorded_and_invalid_transitions_refused(db, create_prescription):
+    async def scenario():
+        presc = await create_prescription(SAMPLE_PRESCRIPTIONS[0])
+        request = (await db.dispense_requests.find({}, {"_id": 0}).to_list(None))[0]
+        await dispense.approve_dispense_request(request["id"], "pharm-1")
+        stock_after_approval = [item.get("quantity_available") for item in db.inventory.docs]
+
+        # A second approval must neither succeed nor consume stock again
+        with pytest.raises(HTTPException) as conflict:
+            await dispense.approve_dispense_request(request["id"], "pharm-2")
+        assert [item.get("quantity_available") for item in db.inventory.docs] == stock_after_approval
+
+        dispensed = await dispense.dispense_medication(request["id"], "pharm-1")
+        with pytest.raises(HTTPException) as unknown:
+            await prescriptions.update_prescription_status(presc["id"], "teleported")
+        # Events are buffered until the writer flushes, and history includes them either way
+        assert not any(name.startswith("status_events_") for name in await db.list_collection_names())
+        buffered = await audit.get_status_history("dispense_request", request["id"], months=1)
+        await audit.audit_log.flush(db)
+        flushed = await audit.get_status_history("dispense_request", request["id"], months=1)
+        prescription_history = await audit.get_status_history("prescription", presc["id"], months=1)
+        return conflict.value, unknown.value, dispensed, buffered, flushed, prescription_history
+
+    conflict, unknown, dispensed, buffered, flushed, prescription_history = asyncio.run(scenario())
+
+    assert conflict.status_code == 409
+    assert unknown.status_code == 400
+    assert dispensed["status"] == "dispensed" and dispensed["version"] == 2
+    transitions = [(e["from_status"], e["to_status"], e["version"], e["actor"]) for e in flushed["events"]]
+    assert transitions == [("pending", "approved", 1, "pharm-1"), ("approved", "dispensed", 2, "pharm-1")]
+    assert [e["to_status"] for e in buffered["events"]] == ["approved", "dispensed"]
+    assert [e["to_status"] for e in prescription_history["events"]] == ["approved", "dispensed"]
+
+
+def test_status_endpoints_return_404_and_409(db):
+    async def scenario():
+        await db.appointments.insert_one({"id": "apt-1", "status": "scheduled"})
+        await appointments.update_appointment_status("apt-1", "completed")
+        errors = []
+        for call in (appointments.update_appointment_status("apt-1", "in-progress"),
+                     appointments.update_appointment_status("missing", "completed")):
+            with pytest.raises(HTTPException) as exc:
+                await call
+            errors.append(exc.value.status_code)
+        return errors
+
+    assert asyncio.run(scenario()) == [409, 404]
+
+
+def test_buffered_writer_flushes_in_batches_off_the_request_path():
+    db = FakeDatabase()
+    log = AuditLog(flush_interval=60, max_batch=100)
+
+    async def scenario():
+        log.start(db)
+        for i in range(250):
+            log.record("appointment", f"apt-{i}", "scheduled", "completed", version=1)
+        # No database call happens while recording
+        assert db.round_trips == 0
+        await asyncio.sleep(0.05)
+        written_before_stop = log.stats["written"]
+        await log.stop()
+        return written_before_stop
+
+    written_before_stop = asyncio.run(scenario())
+
+    # The size trigger flushed well before the 60 s interval, in a single insert per partition
+    assert written_before_stop == 250
+    assert log.metrics()["buffered"] == 0
+    assert sum(len(c.docs) for name, c in db._collections.items() if name.startswith("status_events_")) == 250
+
+
+def _slow_partition(db, started: asyncio.Event):
+    """Make this month's partition take a while to insert into"""
+    collection = db[partition_name(datetime.now(timezone.utc))]
+    insert_many = collection.insert_many
+
+    async def slow_insert_many(*args, **kwargs):
+        started.set()
+        await asyncio.sleep(0.05)
+        return await insert_many(*args, **kwargs)
+
+    collection.insert_many = slow_insert_many
+    return collection
+
+
+def test_stop_waits_for_the_flush_in_progress():
+    db = FakeDatabase()
+    log = AuditLog(flush_interval=60, max_batch=10)
+
+    async def scenario():
+        started = asyncio.Event()
+        collection = _slow_partition(db, started)
+        log.start(db)
+        for i in range(10):
+            log.record("appointment", f"apt-{i}", "scheduled", "completed", version=1)
+        await started.wait()
+        # The batch has left the buffer and is being written
+        await log.stop()
+        return collection
+
+    collection = asyncio.run(scenario())
+
+    assert len(collection.docs) == 10 and log.stats["written"] == 10
+
+
+def test_a_cancelled_flush_keeps_its_events():
+    db = FakeDatabase()
+    log = AuditLog(flush_interval=60)
+
+    async def scenario():
+        started = asyncio.Event()
+        _slow_partition(db, started)
+        for i in range(3):
+            log.record("appointment", f"apt-{i}", "scheduled", "completed", version=1)
+        flush = asyncio.create_task(log.flush(db))
+        await started.wait()
+        flush.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await flush
+
+    asyncio.run(scenario())
+
+    assert [e["entity_id"] for e in log._buffer] == ["apt-0", "apt-1", "apt-2"]
+    assert log.stats["written"] == 0
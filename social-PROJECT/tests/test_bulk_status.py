@@ -0,0 +1,145 @@
+import asyncio
+from collections import Counter
+
+import httpx
+import pytest
+
+import repository
+import server
+from audit_log import AuditLog
+from benchmarks import bulk_status_bench
+from routes import appointments, dispense, prescriptions
+from sample_data import SAMPLE_INVENTORY
+from summary_refresh import summary_refresher
+
+
+@pytest.fixture
+def db(db, monkeypatch):
+    monkeypatch.setattr(summary_refresher, "stats", Counter())
+    log = AuditLog(flush_interval=60)
+    for module in (appointments, dispense, prescriptions):
+        monkeypatch.setattr(module, "audit_log", log)
+
+    async def seed():
+        await db.inventory.insert_many([{**item, "id": f"sku-{i}", "quantity_available": 100}
+                                        for i, item in enumerate(SAMPLE_INVENTORY)])
+        await db.appointments.insert_many([{"id": f"apt-{i}", "status": "scheduled"} for i in range(3)])
+        await db.prescriptions.insert_many([
+            {"id": f"presc-{i}", "status": "pending", "patient_name": f"Patient {i % 2}"} for i in range(4)
+        ])
+        # req-0 and req-1 take the same SKU
+        await db.dispense_requests.insert_many([
+            {"id": f"req-{i}", "prescription_id": f"presc-{i}", "status": "pending",
+             "medicines": [{"name": SAMPLE_INVENTORY[i // 2]["medicine_name"],
+                            "dosage": SAMPLE_INVENTORY[i // 2]["dosage"], "quantity": i + 1}]}
+            for i in range(4)
+        ])
+        await dispense.refresh_drug_index()
+
+    asyncio.run(seed())
+    return db
+
+
+def _put(path, body):
+    async def scenario():
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.put(path, json=body)
+
+    return asyncio.run(scenario())
+
+
+def _outcomes(report):
+    return [(item["id"], item["status_code"]) for item in report["results"]]
+
+
+def test_bulk_dispense_aggregates_inventory_and_reports_each_item(db):
+    asyncio.run(db.dispense_requests.update_one({"id": "req-3"}, {"$set": {"status": "dispensed"}}))
+    db.round_trips = 0
+
+    response = _put("/api/dispense-requests/bulk", {"pharmacist_id": "pharm-1", "items": [
+        {"id": "req-0", "action": "approve"},
+        {"id": "req-1", "action": "approve", "notes": "Checked"},
+        {"id": "req-2", "action": "reject"},
+        {"id": "req-3", "action": "approve"},
+        {"id": "missing", "action": "dispense"},
+    ]})
+
+    report = response.json()
+    assert response.status_code == 200 and (report["updated"], report["failed"]) == (2, 3)
+    assert _outcomes(report) == [("req-0", 200), ("req-1", 200), ("req-2", 400), ("req-3", 409), ("missing", 404)]
+    assert report["results"][0]["previous_status"] == "pending" and report["results"][0]["version"] == 1
+    # Read, status write, one inventory write, rollups, then the prescriptions' read and write
+    assert db.round_trips == 6
+    stock = {doc["id"]: doc["quantity_available"] for doc in db.inventory.docs}
+    assert stock["sku-0"] == 100 - 1 - 2 and stock["sku-1"] == 100
+    assert [doc["status"] for doc in db.prescriptions.docs] == ["approved", "approved", "pending", "pending"]
+    stored = db.dispense_requests.docs[1]
+    assert stored["pharmacist_notes"] == "Checked" and stored["inventory_consumed"] == {"sku-0": 2}
+    assert dispense.audit_log.stats["recorded"] == 4
+
+
+def test_bulk_reject_of_approved_requests_returns_their_stock(db):
+    approved = _put("/api/dispense-requests/bulk", {"pharmacist_id": "pharm-1", "items": [
+        {"id": "req-0", "action": "approve"}, {"id": "req-1", "action": "approve"}]}).json()
+    db.round_trips = 0
+    response = _put("/api/dispense-requests/bulk", {"pharmacist_id": "pharm-1", "items": [
+        {"id": "req-0", "action": "reject", "notes": "Recalled batch"},
+        {"id": "req-1", "action": "dispense"},
+        {"id": "req-2", "action": "approve"},
+    ]})
+
+    assert approved["updated"] == 2 and response.json()["updated"] == 3
+    # req-0's 1 unit goes back and req-2's 3 units of another SKU are taken, in one inventory write
+    stock = {doc["id"]: doc["quantity_available"] for doc in db.inventory.docs}
+    assert (stock["sku-0"], stock["sku-1"]) == (100 - 2, 100 - 3)
+    assert db.round_trips == 6
+    assert [doc["status"] for doc in db.prescriptions.docs] == ["pending", "dispensed", "approved", "pending"]
+
+
+def test_bulk_status_matches_the_single_item_rules(db):
+    appointment_report = _put("/api/appointments/bulk-status", {"items": [
+        {"id": "apt-0", "status": "completed", "notes": "Seen"},
+        {"id": "apt-1", "status": "teleported"},
+        {"id": "apt-0", "status": "cancelled"},
+    ]}).json()
+    prescription_report = _put("/api/prescriptions/bulk-status", {"items": [
+        {"id": f"presc-{i}", "status": "approved"} for i in range(4)
+    ] + [{"id": "presc-0", "status": "dispensed"}]}).json()
+    empty = _put("/api/prescriptions/bulk-status", {"items": []})
+
+    assert _outcomes(appointment_report) == [("apt-0", 200), ("apt-1", 400), ("apt-0", 400)]
+    assert db.appointments.docs[0]["notes"] == "Seen" and db.appointments.docs[1]["status"] == "scheduled"
+    assert prescription_report["updated"] == 4 and prescription_report["results"][-1]["status_code"] == 400
+    # Four prescriptions of two patients: two debounced summary refreshes
+    assert summary_refresher.stats["writes"] == 2
+    assert empty.status_code == 422
+
+
+def test_documents_changed_after_the_read_are_conflicts(db):
+    async def scenario():
+        current = await repository.prescriptions.get_many(db, ["presc-0", "presc-1"])
+        # Another request moves presc-1 between the read and the bulk write
+        await repository.prescriptions.transition(db, "presc-1", "approved")
+        db.round_trips = 0
+        results = await repository.prescriptions.bulk_transition(
+            db, [("presc-0", "approved", None), ("presc-1", "approved", None)], current)
+        return results, db.round_trips
+
+    results, trips = asyncio.run(scenario())
+
+    assert results[0][0] == "pending" and results[0][1]["version"] == 1
+    assert results[1].status_code == 409
+    # The bulk write, and one read to tell which documents it moved
+    assert trips == 2
+    assert db.prescriptions.docs[1]["version"] == 1
+
+
+def test_bulk_approvals_outrun_the_single_item_loop():
+    report = bulk_status_bench.run(count=200, chunk=100, rtt_ms=0.5)
+
+    single, bulk = report["single"], report["bulk"]
+    assert single["approved"] == bulk["approved"] == 200
+    assert single["stock_used"] == bulk["stock_used"]
+    assert single["round_trips_per_item"] == 5 and bulk["round_trips_per_item"] < 0.1
+    assert bulk["modelled_items_per_second"] > 3 * single["modelled_items_per_second"]
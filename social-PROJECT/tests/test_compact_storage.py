@@ -0,0 +1,129 @@
+import asyncio
+
+import pytest
+
+import application
+from compact_storage import DictionaryCodec, PrescriptionCodec, SummaryCodec
+import repository
+from routes import ai_summaries, prescriptions, search
+from sample_data import SAMPLE_PRESCRIPTIONS
+from tests.fake_mongo import FakeDatabase
+
+
+@pytest.fixture
+def db(db):
+    asyncio.run(application.ensure_indexes())
+    return db
+
+
+def test_prescriptions_are_stored_encoded_and_read_back_decoded(db, create_prescription):
+    async def scenario():
+        created = [await create_prescription(presc) for presc in SAMPLE_PRESCRIPTIONS[:3]]
+        # A document written before encoding was introduced
+        await db.prescriptions.insert_one({**SAMPLE_PRESCRIPTIONS[3], "id": "legacy", "status": "pending"})
+        return created, await prescriptions.get_prescriptions(patient_name=None, status=None)
+
+    created, listed = asyncio.run(scenario())
+
+    stored = db.prescriptions.docs[0]
+    assert isinstance(stored["clinic"], int) and isinstance(stored["prescriber_name"], int)
+    assert all(isinstance(m[field], int) for m in stored["medicines"] for field in ("name", "form", "route"))
+    assert isinstance(stored["medicines"][0]["quantity"], int) and isinstance(stored["patient_name"], str)
+    by_id = {p["id"]: p for p in listed}
+    for presc in created:
+        assert by_id[presc["id"]] == presc
+    assert by_id["legacy"]["clinic"] == SAMPLE_PRESCRIPTIONS[3]["clinic"]
+    # One code per distinct value, shared by every document
+    distinct_forms = {m["form"] for p in SAMPLE_PRESCRIPTIONS[:3] for m in p["medicines"]}
+    assert {e["value"] for e in db.dictionaries.docs if e["field"] == "form"} == distinct_forms
+
+
+def test_codes_allocated_by_another_worker_are_loaded_on_demand():
+    db = FakeDatabase()
+    writer = PrescriptionCodec(DictionaryCodec())
+    reader = PrescriptionCodec(DictionaryCodec())
+    prescription = {**SAMPLE_PRESCRIPTIONS[1], "id": "p1"}
+
+    async def scenario():
+        await reader.dictionary.load(db)
+        encoded = await writer.encode(db, prescription)
+        return await reader.decode(db, [encoded])
+
+    assert asyncio.run(scenario()) == [prescription]
+    assert reader.dictionary.stats["reloads"] == 2
+
+
+def test_summaries_reference_their_prescription_instead_of_copying_it(db):
+    async def scenario():
+        await db.prescriptions.insert_one({**SAMPLE_PRESCRIPTIONS[0], "id": "presc-0", "status": "pending"})
+        generated = await ai_summaries.generate_ai_summary("presc-0")
+        fetched = await ai_summaries.get_ai_summary(generated["id"])
+        await search.refresh_search_index()
+        found = await search.search(q="", type=["ai_summary"], clinic=[SAMPLE_PRESCRIPTIONS[0]["clinic"]],
+                                    prescriber=None, medicine=None, status=None, record_type=None,
+                                    date_from=None, date_to=None, days=None, limit=10, offset=0)
+        return generated, fetched, found
+
+    generated, fetched, found = asyncio.run(scenario())
+
+    stored = db.ai_summaries.docs[0]
+    assert "raw_data" not in stored and "provenance_links" not in stored
+    assert stored["prescription_id"] == "presc-0" and stored["source_hash"] == generated["source_hash"]
+    assert fetched["provenance_links"] == generated["provenance_links"]
+    assert all(link["source_id"] == "presc-0" for link in fetched["provenance_links"])
+    assert [hit["id"] for hit in found["results"]] == [generated["id"]]
+
+
+def test_summary_links_from_several_sources_are_kept_as_is():
+    links = [{"field_name": "age", "value": "30", "source_type": "prescription", "source_id": "a",
+              "source_field": "age"},
+             {"field_name": "test", "value": "ECG", "source_type": "lab_result", "source_id": "b",
+              "source_field": "name"}]
+    codec = SummaryCodec()
+    stored = asyncio.run(codec.encode(None, {"id": "s", "provenance_links": links, "raw_data": {"x": 1}}))
+
+    assert stored == {"id": "s", "provenance_links": links}
+    assert asyncio.run(codec.decode(None, [stored])) == [stored]
+
+
+def test_queries_on_encoded_fields_match_encoded_and_legacy_documents(db, create_prescription):
+    clinic = SAMPLE_PRESCRIPTIONS[0]["clinic"]
+    medicine = SAMPLE_PRESCRIPTIONS[0]["medicines"][0]["name"]
+
+    async def scenario():
+        created = await create_prescription(SAMPLE_PRESCRIPTIONS[0])
+        await db.prescriptions.insert_one({**SAMPLE_PRESCRIPTIONS[0], "id": "legacy", "status": "pending"})
+        by_clinic = await repository.prescriptions.find(db, {"clinic": clinic})
+        by_medicine = await repository.prescriptions.find(db, {"medicines.name": {"$in": [medicine]}})
+        others = await repository.prescriptions.find(db, {"clinic": {"$ne": clinic}})
+        unknown = await repository.prescriptions.find_one(db, {"$or": [{"clinic": "Nowhere"}]})
+        return created, by_clinic, by_medicine, others, unknown
+
+    created, by_clinic, by_medicine, others, unknown = asyncio.run(scenario())
+
+    assert isinstance(db.prescriptions.docs[0]["clinic"], int)
+    assert {p["id"] for p in by_clinic} == {p["id"] for p in by_medicine} == {created["id"], "legacy"}
+    assert others == [] and unknown is None
+    # Looking up a value never seen allocates no code for it
+    assert not any(e["value"] == "Nowhere" for e in db.dictionaries.docs)
+
+
+def test_rewriting_links_in_the_other_layout_drops_the_previous_one(db):
+    single = [{"field_name": "age", "value": "30", "source_type": "prescription", "source_id": "a",
+               "source_field": "age"}]
+    several = single + [{"field_name": "test", "value": "ECG", "source_type": "lab_result", "source_id": "b",
+                         "source_field": "name"}]
+    summary = {"id": "s", "patient_name": "Asha", "summary_text": "text"}
+
+    async def scenario():
+        await ai_summaries.upsert_ai_summary({**summary, "provenance_links": single})
+        first = dict(db.ai_summaries.docs[0])
+        fetched = await ai_summaries.upsert_ai_summary({**summary, "provenance_links": several})
+        return first, fetched
+
+    first, fetched = asyncio.run(scenario())
+
+    assert "provenance" in first and "provenance_links" not in first
+    stored = db.ai_summaries.docs[0]
+    assert "provenance" not in stored and stored["provenance_links"] == several
+    assert fetched["provenance_links"] == several
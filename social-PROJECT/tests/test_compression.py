@@ -0,0 +1,92 @@
+import asyncio
+import json
+import zlib
+
+import httpx
+import pytest
+
+import server
+from compression import (CompressionMiddleware, CompressionStats, StreamCompressor, available_encodings,
+                         compression_stats, negotiate)
+from sample_data import SAMPLE_PRESCRIPTIONS
+
+
+@pytest.fixture
+def db(db, monkeypatch):
+    monkeypatch.setattr(compression_stats, "routes", {})
+    asyncio.run(db.prescriptions.insert_many([
+        {**SAMPLE_PRESCRIPTIONS[i % len(SAMPLE_PRESCRIPTIONS)], "id": f"presc-{i}", "status": "pending"}
+        for i in range(50)
+    ]))
+    return db
+
+
+def _get(path: str, accept_encoding: str) -> httpx.Response:
+    async def scenario():
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.get(path, headers={"Accept-Encoding": accept_encoding})
+
+    return asyncio.run(scenario())
+
+
+def test_large_lists_are_gzipped_and_bytes_are_recorded_per_route(db):
+    compressed = _get("/api/prescriptions", "gzip")
+    plain = _get("/api/prescriptions", "identity")
+
+    assert compressed.headers["content-encoding"] == "gzip" and "content-encoding" not in plain.headers
+    assert compressed.json() == plain.json()
+    assert compressed.headers["vary"] == "Accept-Encoding"
+    stats = compression_stats.metrics()["routes"]["/api/prescriptions"]
+    assert stats["responses"] == 2 and stats["encoding_gzip"] == 1 and stats["encoding_identity"] == 1
+    assert stats["bytes_in"] == 2 * len(plain.content)
+    assert stats["bytes_out"] == len(plain.content) + int(compressed.headers["content-length"])
+    assert int(compressed.headers["content-length"]) * 4 < len(plain.content)
+
+
+def test_small_responses_are_sent_as_is(db):
+    response = _get("/api/auth/roles", "gzip")
+    assert "content-encoding" not in response.headers and response.json()["roles"]
+
+
+def test_streamed_chunks_are_decodable_as_they_arrive():
+    chunks = [json.dumps({"event": "section", "n": i}).encode() + b"\n" for i in range(5)]
+
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200,
+                    "headers": [(b"content-type", b"application/x-ndjson")]})
+        for i, chunk in enumerate(chunks):
+            await send({"type": "http.response.body", "body": chunk, "more_body": i < len(chunks) - 1})
+
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    middleware = CompressionMiddleware(app, CompressionStats())
+    scope = {"type": "http", "method": "POST", "path": "/stream", "headers": [(b"accept-encoding", b"gzip")]}
+    asyncio.run(middleware(scope, None, send))
+
+    assert (b"content-encoding", b"gzip") in sent[0]["headers"]
+    decoder = zlib.decompressobj(31)
+    # Each chunk decodes completely on arrival, so nothing waits for the end of the stream
+    assert [decoder.decompress(m["body"]) for m in sent[1:]] == chunks
+    assert decoder.eof
+
+
+def test_negotiation_follows_q_values():
+    assert negotiate("gzip, br;q=0.5", ["zstd", "br", "gzip"]) == "gzip"
+    assert negotiate("br, gzip", ["zstd", "br", "gzip"]) == "br"
+    assert negotiate("gzip;q=0, *", ["gzip"]) is None
+    assert negotiate("*;q=0.1", ["zstd", "gzip"]) == "zstd"
+    assert negotiate("identity", ["gzip"]) is None
+
+
+def test_stream_compressors_implement_the_abstract_interface():
+    with pytest.raises(TypeError):
+        StreamCompressor()
+
+    for name, codec in available_encodings().items():
+        compressor = codec()
+        assert isinstance(compressor, StreamCompressor)
+        assert compressor.chunk(b"{}\n") and compressor.finish(), name
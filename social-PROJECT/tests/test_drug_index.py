@@ -0,0 +1,71 @@
+import asyncio
+
+import pytest
+
+import database
+from drug_index import DrugIndex, canonical_dose, normalize_name
+from routes import dispense
+from sample_data import SAMPLE_INVENTORY
+from tests.fake_mongo import FakeDatabase
+
+
+@pytest.fixture
+def index():
+    index = DrugIndex()
+    index.build({**item, "id": f"sku-{i}"} for i, item in enumerate(SAMPLE_INVENTORY))
+    return index
+
+
+@pytest.mark.parametrize("dosage", ["250mg", "250 MG", "0.25 g", "250 milligrams"])
+def test_dose_units_are_canonicalized(dosage):
+    assert canonical_dose(dosage) == "mg:250"
+
+
+def test_names_fold_case_forms_and_brands():
+    assert normalize_name("AMOXIL 250mg Capsule") == ("amoxicillin", "mg:250")
+    assert normalize_name("Tylenol") == ("paracetamol", None)
+
+
+@pytest.mark.parametrize("name, dosage, expected", [
+    ("Amoxicillin", "250 mg", "sku-2"),
+    ("amoxicillin", "500MG", "sku-3"),
+    ("Amoxil", "0.5 g", "sku-3"),
+    ("Amoxicilin", "250 mg", "sku-2"),       # one-letter typo
+    ("Prednisolone 10mg", None, "sku-5"),    # dose written into the name
+    ("Crocin", None, "sku-6"),               # brand with a single SKU
+    ("Amoxicillin", None, None),             # two strengths: ambiguous
+    ("Amoxicillin", "125 mg", None),         # strength not stocked
+    ("Unobtainium", "10 mg", None),
+])
+def test_match(index, name, dosage, expected):
+    assert index.match(name, dosage) == expected
+
+
+def test_removing_last_sku_drops_fuzzy_entries(index):
+    index.remove("sku-5")
+    assert index.match("Prednisolon", "10 mg") is None
+    assert all("prednisolone" not in names for names in index._fuzzy.values())
+
+
+def test_approve_decrements_matched_skus_and_records_unmatched(monkeypatch):
+    db = FakeDatabase()
+    monkeypatch.setattr(database, "db", db)
+
+    async def scenario():
+        await db.inventory.insert_many([{**item, "id": f"sku-{i}"} for i, item in enumerate(SAMPLE_INVENTORY)])
+        await dispense.refresh_drug_index()
+        await db.prescriptions.insert_one({"id": "presc-1", "status": "pending"})
+        await db.dispense_requests.insert_one({
+            "id": "req-1", "prescription_id": "presc-1", "status": "pending",
+            "medicines": [
+                {"name": "Amoxil", "dosage": "250mg", "quantity": 10},
+                {"name": "amoxicillin", "dosage": "250 MG", "quantity": 5},
+                {"name": "Placebo", "dosage": "1 mg", "quantity": 1},
+            ],
+        })
+        return await dispense.approve_dispense_request("req-1", "pharm-1")
+
+    updated = asyncio.run(scenario())
+
+    assert db.inventory.docs[2]["quantity_available"] == SAMPLE_INVENTORY[2]["quantity_available"] - 15
+    assert updated["unmatched_medicines"] == ["Placebo"]
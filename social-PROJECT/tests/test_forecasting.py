@@ -0,0 +1,87 @@
+import asyncio
+from datetime import datetime, timezone, timedelta
+
+import numpy as np
+import pytest
+
+import database
+from forecasting import InventoryForecaster, compute_forecast, daily_matrix
+from routes import inventory
+from sample_data import SAMPLE_INVENTORY
+from tests.fake_mongo import FakeDatabase
+
+
+def test_daily_matrix_sums_events_into_buckets():
+    matrix = daily_matrix(np.array([0, 0, 1, 1, 5]), np.array([0, 0, 2, 9, 1]),
+                          np.array([2.0, 3.0, 1.0, 4.0, 7.0]), skus=2, days=3)
+
+    # Events outside the window or for unknown SKUs are dropped
+    assert matrix.tolist() == [[5.0, 0.0, 0.0], [0.0, 0.0, 1.0]]
+
+
+def test_steady_demand_sets_reorder_point_and_cover():
+    history = np.zeros((3, 90))
+    history[0] = 10             # steady 10/day
+    history[1, ::2] = 20        # same mean, volatile
+    result = compute_forecast(history, on_hand=np.array([100.0, 100.0, 5.0]),
+                              minimum_stock=np.array([10.0, 10.0, 10.0]), lead_time_days=np.array([7.0] * 3))
+
+    assert result["daily_rate"][0] == pytest.approx(10)
+    assert result["reorder_point"][0] == 70
+    assert result["days_of_cover"][0] == pytest.approx(10)
+    assert not result["reorder"][0]
+    # Volatile demand needs more safety stock and triggers a reorder at the same stock level
+    assert result["safety_stock"][1] > result["safety_stock"][0]
+    assert result["reorder"][1] and result["suggested_order_quantity"][1] > 0
+    # No demand: infinite cover, reorder only because stock is below the static minimum
+    assert np.isinf(result["days_of_cover"][2]) and result["reorder"][2]
+    assert result["rank"].tolist() == [2, 0, 1]
+
+
+def test_batch_job_writes_forecasts_served_most_urgent_first(monkeypatch):
+    db = FakeDatabase()
+    monkeypatch.setattr(database, "db", db)
+    today = datetime.now(timezone.utc).date()
+
+    async def scenario():
+        await db.inventory.insert_many([{**item, "id": f"sku-{i}"} for i, item in enumerate(SAMPLE_INVENTORY)])
+        # Ninety days (longer than the weighting window) of steady consumption for the first two SKUs
+        await db.analytics_daily.insert_many([
+            {"day": (today - timedelta(days=d)).isoformat(), "dimension": "sku", "key": key,
+             "counts": {"consumed_quantity": rate}}
+            for d in range(90) for key, rate in (("sku-0", 80), ("sku-1", 5))
+        ])
+        run = await InventoryForecaster(history_days=365).run(db)
+        return run, await inventory.get_inventory_forecast(reorder_only=False, limit=3)
+
+    run, forecast = asyncio.run(scenario())
+
+    assert run["skus"] == len(SAMPLE_INVENTORY)
+    first = forecast["items"][0]
+    # 500 on hand at 80/day covers ~6 days, less than the 7-day lead time
+    assert first["id"] == "sku-0"
+    assert first["forecast"]["days_of_cover"] == pytest.approx(6.25, rel=0.01)
+    assert first["forecast"]["reorder"] is True
+    assert db.inventory.docs[1]["forecast"]["reorder"] is False
+
+
+def test_periodic_job_survives_a_failed_run(monkeypatch):
+    forecaster = InventoryForecaster(interval=0.001)
+    runs = []
+
+    async def run(db):
+        runs.append(db)
+        if len(runs) == 1:
+            raise ValueError("bad history row")
+
+    monkeypatch.setattr(forecaster, "run", run)
+
+    async def scenario():
+        forecaster.start(FakeDatabase())
+        while len(runs) < 3:
+            await asyncio.sleep(0.001)
+        await forecaster.stop()
+
+    asyncio.run(asyncio.wait_for(scenario(), timeout=5))
+
+    assert len(runs) >= 3
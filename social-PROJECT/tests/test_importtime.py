@@ -0,0 +1,65 @@
+import os
+import subprocess
+import sys
+from typing import List, Tuple
+
+from tests.conftest import BACKEND_DIR
+
+# Imported before the application, so the `server` row only counts the application's own work
+FRAMEWORKS = "fastapi, fastapi.responses, starlette.middleware.cors, pydantic, pymongo, dotenv, numpy"
+
+# Milliseconds `import server` may take on top of FRAMEWORKS (about 70 ms on a developer laptop)
+IMPORT_BUDGET_MS = float(os.environ.get("IMPORT_BUDGET_MS", "250"))
+
+# Not needed to serve the first request; imported on first use
+DEFERRED = ("motor", "sample_data", "llama_extract", "multiprocessing")
+
+ENV = {**os.environ, "MONGO_URL": "mongodb://127.0.0.1:1/?serverSelectionTimeoutMS=10"}
+
+
+def _import_profile(code: str) -> List[Tuple[str, int, int]]:
+    """(module, self µs, cumulative µs) for each import `code` makes, in completion order"""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=BACKEND_DIR, env=ENV,
+                            capture_output=True, text=True, check=True)
+    profile = []
+    for line in result.stderr.splitlines():
+        if line.startswith("import time:") and "self [us]" not in line:
+            self_us, cumulative_us, name = line[len("import time:"):].split("|")
+            profile.append((name.strip(), int(self_us), int(cumulative_us)))
+    return profile
+
+
+def test_importing_the_app_stays_within_the_cold_start_budget():
+    # Best of three runs, so a busy machine does not fail the budget
+    runs = [_import_profile(f"import {FRAMEWORKS}; import server") for _ in range(3)]
+    profile = min(runs, key=lambda run: run[-1][2])
+    name, _, cumulative = profile[-1]
+    assert name == "server"
+    frameworks = [module.strip() for module in FRAMEWORKS.split(",")]
+    start = max(i for i, row in enumerate(profile) if row[0] in frameworks) + 1
+    slowest = sorted(profile[start:-1], key=lambda row: -row[1])[:5]
+    assert cumulative / 1000 < IMPORT_BUDGET_MS, (
+        f"import server took {cumulative / 1000:.0f} ms over its frameworks (budget {IMPORT_BUDGET_MS:.0f} ms); "
+        f"slowest: {', '.join(f'{module} {self_us / 1000:.1f} ms' for module, self_us, _ in slowest)}"
+    )
+
+
+def test_importing_the_app_defers_modules_the_first_request_does_not_need():
+    imported = {name.split(".")[0] for name, _, _ in _import_profile("import server")}
+    assert not imported.intersection(DEFERRED)
+
+
+def test_a_partial_app_imports_only_its_route_groups():
+    code = "from application import create_app; create_app(['auth', 'students', 'doctors'])"
+    imported = {name for name, _, _ in _import_profile(code)}
+    assert not imported.intersection({"numpy", "search_index", "forecasting", "drug_index"})
+
+
+def test_a_partial_app_registers_only_its_groups_hooks():
+    from application import create_app
+    from routes import inventory, search
+
+    app = create_app(["auth", "inventory"])
+    assert inventory.start_inventory_forecaster in app.router.on_startup
+    assert inventory.stop_inventory_forecaster in app.router.on_shutdown
+    assert search.build_search_index not in app.router.on_startup
@@ -0,0 +1,266 @@
+import asyncio
+from datetime import datetime, timezone, timedelta
+
+import httpx
+import pytest
+
+import server
+from ai_cache import ai_cache
+from jobs import JobQueue, PermanentJobError, job_queue
+from routes.seed import seed_sample_data
+
+
+def _queue(**kwargs) -> JobQueue:
+    return JobQueue(**{"workers": 0, "retry_base": 0, **kwargs})
+
+
+def test_seeding_runs_as_a_job_with_progress_and_result(db):
+    async def scenario():
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            queued = await client.post("/api/seed-database")
+            again = await client.post("/api/seed-database")
+            # Nothing has been seeded while the request was answered
+            assert await db.prescriptions.count_documents({}) == 0
+            assert await job_queue.run_pending(db) == 1
+            return queued, again, await client.get(f"/api/jobs/{queued.json()['id']}"), \
+                await client.get("/api/jobs", params={"type": "seed_database"})
+
+    queued, again, finished, listed = asyncio.run(scenario())
+
+    assert queued.status_code == 202 and queued.json()["status"] == "queued"
+    # A second reseed while one is queued returns the same job
+    assert again.json()["id"] == queued.json()["id"]
+    job = finished.json()
+    assert job["status"] == "succeeded" and job["attempts"] == 1
+    assert job["progress"]["done"] == job["progress"]["total"] == 4
+    assert job["result"]["counts"]["prescriptions"] == 10
+    assert "lease_token" not in job and "lease_until" not in job
+    assert [j["id"] for j in listed.json()] == [job["id"]]
+
+
+
+def test_reseeding_reuses_memoized_summaries(db, monkeypatch):
+    monkeypatch.setattr(ai_cache, "collection", None)
+    ai_cache.clear()
+
+    async def scenario():
+        await seed_sample_data()
+        await seed_sample_data()
+
+    try:
+        asyncio.run(scenario())
+        summaries = ai_cache.stats()["kinds"]["summary"]
+    finally:
+        ai_cache.clear()
+
+    # The second seed finds every summary generated by the first
+    assert summaries["memory_hits"] >= 10
+    assert len(db.ai_summaries.docs) == 10
+
+
+def test_racing_processes_queue_one_job_per_key(db):
+    # Two queues stand in for two API processes sharing the database
+    queues = [_queue(), _queue()]
+    for queue in queues:
+        queue.register("task", lambda job: asyncio.sleep(0))
+    find_one = db.jobs.find_one
+
+    async def slow_find_one(*args, **kwargs):
+        found = await find_one(*args, **kwargs)
+        # Both lookups complete before either process inserts
+        await asyncio.sleep(0.01)
+        return found
+
+    async def scenario():
+        await queues[0].ensure_indexes(db)
+        db.jobs.find_one = slow_find_one
+        enqueued = await asyncio.gather(*(q.enqueue(db, "task", key="reseed") for q in queues))
+        debounced = await asyncio.gather(*(q.debounce(db, "task", {}, key="refresh", delay=5, max_delay=30)
+                                           for q in queues))
+        await queues[0].run_pending(db)
+        again = await queues[1].enqueue(db, "task", key="reseed")
+        return enqueued, debounced, again
+
+    enqueued, debounced, again = asyncio.run(scenario())
+
+    assert enqueued[0]["id"] == enqueued[1]["id"]
+    assert debounced[0]["id"] == debounced[1]["id"] and debounced[1]["coalesced"] == 1
+    assert len(db.jobs.docs) == 3
+    # Finished jobs free their key
+    assert again["id"] != enqueued[0]["id"]
+
+
+def test_failed_jobs_are_retried_until_max_attempts(db):
+    queue = _queue()
+    calls = []
+
+    async def flaky(job):
+        calls.append(job.attempt)
+        if job.attempt < 3:
+            raise RuntimeError(f"attempt {job.attempt} failed")
+        return {"ok": True}
+
+    async def always_fails(job):
+        raise RuntimeError("still broken")
+
+    queue.register("flaky", flaky, max_attempts=3)
+    queue.register("broken", always_fails, max_attempts=2)
+
+    async def scenario():
+        flaky_job = await queue.enqueue(db, "flaky")
+        broken_job = await queue.enqueue(db, "broken")
+        await queue.run_pending(db)
+        return await queue.get(db, flaky_job["id"]), await queue.get(db, broken_job["id"])
+
+    flaky_job, broken_job = asyncio.run(scenario())
+
+    assert calls == [1, 2, 3]
+    assert flaky_job["status"] == "succeeded" and flaky_job["result"] == {"ok": True}
+    assert (broken_job["status"], broken_job["attempts"], broken_job["error"]) == ("failed", 2, "still broken")
+    assert queue.metrics()["outcomes"] == {"flaky": {"enqueued": 1, "retried": 2, "succeeded": 1},
+                                           "broken": {"enqueued": 1, "retried": 1, "failed": 1}}
+
+
+def test_retries_back_off_exponentially_with_jitter():
+    queue = _queue(retry_base=2, retry_max=10)
+    delays = [[queue.backoff(attempt) for _ in range(200)] for attempt in (1, 2, 3, 4)]
+
+    assert [max(d) <= limit for d, limit in zip(delays, (2, 4, 8, 10))] == [True] * 4
+    assert all(min(d) >= 0 for d in delays)
+    assert max(delays[2]) > 4
+
+
+def test_retry_waits_for_its_backoff(db, monkeypatch):
+    queue = _queue()
+    monkeypatch.setattr(queue, "backoff", lambda attempt: 60)
+
+    async def fails(job):
+        raise RuntimeError("try later")
+
+    queue.register("later", fails)
+
+    async def scenario():
+        job = await queue.enqueue(db, "later")
+        ran = await queue.run_pending(db)
+        return ran, await queue.get(db, job["id"])
+
+    ran, job = asyncio.run(scenario())
+
+    assert ran == 1
+    assert job["status"] == "queued" and job["error"] == "try later"
+    assert job["run_at"] > datetime.now(timezone.utc) + timedelta(seconds=50)
+
+
+def test_missing_prescription_fails_the_summary_job_without_retries(db):
+    async def scenario():
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            queued = await client.post("/api/ai-summaries/generate/missing/job")
+            await job_queue.run_pending(db)
+            return queued, (await client.get(f"/api/jobs/{queued.json()['id']}")).json()
+
+    queued, job = asyncio.run(scenario())
+
+    assert queued.status_code == 202
+    assert (job["status"], job["attempts"]) == ("failed", 1)
+    assert "not found" in job["error"]
+
+
+def test_expired_lease_is_claimed_again_and_the_old_owner_cannot_write(db):
+    queue = _queue(lease_seconds=30)
+    queue.register("task", lambda job: asyncio.sleep(0, {"done": job.attempt}))
+
+    async def scenario():
+        queued = await queue.enqueue(db, "task")
+        stale = await queue.claim(db)
+        # The first worker dies without renewing its lease
+        await db.jobs.update_one({"id": queued["id"]},
+                                 {"$set": {"lease_until": datetime.now(timezone.utc) - timedelta(seconds=1)}})
+        other = _queue()
+        other.register("task", queue.types["task"].handler)
+        assert await other.run_pending(db) == 1
+        assert not await queue._update(db, stale, {"$set": {"status": "failed"}})
+        return stale, await queue.get(db, queued["id"])
+
+    stale, job = asyncio.run(scenario())
+
+    assert stale.attempt == 1
+    assert (job["status"], job["attempts"], job["result"]) == ("succeeded", 2, {"done": 2})
+
+
+def test_workers_respect_the_per_type_concurrency_limit(db):
+    queue = JobQueue(workers=4, poll_interval=0.01)
+    running = peak = 0
+
+    async def task(job):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await job.progress(1, 2)
+        await asyncio.sleep(0.02)
+        running -= 1
+
+    queue.register("limited", task, concurrency=2)
+
+    async def scenario():
+        queue.start(db)
+        ids = [(await queue.enqueue(db, "limited"))["id"] for _ in range(6)]
+        for _ in range(200):
+            if await db.jobs.count_documents({"status": "succeeded"}) == 6:
+                break
+            await asyncio.sleep(0.01)
+        backlog = await queue.backlog(db)
+        await queue.stop()
+        return ids, backlog
+
+    ids, backlog = asyncio.run(scenario())
+
+    assert peak == 2
+    assert backlog == {"limited": {"queued": 0, "running": 0}}
+    assert asyncio.run(db.jobs.count_documents({"id": {"$in": ids}, "status": "succeeded"})) == 6
+
+
+def test_stopping_the_workers_requeues_running_jobs(db):
+    queue = JobQueue(workers=1, poll_interval=0.01)
+    started = asyncio.Event()
+
+    async def endless(job):
+        started.set()
+        await asyncio.Event().wait()
+
+    queue.register("endless", endless)
+
+    async def scenario():
+        queue.start(db)
+        job = await queue.enqueue(db, "endless")
+        await started.wait()
+        assert queue.metrics()["running"] == {"endless": 1}
+        await queue.stop()
+        return await queue.get(db, job["id"])
+
+    job = asyncio.run(scenario())
+
+    assert (job["status"], job["attempts"]) == ("queued", 0)
+    assert "lease_until" not in job
+    assert queue.metrics()["running"] == {"endless": 0}
+
+
+def test_permanent_errors_and_unknown_types(db):
+    queue = _queue()
+
+    async def invalid(job):
+        raise PermanentJobError("bad parameters")
+
+    queue.register("invalid", invalid)
+
+    async def scenario():
+        job = await queue.enqueue(db, "invalid")
+        await queue.run_pending(db)
+        with pytest.raises(ValueError):
+            await queue.enqueue(db, "unknown")
+        return await queue.get(db, job["id"])
+
+    job = asyncio.run(scenario())
+
+    assert (job["status"], job["attempts"], job["error"]) == ("failed", 1, "bad parameters")
@@ -0,0 +1,136 @@
+import asyncio
+
+from ai_service import AIService, ExtractedPrescription
+from llama_extract import EXTRACT_CONFIG, CircuitBreaker, LlamaExtractClient
+from tests.fake_llama_cloud import FakeLlamaCloud
+
+PRESCRIPTION_TEXT = """Clinic: Wellness Care
+Date: 2024-12-29
+Patient: Diya Sharma, Age: 36, Sex: Male
+Symptoms: Cough, Shortness of breath
+Medications:
+1. Ranitidine 300 mg (tablet) - Once daily, 3 days, Route: Oral, Qty: 3
+Notes: Follow up after completion of medication.
+Prescribed by: Dr. Shreya Gupta (Reg. #eab9f811)
+"""
+
+
+def _service(fake: FakeLlamaCloud, **kwargs) -> AIService:
+    service = AIService()
+    service.llama_client = LlamaExtractClient(
+        "test-key", base_url="http://llama.test", data_schema=ExtractedPrescription.model_json_schema(),
+        transport=fake.transport(), backoff_base=0.001, poll_interval=0.001, **kwargs
+    )
+    return service
+
+
+def test_extraction_submits_a_stateless_job_and_polls_it_for_the_result():
+    fake = FakeLlamaCloud(delay=0.02)
+    service = _service(fake)
+
+    result = asyncio.run(service.extract_prescription(PRESCRIPTION_TEXT))
+
+    payload = fake.payloads[0]
+    assert set(payload) == {"data_schema", "config", "text"}
+    assert payload["text"] == PRESCRIPTION_TEXT and payload["config"] == EXTRACT_CONFIG
+    assert payload["data_schema"]["properties"].keys() >= {"patient_name", "medicines"}
+    assert fake.polls > 1 and service.llama_client.stats["polls"] == fake.polls
+    assert result["diagnosis"] == "remote" and result["medicines"][0]["name"] == "Ranitidine"
+
+
+def test_failed_jobs_fall_back_to_regex_without_retrying():
+    fake = FakeLlamaCloud(job_status="ERROR")
+    service = _service(fake, max_retries=2)
+
+    result = asyncio.run(service.extract_prescription(PRESCRIPTION_TEXT))
+
+    assert result == service.extract_with_regex(PRESCRIPTION_TEXT)
+    assert fake.requests == 1 and service.llama_client.stats["retries"] == 0
+    assert service.llama_client.breaker.state == "closed"
+
+
+def test_remote_extraction_is_used_and_retried_after_transient_failures():
+    fake = FakeLlamaCloud(fail_first=2)
+    service = _service(fake, max_retries=2)
+
+    result = asyncio.run(service.extract_prescription(PRESCRIPTION_TEXT))
+
+    assert result["diagnosis"] == "remote"
+    assert result["medicines"][0]["name"] == "Ranitidine"
+    assert fake.requests == 3
+    assert service.llama_client.stats["retries"] == 2
+
+
+def test_timeouts_fall_back_to_regex_and_open_the_breaker():
+    fake = FakeLlamaCloud(delay=0.2)
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+    service = _service(fake, timeout=0.02, max_retries=0, breaker=breaker)
+
+    async def scenario():
+        results = []
+        for _ in range(3):
+            results.append(await service.extract_prescription(PRESCRIPTION_TEXT + " "))
+        return results
+
+    results = asyncio.run(scenario())
+
+    assert all(r["diagnosis"] is None for r in results)
+    assert results[0] == service.extract_with_regex(PRESCRIPTION_TEXT)
+    assert breaker.state == "open"
+    assert fake.requests == 2
+    assert service.llama_client.stats["short_circuited"] == 1
+
+
+def test_non_json_bodies_are_retried_like_server_errors():
+    fake = FakeLlamaCloud(fail_first=1, status_code=200)
+    service = _service(fake, max_retries=1)
+
+    result = asyncio.run(service.extract_prescription(PRESCRIPTION_TEXT))
+
+    assert result["diagnosis"] == "remote"
+    assert fake.requests == 2 and service.llama_client.stats["retries"] == 1
+
+
+def test_refused_credentials_open_the_breaker_without_retries():
+    fake = FakeLlamaCloud(fail_first=100, status_code=401)
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+    service = _service(fake, max_retries=2, breaker=breaker)
+
+    async def scenario():
+        return [await service.extract_prescription(PRESCRIPTION_TEXT + " " * i) for i in range(3)]
+
+    results = asyncio.run(scenario())
+
+    assert all(r == service.extract_with_regex(PRESCRIPTION_TEXT) for r in results)
+    assert fake.requests == 2 and service.llama_client.stats["retries"] == 0
+    assert breaker.state == "open" and service.llama_client.stats["short_circuited"] == 1
+
+
+def test_half_open_breaker_closes_after_successful_probe():
+    now = [0.0]
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=lambda: now[0])
+    breaker.record_failure()
+    assert not breaker.allow_request()
+
+    now[0] = 11
+    assert breaker.allow_request()
+    assert not breaker.allow_request()  # only one probe at a time
+    breaker.record_success(latency=0.01)
+    assert breaker.state == "closed"
+
+
+def test_identical_concurrent_inputs_are_coalesced_and_concurrency_is_bounded():
+    fake = FakeLlamaCloud(delay=0.05)
+    service = _service(fake, max_concurrency=2)
+
+    async def scenario():
+        same = [service.extract_prescription(PRESCRIPTION_TEXT) for _ in range(5)]
+        distinct = [service.extract_prescription(PRESCRIPTION_TEXT + "\n" * i) for i in range(1, 5)]
+        return await asyncio.gather(*same, *distinct)
+
+    results = asyncio.run(scenario())
+
+    assert all(r["diagnosis"] == "remote" for r in results)
+    assert fake.requests == 5
+    assert fake.max_active == 2
+    assert service.llama_client.stats["coalesced"] == 4
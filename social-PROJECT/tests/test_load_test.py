@@ -0,0 +1,36 @@
+import asyncio
+
+from ai_cache import ai_cache, LRUCache
+from benchmarks.load_test import HealthcareLoadTester, build_app, compare_reports, percentile
+
+
+def test_load_test_reports_percentiles_per_route(db, monkeypatch):
+    # `db` restores the database and admission controller build_app rebinds; the run's
+    # summaries must not stay memoized for the tests after this one either
+    monkeypatch.setattr(ai_cache, "memory", LRUCache(ai_cache.memory.max_entries))
+    monkeypatch.setattr(ai_cache, "_stats", {})
+    tester = HealthcareLoadTester(build_app(db=db), concurrency=4, total_requests=80, seed=1)
+    report = asyncio.run(tester.run())
+
+    assert report["totals"]["errors"] == 0
+    assert report["totals"]["requests"] >= 80
+    queue = report["routes"]["GET /api/doctors/{doctor_id}/queue"]
+    assert queue["p50_ms"] <= queue["p95_ms"] <= queue["p99_ms"] <= queue["max_ms"]
+    assert set(report["scenarios"]) <= {name for name, _, _ in tester.scenarios}
+
+
+def test_compare_reports_flags_p95_regressions():
+    baseline = {"routes": {"GET /api/inventory": {"p95_ms": 10.0}, "GET /api/doctors": {"p95_ms": 10.0}}}
+    current = {"routes": {"GET /api/inventory": {"p95_ms": 20.0}, "GET /api/doctors": {"p95_ms": 11.0}}}
+
+    assert compare_reports(current, baseline, tolerance=0.25) == ["GET /api/inventory"]
+    assert percentile([1.0, 2.0, 3.0, 4.0], 50) == 2.0
+
+
+def test_percentile_uses_the_nearest_rank():
+    values = [1.0, 2.0, 3.0, 4.0, 5.0, 6.0]
+
+    assert percentile(values, 50) == 3.0
+    assert percentile(values, 0) == 1.0 and percentile(values, 100) == 6.0
+    assert percentile([float(v) for v in range(1, 101)], 7) == 7.0
+    assert percentile(values[:1], 99) == 1.0 and percentile([], 50) == 0.0
@@ -0,0 +1,76 @@
+import time
+
+import pytest
+
+from ai_service import AIService
+from medication_parser import MedicationParseError, parse_medication_line, parse_medications
+
+
+@pytest.mark.parametrize("line, name, dosage", [
+    ("1. Ranitidine 300 mg (tablet) - Once daily, 3 days, Route: Oral, Qty: 3", "Ranitidine", "300 mg"),
+    ("2. Vitamin B12 1000 mcg (tablet) - Once daily, 30 days, Route: Oral, Qty: 30", "Vitamin B12", "1000 mcg"),
+    ("3. Vitamin D3 60000 IU (capsule) - Weekly, 8 weeks, Route: Oral, Qty: 8", "Vitamin D3", "60000 IU"),
+    ("4. Hydrocortisone 1% (cream) - Twice daily, 7 days, Route: Topical, Qty: 1", "Hydrocortisone", "1%"),
+    ("5. Amoxicillin (Amoxil) 125 mg/5 ml (syrup) - When required (PRN), 5 days, Qty: 1, Route: Oral",
+     "Amoxicillin (Amoxil)", "125 mg/5 ml"),
+    ("6. Paracetamol 0.5 g (tablet) - Every 6 hours, 3 days, Route: Oral, Qty: 12", "Paracetamol", "0.5 g"),
+])
+def test_parses_units_beyond_mg_and_ml(line, name, dosage):
+    medicine = parse_medication_line(line)
+    assert (medicine["name"], medicine["dosage"]) == (name, dosage)
+    assert medicine["route"] in ("Oral", "Topical")
+
+
+def test_reports_failures_with_line_and_column_instead_of_skipping():
+    text = "\n".join([
+        "Patient: Test, Age: 30, Sex: Male",
+        "Medications:",
+        "1. Ibuprofen 400 mg (tablet) - Twice daily, 3 days, Route: Oral, Qty: 6",
+        "2. Cetirizine (tablet) - Once daily, 5 days, Route: Oral, Qty: 5",
+        "3. Metformin 500 mg (tablet) - Twice daily, 5 days, Route: Oral, Qty: ten",
+        "Notes: Rest",
+    ])
+
+    medicines, errors = parse_medications(text)
+
+    assert [m["name"] for m in medicines] == ["Ibuprofen"]
+    assert [(e.line, e.message) for e in errors] == [
+        (4, "expected dose followed by '(form)'"),
+        (5, "quantity must be a whole number"),
+    ]
+    assert errors[1].text[errors[1].column:].strip() == "ten"
+
+    extracted = AIService().extract_with_regex(text)
+    assert len(extracted["medicines"]) == 1
+    assert [e["line"] for e in extracted["parse_errors"]] == [4, 5]
+
+
+def test_adversarial_sections_parse_in_linear_time():
+    no_form = "Medications:\n1. " + "1.1 mg " * 20_000 + "\n"
+    unterminated = "Medications:\n" + "1. A 5 mg (tab) - x " * 20_000 + "\n"
+    compound = "1. X " + "1 mg/" * 2000 + "1 mg (tab) - a, b, Route: c, Qty: 1"
+
+    started = time.perf_counter()
+    for text in (no_form, unterminated):
+        with pytest.raises(MedicationParseError):
+            parse_medication_line(text.split("\n")[1])
+    extracted = AIService().extract_with_regex("Medications:\n" + compound + "\n" + "1. X " + "1 mg/" * 20_000)
+    assert time.perf_counter() - started < 0.5
+    assert extracted["medicines"] == []
+    assert [e["message"] for e in extracted["parse_errors"]] == ["expected dose followed by '(form)'"] * 2
+
+
+def test_unexpected_failures_become_parse_errors(monkeypatch):
+    import medication_parser
+
+    def broken(raw, line=0):
+        if "Cetirizine" in raw:
+            raise RecursionError("maximum recursion depth exceeded")
+        return {"name": raw}
+
+    monkeypatch.setattr(medication_parser, "parse_medication_line", broken)
+
+    medicines, errors = parse_medications("Medications:\n1. Ibuprofen\n2. Cetirizine\n3. Metformin")
+
+    assert len(medicines) == 2
+    assert [(e.line, e.message) for e in errors] == [(3, "could not parse line: RecursionError")]
@@ -0,0 +1,76 @@
+import io
+import tracemalloc
+
+from benchmarks.ai_service_bench import build_prescription, render_prescription_text
+from prescription_stream import PrescriptionStreamSplitter, iter_extracted_prescriptions
+from sample_data import SAMPLE_PRESCRIPTIONS
+
+
+def _dump(count: int, separator: str = "\n\n") -> str:
+    return separator.join(render_prescription_text(SAMPLE_PRESCRIPTIONS[i % len(SAMPLE_PRESCRIPTIONS)])
+                          for i in range(count))
+
+
+class _GeneratedDump(io.TextIOBase):
+    """Text stream that renders prescriptions on demand instead of holding the dump in memory"""
+
+    def __init__(self, count: int):
+        self._remaining = count
+        self._buffer = ""
+
+    def readable(self):
+        return True
+
+    def read(self, size=-1):
+        while self._remaining and len(self._buffer) < size:
+            self._buffer += render_prescription_text(build_prescription(medicines=5)) + "\n\n"
+            self._remaining -= 1
+        chunk, self._buffer = self._buffer[:size], self._buffer[size:]
+        return chunk
+
+
+def test_splits_concatenated_dump_regardless_of_chunk_boundaries(tmp_path):
+    path = tmp_path / "export.txt"
+    path.write_text("Clinic export 2025-01-01\n=====\n" + _dump(25))
+
+    for chunk_size in (7, 64, 1 << 20):
+        splitter = PrescriptionStreamSplitter(chunk_size=chunk_size)
+        extracted = list(iter_extracted_prescriptions(path, splitter=splitter))
+        assert len(extracted) == 25
+        assert [p.patient_name for p in extracted[:10]] == [p["patient_name"] for p in SAMPLE_PRESCRIPTIONS]
+        assert len(extracted[1].medicines) == len(SAMPLE_PRESCRIPTIONS[1]["medicines"])
+        assert splitter.stats.skipped_empty == 1
+
+
+def test_separator_lines_and_missing_signatures_still_split():
+    records = [render_prescription_text(p).rsplit("\nPrescribed by", 1)[0] for p in SAMPLE_PRESCRIPTIONS[:3]]
+    stream = io.StringIO("\n-----\n".join(records[:2]) + "\n" + records[2])
+
+    extracted = list(iter_extracted_prescriptions(stream))
+    assert [p.patient_name for p in extracted] == [p["patient_name"] for p in SAMPLE_PRESCRIPTIONS[:3]]
+
+
+def test_oversized_records_are_skipped():
+    huge = "Patient: Huge Record, Age: 1, Sex: Male\nNotes: " + "x" * 5000
+    stream = io.StringIO(huge + "\n\n" + _dump(2))
+    splitter = PrescriptionStreamSplitter(chunk_size=256, max_record_chars=2048)
+
+    extracted = list(iter_extracted_prescriptions(stream, splitter=splitter))
+    assert [p.patient_name for p in extracted] == [p["patient_name"] for p in SAMPLE_PRESCRIPTIONS[:2]]
+    assert splitter.stats.skipped_oversized == 1
+
+
+def test_peak_memory_does_not_grow_with_dump_size():
+    def peak_for(count):
+        tracemalloc.start()
+        try:
+            total = sum(1 for _ in iter_extracted_prescriptions(
+                _GeneratedDump(count), splitter=PrescriptionStreamSplitter(chunk_size=16 * 1024)))
+            return total, tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    small_count, small_peak = peak_for(50)
+    large_count, large_peak = peak_for(1000)
+    assert (small_count, large_count) == (50, 1000)
+    assert large_peak < small_peak * 1.5
@@ -0,0 +1,97 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from audit_log import AuditLog
+from models import InventoryUpdate
+from routes import appointments, dispense, inventory, prescriptions
+from sample_data import SAMPLE_INVENTORY
+
+
+@pytest.fixture
+def db(db, monkeypatch):
+    log = AuditLog(flush_interval=60)
+    for module in (appointments, dispense, prescriptions):
+        monkeypatch.setattr(module, "audit_log", log)
+
+    async def seed():
+        await db.inventory.insert_many([{**item, "id": f"sku-{i}"} for i, item in enumerate(SAMPLE_INVENTORY)])
+        await db.appointments.insert_one({"id": "apt-1", "status": "scheduled"})
+        await db.prescriptions.insert_many([{"id": f"presc-{i}", "status": "pending"} for i in range(2)])
+        await db.dispense_requests.insert_many([
+            {"id": f"req-{i}", "prescription_id": f"presc-{i}", "status": "pending",
+             "medicines": [{"name": SAMPLE_INVENTORY[i]["medicine_name"], "dosage": SAMPLE_INVENTORY[i]["dosage"],
+                            "quantity": 2}]}
+            for i in range(2)
+        ])
+        await dispense.refresh_drug_index()
+
+    asyncio.run(seed())
+    return db
+
+
+def _round_trips(db, call):
+    db.round_trips = 0
+    result = asyncio.run(call)
+    return db.round_trips, result
+
+
+def test_writes_return_the_stored_document_in_one_round_trip(db):
+    trips, item = _round_trips(db, inventory.update_inventory("sku-0", InventoryUpdate(quantity_available=42)))
+    assert trips == 1 and item["quantity_available"] == 42 and item["last_restocked"]
+
+    trips, appointment = _round_trips(db, appointments.update_appointment_status("apt-1", "completed", notes="ok"))
+    assert trips == 1 and appointment == {"id": "apt-1", "status": "completed", "notes": "ok", "version": 1}
+
+    trips, prescription = _round_trips(db, prescriptions.update_prescription_status("presc-1", "cancelled"))
+    assert trips == 1 and prescription["status"] == "cancelled"
+    assert db.prescriptions.docs[1]["status"] == "cancelled"
+
+
+def test_dispense_flow_round_trips(db):
+    # One read, the status write, one inventory bulk write, the rollup write and the prescription write
+    trips, approved = _round_trips(db, dispense.approve_dispense_request("req-0", "pharm-1"))
+    assert trips == 5 and approved["status"] == "approved"
+    assert approved["inventory_consumed"] == {"sku-0": 2}
+
+    trips, dispensed = _round_trips(db, dispense.dispense_medication("req-0", "pharm-1"))
+    assert trips == 3 and dispensed["status"] == "dispensed"
+
+    trips, rejected = _round_trips(db, dispense.reject_dispense_request("req-1", "pharm-1", "Out of stock"))
+    assert trips == 2 and rejected["status"] == "rejected"
+    assert {k: v for k, v in rejected.items() if k != "rejected_at"} == \
+        {k: v for k, v in db.dispense_requests.docs[1].items() if k not in ("_id", "rejected_at")}
+
+
+@pytest.mark.parametrize("call", [
+    lambda: inventory.update_inventory("missing", InventoryUpdate(quantity_available=1)),
+    lambda: appointments.update_appointment_status("missing", "completed"),
+    lambda: prescriptions.update_prescription_status("missing", "approved"),
+    lambda: dispense.approve_dispense_request("missing", "pharm-1"),
+    lambda: dispense.dispense_medication("missing", "pharm-1"),
+    lambda: dispense.reject_dispense_request("missing", "pharm-1", "n/a"),
+])
+def test_missing_documents_are_404(db, call):
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(call())
+    assert exc.value.status_code == 404 and exc.value.detail.endswith("not found")
+
+
+def test_rejecting_an_approved_request_returns_its_stock(db):
+    stock = {doc["id"]: doc["quantity_available"] for doc in db.inventory.docs}
+
+    async def scenario():
+        await dispense.approve_dispense_request("req-0", "pharm-1")
+        taken = next(doc for doc in db.inventory.docs if doc["id"] == "sku-0")["quantity_available"]
+        rejected = await dispense.reject_dispense_request("req-0", "pharm-1", "Wrong patient")
+        rollups = await db.analytics_daily.find({"dimension": "sku", "key": "sku-0"}, {"_id": 0}).to_list(None)
+        return taken, rejected, rollups
+
+    taken, rejected, rollups = asyncio.run(scenario())
+
+    assert taken == stock["sku-0"] - 2
+    assert rejected["status"] == "rejected"
+    assert {doc["id"]: doc["quantity_available"] for doc in db.inventory.docs} == stock
+    assert db.prescriptions.docs[0]["status"] == "pending"
+    assert [r["counts"]["consumed_quantity"] for r in rollups] == [0]
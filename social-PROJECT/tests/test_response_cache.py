@@ -0,0 +1,102 @@
+import asyncio
+from collections import Counter
+
+import httpx
+import pytest
+
+import database
+import server
+from models import InventoryUpdate
+from response_cache import ResponseVersions, response_versions
+from routes import inventory
+from sample_data import SAMPLE_INVENTORY, SAMPLE_STUDENTS
+
+
+@pytest.fixture
+def db(db, monkeypatch):
+    monkeypatch.setattr(response_versions, "versions", {})
+    monkeypatch.setattr(response_versions, "served", {})
+    monkeypatch.setattr(response_versions, "_pending", Counter())
+    monkeypatch.setattr(response_versions, "_synced_at", None)
+    asyncio.run(db.students.insert_one({**SAMPLE_STUDENTS[0], "id": "student-1"}))
+    asyncio.run(db.inventory.insert_many([{**item, "id": f"item-{i}"} for i, item in enumerate(SAMPLE_INVENTORY)]))
+    return db
+
+
+def _get(*requests):
+    async def scenario():
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            responses = []
+            for request in requests:
+                if callable(request):
+                    await request()
+                    continue
+                path, headers = request
+                responses.append(await client.get(path, headers=headers))
+            return responses
+
+    return asyncio.run(scenario())
+
+
+def test_unchanged_resource_is_answered_304_without_reaching_the_handler(db, monkeypatch):
+    first, = _get(("/api/students/student-1", {}))
+    etag = first.headers["etag"]
+    assert first.status_code == 200 and first.json()["id"] == "student-1"
+    assert first.headers["cache-control"] == "private, no-cache"
+
+    # The handler would fail without a database; a 304 never gets that far
+    monkeypatch.setattr(database, "db", None)
+    second, = _get(("/api/students/student-1", {"If-None-Match": etag}))
+
+    assert second.status_code == 304 and second.content == b""
+    assert second.headers["etag"] == etag
+    assert response_versions.metrics()["routes"]["student"]["not_modified"] == 1
+
+
+def test_writes_change_the_etag_of_the_collection(db):
+    first, = _get(("/api/inventory", {}))
+    etag = first.headers["etag"]
+
+    async def restock():
+        await inventory.update_inventory("item-0", InventoryUpdate(quantity_available=7))
+
+    unchanged, changed = _get(("/api/doctors", {"If-None-Match": etag}), restock,
+                              ("/api/inventory", {"If-None-Match": etag}))
+
+    assert unchanged.status_code == 200
+    assert changed.status_code == 200 and changed.headers["etag"] != etag
+    assert next(i for i in changed.json() if i["id"] == "item-0")["quantity_available"] == 7
+    assert _get(("/api/inventory", {"If-None-Match": changed.headers["etag"]}))[0].status_code == 304
+
+
+def test_versions_bumped_by_another_worker_are_picked_up_on_sync(db):
+    other_worker = ResponseVersions()
+
+    async def scenario():
+        await response_versions.sync(db)
+        before = response_versions.etag("ai_summaries", "Jane")
+        other_worker.bump("ai_summaries", "Jane")
+        await other_worker.flush(db)
+        unchanged = response_versions.etag("ai_summaries", "Jane")
+        await response_versions.sync(db)
+        return before, unchanged, response_versions.etag("ai_summaries", "Jane")
+
+    before, unchanged, after = asyncio.run(scenario())
+
+    assert before == unchanged != after
+    assert after == other_worker.etag("ai_summaries", "Jane")
+
+
+def test_bumps_add_no_round_trip_and_are_flushed_in_one_bulk_write(db):
+    async def scenario():
+        db.round_trips = 0
+        for name in ("Jane", "John", "Jane"):
+            response_versions.bump("ai_summaries", name)
+        bumped = db.round_trips
+        await response_versions.flush(db)
+        return bumped, db.round_trips
+
+    assert asyncio.run(scenario()) == (0, 1)
+    stored = {doc["scope"]: doc["version"] for doc in db.response_versions.docs}
+    assert stored == {"ai_summaries/Jane": 2, "ai_summaries/John": 1}
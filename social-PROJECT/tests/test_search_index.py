@@ -0,0 +1,152 @@
+import asyncio
+
+import pytest
+
+import database
+from models import PrescriptionCreate
+from routes import prescriptions, search
+from sample_data import SAMPLE_PRESCRIPTIONS
+from search_index import SearchIndex, SearchIndexSync
+from tests.fake_mongo import FakeDatabase
+
+
+@pytest.fixture
+def index():
+    index = SearchIndex()
+    index.build(("prescription", {**p, "id": f"presc-{i}", "status": "pending"})
+                for i, p in enumerate(SAMPLE_PRESCRIPTIONS))
+    return index
+
+
+def _expected(predicate):
+    return {f"presc-{i}" for i, p in enumerate(SAMPLE_PRESCRIPTIONS) if predicate(p)}
+
+
+def test_terms_and_facets_are_and_ed(index):
+    result = index.search("fatigue", {"medicine": ["Metformin"]}, limit=100)
+
+    assert {r["id"] for r in result["hits"]} == _expected(
+        lambda p: "Fatigue" in p["symptoms"] and any(m["name"] == "Metformin" for m in p["medicines"]))
+    assert result["total"] == len(result["hits"])
+
+
+def test_brand_names_and_case_match_generic_postings(index):
+    generic = {r["id"] for r in index.search("ibuprofen", limit=100)["hits"]}
+    assert generic
+    assert {r["id"] for r in index.search("ADVIL", limit=100)["hits"]} == generic
+    assert {r["id"] for r in index.search("", {"medicine": ["advil"]}, limit=100)["hits"]} == generic
+
+
+def test_date_range_and_newest_first(index):
+    result = index.search(date_from="2025-01-01", date_to="2025-06-30", limit=100)
+
+    dates = [SAMPLE_PRESCRIPTIONS[int(r["id"].split("-")[1])]["date"] for r in result["hits"]]
+    assert result["total"] == len(_expected(lambda p: "2025-01-01" <= p["date"] <= "2025-06-30"))
+    assert dates == sorted(dates, reverse=True)
+    assert all("2025-01-01" <= d <= "2025-06-30" for d in dates)
+
+
+def test_facet_counts_match_results(index):
+    result = index.search("", {"clinic": ["Wellness Care"]}, limit=100)
+
+    clinics = {f["value"]: f["count"] for f in result["facets"]["clinic"]}
+    assert clinics == {"Wellness Care": len(_expected(lambda p: p["clinic"] == "Wellness Care"))}
+    statuses = {f["value"]: f["count"] for f in result["facets"]["status"]}
+    assert statuses == {"pending": result["total"]}
+
+
+def test_medical_records_have_their_own_facet(index):
+    index.add("medical_record", {"id": "rec-1", "record_type": "lab_result", "description": "HbA1c panel",
+                                 "created_at": "2025-02-01T09:00:00+00:00"})
+
+    result = index.search("", limit=100)
+    statuses = {f["value"]: f["count"] for f in result["facets"]["status"]}
+    assert statuses == {"pending": len(SAMPLE_PRESCRIPTIONS)}
+    assert result["facets"]["record_type"] == [{"value": "lab_result", "count": 1}]
+    assert [r["id"] for r in index.search(filters={"record_type": ["lab_result"]})["hits"]] == ["rec-1"]
+    assert index.search(filters={"status": ["lab_result"]})["total"] == 0
+
+
+def test_status_change_and_removal_update_postings(index):
+    index.set_status("prescription", "presc-0", "dispensed")
+    assert [r["id"] for r in index.search(filters={"status": ["dispensed"]})["hits"]] == ["presc-0"]
+
+    index.remove("prescription", "presc-0")
+    assert index.search(filters={"status": ["dispensed"]})["total"] == 0
+    assert len(index) == len(SAMPLE_PRESCRIPTIONS) - 1
+
+
+def test_compaction_keeps_results(index):
+    before = index.search("fatigue", limit=100)
+    index.remove("prescription", "presc-1")
+    index.compact()
+
+    after = index.search("fatigue", limit=100)
+    assert {h["id"] for h in after["hits"]} == {h["id"] for h in before["hits"]} - {"presc-1"}
+    assert index.search(filters={"status": ["pending"]})["total"] == len(SAMPLE_PRESCRIPTIONS) - 1
+
+
+def test_writes_keep_endpoint_results_current(monkeypatch):
+    monkeypatch.setattr(database, "db", FakeDatabase())
+
+    async def scenario():
+        await search.refresh_search_index()
+        created = await prescriptions.create_prescription(
+            PrescriptionCreate(**{k: v for k, v in SAMPLE_PRESCRIPTIONS[1].items()
+                                         if k in PrescriptionCreate.model_fields}),
+            doctor_name="Dr. Test", doctor_reg="reg-1")
+        await prescriptions.update_prescription_status(created["id"], "approved")
+        return created, await search.search(
+            q="fatigue", type=None, clinic=None, prescriber=None, medicine=None, status=["approved"],
+            record_type=None, date_from=None, date_to=None, days=1, limit=20, offset=0)
+
+    created, result = asyncio.run(scenario())
+
+    assert [r["id"] for r in result["results"]] == [created["id"]]
+    assert result["results"][0]["status"] == "approved"
+    assert result["facets"]["prescriber"] == [{"value": "Dr. Test", "count": 1}]
+
+
+def test_workers_share_writes_and_rebuilds_through_mongo():
+    db = FakeDatabase()
+    worker_a = SearchIndexSync(SearchIndex(), search.SEARCH_COLLECTIONS, sync_interval=1)
+    worker_b = SearchIndexSync(SearchIndex(), search.SEARCH_COLLECTIONS, sync_interval=1)
+    prescription = {**SAMPLE_PRESCRIPTIONS[0], "id": "presc-0", "status": "pending"}
+
+    async def scenario():
+        await db.prescriptions.insert_one(dict(prescription))
+        for worker in (worker_a, worker_b):
+            await worker.ensure_indexes(db)
+            await worker.rebuild(db)
+            worker.index.shared = True
+
+        # A write handled by worker A
+        await db.prescriptions.update_one({"id": "presc-0"}, {"$set": {"status": "approved"}})
+        worker_a.index.set_status("prescription", "presc-0", "approved")
+        created = {**SAMPLE_PRESCRIPTIONS[1], "id": "presc-1", "status": "pending"}
+        await db.prescriptions.insert_one(dict(created))
+        worker_a.index.add("prescription", created)
+        before = worker_b.index.search(filters={"status": ["approved"]})["total"]
+        await worker_a.sync(db)
+        applied = await worker_b.sync(db)
+        after = {r["id"] for r in worker_b.index.search(limit=10)["hits"]}
+        approved = worker_b.index.search(filters={"status": ["approved"]})["total"]
+
+        # Reseeding on worker A rebuilds worker B as well, once
+        await db.prescriptions.delete_many({})
+        await db.prescriptions.insert_one({**SAMPLE_PRESCRIPTIONS[2], "id": "presc-2", "status": "pending"})
+        await worker_a.rebuild(db, share=True)
+        await worker_a.sync(db)
+        await worker_b.sync(db)
+        reseeded = {r["id"] for r in worker_b.index.search(limit=10)["hits"]}
+        await worker_b.sync(db)
+        return before, applied, after, approved, reseeded
+
+    before, applied, after, approved, reseeded = asyncio.run(scenario())
+
+    assert before == 0 and applied == 2
+    assert after == {"presc-0", "presc-1"} and approved == 1
+    assert reseeded == {"presc-2"}
+    assert worker_b.stats["rebuilds"] == 2 and worker_a.stats["rebuilds"] == 2
+    # A worker never re-applies its own changes
+    assert worker_a.stats["applied"] == 0 and not worker_a.index.pending
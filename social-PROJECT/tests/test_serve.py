@@ -0,0 +1,54 @@
+import os
+import signal
+import subprocess
+import sys
+import urllib.request
+
+import pytest
+
+from tests.conftest import BACKEND_DIR
+
+pytestmark = pytest.mark.skipif(not sys.platform.startswith("linux"), reason="reads worker pids from /proc")
+
+# Startup hooks fail fast instead of waiting for a server
+ENV = {**os.environ, "MONGO_URL": "mongodb://127.0.0.1:1/?serverSelectionTimeoutMS=10"}
+
+
+def _children(pid: int):
+    with open(f"/proc/{pid}/task/{pid}/children") as f:
+        return [int(p) for p in f.read().split()]
+
+
+def test_importing_the_app_opens_no_clients():
+    code = ("import sys, server; from ai_service import ai_service; "
+            "print(ai_service._llama_initialized, 'llama_extract' in sys.modules, 'motor' in sys.modules)")
+    result = subprocess.run([sys.executable, "-c", code], cwd=BACKEND_DIR, env={**ENV, "LLAMA_API_KEY": "key"},
+                            capture_output=True, text=True, check=True)
+    assert result.stdout.split() == ["False", "False", "False"]
+
+
+def test_workers_start_serve_and_stop_gracefully():
+    process = subprocess.Popen([sys.executable, "-m", "serve", "--host", "127.0.0.1", "--port", "0",
+                                "--workers", "2", "--no-access-log"],
+                               cwd=BACKEND_DIR, env=ENV, stderr=subprocess.PIPE, text=True)
+    try:
+        log = []
+        for line in process.stderr:
+            log.append(line)
+            if "All 2 workers ready" in line or process.poll() is not None:
+                break
+        assert any("Preloaded application" in line for line in log)
+        assert sum("warmed up" in line for line in log) == 2
+        port = int(next(line for line in log if "Forked 2 workers" in line).rsplit(":", 1)[1])
+        workers = _children(process.pid)
+        assert len(workers) == 2
+
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/api/auth/roles", timeout=5) as response:
+            assert response.status == 200
+
+        process.send_signal(signal.SIGTERM)
+        assert process.wait(30) == 0
+        assert not any(os.path.exists(f"/proc/{pid}") for pid in workers)
+    finally:
+        if process.poll() is None:
+            process.kill()
@@ -0,0 +1,140 @@
+import asyncio
+from collections import Counter, deque
+from datetime import datetime, timezone, timedelta
+
+import httpx
+import pytest
+
+import server
+from jobs import JobQueue, job_queue
+from routes import prescriptions
+from sample_data import SAMPLE_PRESCRIPTIONS
+from summary_refresh import summary_refresher
+
+
+@pytest.fixture
+def db(db, monkeypatch):
+    monkeypatch.setattr(summary_refresher, "stats", Counter())
+    monkeypatch.setattr(summary_refresher, "lags", deque(maxlen=100))
+    # Due as soon as it is queued; writes still coalesce until a worker claims the job
+    monkeypatch.setattr(summary_refresher, "debounce_seconds", 0)
+    return db
+
+
+def test_a_burst_of_writes_regenerates_the_summary_once(db, create_prescription):
+    patient = SAMPLE_PRESCRIPTIONS[0]["patient_name"]
+
+    async def scenario():
+        created = [await create_prescription(SAMPLE_PRESCRIPTIONS[0], notes=f"Visit {i}") for i in range(5)]
+        for presc in created[:4]:
+            await prescriptions.update_prescription_status(presc["id"], "approved")
+        await prescriptions.update_prescription_status(created[0]["id"], "dispensed")
+        jobs = await db.jobs.find({"type": "refresh_summary"}, {"_id": 0}).to_list(None)
+        assert await job_queue.run_pending(db) == 1
+        summaries = await db.ai_summaries.find({"patient_name": patient}, {"_id": 0}).to_list(None)
+        return created, jobs, summaries
+
+    created, jobs, summaries = asyncio.run(scenario())
+
+    assert len(jobs) == 1 and jobs[0]["coalesced"] == 9
+    # Regenerated from the latest prescription
+    assert [s["prescription_id"] for s in summaries] == [created[-1]["id"]]
+    stats = summary_refresher.stats
+    assert (stats["writes"], stats["coalesced"], stats["refreshed"]) == (10, 9, 1)
+    assert len(summary_refresher.lags) == 1
+
+
+def test_debounce_pushes_the_run_back_up_to_the_max_delay(db):
+    queue = JobQueue(workers=0)
+    queue.register("task", lambda job: asyncio.sleep(0, {}))
+
+    async def scenario():
+        first = await queue.debounce(db, "task", {}, key="k", delay=5, max_delay=60)
+        second = await queue.debounce(db, "task", {}, key="k", delay=5, max_delay=60)
+        assert await queue.run_pending(db) == 0
+        # The burst has gone on for max_delay: the next write no longer postpones it
+        await db.jobs.update_one({"id": first["id"]},
+                                 {"$set": {"run_by": datetime.now(timezone.utc) - timedelta(seconds=1)}})
+        third = await queue.debounce(db, "task", {}, key="k", delay=5, max_delay=60)
+        ran = await queue.run_pending(db)
+        return first, second, third, ran
+
+    first, second, third, ran = asyncio.run(scenario())
+
+    assert first["id"] == second["id"] == third["id"]
+    assert second["run_at"] >= first["run_at"] and second["coalesced"] == 1
+    assert third["run_at"] < datetime.now(timezone.utc) and ran == 1
+    assert queue.metrics()["outcomes"]["task"] == {"enqueued": 1, "coalesced": 2, "succeeded": 1}
+
+
+def test_a_write_during_a_regeneration_queues_another(db):
+    queue = JobQueue(workers=0)
+    queue.register("task", lambda job: asyncio.sleep(0, {}))
+
+    async def scenario():
+        await queue.debounce(db, "task", {}, key="k", delay=0, max_delay=60)
+        running = await queue.claim(db)
+        queued = await queue.debounce(db, "task", {}, key="k", delay=0, max_delay=60)
+        await queue.execute(db, running)
+        return running, queued, await queue.run_pending(db)
+
+    running, queued, ran = asyncio.run(scenario())
+
+    assert queued["id"] != running.id and queued["coalesced"] == 0
+    assert ran == 1
+
+
+def test_cancelled_prescriptions_are_not_summarized(db, create_prescription):
+    patient = SAMPLE_PRESCRIPTIONS[1]["patient_name"]
+
+    async def scenario():
+        older = await create_prescription(SAMPLE_PRESCRIPTIONS[1])
+        await asyncio.sleep(0.001)
+        newer = await create_prescription(SAMPLE_PRESCRIPTIONS[1], notes="Follow-up")
+        await job_queue.run_pending(db)
+        first = await db.ai_summaries.find_one({"patient_name": patient}, {"_id": 0})
+        await prescriptions.update_prescription_status(newer["id"], "cancelled")
+        await job_queue.run_pending(db)
+        second = await db.ai_summaries.find_one({"patient_name": patient}, {"_id": 0})
+        await prescriptions.update_prescription_status(older["id"], "rejected")
+        await job_queue.run_pending(db)
+        return older, newer, first, second
+
+    older, newer, first, second = asyncio.run(scenario())
+
+    assert first["prescription_id"] == newer["id"]
+    assert second["prescription_id"] == older["id"]
+    assert summary_refresher.stats["skipped"] == 1
+
+
+def test_backlog_and_freshness_lag_metrics(db, monkeypatch, create_prescription):
+    monkeypatch.setattr(summary_refresher, "debounce_seconds", 30)
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            for presc in SAMPLE_PRESCRIPTIONS[:3]:
+                await create_prescription(presc)
+            await asyncio.sleep(0.01)
+            pending = (await client.get("/api/metrics/summary-refresh")).json()
+            await db.jobs.update_many({"type": "refresh_summary"},
+                                      {"$set": {"run_at": datetime.now(timezone.utc)}})
+            await job_queue.run_pending(db)
+            done = (await client.get("/api/metrics/summary-refresh")).json()
+            return pending, done
+
+    pending, done = asyncio.run(scenario())
+
+    assert pending["backlog"] == {"queued": 3, "running": 0}
+    assert pending["oldest_pending_seconds"] >= 0.01
+    assert done["backlog"] == {"queued": 0, "running": 0} and done["oldest_pending_seconds"] == 0.0
+    assert done["refreshed"] == 3 and done["freshness_lag_seconds"]["samples"] == 3
+    assert 0.01 <= done["freshness_lag_seconds"]["p50"] <= done["freshness_lag_seconds"]["max"]
+
+
+def test_freshness_lag_percentiles_use_the_nearest_rank(db):
+    summary_refresher.lags.extend([4.0, 1.0, 3.0, 2.0])
+
+    lag = asyncio.run(summary_refresher.metrics(db))["freshness_lag_seconds"]
+
+    assert lag == {"p50": 2.0, "p95": 4.0, "max": 4.0, "samples": 4}